@@ -24,8 +24,12 @@ python speech_to_text_buffered_infer_ctc.py \
     --model_stride=4 \
     --batch_size=32 \
     --total_buffer_in_secs=4.0 \
-    --chunk_len_in_ms=1000
+    --chunk_len_in_ms=1000 \
+    --prefetch_batches=2 \
+    --multi_file
 
+--multi_file packs the buffers of consecutive files into the same batches, so that short files do not leave the
+batches partially empty.
 
 
 """
@@ -42,7 +46,7 @@ from tqdm import tqdm
 
 import nemo.collections.asr as nemo_asr
 from nemo.collections.asr.metrics.wer import word_error_rate
-from nemo.collections.asr.parts.utils.streaming_utils import FrameBatchASR
+from nemo.collections.asr.parts.utils.streaming_utils import FrameBatchASR, MultiFileFrameBatchASR
 from nemo.utils import logging
 
 can_gpu = torch.cuda.is_available()
@@ -59,9 +63,20 @@ def get_wer_feat(mfst, asr, frame_len, tokens_per_chunk, delay, preprocessor_cfg
     refs = []
 
     with open(mfst, "r") as mfst_f:
-        for l in tqdm(mfst_f, desc="Sample:"):
+        rows = [json.loads(l.strip()) for l in mfst_f]
+    if isinstance(asr, MultiFileFrameBatchASR):
+        audio_filepaths = [row['audio_filepath'] for row in rows]
+        hyps = list(
+            tqdm(
+                asr.transcribe_files(audio_filepaths, tokens_per_chunk, delay, model_stride_in_secs),
+                total=len(rows),
+                desc="Sample:",
+            )
+        )
+        refs = [row['text'] for row in rows]
+    else:
+        for row in tqdm(rows, desc="Sample:"):
             asr.reset()
-            row = json.loads(l.strip())
             asr.read_audio_file(row['audio_filepath'], delay, model_stride_in_secs)
             hyp = asr.transcribe(tokens_per_chunk, delay)
             hyps.append(hyp)
@@ -86,6 +101,15 @@ def main():
     )
     parser.add_argument("--chunk_len_in_ms", type=int, default=1600, help="Chunk length in milliseconds")
     parser.add_argument("--output_path", type=str, help="path to output file", default=None)
+    parser.add_argument(
+        "--prefetch_batches",
+        type=int,
+        default=0,
+        help="Number of batches of feature buffers prepared in the background while the model runs, 0 to disable",
+    )
+    parser.add_argument(
+        "--multi_file", action="store_true", help="Pack the buffers of consecutive files into the same batches",
+    )
     parser.add_argument(
         "--model_stride",
         type=int,
@@ -127,8 +151,13 @@ def main():
     mid_delay = math.ceil((chunk_len + (total_buffer - chunk_len) / 2) / model_stride_in_secs)
     print(tokens_per_chunk, mid_delay)
 
-    frame_asr = FrameBatchASR(
-        asr_model=asr_model, frame_len=chunk_len, total_buffer=args.total_buffer_in_secs, batch_size=args.batch_size,
+    frame_asr_cls = MultiFileFrameBatchASR if args.multi_file else FrameBatchASR
+    frame_asr = frame_asr_cls(
+        asr_model=asr_model,
+        frame_len=chunk_len,
+        total_buffer=args.total_buffer_in_secs,
+        batch_size=args.batch_size,
+        prefetch_batches=args.prefetch_batches,
     )
 
     hyps, refs, wer = get_wer_feat(
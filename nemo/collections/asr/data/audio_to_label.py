@@ -268,9 +268,11 @@ target_label_n, "offset": offset_in_sec_n}
         max_duration: Optional[float] = None,
         trim: bool = False,
         is_regression_task: bool = False,
+        manifest_columnar: bool = False,
     ):
         super().__init__()
-        self.collection = collections.ASRSpeechLabel(
+        speech_label_cls = collections.ColumnarASRSpeechLabel if manifest_columnar else collections.ASRSpeechLabel
+        self.collection = speech_label_cls(
             manifests_files=manifest_filepath.split(','),
             min_duration=min_duration,
             max_duration=max_duration,
@@ -342,6 +344,9 @@ class AudioToClassificationLabelDataset(_AudioLabelDataset):
         min_duration: If audio is less than this length, do not include
             in dataset
         trim: Boolean flag whether to trim the audio
+        is_regression_task: Whether the dataset is for a regression task instead of classification
+        manifest_columnar: If True, the manifest is stored in flat numpy arrays instead of one Python object per
+            sample, which keeps memory flat in forked dataloader workers
     """
 
     def _collate_fn(self, batch):
@@ -381,6 +386,8 @@ class AudioToSpeechLabelDataset(_AudioLabelDataset):
         normalize_audio (bool): Whether to normalize audio signal.
             Defaults to False.
         is_regression_task (bool): Whether the dataset is for a regression task instead of classification
+        manifest_columnar (bool): If True, the manifest is stored in flat numpy arrays instead of one Python object
+            per sample, which keeps memory flat in forked dataloader workers. Defaults to False.
     """
 
     def __init__(
@@ -396,6 +403,7 @@ class AudioToSpeechLabelDataset(_AudioLabelDataset):
         shift_length_in_sec: Optional[float] = 1,
         normalize_audio: bool = False,
         is_regression_task: bool = False,
+        manifest_columnar: bool = False,
     ):
         self.window_length_in_sec = window_length_in_sec
         self.shift_length_in_sec = shift_length_in_sec
@@ -412,6 +420,7 @@ class AudioToSpeechLabelDataset(_AudioLabelDataset):
             max_duration=max_duration,
             trim=trim,
             is_regression_task=is_regression_task,
+            manifest_columnar=manifest_columnar,
         )
 
     def fixed_seq_collate_fn(self, batch):
@@ -11,6 +11,7 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import bisect
 import io
 import math
 import os
@@ -22,6 +23,7 @@ import torch
 import webdataset as wd
 from torch.utils.data import ChainDataset
 
+from nemo.collections.asr.data.data_samplers import make_duration_batches
 from nemo.collections.asr.parts.preprocessing.features import WaveformFeaturizer
 from nemo.collections.common import tokenizers
 from nemo.collections.common.parts.preprocessing import collections, parsers
@@ -44,46 +46,36 @@ def _speech_collate_fn(batch, pad_id):
                LongTensor):  A tuple of tuples of signal, signal lengths,
                encoded tokens, and encoded tokens length.  This collate func
                assumes the signals are 1d torch tensors (i.e. mono audio).
+        pad_id (int): Id used to pad the tokens.
     """
     packed_batch = list(zip(*batch))
     if len(packed_batch) == 5:
-        _, audio_lengths, _, tokens_lengths, sample_ids = packed_batch
+        audio_signal, audio_lengths, tokens, tokens_lengths, sample_ids = packed_batch
     elif len(packed_batch) == 4:
         sample_ids = None
-        _, audio_lengths, _, tokens_lengths = packed_batch
+        audio_signal, audio_lengths, tokens, tokens_lengths = packed_batch
     else:
         raise ValueError("Expects 4 or 5 tensors in the batch!")
-    max_audio_len = 0
-    has_audio = audio_lengths[0] is not None
-    if has_audio:
-        max_audio_len = max(audio_lengths).item()
-    max_tokens_len = max(tokens_lengths).item()
-
-    audio_signal, tokens = [], []
-    for b in batch:
-        if len(b) == 5:
-            sig, sig_len, tokens_i, tokens_i_len, _ = b
-        else:
-            sig, sig_len, tokens_i, tokens_i_len = b
-        if has_audio:
-            sig_len = sig_len.item()
-            if sig_len < max_audio_len:
-                pad = (0, max_audio_len - sig_len)
-                sig = torch.nn.functional.pad(sig, pad)
-            audio_signal.append(sig)
-        tokens_i_len = tokens_i_len.item()
-        if tokens_i_len < max_tokens_len:
-            pad = (0, max_tokens_len - tokens_i_len)
-            tokens_i = torch.nn.functional.pad(tokens_i, pad, value=pad_id)
-        tokens.append(tokens_i)
-
-    if has_audio:
-        audio_signal = torch.stack(audio_signal)
+
+    # The maximum lengths are computed once, and every sample is copied in place into a single padded tensor
+    # instead of being padded and stacked one by one.
+    if audio_lengths[0] is not None:
         audio_lengths = torch.stack(audio_lengths)
+        padded_audio = torch.empty((len(batch), int(audio_lengths.max())), dtype=audio_signal[0].dtype)
+        # Only the padding is zeroed, so that every element of the batch is written exactly once.
+        for padded_sig, sig in zip(padded_audio, audio_signal):
+            padded_sig[: sig.shape[0]].copy_(sig)
+            padded_sig[sig.shape[0] :].zero_()
+        audio_signal = padded_audio
     else:
         audio_signal, audio_lengths = None, None
-    tokens = torch.stack(tokens)
+
     tokens_lengths = torch.stack(tokens_lengths)
+    padded_tokens = torch.full((len(batch), int(tokens_lengths.max())), pad_id, dtype=tokens[0].dtype)
+    for padded_tokens_i, tokens_i in zip(padded_tokens, tokens):
+        padded_tokens_i[: tokens_i.shape[0]].copy_(tokens_i)
+    tokens = padded_tokens
+
     if sample_ids is None:
         return audio_signal, audio_lengths, tokens, tokens_lengths
     else:
@@ -91,6 +83,14 @@ def _speech_collate_fn(batch, pad_id):
         return audio_signal, audio_lengths, tokens, tokens_lengths, sample_ids
 
 
+def _augment_speech_batch(batch, augmentor, sample_rate: int):
+    """Applies `AudioAugmentor.perturb_batch` to the padded audio of a batch collated by `_speech_collate_fn`."""
+    if augmentor is None or batch[0] is None:
+        return batch
+    audio_signal, audio_lengths = augmentor.perturb_batch(batch[0], batch[1], sample_rate)
+    return (audio_signal, audio_lengths) + tuple(batch[2:])
+
+
 class ASRManifestProcessor:
     """
     Class that processes a manifest json file containing paths to audio files, transcripts, and durations (in seconds).
@@ -108,6 +108,14 @@ class ASRManifestProcessor:
         bos_id: Id of beginning of sequence symbol to append if not None.
         eos_id: Id of end of sequence symbol to append if not None.
         pad_id: Id of pad symbol. Defaults to 0.
+        index_by_file_id: If True, saves a mapping from filename base (ID) to index in the collection.
+        manifest_cache_dir: If set, the parsed and tokenized manifest is cached in this directory as memory-mapped
+            columns and loaded from there on subsequent runs. Defaults to None (no caching).
+        manifest_num_workers: Number of processes used to parse the manifest. Defaults to 0 (parse in this process).
+        manifest_check_audio_exists: If False, relative audio paths are not probed on the file system and used as
+            given. Defaults to True.
+        manifest_columnar: If True, the manifest is stored column-wise in flat numpy arrays instead of one Python
+            object per sample. Always the case when manifest_cache_dir is set. Defaults to False.
     """
 
     def __init__(
@@ -121,17 +129,36 @@ class ASRManifestProcessor:
         eos_id: Optional[int] = None,
         pad_id: int = 0,
         index_by_file_id: bool = False,
+        manifest_cache_dir: Optional[str] = None,
+        manifest_num_workers: int = 0,
+        manifest_check_audio_exists: bool = True,
+        manifest_columnar: bool = False,
     ):
         self.parser = parser
 
-        self.collection = collections.ASRAudioText(
-            manifests_files=manifest_filepath,
-            parser=parser,
-            min_duration=min_duration,
-            max_duration=max_duration,
-            max_number=max_utts,
-            index_by_file_id=index_by_file_id,
-        )
+        if manifest_columnar or manifest_cache_dir is not None:
+            self.collection = collections.ColumnarASRAudioText(
+                manifests_files=manifest_filepath,
+                parser=parser,
+                min_duration=min_duration,
+                max_duration=max_duration,
+                max_number=max_utts,
+                index_by_file_id=index_by_file_id,
+                cache_dir=manifest_cache_dir,
+                num_workers=manifest_num_workers,
+                check_audio_exists=manifest_check_audio_exists,
+            )
+        else:
+            self.collection = collections.ASRAudioText(
+                manifests_files=manifest_filepath,
+                parser=parser,
+                min_duration=min_duration,
+                max_duration=max_duration,
+                max_number=max_utts,
+                index_by_file_id=index_by_file_id,
+                num_workers=manifest_num_workers,
+                check_audio_exists=manifest_check_audio_exists,
+            )
 
         self.eos_id = eos_id
         self.bos_id = bos_id
@@ -230,6 +257,17 @@ class _AudioTextDataset(Dataset):
         eos_id: Id of end of sequence symbol to append if not None
         pad_id: Id of pad symbol. Defaults to 0
         return_sample_id (bool): whether to return the sample_id as a part of each sample
+        manifest_cache_dir (str): If set, the parsed manifest is cached as memory-mapped columns in this directory
+            and reused by subsequent runs. Defaults to None.
+        manifest_num_workers (int): Number of processes used to parse the manifest. Defaults to 0.
+        manifest_check_audio_exists (bool): If False, relative audio paths in the manifest are not probed on the
+            file system. Defaults to True.
+        manifest_columnar (bool): If True, the manifest is stored in flat numpy arrays instead of one Python object
+            per sample, which keeps memory flat in forked dataloader workers. Defaults to False.
+        resample_method (str): Method used to resample audio whose sample rate differs from sample_rate, either
+            'librosa' or 'polyphase' (cached polyphase filters, much faster). Defaults to 'librosa'.
+        batch_augmentation (bool): If True, the augmentor is applied to whole padded batches at collation (see
+            `AudioAugmentor.perturb_batch`) instead of to each loaded sample. Defaults to False.
     """
 
     @property
@@ -259,6 +297,12 @@ class _AudioTextDataset(Dataset):
         eos_id: Optional[int] = None,
         pad_id: int = 0,
         return_sample_id: bool = False,
+        manifest_cache_dir: Optional[str] = None,
+        manifest_num_workers: int = 0,
+        manifest_check_audio_exists: bool = True,
+        manifest_columnar: bool = False,
+        resample_method: str = 'librosa',
+        batch_augmentation: bool = False,
     ):
         if type(manifest_filepath) == str:
             manifest_filepath = manifest_filepath.split(",")
@@ -272,8 +316,18 @@ class _AudioTextDataset(Dataset):
             bos_id=bos_id,
             eos_id=eos_id,
             pad_id=pad_id,
+            manifest_cache_dir=manifest_cache_dir,
+            manifest_num_workers=manifest_num_workers,
+            manifest_check_audio_exists=manifest_check_audio_exists,
+            manifest_columnar=manifest_columnar,
         )
-        self.featurizer = WaveformFeaturizer(sample_rate=sample_rate, int_values=int_values, augmentor=augmentor)
+        self.featurizer = WaveformFeaturizer(
+            sample_rate=sample_rate,
+            int_values=int_values,
+            augmentor=None if batch_augmentation else augmentor,
+            resample_method=resample_method,
+        )
+        self.batch_augmentor = augmentor if batch_augmentation else None
         self.trim = trim
         self.return_sample_id = return_sample_id
 
@@ -305,7 +359,8 @@ class _AudioTextDataset(Dataset):
         return len(self.manifest_processor.collection)
 
     def _collate_fn(self, batch):
-        return _speech_collate_fn(batch, pad_id=self.manifest_processor.pad_id)
+        batch = _speech_collate_fn(batch, pad_id=self.manifest_processor.pad_id)
+        return _augment_speech_batch(batch, self.batch_augmentor, self.featurizer.sample_rate)
 
 
 class AudioToCharDataset(_AudioTextDataset):
@@ -337,6 +392,17 @@ class AudioToCharDataset(_AudioTextDataset):
         bos_id: Id of beginning of sequence symbol to append if not None
         eos_id: Id of end of sequence symbol to append if not None
         return_sample_id (bool): whether to return the sample_id as a part of each sample
+        manifest_cache_dir (str): If set, the parsed manifest is cached as memory-mapped columns in this directory
+            and reused by subsequent runs. Defaults to None.
+        manifest_num_workers (int): Number of processes used to parse the manifest. Defaults to 0.
+        manifest_check_audio_exists (bool): If False, relative audio paths in the manifest are not probed on the
+            file system. Defaults to True.
+        manifest_columnar (bool): If True, the manifest is stored in flat numpy arrays instead of one Python object
+            per sample, which keeps memory flat in forked dataloader workers. Defaults to False.
+        resample_method (str): Method used to resample audio whose sample rate differs from sample_rate, either
+            'librosa' or 'polyphase' (cached polyphase filters, much faster). Defaults to 'librosa'.
+        batch_augmentation (bool): If True, the augmentor is applied to whole padded batches at collation (see
+            `AudioAugmentor.perturb_batch`) instead of to each loaded sample. Defaults to False.
     """
 
     @property
@@ -370,6 +436,12 @@ class AudioToCharDataset(_AudioTextDataset):
         pad_id: int = 0,
         parser: Union[str, Callable] = 'en',
         return_sample_id: bool = False,
+        manifest_cache_dir: Optional[str] = None,
+        manifest_num_workers: int = 0,
+        manifest_check_audio_exists: bool = True,
+        manifest_columnar: bool = False,
+        resample_method: str = 'librosa',
+        batch_augmentation: bool = False,
     ):
         self.labels = labels
 
@@ -391,6 +463,12 @@ class AudioToCharDataset(_AudioTextDataset):
             eos_id=eos_id,
             pad_id=pad_id,
             return_sample_id=return_sample_id,
+            manifest_cache_dir=manifest_cache_dir,
+            manifest_num_workers=manifest_num_workers,
+            manifest_check_audio_exists=manifest_check_audio_exists,
+            manifest_columnar=manifest_columnar,
+            resample_method=resample_method,
+            batch_augmentation=batch_augmentation,
         )
 
 
@@ -428,6 +506,17 @@ class AudioToBPEDataset(_AudioTextDataset):
         use_start_end_token: Boolean which dictates whether to add [BOS] and [EOS]
             tokens to beginning and ending of speech respectively.
         return_sample_id (bool): whether to return the sample_id as a part of each sample
+        manifest_cache_dir (str): If set, the parsed manifest is cached as memory-mapped columns in this directory
+            and reused by subsequent runs. Defaults to None.
+        manifest_num_workers (int): Number of processes used to parse the manifest. Defaults to 0.
+        manifest_check_audio_exists (bool): If False, relative audio paths in the manifest are not probed on the
+            file system. Defaults to True.
+        manifest_columnar (bool): If True, the manifest is stored in flat numpy arrays instead of one Python object
+            per sample, which keeps memory flat in forked dataloader workers. Defaults to False.
+        resample_method (str): Method used to resample audio whose sample rate differs from sample_rate, either
+            'librosa' or 'polyphase' (cached polyphase filters, much faster). Defaults to 'librosa'.
+        batch_augmentation (bool): If True, the augmentor is applied to whole padded batches at collation (see
+            `AudioAugmentor.perturb_batch`) instead of to each loaded sample. Defaults to False.
     """
 
     @property
@@ -455,6 +544,12 @@ class AudioToBPEDataset(_AudioTextDataset):
         trim: bool = False,
         use_start_end_token: bool = True,
         return_sample_id: bool = False,
+        manifest_cache_dir: Optional[str] = None,
+        manifest_num_workers: int = 0,
+        manifest_check_audio_exists: bool = True,
+        manifest_columnar: bool = False,
+        resample_method: str = 'librosa',
+        batch_augmentation: bool = False,
     ):
         if use_start_end_token and hasattr(tokenizer, 'bos_token'):
             bos_id = tokenizer.bos_id
@@ -497,6 +592,12 @@ class AudioToBPEDataset(_AudioTextDataset):
             pad_id=pad_id,
             trim=trim,
             return_sample_id=return_sample_id,
+            manifest_cache_dir=manifest_cache_dir,
+            manifest_num_workers=manifest_num_workers,
+            manifest_check_audio_exists=manifest_check_audio_exists,
+            manifest_columnar=manifest_columnar,
+            resample_method=resample_method,
+            batch_augmentation=batch_augmentation,
         )
 
 
@@ -590,6 +691,17 @@ class _TarredAudioToTextDataset(IterableDataset):
         global_rank (int): Worker rank, used for partitioning shards. Defaults to 0.
         world_size (int): Total number of processes, used for partitioning shards. Defaults to 0.
         return_sample_id (bool): whether to return the sample_id as a part of each sample
+        manifest_cache_dir (str): If set, the parsed manifest is cached as memory-mapped columns in this directory
+            and reused by subsequent runs. Defaults to None.
+        manifest_num_workers (int): Number of processes used to parse the manifest. Defaults to 0.
+        manifest_check_audio_exists (bool): If False, relative audio paths in the manifest are not probed on the
+            file system. Defaults to True.
+        manifest_columnar (bool): If True, the manifest is stored in flat numpy arrays instead of one Python object
+            per sample, which keeps memory flat in forked dataloader workers. Defaults to False.
+        resample_method (str): Method used to resample audio whose sample rate differs from sample_rate, either
+            'librosa' or 'polyphase' (cached polyphase filters, much faster). Defaults to 'librosa'.
+        batch_augmentation (bool): If True, the augmentor is applied to whole padded batches at collation (see
+            `AudioAugmentor.perturb_batch`) instead of to each loaded sample. Defaults to False.
     """
 
     def __init__(
@@ -612,6 +724,12 @@ class _TarredAudioToTextDataset(IterableDataset):
         global_rank: int = 0,
         world_size: int = 0,
         return_sample_id: bool = False,
+        manifest_cache_dir: Optional[str] = None,
+        manifest_num_workers: int = 0,
+        manifest_check_audio_exists: bool = True,
+        manifest_columnar: bool = False,
+        resample_method: str = 'librosa',
+        batch_augmentation: bool = False,
     ):
         self.manifest_processor = ASRManifestProcessor(
             manifest_filepath=manifest_filepath,
@@ -623,9 +741,19 @@ class _TarredAudioToTextDataset(IterableDataset):
             eos_id=eos_id,
             pad_id=pad_id,
             index_by_file_id=True,  # Must set this so the manifest lines can be indexed by file ID
+            manifest_cache_dir=manifest_cache_dir,
+            manifest_num_workers=manifest_num_workers,
+            manifest_check_audio_exists=manifest_check_audio_exists,
+            manifest_columnar=manifest_columnar,
         )
 
-        self.featurizer = WaveformFeaturizer(sample_rate=sample_rate, int_values=int_values, augmentor=augmentor)
+        self.featurizer = WaveformFeaturizer(
+            sample_rate=sample_rate,
+            int_values=int_values,
+            augmentor=None if batch_augmentation else augmentor,
+            resample_method=resample_method,
+        )
+        self.batch_augmentor = augmentor if batch_augmentation else None
         self.trim = trim
         self.eos_id = eos_id
         self.bos_id = bos_id
@@ -712,7 +840,8 @@ class _TarredAudioToTextDataset(IterableDataset):
         return TarredAudioLoopOffsets(self.manifest_processor.collection)
 
     def _collate_fn(self, batch):
-        return _speech_collate_fn(batch, self.pad_id)
+        batch = _speech_collate_fn(batch, self.pad_id)
+        return _augment_speech_batch(batch, self.batch_augmentor, self.featurizer.sample_rate)
 
     def _build_sample(self, tup):
         """Builds the training sample by combining the data from the WebDataset with the manifest info.
@@ -855,6 +984,17 @@ class TarredAudioToCharDataset(_TarredAudioToTextDataset):
         global_rank (int): Worker rank, used for partitioning shards. Defaults to 0.
         world_size (int): Total number of processes, used for partitioning shards. Defaults to 0.
         return_sample_id (bool): whether to return the sample_id as a part of each sample
+        manifest_cache_dir (str): If set, the parsed manifest is cached as memory-mapped columns in this directory
+            and reused by subsequent runs. Defaults to None.
+        manifest_num_workers (int): Number of processes used to parse the manifest. Defaults to 0.
+        manifest_check_audio_exists (bool): If False, relative audio paths in the manifest are not probed on the
+            file system. Defaults to True.
+        manifest_columnar (bool): If True, the manifest is stored in flat numpy arrays instead of one Python object
+            per sample, which keeps memory flat in forked dataloader workers. Defaults to False.
+        resample_method (str): Method used to resample audio whose sample rate differs from sample_rate, either
+            'librosa' or 'polyphase' (cached polyphase filters, much faster). Defaults to 'librosa'.
+        batch_augmentation (bool): If True, the augmentor is applied to whole padded batches at collation (see
+            `AudioAugmentor.perturb_batch`) instead of to each loaded sample. Defaults to False.
     """
 
     def __init__(
@@ -881,6 +1021,12 @@ class TarredAudioToCharDataset(_TarredAudioToTextDataset):
         global_rank: int = 0,
         world_size: int = 0,
         return_sample_id: bool = False,
+        manifest_cache_dir: Optional[str] = None,
+        manifest_num_workers: int = 0,
+        manifest_check_audio_exists: bool = True,
+        manifest_columnar: bool = False,
+        resample_method: str = 'librosa',
+        batch_augmentation: bool = False,
     ):
         self.labels = labels
 
@@ -907,6 +1053,12 @@ class TarredAudioToCharDataset(_TarredAudioToTextDataset):
             global_rank=global_rank,
             world_size=world_size,
             return_sample_id=return_sample_id,
+            manifest_cache_dir=manifest_cache_dir,
+            manifest_num_workers=manifest_num_workers,
+            manifest_check_audio_exists=manifest_check_audio_exists,
+            manifest_columnar=manifest_columnar,
+            resample_method=resample_method,
+            batch_augmentation=batch_augmentation,
         )
 
 
@@ -985,6 +1137,17 @@ class TarredAudioToBPEDataset(_TarredAudioToTextDataset):
         global_rank (int): Worker rank, used for partitioning shards. Defaults to 0.
         world_size (int): Total number of processes, used for partitioning shards. Defaults to 0.
         return_sample_id (bool): whether to return the sample_id as a part of each sample
+        manifest_cache_dir (str): If set, the parsed manifest is cached as memory-mapped columns in this directory
+            and reused by subsequent runs. Defaults to None.
+        manifest_num_workers (int): Number of processes used to parse the manifest. Defaults to 0.
+        manifest_check_audio_exists (bool): If False, relative audio paths in the manifest are not probed on the
+            file system. Defaults to True.
+        manifest_columnar (bool): If True, the manifest is stored in flat numpy arrays instead of one Python object
+            per sample, which keeps memory flat in forked dataloader workers. Defaults to False.
+        resample_method (str): Method used to resample audio whose sample rate differs from sample_rate, either
+            'librosa' or 'polyphase' (cached polyphase filters, much faster). Defaults to 'librosa'.
+        batch_augmentation (bool): If True, the augmentor is applied to whole padded batches at collation (see
+            `AudioAugmentor.perturb_batch`) instead of to each loaded sample. Defaults to False.
     """
 
     def __init__(
@@ -1005,6 +1168,12 @@ class TarredAudioToBPEDataset(_TarredAudioToTextDataset):
         global_rank: int = 0,
         world_size: int = 0,
         return_sample_id: bool = False,
+        manifest_cache_dir: Optional[str] = None,
+        manifest_num_workers: int = 0,
+        manifest_check_audio_exists: bool = True,
+        manifest_columnar: bool = False,
+        resample_method: str = 'librosa',
+        batch_augmentation: bool = False,
     ):
         if use_start_end_token and hasattr(tokenizer, 'bos_token'):
             bos_id = tokenizer.bos_id
@@ -1052,6 +1221,12 @@ class TarredAudioToBPEDataset(_TarredAudioToTextDataset):
             global_rank=global_rank,
             world_size=world_size,
             return_sample_id=return_sample_id,
+            manifest_cache_dir=manifest_cache_dir,
+            manifest_num_workers=manifest_num_workers,
+            manifest_check_audio_exists=manifest_check_audio_exists,
+            manifest_columnar=manifest_columnar,
+            resample_method=resample_method,
+            batch_augmentation=batch_augmentation,
         )
 
 
@@ -1071,7 +1246,7 @@ class BucketingDataset(IterableDataset):
         super().__init__()
 
     def _collate_fn(self, batch):
-        return _speech_collate_fn(batch[0], self.wrapped_dataset.pad_id)
+        return self.wrapped_dataset._collate_fn(batch[0])
 
     def __iter__(self):
         return BucketingIterator(
@@ -1103,6 +1278,110 @@ class BucketingIterator:
         return batches
 
 
+class DurationBucketingDataset(Dataset):
+    """
+    A Dataset which wraps a map-style dataset so that it can be indexed by the lists of indices yielded by
+    `DurationBucketingBatchSampler`. It should be used with ``batch_size=None`` in the DataLoader, each item
+    being a whole batch of samples.
+    Args:
+        dataset (Dataset): The Dataset to get wrapped
+    """
+
+    def __init__(self, dataset: Dataset):
+        super().__init__()
+        self.wrapped_dataset = dataset
+
+    def _collate_fn(self, batch):
+        return self.wrapped_dataset._collate_fn(batch)
+
+    def __getitem__(self, indices: List[int]):
+        return [self.wrapped_dataset[index] for index in indices]
+
+    def __len__(self):
+        return len(self.wrapped_dataset)
+
+
+class TarredDurationBucketingDataset(IterableDataset):
+    """
+    A Dataset which wraps another IterableDataset (e.g. a tarred dataset) and groups the samples it yields into
+    batches of similar durations, formed by a total duration budget rather than a fixed batch size.
+
+    Incoming samples are dispatched to the duration bucket their length falls in, and a bucket is emitted as a batch
+    as soon as adding one more sample would exceed the padded duration budget or the maximum batch size. The
+    remaining partial buckets are emitted at the end of the iteration unless drop_last is set. Randomness comes from
+    the shuffling of the wrapped dataset. It should be used with ``batch_size=None`` in the DataLoader.
+    Args:
+        dataset (IterableDataset): The IterableDataset to get wrapped, yielding (audio, audio length, ...) samples
+        sample_rate (int): Sample rate of the audio signals, used to convert lengths to durations
+        max_batch_duration (float): Maximum padded duration of a batch, in seconds
+        bucket_boundaries (list): Sorted inner bucket boundaries, in seconds
+        max_batch_size (int): Optional maximum number of samples in a batch
+        drop_last (bool): Whether to drop the partial batches left at the end of the iteration
+        durations (np.ndarray): Optional durations of all the samples of the wrapped dataset, used to estimate
+            the number of batches
+        world_size (int): Number of processes the samples are split between, used to estimate the number of batches
+    """
+
+    def __init__(
+        self,
+        dataset: IterableDataset,
+        sample_rate: int,
+        max_batch_duration: float,
+        bucket_boundaries: List[float],
+        max_batch_size: Optional[int] = None,
+        drop_last: bool = False,
+        durations: Optional[np.ndarray] = None,
+        world_size: int = 1,
+    ):
+        super().__init__()
+        self.wrapped_dataset = dataset
+        self.sample_rate = sample_rate
+        self.max_batch_duration = max_batch_duration
+        self.bucket_boundaries = list(bucket_boundaries)
+        self.max_batch_size = max_batch_size
+        self.drop_last = drop_last
+        self.durations = durations
+        self.world_size = world_size
+
+    def _collate_fn(self, batch):
+        if isinstance(self.wrapped_dataset, ChainDataset):
+            return self.wrapped_dataset.datasets[0]._collate_fn(batch)
+        return self.wrapped_dataset._collate_fn(batch)
+
+    def __iter__(self):
+        buckets = [[] for _ in range(len(self.bucket_boundaries) + 1)]
+        bucket_max = [0.0] * len(buckets)
+        for sample in self.wrapped_dataset:
+            duration = sample[1].item() / self.sample_rate
+            bucket_id = bisect.bisect_right(self.bucket_boundaries, duration)
+            bucket = buckets[bucket_id]
+            new_max = max(bucket_max[bucket_id], duration)
+            if bucket and (
+                (len(bucket) + 1) * new_max > self.max_batch_duration or len(bucket) == self.max_batch_size
+            ):
+                yield bucket
+                bucket = buckets[bucket_id] = []
+                new_max = duration
+            bucket.append(sample)
+            bucket_max[bucket_id] = new_max
+
+        if not self.drop_last:
+            for bucket in buckets:
+                if bucket:
+                    yield bucket
+
+    def __len__(self):
+        # Estimated from the manifest durations, the actual number of batches depends on the order of the samples.
+        if self.durations is None:
+            return len(self.wrapped_dataset)
+        num_batches = len(
+            make_duration_batches(
+                self.durations, np.asarray(self.bucket_boundaries), self.max_batch_duration, self.max_batch_size
+            )
+        )
+        return int(math.ceil(num_batches / self.world_size))
+
+
 class RandomizedChainDataset(ChainDataset):
     def __init__(self, datasets: Iterable[Dataset], rnd_seed=0) -> None:
         super(RandomizedChainDataset, self).__init__(list(datasets))
@@ -16,13 +16,14 @@ import json
 import random
 from typing import Any, List, Optional, Union
 
+import numpy as np
 import torch
 from omegaconf import DictConfig, open_dict
 from omegaconf.listconfig import ListConfig
 from pytorch_lightning.callbacks import BasePredictionWriter
 from torch.utils.data import ChainDataset
 
-from nemo.collections.asr.data import audio_to_text, audio_to_text_dali
+from nemo.collections.asr.data import audio_to_text, audio_to_text_dali, data_samplers, feature_to_text
 from nemo.utils import logging
 
 
@@ -69,6 +70,14 @@ def inject_dataloader_value_from_model_config(model_cfg: dict, dataloader_cfg: D
             dataloader_cfg[key] = model_cfg[key]
 
 
+def _check_feature_store_augmentor(augmentor: Optional['AudioAugmentor']):
+    if augmentor is not None:
+        logging.warning(
+            "Audio augmentations are not applied to precomputed features (`feature_store_dir`), "
+            "use `spec_augment` in the model config instead."
+        )
+
+
 def get_char_dataset(config: dict, augmentor: Optional['AudioAugmentor'] = None) -> audio_to_text.AudioToCharDataset:
     """
     Instantiates a Character Encoding based AudioToCharDataset.
@@ -83,6 +92,22 @@ def get_char_dataset(config: dict, augmentor: Optional['AudioAugmentor'] = None)
     if 'labels' not in config:
         logging.warning(f"dataset does not have explicitly defined labels")
 
+    if config.get('feature_store_dir', None) is not None:
+        _check_feature_store_augmentor(augmentor)
+        return feature_to_text.FeatureToCharDataset(
+            manifest_filepath=config['manifest_filepath'],
+            labels=config.get('labels', None),
+            feature_store_dir=config['feature_store_dir'],
+            max_duration=config.get('max_duration', None),
+            min_duration=config.get('min_duration', None),
+            max_utts=config.get('max_utts', 0),
+            blank_index=config.get('blank_index', -1),
+            unk_index=config.get('unk_index', -1),
+            normalize=config.get('normalize_transcripts', False),
+            parser=config.get('parser', 'en'),
+            manifest_columnar=config.get('manifest_columnar', False),
+        )
+
     dataset = audio_to_text.AudioToCharDataset(
         manifest_filepath=config['manifest_filepath'],
         labels=config.get('labels', None),
@@ -98,6 +123,12 @@ def get_char_dataset(config: dict, augmentor: Optional['AudioAugmentor'] = None)
         trim=config.get('trim_silence', False),
         parser=config.get('parser', 'en'),
         return_sample_id=config.get('return_sample_id', False),
+        manifest_cache_dir=config.get('manifest_cache_dir', None),
+        manifest_num_workers=config.get('manifest_num_workers', 0),
+        manifest_check_audio_exists=config.get('manifest_check_audio_exists', True),
+        manifest_columnar=config.get('manifest_columnar', False),
+        resample_method=config.get('resample_method', 'librosa'),
+        batch_augmentation=config.get('batch_augmentation', False),
     )
     return dataset
 
@@ -116,6 +147,19 @@ def get_bpe_dataset(
     Returns:
         An instance of AudioToBPEDataset.
     """
+    if config.get('feature_store_dir', None) is not None:
+        _check_feature_store_augmentor(augmentor)
+        return feature_to_text.FeatureToBPEDataset(
+            manifest_filepath=config['manifest_filepath'],
+            tokenizer=tokenizer,
+            feature_store_dir=config['feature_store_dir'],
+            max_duration=config.get('max_duration', None),
+            min_duration=config.get('min_duration', None),
+            max_utts=config.get('max_utts', 0),
+            use_start_end_token=config.get('use_start_end_token', True),
+            manifest_columnar=config.get('manifest_columnar', False),
+        )
+
     dataset = audio_to_text.AudioToBPEDataset(
         manifest_filepath=config['manifest_filepath'],
         tokenizer=tokenizer,
@@ -128,6 +172,12 @@ def get_bpe_dataset(
         trim=config.get('trim_silence', False),
         use_start_end_token=config.get('use_start_end_token', True),
         return_sample_id=config.get('return_sample_id', False),
+        manifest_cache_dir=config.get('manifest_cache_dir', None),
+        manifest_num_workers=config.get('manifest_num_workers', 0),
+        manifest_check_audio_exists=config.get('manifest_check_audio_exists', True),
+        manifest_columnar=config.get('manifest_columnar', False),
+        resample_method=config.get('resample_method', 'librosa'),
+        batch_augmentation=config.get('batch_augmentation', False),
     )
     return dataset
 
@@ -202,6 +252,12 @@ def get_tarred_dataset(
                 global_rank=global_rank,
                 world_size=world_size,
                 return_sample_id=config.get('return_sample_id', False),
+                manifest_cache_dir=config.get('manifest_cache_dir', None),
+                manifest_num_workers=config.get('manifest_num_workers', 0),
+                manifest_check_audio_exists=config.get('manifest_check_audio_exists', True),
+                manifest_columnar=config.get('manifest_columnar', False),
+                resample_method=config.get('resample_method', 'librosa'),
+                batch_augmentation=config.get('batch_augmentation', False),
             )
         else:
             dataset = audio_to_text.TarredAudioToBPEDataset(
@@ -221,6 +277,12 @@ def get_tarred_dataset(
                 global_rank=global_rank,
                 world_size=world_size,
                 return_sample_id=config.get('return_sample_id', False),
+                manifest_cache_dir=config.get('manifest_cache_dir', None),
+                manifest_num_workers=config.get('manifest_num_workers', 0),
+                manifest_check_audio_exists=config.get('manifest_check_audio_exists', True),
+                manifest_columnar=config.get('manifest_columnar', False),
+                resample_method=config.get('resample_method', 'librosa'),
+                batch_augmentation=config.get('batch_augmentation', False),
             )
         if bucketing_weights:
             [datasets.append(dataset) for _ in range(bucketing_weights[dataset_idx])]
@@ -230,6 +292,76 @@ def get_tarred_dataset(
     return get_chain_dataset(datasets=datasets, ds_config=config)
 
 
+def get_duration_bucketing_dataloader(
+    config: dict,
+    dataset: Union[torch.utils.data.Dataset, torch.utils.data.IterableDataset],
+    global_rank: int,
+    world_size: int,
+) -> torch.utils.data.DataLoader:
+    """
+    Instantiates a DataLoader forming batches of utterances of similar durations under a total duration budget,
+    enabled by setting `max_batch_duration` (in seconds) in the config. `batch_size` is ignored in that case.
+
+    Map-style datasets are sampled with a DurationBucketingBatchSampler, which also splits batches between ranks.
+    Tarred datasets are wrapped into a TarredDurationBucketingDataset which buckets the streamed samples.
+
+    Args:
+        config: Config of the dataset, with the `max_batch_duration`, `num_duration_buckets` (default 30) and
+            optional `max_batch_size` bucketing parameters.
+        dataset: An instance of AudioToCharDataset / AudioToBPEDataset or of their tarred counterparts.
+        global_rank: Global rank of this device.
+        world_size: Global world size in the training method.
+
+    Returns:
+        An instance of DataLoader yielding collated batches.
+    """
+    if config.get('bucketing_batch_size', None) is not None:
+        raise ValueError("max_batch_duration and bucketing_batch_size cannot be used together.")
+
+    max_batch_duration = config['max_batch_duration']
+    num_buckets = config.get('num_duration_buckets', 30)
+    max_batch_size = config.get('max_batch_size', None)
+    drop_last = config.get('drop_last', False)
+
+    if isinstance(dataset, torch.utils.data.IterableDataset):
+        wrapped = dataset.datasets if isinstance(dataset, ChainDataset) else [dataset]
+        durations = np.concatenate(
+            [data_samplers.get_collection_durations(ds.manifest_processor.collection) for ds in wrapped]
+        )
+        dataset = audio_to_text.TarredDurationBucketingDataset(
+            dataset=dataset,
+            sample_rate=config['sample_rate'],
+            max_batch_duration=max_batch_duration,
+            bucket_boundaries=data_samplers.get_duration_bucket_boundaries(durations, num_buckets),
+            max_batch_size=max_batch_size,
+            drop_last=drop_last,
+            durations=durations,
+            world_size=world_size,
+        )
+        sampler = None
+    else:
+        sampler = data_samplers.DurationBucketingBatchSampler(
+            durations=data_samplers.get_collection_durations(dataset.manifest_processor.collection),
+            max_batch_duration=max_batch_duration,
+            num_buckets=num_buckets,
+            max_batch_size=max_batch_size,
+            shuffle=config['shuffle'],
+            drop_last=drop_last,
+            global_rank=global_rank,
+            world_size=world_size,
+        )
+        dataset = audio_to_text.DurationBucketingDataset(dataset=dataset)
+
+    return torch.utils.data.DataLoader(
+        dataset=dataset,
+        batch_size=None,
+        sampler=sampler,
+        collate_fn=dataset.collate_fn,
+        num_workers=config.get('num_workers', 0),
+        pin_memory=config.get('pin_memory', False),
+    )
+
+
 def get_dali_char_dataset(
     config: dict,
     shuffle: bool,
@@ -0,0 +1,182 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Iterator, List, Optional, Sequence
+
+import numpy as np
+from torch.utils.data.distributed import DistributedSampler
+
+__all__ = [
+    'get_collection_durations',
+    'get_duration_bucket_boundaries',
+    'make_duration_batches',
+    'DurationBucketingBatchSampler',
+]
+
+
+def get_collection_durations(collection: Sequence) -> np.ndarray:
+    """Returns the durations of all the entries of an `AudioText` like collection as a float64 array.
+
+    Columnar collections expose their durations directly, list-based collections are read entry by entry.
+    """
+    durations = getattr(collection, 'durations', None)
+    if durations is not None:
+        return np.asarray(durations, dtype=np.float64)
+    return np.fromiter((entry.duration for entry in collection), dtype=np.float64, count=len(collection))
+
+
+def get_duration_bucket_boundaries(durations: np.ndarray, num_buckets: int) -> np.ndarray:
+    """Computes the boundaries splitting ``durations`` into ``num_buckets`` buckets of (roughly) equal size.
+
+    Args:
+        durations: Durations of all the utterances, in seconds.
+        num_buckets: Number of buckets.
+
+    Returns:
+        Sorted array of at most ``num_buckets - 1`` inner bucket boundaries, in seconds.
+    """
+    if num_buckets < 1:
+        raise ValueError(f"num_buckets should be a positive integer, got {num_buckets}")
+    if len(durations) == 0 or num_buckets == 1:
+        return np.empty(0, dtype=np.float64)
+    quantiles = np.linspace(0, 1, num_buckets + 1)[1:-1]
+    return np.unique(np.quantile(durations, quantiles))
+
+
+def make_duration_batches(
+    durations: np.ndarray,
+    bucket_boundaries: np.ndarray,
+    max_batch_duration: float,
+    max_batch_size: Optional[int] = None,
+    rng: Optional[np.random.RandomState] = None,
+) -> List[np.ndarray]:
+    """Groups utterances of similar durations into batches bounded by a total duration budget.
+
+    Every utterance is assigned to the bucket delimited by ``bucket_boundaries`` its duration falls in, and each
+    bucket is greedily cut into batches. The cost of a batch is its padded duration, i.e. the number of utterances
+    times the longest one, which is what the collated batch actually occupies. An utterance longer than the budget
+    forms a batch on its own.
+
+    Args:
+        durations: Durations of all the utterances, in seconds.
+        bucket_boundaries: Sorted inner bucket boundaries, in seconds.
+        max_batch_duration: Maximum padded duration of a batch, in seconds.
+        max_batch_size: Optional maximum number of utterances in a batch.
+        rng: If given, utterances are shuffled within their bucket. Otherwise they are sorted by duration.
+
+    Returns:
+        List of batches, each an array of utterance indices. Batches are ordered by bucket.
+    """
+    bucket_ids = np.searchsorted(bucket_boundaries, durations, side='right')
+    batches = []
+    for bucket_id in np.unique(bucket_ids):
+        indices = np.flatnonzero(bucket_ids == bucket_id)
+        if rng is not None:
+            indices = rng.permutation(indices)
+        else:
+            indices = indices[np.argsort(durations[indices], kind='stable')]
+
+        start, batch_max = 0, 0.0
+        for pos, duration in enumerate(durations[indices].tolist()):
+            new_max = max(batch_max, duration)
+            num_utts = pos - start
+            if num_utts > 0 and ((num_utts + 1) * new_max > max_batch_duration or num_utts == max_batch_size):
+                batches.append(indices[start:pos])
+                start, new_max = pos, duration
+            batch_max = new_max
+        if start < len(indices):
+            batches.append(indices[start:])
+    return batches
+
+
+class DurationBucketingBatchSampler(DistributedSampler):
+    """
+    Sampler yielding batches of indices of utterances of similar durations, formed by a total duration budget
+    rather than a fixed batch size. This reduces padding in `_speech_collate_fn` and keeps the amount of audio per
+    batch roughly constant.
+
+    Every epoch, utterances are shuffled within their duration bucket, cut into batches by `make_duration_batches`,
+    and the batches are shuffled and split between the ranks. All ranks get the same number of batches: with
+    ``drop_last`` the extra batches are dropped, otherwise the first batches are repeated.
+
+    The sampler yields whole batches, so it should be used with ``batch_size=None`` on a dataset accepting lists of
+    indices, such as `DurationBucketingDataset`. It derives from `DistributedSampler` so that PyTorch Lightning
+    neither replaces it in distributed runs nor forgets to call `set_epoch`.
+
+    Args:
+        durations: Durations of all the utterances of the dataset, in seconds.
+        max_batch_duration: Maximum padded duration of a batch, in seconds.
+        num_buckets: Number of duration buckets. Ignored if bucket_boundaries is given.
+        bucket_boundaries: Optional sorted inner bucket boundaries, in seconds.
+        max_batch_size: Optional maximum number of utterances in a batch.
+        shuffle: Whether to shuffle utterances and batches. If False, batches are sorted by duration.
+        seed: Random seed, shared by all ranks.
+        drop_last: Whether to drop the batches that cannot be evenly split between the ranks.
+        global_rank: Rank of this process.
+        world_size: Number of processes.
+    """
+
+    def __init__(
+        self,
+        durations: np.ndarray,
+        max_batch_duration: float,
+        num_buckets: int = 30,
+        bucket_boundaries: Optional[Sequence[float]] = None,
+        max_batch_size: Optional[int] = None,
+        shuffle: bool = True,
+        seed: int = 0,
+        drop_last: bool = False,
+        global_rank: int = 0,
+        world_size: int = 1,
+    ):
+        self.durations = np.asarray(durations, dtype=np.float64)
+        super().__init__(
+            self.durations, num_replicas=world_size, rank=global_rank, shuffle=shuffle, seed=seed, drop_last=drop_last
+        )
+        if max_batch_duration <= 0:
+            raise ValueError(f"max_batch_duration should be positive, got {max_batch_duration}")
+        self.max_batch_duration = max_batch_duration
+        self.max_batch_size = max_batch_size
+        if bucket_boundaries is None:
+            bucket_boundaries = get_duration_bucket_boundaries(self.durations, num_buckets)
+        self.bucket_boundaries = np.asarray(bucket_boundaries, dtype=np.float64)
+        self._batches_epoch, self._batches = None, None
+
+    def _get_batches(self) -> List[np.ndarray]:
+        """Returns the batches of this rank for the current epoch."""
+        if self._batches_epoch == self.epoch:
+            return self._batches
+
+        rng = np.random.RandomState(self.seed + self.epoch) if self.shuffle else None
+        batches = make_duration_batches(
+            self.durations, self.bucket_boundaries, self.max_batch_duration, self.max_batch_size, rng=rng
+        )
+        if rng is not None:
+            batches = [batches[i] for i in rng.permutation(len(batches))]
+
+        if self.drop_last:
+            batches = batches[: len(batches) - len(batches) % self.num_replicas]
+        elif len(batches) % self.num_replicas:
+            num_padding = self.num_replicas - len(batches) % self.num_replicas
+            batches = batches + [batches[i % len(batches)] for i in range(num_padding)]
+
+        self._batches_epoch, self._batches = self.epoch, batches[self.rank :: self.num_replicas]
+        return self._batches
+
+    def __iter__(self) -> Iterator[List[int]]:
+        for batch in self._get_batches():
+            yield batch.tolist()
+
+    def __len__(self) -> int:
+        return len(self._get_batches())
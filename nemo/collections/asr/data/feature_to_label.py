@@ -56,6 +56,8 @@ class _FeatureSeqSpeakerLabelDataset(Dataset):
         manifest_filepath (str): Dataset parameter. Path to JSON containing data.
         labels (Optional[list]): Dataset parameter. List of unique labels collected from all samples.
         feature_loader : Dataset parameter. Feature loader to load (external) feature.       
+        manifest_columnar (bool): If True, the manifest is stored in flat numpy arrays instead of one Python object
+            per sample, which keeps memory flat in forked dataloader workers. Defaults to False.
     """
 
     @property
@@ -85,10 +87,19 @@ class _FeatureSeqSpeakerLabelDataset(Dataset):
         return output_types
 
     def __init__(
-        self, *, manifest_filepath: str, labels: List[str], feature_loader, is_speaker_emb: bool = False,
+        self,
+        *,
+        manifest_filepath: str,
+        labels: List[str],
+        feature_loader,
+        is_speaker_emb: bool = False,
+        manifest_columnar: bool = False,
     ):
         super().__init__()
-        self.collection = collections.ASRFeatureSequenceLabel(manifests_files=manifest_filepath.split(','),)
+        if manifest_columnar:
+            self.collection = collections.ColumnarASRFeatureSequenceLabel(manifests_files=manifest_filepath.split(','))
+        else:
+            self.collection = collections.ASRFeatureSequenceLabel(manifests_files=manifest_filepath.split(','),)
 
         self.feature_loader = feature_loader
         self.labels = labels if labels else self.collection.uniq_labels
@@ -0,0 +1,211 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from typing import Callable, Dict, List, Optional, Union
+
+import torch
+
+from nemo.collections.asr.data.audio_to_text import AudioToBPEDataset, AudioToCharDataset
+from nemo.collections.asr.data.audio_to_text_dali import DALIOutputs
+from nemo.collections.asr.parts.preprocessing.feature_store import FeatureStore, get_feature_store_key
+from nemo.core.neural_types import LabelsType, LengthsType, MelSpectrogramType, NeuralType
+
+__all__ = ['FeatureToCharDataset', 'FeatureToBPEDataset', 'FeatureTextOutputs']
+
+
+class FeatureTextOutputs(DALIOutputs):
+    """
+    Batch of precomputed features and transcripts. As the batches of DALI datasets computing features on the fly,
+    ASR models feed them directly to their encoder (after spectrogram augmentation) instead of their preprocessor.
+    Unlike DALI outputs, the batch is built on the CPU and moved to the device by Lightning through `to`.
+    """
+
+    def __init__(self, processed_signal, processed_signal_len, transcript, transcript_len):
+        super().__init__(
+            {
+                'processed_signal': processed_signal,
+                'processed_signal_len': processed_signal_len,
+                'transcript': transcript,
+                'transcript_len': transcript_len,
+            }
+        )
+
+    def to(self, *args, **kwargs) -> 'FeatureTextOutputs':
+        return FeatureTextOutputs(*[tensor.to(*args, **kwargs) for tensor in self._outs])
+
+    def pin_memory(self) -> 'FeatureTextOutputs':
+        return FeatureTextOutputs(*[tensor.pin_memory() for tensor in self._outs])
+
+
+def _feature_text_collate_fn(batch, pad_id) -> FeatureTextOutputs:
+    """collate batch of features [num_features x num_frames], features len, tokens, tokens len
+    into a FeatureTextOutputs, padding features with zeros and tokens with pad_id.
+    """
+    features, features_lengths, tokens, tokens_lengths = zip(*batch)
+    features_lengths = torch.stack(features_lengths)
+    tokens_lengths = torch.stack(tokens_lengths)
+
+    padded_features = torch.zeros((len(batch), features[0].shape[0], int(features_lengths.max())))
+    for padded_features_i, features_i in zip(padded_features, features):
+        padded_features_i[:, : features_i.shape[1]].copy_(features_i)
+    padded_tokens = torch.full((len(batch), int(tokens_lengths.max())), pad_id, dtype=tokens[0].dtype)
+    for padded_tokens_i, tokens_i in zip(padded_tokens, tokens):
+        padded_tokens_i[: tokens_i.shape[0]].copy_(tokens_i)
+
+    return FeatureTextOutputs(padded_features, features_lengths, padded_tokens, tokens_lengths)
+
+
+class _FeatureTextDatasetMixin:
+    """Loads the features of the manifest entries of an audio-to-text dataset from a `FeatureStore`."""
+
+    @property
+    def output_types(self) -> Optional[Dict[str, NeuralType]]:
+        """Returns definitions of module output ports.
+               """
+        return {
+            'processed_signal': NeuralType(('B', 'D', 'T'), MelSpectrogramType()),
+            'processed_signal_length': NeuralType(tuple('B'), LengthsType()),
+            'transcripts': NeuralType(('B', 'T'), LabelsType()),
+            'transcript_length': NeuralType(tuple('B'), LengthsType()),
+        }
+
+    def _setup_feature_store(self, feature_store_dir: str):
+        self.feature_store = FeatureStore(feature_store_dir)
+        collection = self.manifest_processor.collection
+        for index in range(len(collection)):
+            key = self._feature_store_key(collection[index])
+            if key not in self.feature_store:
+                raise ValueError(f"Features of {key} are missing from the feature store {feature_store_dir}")
+
+    @staticmethod
+    def _feature_store_key(sample) -> str:
+        return get_feature_store_key(sample.audio_file, sample.offset, sample.duration)
+
+    def __getitem__(self, index):
+        sample = self.manifest_processor.collection[index]
+        features = self.feature_store.process(self._feature_store_key(sample))
+        t, tl = self.manifest_processor.process_text_by_sample(sample=sample)
+        return features, torch.tensor(features.shape[1]).long(), torch.tensor(t).long(), torch.tensor(tl).long()
+
+    def _collate_fn(self, batch):
+        return _feature_text_collate_fn(batch, pad_id=self.manifest_processor.pad_id)
+
+    def collate_fn(self, batch):
+        # Batches are `FeatureTextOutputs` rather than tuples of typed tensors, so they are not type checked.
+        return self._collate_fn(batch)
+
+
+class FeatureToCharDataset(_FeatureTextDatasetMixin, AudioToCharDataset):
+    """
+    Dataset that loads precomputed features from a feature store (see
+    scripts/speech_recognition/extract_features.py) for the entries of a manifest, and their character encoded
+    transcripts. The manifest is the one used for feature extraction. Features are the output of the preprocessor of
+    the model, in evaluation mode (i.e. without dithering), so batches skip the preprocessor.
+
+    Args:
+        manifest_filepath: Path to manifest json. Can be comma-separated paths.
+        labels: String containing all the possible characters to map to
+        feature_store_dir: Directory of the feature store
+        max_duration: If audio exceeds this length, do not include in dataset
+        min_duration: If audio is less than this length, do not include in dataset
+        max_utts: Limit number of utterances
+        blank_index: blank character index, default = -1
+        unk_index: unk_character index, default = -1
+        normalize: whether to normalize transcript text (default): True
+        bos_id: Id of beginning of sequence symbol to append if not None
+        eos_id: Id of end of sequence symbol to append if not None
+        pad_id: Id of pad symbol. Defaults to 0
+        parser: Str for a language specific preprocessor or a callable.
+        manifest_columnar (bool): If True, the manifest is stored in flat numpy arrays instead of one Python object
+            per sample. Defaults to False.
+    """
+
+    def __init__(
+        self,
+        manifest_filepath: str,
+        labels: Union[str, List[str]],
+        feature_store_dir: str,
+        max_duration: Optional[float] = None,
+        min_duration: Optional[float] = None,
+        max_utts: int = 0,
+        blank_index: int = -1,
+        unk_index: int = -1,
+        normalize: bool = True,
+        bos_id: Optional[int] = None,
+        eos_id: Optional[int] = None,
+        pad_id: int = 0,
+        parser: Union[str, Callable] = 'en',
+        manifest_columnar: bool = False,
+    ):
+        super().__init__(
+            manifest_filepath=manifest_filepath,
+            labels=labels,
+            sample_rate=None,
+            max_duration=max_duration,
+            min_duration=min_duration,
+            max_utts=max_utts,
+            blank_index=blank_index,
+            unk_index=unk_index,
+            normalize=normalize,
+            bos_id=bos_id,
+            eos_id=eos_id,
+            pad_id=pad_id,
+            parser=parser,
+            manifest_columnar=manifest_columnar,
+        )
+        self._setup_feature_store(feature_store_dir)
+
+
+class FeatureToBPEDataset(_FeatureTextDatasetMixin, AudioToBPEDataset):
+    """
+    Dataset that loads precomputed features from a feature store (see
+    scripts/speech_recognition/extract_features.py) for the entries of a manifest, and their sub-word encoded
+    transcripts. The manifest is the one used for feature extraction. Features are the output of the preprocessor of
+    the model, in evaluation mode (i.e. without dithering), so batches skip the preprocessor.
+
+    Args:
+        manifest_filepath: Path to manifest json. Can be comma-separated paths.
+        tokenizer: A subclass of the Tokenizer wrapper found in the common collection,
+            nemo.collections.common.tokenizers.TokenizerSpec.
+        feature_store_dir: Directory of the feature store
+        max_duration: If audio exceeds this length, do not include in dataset
+        min_duration: If audio is less than this length, do not include in dataset
+        max_utts: Limit number of utterances
+        use_start_end_token: Boolean which dictates whether to add [BOS] and [EOS]
+            tokens to beginning and ending of speech respectively.
+        manifest_columnar (bool): If True, the manifest is stored in flat numpy arrays instead of one Python object
+            per sample. Defaults to False.
+    """
+
+    def __init__(
+        self,
+        manifest_filepath: str,
+        tokenizer: 'nemo.collections.common.tokenizers.TokenizerSpec',
+        feature_store_dir: str,
+        max_duration: Optional[int] = None,
+        min_duration: Optional[int] = None,
+        max_utts: int = 0,
+        use_start_end_token: bool = True,
+        manifest_columnar: bool = False,
+    ):
+        super().__init__(
+            manifest_filepath=manifest_filepath,
+            tokenizer=tokenizer,
+            sample_rate=None,
+            max_duration=max_duration,
+            min_duration=min_duration,
+            max_utts=max_utts,
+            use_start_end_token=use_start_end_token,
+            manifest_columnar=manifest_columnar,
+        )
+        self._setup_feature_store(feature_store_dir)
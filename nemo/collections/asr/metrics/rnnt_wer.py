@@ -16,11 +16,10 @@ from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from typing import List, Optional, Union
 
-import editdistance
 import torch
 from torchmetrics import Metric
 
-from nemo.collections.asr.metrics.wer import move_dimension_to_the_front
+from nemo.collections.asr.metrics.wer import move_dimension_to_the_front, word_error_rate_detail
 from nemo.collections.asr.parts.submodules import rnnt_beam_decoding as beam_decode
 from nemo.collections.asr.parts.submodules import rnnt_greedy_decoding as greedy_decode
 from nemo.collections.asr.parts.utils.rnnt_utils import Hypothesis, NBestHypotheses
@@ -38,7 +37,7 @@ class AbstractRNNTDecoding(ABC):
             strategy: str value which represents the type of decoding that can occur.
                 Possible values are :
                 -   greedy, greedy_batch (for greedy decoding).
-                -   beam, tsd, alsd (for beam search decoding).
+                -   beam, tsd, alsd, maes, beam_batch (for beam search decoding).
 
             compute_hypothesis_token_set: A bool flag, which determines whether to compute a list of decoded
                 tokens as well as the decoded string. Default is False in order to avoid double decoding
@@ -107,6 +106,9 @@ class AbstractRNNTDecoding(ABC):
                     thereby reducing speed but potentially improving accuracy). This is a hyper parameter to be experimentally
                     tuned on a validation set.
 
+                batch_max_symbols_per_step: optional int, used by `beam_batch`. The maximum number of tokens
+                    emitted by a hypothesis per timestep during batched beam search.
+
                 softmax_temperature: Scales the logits of the joint prior to computing log_softmax.
 
         decoder: The Decoder/Prediction network module.
@@ -122,7 +124,7 @@ class AbstractRNNTDecoding(ABC):
         self.preserve_alignments = self.cfg.get('preserve_alignments', None)
         self.joint_fused_batch_size = self.cfg.get('fused_batch_size', None)
 
-        possible_strategies = ['greedy', 'greedy_batch', 'beam', 'tsd', 'alsd', 'maes']
+        possible_strategies = ['greedy', 'greedy_batch', 'beam', 'tsd', 'alsd', 'maes', 'beam_batch']
         if self.cfg.strategy not in possible_strategies:
             raise ValueError(f"Decoding strategy must be one of {possible_strategies}")
 
@@ -131,7 +133,7 @@ class AbstractRNNTDecoding(ABC):
             if self.cfg.strategy in ['greedy', 'greedy_batch']:
                 self.preserve_alignments = self.cfg.greedy.get('preserve_alignments', False)
 
-            elif self.cfg.strategy in ['beam', 'tsd', 'alsd', 'maes']:
+            elif self.cfg.strategy in ['beam', 'tsd', 'alsd', 'maes', 'beam_batch']:
                 self.preserve_alignments = self.cfg.beam.get('preserve_alignments', False)
 
         if self.cfg.strategy == 'greedy':
@@ -216,6 +218,20 @@ class AbstractRNNTDecoding(ABC):
                 preserve_alignments=self.preserve_alignments,
             )
 
+        elif self.cfg.strategy == 'beam_batch':
+
+            self.decoding = beam_decode.BeamRNNTInfer(
+                decoder_model=decoder,
+                joint_model=joint,
+                beam_size=self.cfg.beam.beam_size,
+                return_best_hypothesis=decoding_cfg.beam.get('return_best_hypothesis', True),
+                search_type='batch',
+                score_norm=self.cfg.beam.get('score_norm', True),
+                batch_max_symbols_per_step=self.cfg.beam.get('batch_max_symbols_per_step', 10),
+                softmax_temperature=self.cfg.beam.get('softmax_temperature', 1.0),
+                preserve_alignments=self.preserve_alignments,
+            )
+
         else:
 
             raise ValueError(
@@ -378,7 +394,7 @@ class RNNTDecoding(AbstractRNNTDecoding):
             strategy: str value which represents the type of decoding that can occur.
                 Possible values are :
                 -   greedy, greedy_batch (for greedy decoding).
-                -   beam, tsd, alsd (for beam search decoding).
+                -   beam, tsd, alsd, maes, beam_batch (for beam search decoding).
 
             compute_hypothesis_token_set: A bool flag, which determines whether to compute a list of decoded
                 tokens as well as the decoded string. Default is False in order to avoid double decoding
@@ -447,6 +463,9 @@ class RNNTDecoding(AbstractRNNTDecoding):
                     thereby reducing speed but potentially improving accuracy). This is a hyper parameter to be experimentally
                     tuned on a validation set.
 
+                batch_max_symbols_per_step: optional int, used by `beam_batch`. The maximum number of tokens
+                    emitted by a hypothesis per timestep during batched beam search.
+
                 softmax_temperature: Scales the logits of the joint prior to computing log_softmax.
 
         decoder: The Decoder/Prediction network module.
@@ -500,6 +519,9 @@ class RNNTWER(Metric):
     If used with PytorchLightning LightningModule, include wer_numerator and wer_denominators inside validation_step results.
     Then aggregate (sum) then at the end of validation epoch to correctly compute validation WER.
 
+    The numbers of substitutions, insertions and deletions of the hypotheses are also accumulated, in the
+    ``substitutions``, ``insertions`` and ``deletions`` states.
+
     Example:
         def validation_step(self, batch, batch_idx):
             ...
@@ -539,6 +561,9 @@ class RNNTWER(Metric):
 
         self.add_state("scores", default=torch.tensor(0), dist_reduce_fx='sum', persistent=False)
         self.add_state("words", default=torch.tensor(0), dist_reduce_fx='sum', persistent=False)
+        self.add_state("substitutions", default=torch.tensor(0), dist_reduce_fx='sum', persistent=False)
+        self.add_state("insertions", default=torch.tensor(0), dist_reduce_fx='sum', persistent=False)
+        self.add_state("deletions", default=torch.tensor(0), dist_reduce_fx='sum', persistent=False)
 
     def update(
         self,
@@ -547,8 +572,6 @@ class RNNTWER(Metric):
         targets: torch.Tensor,
         target_lengths: torch.Tensor,
     ) -> torch.Tensor:
-        words = 0.0
-        scores = 0.0
         references = []
         with torch.no_grad():
             # prediction_cpu_tensor = tensors[0].long().cpu()
@@ -571,19 +594,15 @@ class RNNTWER(Metric):
             logging.info(f"reference :{references[0]}")
             logging.info(f"predicted :{hypotheses[0]}")
 
-        for h, r in zip(hypotheses, references):
-            if self.use_cer:
-                h_list = list(h)
-                r_list = list(r)
-            else:
-                h_list = h.split()
-                r_list = r.split()
-            words += len(r_list)
-            # Compute Levenshtein's distance
-            scores += editdistance.eval(h_list, r_list)
+        stats = word_error_rate_detail(hypotheses=hypotheses, references=references, use_cer=self.use_cer)
+        scores = stats.total_errors
+        words = stats.total_words
 
         self.scores += torch.tensor(scores, device=self.scores.device, dtype=self.scores.dtype)
         self.words += torch.tensor(words, device=self.words.device, dtype=self.words.dtype)
+        self.substitutions += int(stats.substitutions.sum())
+        self.insertions += int(stats.insertions.sum())
+        self.deletions += int(stats.deletions.sum())
         # return torch.tensor([scores, words]).to(predictions.device)
 
     def compute(self):
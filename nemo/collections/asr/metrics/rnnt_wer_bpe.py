@@ -15,12 +15,11 @@
 from dataclasses import dataclass
 from typing import List
 
-import editdistance
 import torch
 from torchmetrics import Metric
 
 from nemo.collections.asr.metrics.rnnt_wer import AbstractRNNTDecoding, RNNTDecodingConfig
-from nemo.collections.asr.metrics.wer import move_dimension_to_the_front
+from nemo.collections.asr.metrics.wer import move_dimension_to_the_front, word_error_rate_detail
 from nemo.collections.common.tokenizers.tokenizer_spec import TokenizerSpec
 from nemo.utils import logging
 
@@ -158,6 +157,9 @@ class RNNTBPEWER(Metric):
     If used with PytorchLightning LightningModule, include wer_numerator and wer_denominators inside validation_step results.
     Then aggregate (sum) then at the end of validation epoch to correctly compute validation WER.
 
+    The numbers of substitutions, insertions and deletions of the hypotheses are also accumulated, in the
+    ``substitutions``, ``insertions`` and ``deletions`` states.
+
     Example:
         def validation_step(self, batch, batch_idx):
             ...
@@ -202,6 +204,9 @@ class RNNTBPEWER(Metric):
 
         self.add_state("scores", default=torch.tensor(0), dist_reduce_fx='sum', persistent=False)
         self.add_state("words", default=torch.tensor(0), dist_reduce_fx='sum', persistent=False)
+        self.add_state("substitutions", default=torch.tensor(0), dist_reduce_fx='sum', persistent=False)
+        self.add_state("insertions", default=torch.tensor(0), dist_reduce_fx='sum', persistent=False)
+        self.add_state("deletions", default=torch.tensor(0), dist_reduce_fx='sum', persistent=False)
 
     def update(
         self,
@@ -210,8 +215,6 @@ class RNNTBPEWER(Metric):
         targets: torch.Tensor,
         target_lengths: torch.Tensor,
     ) -> torch.Tensor:
-        words = 0.0
-        scores = 0.0
         references = []
         with torch.no_grad():
             # prediction_cpu_tensor = tensors[0].long().cpu()
@@ -233,21 +236,17 @@ class RNNTBPEWER(Metric):
             logging.info(f"reference :{references[0]}")
             logging.info(f"predicted :{hypotheses[0]}")
 
-        for h, r in zip(hypotheses, references):
-            if self.use_cer:
-                h_list = list(h)
-                r_list = list(r)
-            else:
-                h_list = h.split()
-                r_list = r.split()
-            words += len(r_list)
-            # Compute Levenshtein's distance
-            scores += editdistance.eval(h_list, r_list)
+        stats = word_error_rate_detail(hypotheses=hypotheses, references=references, use_cer=self.use_cer)
+        scores = stats.total_errors
+        words = stats.total_words
 
         del hypotheses
 
         self.scores += torch.tensor(scores, device=self.scores.device, dtype=self.scores.dtype)
         self.words += torch.tensor(words, device=self.words.device, dtype=self.words.dtype)
+        self.substitutions += int(stats.substitutions.sum())
+        self.insertions += int(stats.insertions.sum())
+        self.deletions += int(stats.deletions.sum())
         # return torch.tensor([scores, words]).to(predictions.device)
 
     def compute(self):
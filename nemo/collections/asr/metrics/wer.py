@@ -16,17 +16,17 @@ from abc import ABC, abstractmethod
 from dataclasses import dataclass, is_dataclass
 from typing import Callable, Dict, List, Optional, Union
 
-import editdistance
 import numpy as np
 import torch
 from omegaconf import DictConfig, OmegaConf
 from torchmetrics import Metric
 
-from nemo.collections.asr.parts.submodules import ctc_greedy_decoding
+from nemo.collections.asr.parts.submodules import ctc_beam_decoding, ctc_greedy_decoding
+from nemo.collections.asr.parts.utils.edit_distance_utils import ErrorRateStats, compute_error_rate_stats
 from nemo.collections.asr.parts.utils.rnnt_utils import Hypothesis, NBestHypotheses
 from nemo.utils import logging
 
-__all__ = ['word_error_rate', 'WER', 'move_dimension_to_the_front']
+__all__ = ['word_error_rate', 'word_error_rate_detail', 'WER', 'move_dimension_to_the_front']
 
 
 def word_error_rate(hypotheses: List[str], references: List[str], use_cer=False) -> float:
@@ -41,28 +41,29 @@ def word_error_rate(hypotheses: List[str], references: List[str], use_cer=False)
     Returns:
       (float) average word error rate
     """
-    scores = 0
-    words = 0
-    if len(hypotheses) != len(references):
-        raise ValueError(
-            "In word error rate calculation, hypotheses and reference"
-            " lists must have the same number of elements. But I got:"
-            "{0} and {1} correspondingly".format(len(hypotheses), len(references))
-        )
-    for h, r in zip(hypotheses, references):
-        if use_cer:
-            h_list = list(h)
-            r_list = list(r)
-        else:
-            h_list = h.split()
-            r_list = r.split()
-        words += len(r_list)
-        scores += editdistance.eval(h_list, r_list)
-    if words != 0:
-        wer = 1.0 * scores / words
-    else:
-        wer = float('inf')
-    return wer
+    return word_error_rate_detail(hypotheses=hypotheses, references=references, use_cer=use_cer).error_rate
+
+
+def word_error_rate_detail(
+    hypotheses: List[str], references: List[str], use_cer=False, return_alignments=False
+) -> ErrorRateStats:
+    """
+    Computes the edit operations of each hypothesis with respect to its reference, and optionally their alignments.
+    Hypotheses and references must have same length.
+    Words (or characters if ``use_cer``) are interned to integer ids, and the edit distances of all the pairs are
+    computed by a compiled kernel, run over chunks of pairs in a pool of threads.
+    Args:
+      hypotheses: list of hypotheses
+      references: list of references
+      use_cer: bool, set True to enable cer
+      return_alignments: bool, set True to compute the alignment of each hypothesis with its reference
+    Returns:
+      ErrorRateStats with the per utterance counts of edit operations and the corpus level error rate
+      (``error_rate``).
+    """
+    return compute_error_rate_stats(
+        hypotheses=hypotheses, references=references, use_cer=use_cer, return_alignments=return_alignments
+    )
 
 
 def move_dimension_to_the_front(tensor, dim_index):
@@ -79,6 +80,7 @@ class AbstractCTCDecoding(ABC):
             strategy: str value which represents the type of decoding that can occur.
                 Possible values are :
                 -   greedy (for greedy decoding).
+                -   beam (for CTC prefix beam search, with optional n-gram language model fusion).
 
             compute_timestamps: A bool flag, which determines whether to compute the character/subword, or
                 word based timestamp mapping the output log-probabilities to discrite intervals of timestamps.
@@ -102,6 +104,29 @@ class AbstractCTCDecoding(ABC):
                 preserve_alignments: Same as above, overrides above value.
                 compute_timestamps: Same as above, overrides above value.
 
+            "beam":
+                beam_size: int, defining the beam size for beam search. Must be >= 1.
+
+                return_best_hypothesis: optional bool, whether to return just the best hypothesis or all of the
+                    hypotheses after beam search has concluded.
+
+                ngram_lm_model: optional path to an n-gram language model in ARPA format. If the vocabulary
+                    contains the word separator, the LM is a word-level LM, otherwise each token is a word of the
+                    LM (e.g. the LMs of subword models trained by scripts/asr_language_modeling/ngram_lm).
+
+                beam_alpha: float, the weight of the language model scores.
+
+                beam_beta: float, the bonus of each word scored by the language model.
+
+                cutoff_prob: float, the cumulative probability of the candidate tokens of each frame.
+
+                cutoff_top_n: int, the maximum number of candidate tokens of each frame.
+
+                num_workers: int, the number of processes decoding the samples of a batch in parallel.
+
+                preserve_alignments: Same as above, overrides above value.
+                compute_timestamps: Same as above, overrides above value.
+
         blank_id: The id of the RNNT blank token.
     """
 
@@ -118,7 +143,7 @@ class AbstractCTCDecoding(ABC):
         OmegaConf.set_struct(decoding_cfg, False)
 
         # update minimal config
-        minimal_cfg = ['greedy']
+        minimal_cfg = ['greedy', 'beam']
         for item in minimal_cfg:
             if item not in decoding_cfg:
                 decoding_cfg[item] = OmegaConf.create({})
@@ -130,7 +155,7 @@ class AbstractCTCDecoding(ABC):
         self.batch_dim_index = self.cfg.get('batch_dim_index', 0)
         self.word_seperator = self.cfg.get('word_seperator', ' ')
 
-        possible_strategies = ['greedy']
+        possible_strategies = ['greedy', 'beam']
         if self.cfg.strategy not in possible_strategies:
             raise ValueError(f"Decoding strategy must be one of {possible_strategies}. Given {self.cfg.strategy}")
 
@@ -138,11 +163,15 @@ class AbstractCTCDecoding(ABC):
         if self.preserve_alignments is None:
             if self.cfg.strategy in ['greedy']:
                 self.preserve_alignments = self.cfg.greedy.get('preserve_alignments', False)
+            else:
+                self.preserve_alignments = self.cfg.beam.get('preserve_alignments', False)
 
         # Update compute timestamps
         if self.compute_timestamps is None:
             if self.cfg.strategy in ['greedy']:
                 self.compute_timestamps = self.cfg.greedy.get('compute_timestamps', False)
+            else:
+                self.compute_timestamps = self.cfg.beam.get('compute_timestamps', False)
 
         if self.cfg.strategy == 'greedy':
 
@@ -150,6 +179,27 @@ class AbstractCTCDecoding(ABC):
                 blank_id=self.blank_id,
                 preserve_alignments=self.preserve_alignments,
                 compute_timestamps=self.compute_timestamps,
+                batched_inference=self.cfg.greedy.get('batched_inference', True),
+            )
+
+        elif self.cfg.strategy == 'beam':
+
+            self.decoding = ctc_beam_decoding.BeamCTCInfer(
+                blank_id=self.blank_id,
+                beam_size=self.cfg.beam.get('beam_size', 4),
+                return_best_hypothesis=self.cfg.beam.get('return_best_hypothesis', True),
+                ngram_lm_model=self.cfg.beam.get('ngram_lm_model', None),
+                beam_alpha=self.cfg.beam.get('beam_alpha', 1.0),
+                beam_beta=self.cfg.beam.get('beam_beta', 0.0),
+                cutoff_prob=self.cfg.beam.get('cutoff_prob', 1.0),
+                cutoff_top_n=self.cfg.beam.get('cutoff_top_n', 40),
+                num_workers=self.cfg.beam.get('num_workers', 1),
+                token_offset=self.cfg.beam.get('token_offset', ctc_beam_decoding.DEFAULT_TOKEN_OFFSET),
+                # Only character models have a vocabulary, the tokens of subword models are encoded with an offset
+                vocabulary=getattr(self, 'vocabulary', None),
+                word_separator=self.word_seperator,
+                preserve_alignments=self.preserve_alignments,
+                compute_timestamps=self.compute_timestamps,
             )
 
         else:
@@ -199,6 +249,9 @@ class AbstractCTCDecoding(ABC):
             # extract the hypotheses
             hypotheses_list = hypotheses_list[0]  # type: List[Hypothesis]
 
+        if isinstance(hypotheses_list, ctc_greedy_decoding.BatchedGreedyCTCHypotheses) and fold_consecutive:
+            return self._decode_batched_hypotheses(hypotheses_list, return_hypotheses)
+
         if isinstance(hypotheses_list[0], NBestHypotheses):
             hypotheses = []
             all_hypotheses = []
@@ -242,6 +295,29 @@ class AbstractCTCDecoding(ABC):
             best_hyp_text = [h.text for h in hypotheses]
             return best_hyp_text, None
 
+    def _decode_batched_hypotheses(
+        self, hypotheses: ctc_greedy_decoding.BatchedGreedyCTCHypotheses, return_hypotheses: bool
+    ) -> (Union[List[str], List[Hypothesis], ctc_greedy_decoding.BatchedGreedyCTCHypotheses], None):
+        """
+        Decodes the texts of batched greedy hypotheses, whose tokens are already CTC collapsed.
+        Hypothesis objects are only created if timestamps are computed, otherwise they are created lazily
+        when accessed from the returned `BatchedGreedyCTCHypotheses`.
+        """
+        texts = [self.decode_tokens_to_str(hypotheses.token_ids(idx)) for idx in range(len(hypotheses))]
+        if not return_hypotheses:
+            return texts, None
+
+        if self.compute_timestamps is True:
+            timestamp_type = self.cfg.get('ctc_timestamp_type', 'all')
+            hypotheses_list = list(hypotheses)
+            for idx, hypothesis in enumerate(hypotheses_list):
+                hypothesis.text = (hypotheses.token_ids(idx), hypotheses.token_repetitions(idx))
+                hypotheses_list[idx] = self.compute_ctc_timestamps(hypothesis, timestamp_type)
+            return hypotheses_list, None
+
+        hypotheses.texts = texts
+        return hypotheses, None
+
     def decode_hypothesis(
         self, hypotheses_list: List[Hypothesis], fold_consecutive: bool
     ) -> List[Union[Hypothesis, NBestHypotheses]]:
@@ -608,6 +684,7 @@ class CTCDecoding(AbstractCTCDecoding):
             strategy: str value which represents the type of decoding that can occur.
                 Possible values are :
                 -   greedy (for greedy decoding).
+                -   beam (for CTC prefix beam search, with optional n-gram language model fusion).
 
             compute_timestamps: A bool flag, which determines whether to compute the character/subword, or
                 word based timestamp mapping the output log-probabilities to discrite intervals of timestamps.
@@ -631,6 +708,29 @@ class CTCDecoding(AbstractCTCDecoding):
                 preserve_alignments: Same as above, overrides above value.
                 compute_timestamps: Same as above, overrides above value.
 
+            "beam":
+                beam_size: int, defining the beam size for beam search. Must be >= 1.
+
+                return_best_hypothesis: optional bool, whether to return just the best hypothesis or all of the
+                    hypotheses after beam search has concluded.
+
+                ngram_lm_model: optional path to an n-gram language model in ARPA format. If the vocabulary
+                    contains the word separator, the LM is a word-level LM, otherwise each token is a word of the
+                    LM (e.g. the LMs of subword models trained by scripts/asr_language_modeling/ngram_lm).
+
+                beam_alpha: float, the weight of the language model scores.
+
+                beam_beta: float, the bonus of each word scored by the language model.
+
+                cutoff_prob: float, the cumulative probability of the candidate tokens of each frame.
+
+                cutoff_top_n: int, the maximum number of candidate tokens of each frame.
+
+                num_workers: int, the number of processes decoding the samples of a batch in parallel.
+
+                preserve_alignments: Same as above, overrides above value.
+                compute_timestamps: Same as above, overrides above value.
+
         blank_id: The id of the RNNT blank token.
     """
 
@@ -681,6 +781,9 @@ class WER(Metric):
     If used with PytorchLightning LightningModule, include wer_numerator and wer_denominators inside validation_step
     results. Then aggregate (sum) then at the end of validation epoch to correctly compute validation WER.
 
+    The numbers of substitutions, insertions and deletions of the hypotheses are also accumulated, in the
+    ``substitutions``, ``insertions`` and ``deletions`` states.
+
     Example:
         def validation_step(self, batch, batch_idx):
             ...
@@ -724,6 +827,9 @@ class WER(Metric):
 
         self.add_state("scores", default=torch.tensor(0), dist_reduce_fx='sum', persistent=False)
         self.add_state("words", default=torch.tensor(0), dist_reduce_fx='sum', persistent=False)
+        self.add_state("substitutions", default=torch.tensor(0), dist_reduce_fx='sum', persistent=False)
+        self.add_state("insertions", default=torch.tensor(0), dist_reduce_fx='sum', persistent=False)
+        self.add_state("deletions", default=torch.tensor(0), dist_reduce_fx='sum', persistent=False)
 
     def update(
         self,
@@ -742,8 +848,6 @@ class WER(Metric):
             target_lengths: an integer torch.Tensor of shape ``[Batch]``
             predictions_lengths: an integer torch.Tensor of shape ``[Batch]``
         """
-        words = 0.0
-        scores = 0.0
         references = []
         with torch.no_grad():
             # prediction_cpu_tensor = tensors[0].long().cpu()
@@ -766,19 +870,21 @@ class WER(Metric):
             logging.info(f"reference:{references[0]}")
             logging.info(f"predicted:{hypotheses[0]}")
 
-        for h, r in zip(hypotheses, references):
-            if self.use_cer:
-                h_list = list(h)
-                r_list = list(r)
-            else:
-                h_list = h.split()
-                r_list = r.split()
-            words += len(r_list)
-            # Compute Levenstein's distance
-            scores += editdistance.eval(h_list, r_list)
+        stats = word_error_rate_detail(hypotheses=hypotheses, references=references, use_cer=self.use_cer)
+        scores = stats.total_errors
+        words = stats.total_words
 
         self.scores = torch.tensor(scores, device=self.scores.device, dtype=self.scores.dtype)
         self.words = torch.tensor(words, device=self.words.device, dtype=self.words.dtype)
+        self.substitutions = torch.tensor(
+            int(stats.substitutions.sum()), device=self.substitutions.device, dtype=self.substitutions.dtype
+        )
+        self.insertions = torch.tensor(
+            int(stats.insertions.sum()), device=self.insertions.device, dtype=self.insertions.dtype
+        )
+        self.deletions = torch.tensor(
+            int(stats.deletions.sum()), device=self.deletions.device, dtype=self.deletions.dtype
+        )
         # return torch.tensor([scores, words]).to(predictions.device)
 
     def compute(self):
@@ -808,3 +914,6 @@ class CTCDecodingConfig:
 
     # greedy decoding config
     greedy: ctc_greedy_decoding.GreedyCTCInferConfig = ctc_greedy_decoding.GreedyCTCInferConfig()
+
+    # beam decoding config
+    beam: ctc_beam_decoding.BeamCTCInferConfig = ctc_beam_decoding.BeamCTCInferConfig(beam_size=4)
@@ -15,11 +15,10 @@
 from dataclasses import dataclass
 from typing import List
 
-import editdistance
 import torch
 from torchmetrics import Metric
 
-from nemo.collections.asr.metrics.wer import AbstractCTCDecoding, CTCDecodingConfig
+from nemo.collections.asr.metrics.wer import AbstractCTCDecoding, CTCDecodingConfig, word_error_rate_detail
 from nemo.collections.common.tokenizers.tokenizer_spec import TokenizerSpec
 from nemo.utils import logging
 
@@ -33,6 +32,7 @@ class CTCBPEDecoding(AbstractCTCDecoding):
             strategy: str value which represents the type of decoding that can occur.
                 Possible values are :
                 -   greedy (for greedy decoding).
+                -   beam (for CTC prefix beam search, with optional n-gram language model fusion).
 
             compute_timestamps: A bool flag, which determines whether to compute the character/subword, or
                 word based timestamp mapping the output log-probabilities to discrite intervals of timestamps.
@@ -56,6 +56,29 @@ class CTCBPEDecoding(AbstractCTCDecoding):
                 preserve_alignments: Same as above, overrides above value.
                 compute_timestamps: Same as above, overrides above value.
 
+            "beam":
+                beam_size: int, defining the beam size for beam search. Must be >= 1.
+
+                return_best_hypothesis: optional bool, whether to return just the best hypothesis or all of the
+                    hypotheses after beam search has concluded.
+
+                ngram_lm_model: optional path to an n-gram language model in ARPA format. If the vocabulary
+                    contains the word separator, the LM is a word-level LM, otherwise each token is a word of the
+                    LM (e.g. the LMs of subword models trained by scripts/asr_language_modeling/ngram_lm).
+
+                beam_alpha: float, the weight of the language model scores.
+
+                beam_beta: float, the bonus of each word scored by the language model.
+
+                cutoff_prob: float, the cumulative probability of the candidate tokens of each frame.
+
+                cutoff_top_n: int, the maximum number of candidate tokens of each frame.
+
+                num_workers: int, the number of processes decoding the samples of a batch in parallel.
+
+                preserve_alignments: Same as above, overrides above value.
+                compute_timestamps: Same as above, overrides above value.
+
         tokenizer: NeMo tokenizer object, which inherits from TokenizerSpec.
     """
 
@@ -103,6 +126,9 @@ class WERBPE(Metric):
     If used with PytorchLightning LightningModule, include wer_numerator and wer_denominators inside validation_step
     results. Then aggregate (sum) then at the end of validation epoch to correctly compute validation WER.
 
+    The numbers of substitutions, insertions and deletions of the hypotheses are also accumulated, in the
+    ``substitutions``, ``insertions`` and ``deletions`` states.
+
     Example:
         def validation_step(self, batch, batch_idx):
             ...
@@ -147,6 +173,9 @@ class WERBPE(Metric):
 
         self.add_state("scores", default=torch.tensor(0), dist_reduce_fx='sum', persistent=False)
         self.add_state("words", default=torch.tensor(0), dist_reduce_fx='sum', persistent=False)
+        self.add_state("substitutions", default=torch.tensor(0), dist_reduce_fx='sum', persistent=False)
+        self.add_state("insertions", default=torch.tensor(0), dist_reduce_fx='sum', persistent=False)
+        self.add_state("deletions", default=torch.tensor(0), dist_reduce_fx='sum', persistent=False)
 
     def update(
         self,
@@ -165,8 +194,6 @@ class WERBPE(Metric):
             target_lengths: an integer torch.Tensor of shape ``[Batch]``
             predictions_lengths: an integer torch.Tensor of shape ``[Batch]``
         """
-        words = 0.0
-        scores = 0.0
         references = []
         with torch.no_grad():
             targets_cpu_tensor = targets.long().cpu()
@@ -188,19 +215,21 @@ class WERBPE(Metric):
             logging.info(f"reference:{references[0]}")
             logging.info(f"predicted:{hypotheses[0]}")
 
-        for h, r in zip(hypotheses, references):
-            if self.use_cer:
-                h_list = list(h)
-                r_list = list(r)
-            else:
-                h_list = h.split()
-                r_list = r.split()
-            words += len(r_list)
-            # Compute Levenstein's distance
-            scores += editdistance.eval(h_list, r_list)
+        stats = word_error_rate_detail(hypotheses=hypotheses, references=references, use_cer=self.use_cer)
+        scores = stats.total_errors
+        words = stats.total_words
 
         self.scores = torch.tensor(scores, device=self.scores.device, dtype=self.scores.dtype)
         self.words = torch.tensor(words, device=self.words.device, dtype=self.words.dtype)
+        self.substitutions = torch.tensor(
+            int(stats.substitutions.sum()), device=self.substitutions.device, dtype=self.substitutions.dtype
+        )
+        self.insertions = torch.tensor(
+            int(stats.insertions.sum()), device=self.insertions.device, dtype=self.insertions.dtype
+        )
+        self.deletions = torch.tensor(
+            int(stats.deletions.sum()), device=self.deletions.device, dtype=self.deletions.dtype
+        )
         # return torch.tensor([scores, words]).to(predictions.device)
 
     def compute(self):
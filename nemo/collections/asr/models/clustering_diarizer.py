@@ -21,6 +21,7 @@ import tempfile
 from copy import deepcopy
 from typing import List, Optional
 
+import numpy as np
 import torch
 from omegaconf import DictConfig, OmegaConf
 from pytorch_lightning.utilities import rank_zero_only
@@ -29,6 +30,7 @@ from tqdm import tqdm
 from nemo.collections.asr.models.classification_models import EncDecClassificationModel
 from nemo.collections.asr.models.label_models import EncDecSpeakerLabelModel
 from nemo.collections.asr.parts.mixins.mixins import DiarizationMixin
+from nemo.collections.asr.parts.utils.embedding_cache import SpeakerEmbeddingCache, get_model_checksum
 from nemo.collections.asr.parts.utils.speaker_utils import (
     audio_rttm_map,
     get_embs_and_timestamps,
@@ -41,10 +43,11 @@ from nemo.collections.asr.parts.utils.speaker_utils import (
     write_rttm2manifest,
 )
 from nemo.collections.asr.parts.utils.vad_utils import (
-    generate_overlap_vad_seq,
-    generate_vad_segment_table,
+    generate_overlap_vad_seq_from_tensors,
+    generate_vad_segment_table_from_tensors,
     get_vad_stream_status,
     prepare_manifest,
+    write_tensor_to_file,
 )
 from nemo.core.classes import Model
 from nemo.utils import logging, model_utils
@@ -103,6 +106,12 @@ class ClusteringDiarizer(Model, DiarizationMixin):
         self._speaker_dir = os.path.join(self._diarizer_params.out_dir, 'speaker_outputs')
         shutil.rmtree(self._speaker_dir, ignore_errors=True)
         os.makedirs(self._speaker_dir)
+        self._embedding_cache = None
+        if self._speaker_params.get('embedding_cache_dir', None):
+            self._embedding_cache = SpeakerEmbeddingCache(
+                self._speaker_params.embedding_cache_dir,
+                namespace=f'{get_model_checksum(self._speaker_model)}_{self._cfg.sample_rate}',
+            )
 
         # Clustering params
         self._cluster_params = self._diarizer_params.clustering.parameters
@@ -190,6 +199,7 @@ class ClusteringDiarizer(Model, DiarizationMixin):
         Run voice activity detection. 
         Get log probability of voice activity detection and smoothes using the post processing parameters. 
         Using generated frame level predictions generated manifest file for later speaker embedding extraction.
+        The predictions are kept in memory in self.vad_preds, and only saved to files if vad.save_vad_preds is set.
         input:
         manifest_file (str) : Manifest file containing path to audio file and label as infer
 
@@ -204,13 +214,14 @@ class ClusteringDiarizer(Model, DiarizationMixin):
         time_unit = int(self._vad_window_length_in_sec / self._vad_shift_length_in_sec)
         trunc = int(time_unit / 2)
         trunc_l = time_unit - trunc
-        all_len = 0
         data = []
         for line in open(manifest_file, 'r', encoding='utf-8'):
             file = json.loads(line)['audio_filepath']
             data.append(get_uniqname_from_filepath(file))
 
+        save_vad_preds = self._diarizer_params.vad.get('save_vad_preds', False)
         status = get_vad_stream_status(data)
+        frame_preds = {}
         for i, test_batch in enumerate(tqdm(self._vad_model.test_dataloader())):
             test_batch = [x.to(self._device) for x in test_batch]
             with autocast():
@@ -225,41 +236,48 @@ class ClusteringDiarizer(Model, DiarizationMixin):
                     to_save = pred[trunc_l:]
                 else:
                     to_save = pred
-                all_len += len(to_save)
-                outpath = os.path.join(self._vad_dir, data[i] + ".frame")
-                with open(outpath, "a", encoding='utf-8') as fout:
-                    for f in range(len(to_save)):
-                        fout.write('{0:0.4f}\n'.format(to_save[f]))
+                frame_preds.setdefault(data[i], []).append(to_save.float().cpu())
             del test_batch
-            if status[i] == 'end' or status[i] == 'single':
-                all_len = 0
+
+        # Concatenate the predictions of the segments of each audio file
+        frame_preds = {name: torch.cat(preds) for name, preds in frame_preds.items()}
+        if save_vad_preds:
+            for name, frame_pred in frame_preds.items():
+                write_tensor_to_file(frame_pred, os.path.join(self._vad_dir, name + ".frame"))
 
         if not self._vad_params.smoothing:
             # Shift the window by 10ms to generate the frame and use the prediction of the window to represent the label for the frame;
             self.vad_pred_dir = self._vad_dir
+            self.vad_preds = frame_preds
             frame_length_in_sec = self._vad_shift_length_in_sec
         else:
             # Generate predictions with overlapping input segments. Then a smoothing filter is applied to decide the label for a frame spanned by multiple segments.
             # smoothing_method would be either in majority vote (median) or average (mean)
             logging.info("Generating predictions with overlapping input segments")
-            smoothing_pred_dir = generate_overlap_vad_seq(
-                frame_pred_dir=self._vad_dir,
-                smoothing_method=self._vad_params.smoothing,
+            smoothing_method = self._vad_params.smoothing
+            self.vad_pred_dir = os.path.join(
+                self._vad_dir, f"overlap_smoothing_output_{smoothing_method}_{self._vad_params.overlap}"
+            )
+            self.vad_preds = generate_overlap_vad_seq_from_tensors(
+                frame_preds=frame_preds,
+                smoothing_method=smoothing_method,
                 overlap=self._vad_params.overlap,
                 window_length_in_sec=self._vad_window_length_in_sec,
                 shift_length_in_sec=self._vad_shift_length_in_sec,
-                num_workers=self._cfg.num_workers,
+                out_dir=self.vad_pred_dir if save_vad_preds else None,
             )
-            self.vad_pred_dir = smoothing_pred_dir
             frame_length_in_sec = 0.01
 
         logging.info("Converting frame level prediction to speech/no-speech segment in start and end times format.")
 
-        table_out_dir = generate_vad_segment_table(
-            vad_pred_dir=self.vad_pred_dir,
+        table_out_dir_name = "table_output_tmp_"
+        for key in self._vad_params:
+            table_out_dir_name = table_out_dir_name + str(key) + str(self._vad_params[key]) + "_"
+        table_out_dir = generate_vad_segment_table_from_tensors(
+            vad_preds=self.vad_preds,
             postprocessing_params=self._vad_params,
             frame_length_in_sec=frame_length_in_sec,
-            num_workers=self._cfg.num_workers,
+            out_dir=os.path.join(self.vad_pred_dir, table_out_dir_name),
         )
 
         AUDIO_VAD_RTTM_MAP = {}
@@ -326,17 +344,13 @@ class ClusteringDiarizer(Model, DiarizationMixin):
             )
         validate_vad_manifest(self.AUDIO_RTTM_MAP, vad_manifest=self._speaker_manifest_path)
 
-    def _extract_embeddings(self, manifest_file: str):
+    def _infer_embeddings(self, manifest_file: str):
         """
-        This method extracts speaker embeddings from segments passed through manifest_file
-        Optionally you may save the intermediate speaker embeddings for debugging or any use. 
+        Runs the speaker model over the segments of manifest_file, and returns their embeddings.
         """
-        logging.info("Extracting embeddings for Diarization")
         self._setup_spkr_test_data(manifest_file)
-        self.embeddings = {}
         self._speaker_model = self._speaker_model.to(self._device)
         self._speaker_model.eval()
-        self.time_stamps = {}
 
         all_embs = torch.empty([0])
         for test_batch in tqdm(self._speaker_model.test_dataloader()):
@@ -348,22 +362,50 @@ class ClusteringDiarizer(Model, DiarizationMixin):
                 embs = embs.view(-1, emb_shape)
                 all_embs = torch.cat((all_embs, embs.cpu().detach()), dim=0)
             del test_batch
+        return all_embs
 
+    def _extract_embeddings(self, manifest_file: str):
+        """
+        This method extracts speaker embeddings from segments passed through manifest_file
+        Optionally you may save the intermediate speaker embeddings for debugging or any use. 
+        If speaker_embeddings.parameters.embedding_cache_dir is set, only the segments which are not in the
+        embedding cache are passed through the speaker model, and their embeddings are added to the cache.
+        """
+        logging.info("Extracting embeddings for Diarization")
+        self.embeddings = {}
+        self.time_stamps = {}
         with open(manifest_file, 'r', encoding='utf-8') as manifest:
-            for i, line in enumerate(manifest.readlines()):
-                line = line.strip()
-                dic = json.loads(line)
-                uniq_name = get_uniqname_from_filepath(dic['audio_filepath'])
-                if uniq_name in self.embeddings:
-                    self.embeddings[uniq_name] = torch.cat((self.embeddings[uniq_name], all_embs[i].view(1, -1)))
-                else:
-                    self.embeddings[uniq_name] = all_embs[i].view(1, -1)
-                if uniq_name not in self.time_stamps:
-                    self.time_stamps[uniq_name] = []
-                start = dic['offset']
-                end = start + dic['duration']
-                stamp = '{:.3f} {:.3f} '.format(start, end)
-                self.time_stamps[uniq_name].append(stamp)
+            segments = [json.loads(line.strip()) for line in manifest.readlines()]
+
+        if self._embedding_cache is None:
+            all_embs = self._infer_embeddings(manifest_file)
+        else:
+            cached_embs = self._embedding_cache.lookup(segments)
+            missing_idx = [i for i, emb in enumerate(cached_embs) if emb is None]
+            logging.info(f"Found {len(segments) - len(missing_idx)} of {len(segments)} embeddings in the cache")
+            if missing_idx:
+                missing_manifest_file = os.path.join(self._speaker_dir, 'embedding_cache_misses.json')
+                with open(missing_manifest_file, 'w', encoding='utf-8') as fp:
+                    for i in missing_idx:
+                        fp.write(json.dumps(segments[i]) + '\n')
+                missing_embs = self._infer_embeddings(missing_manifest_file)
+                self._embedding_cache.store([segments[i] for i in missing_idx], missing_embs.numpy())
+                for i, emb in zip(missing_idx, missing_embs):
+                    cached_embs[i] = emb.numpy()
+            all_embs = torch.from_numpy(np.stack(cached_embs))
+
+        for i, dic in enumerate(segments):
+            uniq_name = get_uniqname_from_filepath(dic['audio_filepath'])
+            if uniq_name in self.embeddings:
+                self.embeddings[uniq_name] = torch.cat((self.embeddings[uniq_name], all_embs[i].view(1, -1)))
+            else:
+                self.embeddings[uniq_name] = all_embs[i].view(1, -1)
+            if uniq_name not in self.time_stamps:
+                self.time_stamps[uniq_name] = []
+            start = dic['offset']
+            end = start + dic['duration']
+            stamp = '{:.3f} {:.3f} '.format(start, end)
+            self.time_stamps[uniq_name].append(stamp)
 
         if self._speaker_params.save_embeddings:
             embedding_dir = os.path.join(self._speaker_dir, 'embeddings')
@@ -56,12 +56,26 @@ class ASRDatasetConfig(nemo.core.classes.dataset.DatasetConfig):
     pad_id: int = 0
     use_start_end_token: bool = False
     return_sample_id: Optional[bool] = False
+    manifest_cache_dir: Optional[str] = None
+    manifest_num_workers: int = 0
+    manifest_check_audio_exists: bool = True
+    manifest_columnar: bool = False
+    resample_method: str = 'librosa'
+    batch_augmentation: bool = False
 
     # bucketing params
     bucketing_strategy: str = "synced_randomized"
     bucketing_batch_size: Optional[Any] = None
     bucketing_weights: Optional[List[int]] = None
 
+    # duration bucketing params
+    max_batch_duration: Optional[float] = None
+    num_duration_buckets: int = 30
+    max_batch_size: Optional[int] = None
+
+    # precomputed features params
+    feature_store_dir: Optional[str] = None
+
 
 @dataclass
 class EncDecCTCConfig(model_cfg.ModelConfig):
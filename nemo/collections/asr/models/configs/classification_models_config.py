@@ -52,6 +52,7 @@ class EncDecClassificationDatasetConfig(nemo.core.classes.dataset.DatasetConfig)
     shift_length_in_sec: float = 0.01
     normalize_audio: bool = False
     is_regression_task: bool = False
+    manifest_columnar: bool = False
 
     # bucketing params
     bucketing_strategy: str = "synced_randomized"
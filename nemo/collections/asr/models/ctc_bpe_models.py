@@ -138,6 +138,12 @@ class EncDecCTCModelBPE(EncDecCTCModel, ASRBPEMixin):
             dataset = audio_to_text_dataset.get_bpe_dataset(
                 config=config, tokenizer=self.tokenizer, augmentor=augmentor
             )
+
+        if config.get('max_batch_duration', None) is not None:
+            return audio_to_text_dataset.get_duration_bucketing_dataloader(
+                config=config, dataset=dataset, global_rank=self.global_rank, world_size=self.world_size
+            )
+
         if hasattr(dataset, 'collate_fn'):
             collate_fn = dataset.collate_fn
         else:
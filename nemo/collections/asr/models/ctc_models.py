@@ -28,7 +28,7 @@ from nemo.collections.asr.data.audio_to_text_dali import DALIOutputs
 from nemo.collections.asr.losses.ctc import CTCLoss
 from nemo.collections.asr.metrics.wer import WER, CTCDecoding, CTCDecodingConfig
 from nemo.collections.asr.models.asr_model import ASRModel, ExportableEncDecModel
-from nemo.collections.asr.parts.mixins import ASRModuleMixin
+from nemo.collections.asr.parts.mixins import ASRModuleMixin, ASRTranscriptionMixin
 from nemo.collections.asr.parts.preprocessing.perturb import process_augmentations
 from nemo.core.classes.common import PretrainedModelInfo, typecheck
 from nemo.core.classes.mixins import AccessMixin
@@ -38,7 +38,7 @@ from nemo.utils import logging
 __all__ = ['EncDecCTCModel']
 
 
-class EncDecCTCModel(ASRModel, ExportableEncDecModel, ASRModuleMixin):
+class EncDecCTCModel(ASRModel, ExportableEncDecModel, ASRModuleMixin, ASRTranscriptionMixin):
     """Base class for encoder decoder CTC-based models."""
 
     def __init__(self, cfg: DictConfig, trainer: Trainer = None):
@@ -223,6 +223,23 @@ class EncDecCTCModel(ASRModel, ExportableEncDecModel, ASRModuleMixin):
 
         return hypotheses
 
+    def _transcribe_audio_batch(
+        self, input_signal: torch.Tensor, input_signal_length: torch.Tensor, return_hypotheses: bool
+    ) -> List:
+        logits, logits_len, _ = self.forward(input_signal=input_signal, input_signal_length=input_signal_length)
+        hypotheses, _ = self.decoding.ctc_decoder_predictions_tensor(
+            logits, decoder_lengths=logits_len, return_hypotheses=return_hypotheses,
+        )
+        if return_hypotheses:
+            logits, logits_len = logits.cpu(), logits_len.cpu()
+            hypotheses = list(hypotheses)
+            for idx, hypothesis in enumerate(hypotheses):
+                # Same as `transcribe`, hypotheses hold the log probs of their sample
+                hypothesis.y_sequence = logits[idx][: logits_len[idx]]
+                if hypothesis.alignments is None:
+                    hypothesis.alignments = hypothesis.y_sequence
+        return hypotheses
+
     def change_vocabulary(self, new_vocabulary: List[str], decoding_cfg: Optional[DictConfig] = None):
         """
         Changes vocabulary used during CTC decoding process. Use this method when fine-tuning on from pre-trained model.
@@ -376,6 +393,11 @@ class EncDecCTCModel(ASRModel, ExportableEncDecModel, ASRModuleMixin):
 
             dataset = audio_to_text_dataset.get_char_dataset(config=config, augmentor=augmentor)
 
+        if config.get('max_batch_duration', None) is not None:
+            return audio_to_text_dataset.get_duration_bucketing_dataloader(
+                config=config, dataset=dataset, global_rank=self.global_rank, world_size=self.world_size
+            )
+
         if hasattr(dataset, 'collate_fn'):
             collate_fn = dataset.collate_fn
         else:
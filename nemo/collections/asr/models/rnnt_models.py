@@ -30,7 +30,7 @@ from nemo.collections.asr.losses.rnnt import RNNTLoss, resolve_rnnt_default_loss
 from nemo.collections.asr.metrics.rnnt_wer import RNNTWER, RNNTDecoding, RNNTDecodingConfig
 from nemo.collections.asr.models.asr_model import ASRModel
 from nemo.collections.asr.modules.rnnt import RNNTDecoderJoint
-from nemo.collections.asr.parts.mixins import ASRModuleMixin
+from nemo.collections.asr.parts.mixins import ASRModuleMixin, ASRTranscriptionMixin
 from nemo.collections.asr.parts.preprocessing.perturb import process_augmentations
 from nemo.core.classes import Exportable
 from nemo.core.classes.common import PretrainedModelInfo, typecheck
@@ -39,7 +39,7 @@ from nemo.core.neural_types import AcousticEncodedRepresentation, AudioSignal, L
 from nemo.utils import logging
 
 
-class EncDecRNNTModel(ASRModel, ASRModuleMixin, Exportable):
+class EncDecRNNTModel(ASRModel, ASRModuleMixin, ASRTranscriptionMixin, Exportable):
     """Base class for encoder decoder RNNT-based models."""
 
     def __init__(self, cfg: DictConfig, trainer: Trainer = None):
@@ -303,6 +303,15 @@ class EncDecRNNTModel(ASRModel, ASRModuleMixin, Exportable):
                 self.joint.unfreeze()
         return hypotheses, all_hypotheses
 
+    def _transcribe_audio_batch(
+        self, input_signal: torch.Tensor, input_signal_length: torch.Tensor, return_hypotheses: bool
+    ) -> List:
+        encoded, encoded_len = self.forward(input_signal=input_signal, input_signal_length=input_signal_length)
+        best_hyp, _ = self.decoding.rnnt_decoder_predictions_tensor(
+            encoded, encoded_len, return_hypotheses=return_hypotheses
+        )
+        return best_hyp
+
     def change_vocabulary(self, new_vocabulary: List[str], decoding_cfg: Optional[DictConfig] = None):
         """
         Changes vocabulary used during RNNT decoding process. Use this method when fine-tuning a pre-trained model.
@@ -484,6 +493,11 @@ class EncDecRNNTModel(ASRModel, ASRModuleMixin, Exportable):
 
             dataset = audio_to_text_dataset.get_char_dataset(config=config, augmentor=augmentor)
 
+        if config.get('max_batch_duration', None) is not None:
+            return audio_to_text_dataset.get_duration_bucketing_dataloader(
+                config=config, dataset=dataset, global_rank=self.global_rank, world_size=self.world_size
+            )
+
         if hasattr(dataset, 'collate_fn'):
             collate_fn = dataset.collate_fn
         else:
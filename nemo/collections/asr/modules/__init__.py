@@ -19,7 +19,7 @@ from nemo.collections.asr.modules.audio_preprocessing import (
     MaskedPatchAugmentation,
     SpectrogramAugmentation,
 )
-from nemo.collections.asr.modules.beam_search_decoder import BeamSearchDecoderWithLM
+from nemo.collections.asr.modules.beam_search_decoder import BeamSearchDecoderWithLM, CTCPrefixBeamSearchDecoderWithLM
 from nemo.collections.asr.modules.conformer_encoder import ConformerEncoder, ConformerEncoderAdapter
 from nemo.collections.asr.modules.conv_asr import (
     ConvASRDecoder,
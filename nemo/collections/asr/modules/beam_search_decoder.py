@@ -12,8 +12,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import numpy as np
 import torch
 
+from nemo.collections.asr.parts.submodules.ctc_beam_decoding import CTCPrefixBeamSearch
 from nemo.core.classes import NeuralModule, typecheck
 from nemo.core.neural_types import LengthsType, LogprobsType, NeuralType, PredictionsType
 
@@ -101,3 +103,75 @@ class BeamSearchDecoderWithLM(NeuralModule):
             cutoff_top_n=self.cutoff_top_n,
         )
         return res
+
+
+class CTCPrefixBeamSearchDecoderWithLM(NeuralModule):
+    """Neural Module that does CTC prefix beam search with a N-gram language model, in NumPy.
+    Same interface as `BeamSearchDecoderWithLM`, without the ctc_decoders package: the LM is an ARPA file loaded
+    into an in-memory trie, the search is vectorized over the vocabulary and the utterances of a batch are
+    decoded by a pool of processes. Outputs a list of size batch_size. Each element in the list is a list of size
+    beam_search, and each element in that list is a tuple of (final_log_prob, hyp_string).
+    Args:
+        vocab (list): List of characters that can be output by the ASR model. For English, this is the 28 character set
+            {a-z '}. The CTC blank symbol is automatically added.
+        beam_width (int): Size of beams to keep and expand upon. Larger beams result in more accurate but slower
+            predictions
+        alpha (float): The amount of importance to place on the N-gram language model. Larger alpha means more
+            importance on the LM and less importance on the acoustic model.
+        beta (float): A bonus given to each word scored by the language model.
+        lm_path (str): Path to N-gram language model, in ARPA format
+        num_cpus (int): Number of CPUs to use
+        cutoff_prob (float): Cutoff probability in vocabulary pruning, default 1.0, no pruning
+        cutoff_top_n (int): Cutoff number in pruning, only top cutoff_top_n characters with highest probs in
+            vocabulary will be used in beam search, default 40.
+    """
+
+    @property
+    def input_types(self):
+        """Returns definitions of module input ports.
+        """
+        return {
+            "log_probs": NeuralType(('B', 'T', 'D'), LogprobsType()),
+            "log_probs_length": NeuralType(tuple('B'), LengthsType()),
+        }
+
+    @property
+    def output_types(self):
+        """Returns definitions of module output ports.
+        """
+        return {"predictions": NeuralType(('B', 'T'), PredictionsType())}
+
+    def __init__(self, vocab, beam_width, alpha, beta, lm_path, num_cpus, cutoff_prob=1.0, cutoff_top_n=40):
+        super().__init__()
+
+        self.vocab = vocab
+        self.num_cpus = num_cpus
+        self.search = CTCPrefixBeamSearch(
+            blank_id=len(vocab),
+            beam_size=beam_width,
+            ngram_lm=lm_path,
+            alpha=alpha,
+            beta=beta,
+            cutoff_prob=cutoff_prob,
+            cutoff_top_n=cutoff_top_n,
+            vocabulary=vocab,
+        )
+
+    @typecheck(ignore_collections=True)
+    @torch.no_grad()
+    def forward(self, log_probs, log_probs_length):
+        """Decodes log probabilities, a tensor [B x T x D] or a list of arrays [T x D]."""
+        if isinstance(log_probs, torch.Tensor):
+            lengths = (
+                log_probs_length.tolist() if log_probs_length is not None else [log_probs.shape[1]] * len(log_probs)
+            )
+            log_probs = log_probs.float().cpu().numpy()
+            log_probs = [log_probs_i[:length] for log_probs_i, length in zip(log_probs, lengths)]
+        elif log_probs_length is not None:
+            log_probs = [np.asarray(log_probs_i)[:length] for log_probs_i, length in zip(log_probs, log_probs_length)]
+
+        beams = self.search.search_batch(log_probs, num_workers=self.num_cpus)
+        return [
+            [(score, ''.join(self.vocab[token] for token in tokens)) for score, tokens, _ in beams_i]
+            for beams_i in beams
+        ]
@@ -379,7 +379,7 @@ class RNNTDecoder(rnnt_abstract.AbstractRNNTDecoder, Exportable, AdapterModuleMi
 
         Args:
             hypothesis: Refer to rnnt_utils.Hypothesis.
-            cache: Dict which contains a cache to avoid duplicate computations.
+            cache: Dict (or PredictionCache) which contains a cache to avoid duplicate computations.
 
         Returns:
             Returns a tuple (y, states, lm_token) such that:
@@ -406,8 +406,9 @@ class RNNTDecoder(rnnt_abstract.AbstractRNNTDecoder, Exportable, AdapterModuleMi
         # Convert current hypothesis into a tuple to preserve in cache
         sequence = tuple(hypothesis.y_sequence)
 
-        if sequence in cache:
-            y, new_state = cache[sequence]
+        cached = cache.get(sequence)
+        if cached is not None:
+            y, new_state = cached
         else:
             # Obtain score for target token and new states
             if blank_state:
@@ -431,7 +432,7 @@ class RNNTDecoder(rnnt_abstract.AbstractRNNTDecoder, Exportable, AdapterModuleMi
 
         Args:
             hypothesis: List of Hypotheses. Refer to rnnt_utils.Hypothesis.
-            cache: Dict which contains a cache to avoid duplicate computations.
+            cache: Dict (or PredictionCache) which contains a cache to avoid duplicate computations.
             batch_states: List of torch.Tensor which represent the states of the RNN for this batch.
                 Each state is of shape [L, B, H]
 
@@ -459,8 +460,9 @@ class RNNTDecoder(rnnt_abstract.AbstractRNNTDecoder, Exportable, AdapterModuleMi
         for i, hyp in enumerate(hypotheses):
             sequence = tuple(hyp.y_sequence)
 
-            if sequence in cache:
-                done[i] = cache[sequence]
+            cached = cache.get(sequence)
+            if cached is not None:
+                done[i] = cached
             else:
                 tokens.append(hyp.y_sequence[-1])
                 process.append((sequence, hyp.dec_state))
@@ -19,3 +19,4 @@ from nemo.collections.asr.parts.mixins.mixins import (
     ASRModuleMixin,
     DiarizationMixin,
 )
+from nemo.collections.asr.parts.mixins.transcription import ASRTranscriptionMixin
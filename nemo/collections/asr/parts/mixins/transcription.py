@@ -0,0 +1,193 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import contextlib
+import io
+import itertools
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+import numpy as np
+import torch
+
+from nemo.collections.asr.parts.preprocessing.segment import AudioSegment
+from nemo.collections.asr.parts.utils.rnnt_utils import Hypothesis
+
+__all__ = ['ASRTranscriptionMixin', 'get_audio_loading_pool', 'load_audio_input']
+
+AudioInput = Union[np.ndarray, torch.Tensor, bytes]
+
+# Thread pools used to decode and resample the audio inputs, kept alive across calls and shared by all the models.
+_AUDIO_LOADING_POOLS: Dict[int, ThreadPoolExecutor] = {}
+_AUDIO_LOADING_POOLS_LOCK = threading.Lock()
+
+
+def get_audio_loading_pool(num_workers: int) -> Optional[ThreadPoolExecutor]:
+    """Returns the persistent pool of ``num_workers`` threads loading audio inputs, or None if ``num_workers`` is 0."""
+    if num_workers <= 0:
+        return None
+    with _AUDIO_LOADING_POOLS_LOCK:
+        pool = _AUDIO_LOADING_POOLS.get(num_workers)
+        if pool is None:
+            pool = ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix='nemo_audio_loading')
+            _AUDIO_LOADING_POOLS[num_workers] = pool
+        return pool
+
+
+def load_audio_input(audio: AudioInput, target_sr: int, sample_rate: Optional[int] = None) -> np.ndarray:
+    """
+    Converts an in-memory audio input to a mono float32 waveform at ``target_sr``.
+
+    Args:
+        audio: Either the encoded bytes of an audio file in a format supported by soundfile (or pydub), or the samples
+            [num_samples] or [num_samples x num_channels] of a waveform as a NumPy array or torch tensor. Integer
+            samples are scaled to [-1, 1].
+        target_sr: Sample rate of the returned waveform.
+        sample_rate: Sample rate of waveform inputs, defaults to ``target_sr``. Encoded files use their own.
+
+    Returns:
+        Samples of the waveform.
+    """
+    if isinstance(audio, (bytes, bytearray, memoryview)):
+        return AudioSegment.from_file(io.BytesIO(audio), target_sr=target_sr).samples
+    if isinstance(audio, torch.Tensor):
+        audio = audio.detach().cpu().numpy()
+    audio = np.asarray(audio)
+    if audio.ndim not in [1, 2]:
+        raise ValueError(
+            f"Waveforms must be of shape [num_samples] or [num_samples x num_channels], got {audio.shape}"
+        )
+    return AudioSegment(audio, sample_rate or target_sr, target_sr=target_sr).samples
+
+
+class ASRTranscriptionMixin(ABC):
+    """
+    Transcription of in-memory audio inputs, without writing manifests or setting up a DataLoader per call.
+
+    Models implement `_transcribe_audio_batch`, which transcribes a padded batch of waveforms.
+    """
+
+    @abstractmethod
+    def _transcribe_audio_batch(
+        self, input_signal: torch.Tensor, input_signal_length: torch.Tensor, return_hypotheses: bool
+    ) -> List:
+        """
+        Transcribes a batch of waveforms.
+
+        Args:
+            input_signal: Padded waveforms [B, T], on the device of the model.
+            input_signal_length: Number of samples of each waveform [B].
+            return_hypotheses: Whether to return Hypothesis objects instead of texts.
+
+        Returns:
+            The text or Hypothesis of each waveform.
+        """
+        raise NotImplementedError()
+
+    @contextlib.contextmanager
+    def _transcription_mode(self):
+        """Puts the model in evaluation mode, without dithering or padding of the features."""
+        mode = self.training
+        featurizer = self.preprocessor.featurizer
+        dither_value, pad_to_value = featurizer.dither, featurizer.pad_to
+        try:
+            self.eval()
+            featurizer.dither = 0.0
+            featurizer.pad_to = 0
+            with torch.inference_mode():
+                yield
+        finally:
+            self.train(mode=mode)
+            featurizer.dither = dither_value
+            featurizer.pad_to = pad_to_value
+
+    def transcribe_audio(
+        self,
+        audio: Iterable[AudioInput],
+        batch_size: int = 4,
+        sample_rate: Optional[int] = None,
+        return_hypotheses: bool = False,
+        num_workers: int = 0,
+        sort_window: Optional[int] = None,
+    ) -> Iterator[Union[str, Hypothesis]]:
+        """
+        Transcribes in-memory audio inputs, yielding the transcription of each input in the order of the inputs.
+
+        Inputs are sorted by length so that batches hold waveforms of similar durations, and are loaded (decoded and
+        resampled) by a pool of threads which persists across calls. When inputs are sorted by windows, the next window
+        is loaded while the batches of the current window run through the model.
+
+        Args:
+            audio: Iterable of waveforms (NumPy arrays or torch tensors of samples [num_samples] or
+                [num_samples x num_channels]) or encoded audio files (bytes).
+            batch_size: Maximum number of inputs per batch.
+            sample_rate: Sample rate of the waveforms, which are resampled to the sample rate of the model if it
+                differs. Defaults to the sample rate of the model.
+            return_hypotheses: Whether to yield Hypothesis objects instead of texts.
+            num_workers: Number of threads loading the inputs. 0 loads them in the calling thread.
+            sort_window: Number of consecutive inputs sorted by length together. Smaller windows yield the first
+                results earlier, and allow ``audio`` to be an unbounded stream. Defaults to all the inputs.
+
+        Returns:
+            Generator of the text (or Hypothesis) of each input.
+        """
+        target_sr = self.preprocessor._sample_rate
+        device = next(self.parameters()).device
+        pool = get_audio_loading_pool(num_workers)
+
+        def load(inputs: List[AudioInput]) -> List:
+            if pool is None:
+                return [load_audio_input(item, target_sr, sample_rate) for item in inputs]
+            return [pool.submit(load_audio_input, item, target_sr, sample_rate) for item in inputs]
+
+        audio = iter(audio)
+        if sort_window is None:
+            windows = iter([list(audio)])
+        else:
+            windows = iter(lambda: list(itertools.islice(audio, sort_window)), [])
+
+        next_window = next(windows, None)
+        pending = load(next_window) if next_window else None
+        while pending is not None:
+            waveforms = [item.result() if pool is not None else item for item in pending]
+            next_window = next(windows, None)
+            pending = load(next_window) if next_window else None
+
+            lengths = np.array([len(waveform) for waveform in waveforms], dtype=np.int64)
+            order = np.argsort(-lengths, kind='stable')
+            results = [None] * len(waveforms)
+            next_result = 0
+            for start in range(0, len(order), batch_size):
+                batch_idx = order[start : start + batch_size]
+                batch_lengths = lengths[batch_idx]
+                signal = np.zeros([len(batch_idx), batch_lengths.max()], dtype=np.float32)
+                for row, idx in enumerate(batch_idx):
+                    signal[row, : lengths[idx]] = waveforms[idx]
+                    waveforms[idx] = None
+
+                with self._transcription_mode():
+                    transcriptions = self._transcribe_audio_batch(
+                        input_signal=torch.from_numpy(signal).to(device),
+                        input_signal_length=torch.from_numpy(batch_lengths).to(device),
+                        return_hypotheses=return_hypotheses,
+                    )
+                for idx, transcription in zip(batch_idx, transcriptions):
+                    results[idx] = transcription
+
+                while next_result < len(results) and results[next_result] is not None:
+                    yield results[next_result]
+                    results[next_result] = None
+                    next_result += 1
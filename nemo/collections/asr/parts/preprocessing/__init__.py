@@ -11,7 +11,7 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-
+from nemo.collections.asr.parts.preprocessing.audio_reader import AudioReader
 from nemo.collections.asr.parts.preprocessing.feature_loader import ExternalFeatureLoader
 from nemo.collections.asr.parts.preprocessing.features import FeaturizerFactory, FilterbankFeatures, WaveformFeaturizer
 from nemo.collections.asr.parts.preprocessing.perturb import (
@@ -31,4 +31,5 @@ from nemo.collections.asr.parts.preprocessing.perturb import (
     process_augmentations,
     register_perturbation,
 )
+from nemo.collections.asr.parts.preprocessing.resample import Resampler
 from nemo.collections.asr.parts.preprocessing.segment import AudioSegment
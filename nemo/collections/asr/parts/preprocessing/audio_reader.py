@@ -0,0 +1,290 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+import numpy as np
+import soundfile as sf
+
+HAVE_PYDUB = True
+try:
+    from pydub import AudioSegment as Audio
+except ModuleNotFoundError:
+    HAVE_PYDUB = False
+
+__all__ = ['AudioReader', 'get_default_audio_reader', 'set_default_audio_reader']
+
+
+class _LRUCache:
+    """Least recently used cache bounded by the total size of its values."""
+
+    def __init__(self, capacity: float, on_evict=None):
+        self.capacity = capacity
+        self.size = 0
+        self._on_evict = on_evict
+        self._items = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        item = self._items.get(key)
+        if item is None:
+            return None
+        self._items.move_to_end(key)
+        return item[0]
+
+    def put(self, key: Hashable, value: Any, size: float = 1):
+        if size > self.capacity:
+            return
+        self.pop(key)
+        self._items[key] = (value, size)
+        self.size += size
+        while self.size > self.capacity:
+            _, (evicted, evicted_size) = self._items.popitem(last=False)
+            self.size -= evicted_size
+            if self._on_evict is not None:
+                self._on_evict(evicted)
+
+    def pop(self, key: Hashable):
+        item = self._items.pop(key, None)
+        if item is not None:
+            self.size -= item[1]
+            if self._on_evict is not None:
+                self._on_evict(item[0])
+
+    def clear(self):
+        while self._items:
+            self.pop(next(iter(self._items)))
+
+    def __len__(self):
+        return len(self._items)
+
+
+class AudioReader:
+    """
+    Reads whole audio files or parts of them, avoiding to reopen and redecode the same files.
+
+    - Open soundfile handles are kept in an LRU cache, so that the header of a file is parsed once and reads at an
+      offset seek directly to the requested frames. A cached handle is reopened if the file changes on disk.
+    - Files not supported by soundfile are decoded with pydub, which only decodes the requested range through
+      ffmpeg when an offset or a duration is given.
+    - Optionally, decoded audio is kept in an LRU cache bounded by ``cache_size_mb``. Soundfile files are decoded by
+      chunks of ``chunk_duration`` seconds and pydub files as a whole, so that many entries pointing into one long
+      file cost a single decode.
+
+    Caches are per process: they are dropped in forked processes (e.g. dataloader workers) and not pickled.
+
+    Args:
+        max_open_files: Maximum number of soundfile handles kept open. 0 disables handle caching.
+        cache_size_mb: Maximum size of the decoded audio cache, in megabytes. 0 disables decoded audio caching.
+        chunk_duration: Duration of the decoded chunks of soundfile files, in seconds.
+    """
+
+    def __init__(self, max_open_files: int = 16, cache_size_mb: float = 0, chunk_duration: float = 30.0):
+        self.max_open_files = max_open_files
+        self.cache_size_mb = cache_size_mb
+        self.chunk_duration = chunk_duration
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._lock = threading.RLock()
+        self._handles = _LRUCache(self.max_open_files, on_evict=lambda handle: handle[0].close())
+        self._decoded = _LRUCache(self.cache_size_mb * 1024 * 1024)
+
+    def __getstate__(self):
+        return dict(
+            max_open_files=self.max_open_files, cache_size_mb=self.cache_size_mb, chunk_duration=self.chunk_duration
+        )
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._reset()
+
+    def _check_pid(self):
+        # Handles inherited from a parent process share their file position with it, so they are not reused.
+        if self._pid != os.getpid():
+            self._reset()
+
+    def clear(self):
+        """Closes all the cached handles and drops the decoded audio."""
+        with self._lock:
+            self._check_pid()
+            self._handles.clear()
+            self._decoded.clear()
+
+    def _open(self, audio_file: str) -> Tuple[sf.SoundFile, tuple]:
+        """Returns an open handle on ``audio_file`` and the signature of the file it was opened on."""
+        stat = os.stat(audio_file)
+        signature = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        handle = self._handles.get(audio_file)
+        if handle is not None and handle[1] == signature:
+            return handle
+        handle = (sf.SoundFile(audio_file, 'r'), signature)
+        if self.max_open_files > 0:
+            self._handles.put(audio_file, handle)
+        return handle
+
+    def info(self, audio_file) -> Tuple[int, int]:
+        """Returns the sample rate and the number of frames of a soundfile supported file."""
+        if not isinstance(audio_file, str):
+            with sf.SoundFile(audio_file, 'r') as f:
+                return f.samplerate, f.frames
+        with self._lock:
+            self._check_pid()
+            f, _ = self._open(audio_file)
+            try:
+                return f.samplerate, f.frames
+            finally:
+                if self.max_open_files <= 0:
+                    f.close()
+
+    def read(
+        self, audio_file, offset: float = 0, duration: float = 0, dtype: str = 'float32'
+    ) -> Tuple[np.ndarray, int]:
+        """
+        Reads a soundfile supported file, or file-like object.
+
+        Args:
+            audio_file: Path of the file or file-like object.
+            offset: Offset in seconds of the first frame to read.
+            duration: Duration in seconds to read. 0 reads until the end of the file.
+            dtype: Data type of the samples.
+
+        Returns:
+            Samples [num_frames] or [num_frames x num_channels] and sample rate.
+        """
+        if not isinstance(audio_file, str):
+            with sf.SoundFile(audio_file, 'r') as f:
+                return self._read_handle(f, offset, duration, dtype), f.samplerate
+
+        with self._lock:
+            self._check_pid()
+            f, signature = self._open(audio_file)
+            try:
+                sample_rate = f.samplerate
+                start = int(offset * sample_rate) if offset > 0 else 0
+                num_frames = int(duration * sample_rate) if duration > 0 else -1
+                if self.cache_size_mb > 0:
+                    samples = self._read_cached_chunks(audio_file, f, signature, start, num_frames, dtype)
+                else:
+                    samples = self._read_handle(f, offset, duration, dtype)
+            finally:
+                if self.max_open_files <= 0:
+                    f.close()
+        return samples, sample_rate
+
+    def read_frames(
+        self, audio_file, start: int = 0, num_frames: int = -1, dtype: str = 'float32'
+    ) -> Tuple[np.ndarray, int]:
+        """Same as `read`, with the range given in frames. ``num_frames=-1`` reads until the end of the file."""
+        if not isinstance(audio_file, str):
+            with sf.SoundFile(audio_file, 'r') as f:
+                f.seek(start)
+                return f.read(num_frames, dtype=dtype), f.samplerate
+        with self._lock:
+            self._check_pid()
+            f, signature = self._open(audio_file)
+            try:
+                sample_rate = f.samplerate
+                if self.cache_size_mb > 0:
+                    samples = self._read_cached_chunks(audio_file, f, signature, start, num_frames, dtype)
+                else:
+                    f.seek(start)
+                    samples = f.read(num_frames, dtype=dtype)
+            finally:
+                if self.max_open_files <= 0:
+                    f.close()
+        return samples, sample_rate
+
+    @staticmethod
+    def _read_handle(f: sf.SoundFile, offset: float, duration: float, dtype: str) -> np.ndarray:
+        sample_rate = f.samplerate
+        f.seek(int(offset * sample_rate) if offset > 0 else 0)
+        if duration > 0:
+            return f.read(int(duration * sample_rate), dtype=dtype)
+        return f.read(dtype=dtype)
+
+    def _read_cached_chunks(
+        self, audio_file: str, f: sf.SoundFile, signature: tuple, start: int, num_frames: int, dtype: str
+    ) -> np.ndarray:
+        """Reads frames [start, start + num_frames) from decoded chunks, decoding the chunks missing in the cache."""
+        chunk_frames = max(int(self.chunk_duration * f.samplerate), 1)
+        end = f.frames if num_frames < 0 else min(start + num_frames, f.frames)
+        start = min(start, end)
+
+        parts = []
+        for chunk_idx in range(start // chunk_frames, (max(end, start + 1) - 1) // chunk_frames + 1):
+            key = (audio_file, signature, dtype, chunk_idx)
+            chunk = self._decoded.get(key)
+            if chunk is None:
+                f.seek(chunk_idx * chunk_frames)
+                chunk = f.read(chunk_frames, dtype=dtype)
+                self._decoded.put(key, chunk, size=chunk.nbytes)
+            chunk_start = chunk_idx * chunk_frames
+            parts.append(chunk[max(start - chunk_start, 0) : end - chunk_start])
+        return parts[0].copy() if len(parts) == 1 else np.concatenate(parts)
+
+    def read_pydub(self, audio_file, offset: float = 0, duration: float = 0) -> Tuple[np.ndarray, int]:
+        """
+        Reads a file with pydub, for formats not supported by soundfile.
+
+        Args:
+            audio_file: Path of the file or file-like object.
+            offset: Offset in seconds of the first frame to read.
+            duration: Duration in seconds to read. 0 reads until the end of the file.
+
+        Returns:
+            Samples as returned by `pydub.AudioSegment.get_array_of_samples` (interleaved channels) and sample rate.
+        """
+        if not HAVE_PYDUB:
+            raise ModuleNotFoundError("pydub is required to read this audio file.")
+
+        if self.cache_size_mb <= 0 or not isinstance(audio_file, str):
+            # Let ffmpeg only decode the requested range.
+            audio = Audio.from_file(
+                audio_file, start_second=offset if offset > 0 else None, duration=duration if duration > 0 else None
+            )
+            return np.array(audio.get_array_of_samples()), audio.frame_rate
+
+        with self._lock:
+            self._check_pid()
+            stat = os.stat(audio_file)
+            key = (audio_file, (stat.st_ino, stat.st_size, stat.st_mtime_ns), 'pydub')
+            decoded = self._decoded.get(key)
+            if decoded is None:
+                audio = Audio.from_file(audio_file)
+                decoded = (np.array(audio.get_array_of_samples()), audio.frame_rate, audio.channels)
+                self._decoded.put(key, decoded, size=decoded[0].nbytes)
+
+        samples, sample_rate, channels = decoded
+        # Same frame boundaries as slicing the pydub segment in milliseconds.
+        start = int(int(offset * 1000) * sample_rate / 1000) if offset > 0 else 0
+        end = start + int(int(duration * 1000) * sample_rate / 1000) if duration > 0 else len(samples) // channels
+        return samples[start * channels : end * channels].copy(), sample_rate
+
+
+_default_audio_reader = AudioReader()
+
+
+def get_default_audio_reader() -> AudioReader:
+    """Returns the reader used by `AudioSegment` when no reader is given."""
+    return _default_audio_reader
+
+
+def set_default_audio_reader(reader: AudioReader):
+    """Sets the reader used by `AudioSegment` when no reader is given, e.g. to enable the decoded audio cache."""
+    global _default_audio_reader
+    _default_audio_reader = reader
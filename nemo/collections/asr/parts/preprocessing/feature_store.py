@@ -0,0 +1,205 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+from typing import List, Optional
+
+import numpy as np
+import torch
+
+__all__ = ['FeatureStore', 'FeatureStoreWriter', 'get_feature_store_key']
+
+INDEX_FILENAME = 'index.json'
+
+
+def get_feature_store_key(audio_file: str, offset: Optional[float] = None, duration: Optional[float] = None) -> str:
+    """Returns the key of the features of the manifest entry reading ``duration`` seconds of ``audio_file`` at
+    ``offset``."""
+    return f"{audio_file}|{float(offset or 0)!r}|{float(duration or 0)!r}"
+
+
+class FeatureStoreWriter:
+    """
+    Writes precomputed features into a feature store, readable with `FeatureStore`.
+
+    The features of all the utterances are concatenated along time into shards, ``.npy`` files of shape
+    [num_frames x num_features] which are memory-mapped at read time. ``index.json`` maps the key of each utterance to
+    its shard, first frame and number of frames.
+
+    Args:
+        store_dir: Directory of the store, created if it does not exist.
+        shard_size_mb: Approximate size of a shard, in megabytes.
+        dtype: Data type of the stored features, e.g. 'float16' to halve the size of the store.
+        shard_prefix: Prefix of the shard file names, so that several writers can fill the same directory. Their
+            indices are then merged with `FeatureStoreWriter.merge_indices`.
+    """
+
+    def __init__(
+        self, store_dir: str, shard_size_mb: float = 512, dtype: str = 'float32', shard_prefix: str = 'shard'
+    ):
+        self.store_dir = store_dir
+        self.shard_size_mb = shard_size_mb
+        self.dtype = np.dtype(dtype)
+        self.shard_prefix = shard_prefix
+        os.makedirs(store_dir, exist_ok=True)
+
+        self.num_features = None
+        self.shards = []
+        self.entries = {}
+        self._buffer = []
+        self._buffer_frames = 0
+
+    def add(self, key: str, features: np.ndarray):
+        """Adds the features [num_features x num_frames] of the utterance ``key``."""
+        if isinstance(features, torch.Tensor):
+            features = features.detach().cpu().numpy()
+        if features.ndim != 2:
+            raise ValueError(f"Expected features of shape [num_features x num_frames], got {features.shape}")
+        if self.num_features is None:
+            self.num_features = features.shape[0]
+        elif features.shape[0] != self.num_features:
+            raise ValueError(f"Expected {self.num_features} features, got {features.shape[0]} for {key}")
+        if key in self.entries:
+            raise ValueError(f"Features of {key} were already added to the store")
+
+        self.entries[key] = (len(self.shards), self._buffer_frames, features.shape[1])
+        self._buffer.append(features.T.astype(self.dtype))
+        self._buffer_frames += features.shape[1]
+        if self._buffer_frames * self.num_features * self.dtype.itemsize >= self.shard_size_mb * 1024 * 1024:
+            self._write_shard()
+
+    def _write_shard(self):
+        if not self._buffer:
+            return
+        shard_name = f'{self.shard_prefix}_{len(self.shards):05d}.npy'
+        np.save(os.path.join(self.store_dir, shard_name), np.concatenate(self._buffer))
+        self.shards.append(shard_name)
+        self._buffer = []
+        self._buffer_frames = 0
+
+    def close(self) -> str:
+        """Writes the last shard and the index of the store. Returns the path of the index."""
+        self._write_shard()
+        index = {
+            'num_features': self.num_features,
+            'dtype': self.dtype.name,
+            'shards': self.shards,
+            'entries': self.entries,
+        }
+        index_filename = INDEX_FILENAME if self.shard_prefix == 'shard' else f'{self.shard_prefix}_{INDEX_FILENAME}'
+        index_path = os.path.join(self.store_dir, index_filename)
+        with open(index_path, 'w') as f:
+            json.dump(index, f)
+        return index_path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+
+    @staticmethod
+    def merge_indices(store_dir: str, index_paths: List[str]) -> str:
+        """Merges the indices written by several writers of ``store_dir`` into the index of the store."""
+        merged = {'num_features': None, 'dtype': None, 'shards': [], 'entries': {}}
+        for index_path in index_paths:
+            with open(index_path, 'r') as f:
+                index = json.load(f)
+            if index['num_features'] is None:
+                continue
+            for field in ['num_features', 'dtype']:
+                if merged[field] is not None and merged[field] != index[field]:
+                    raise ValueError(f"Cannot merge feature stores with different {field}")
+                merged[field] = index[field]
+            shard_offset = len(merged['shards'])
+            merged['shards'].extend(index['shards'])
+            for key, (shard, start, length) in index['entries'].items():
+                merged['entries'][key] = (shard + shard_offset, start, length)
+
+        index_path = os.path.join(store_dir, INDEX_FILENAME)
+        with open(index_path, 'w') as f:
+            json.dump(merged, f)
+        return index_path
+
+
+class FeatureStore:
+    """
+    Reads features written by `FeatureStoreWriter`.
+
+    Shards are memory-mapped on first use, so that reading an utterance only touches its own frames and the page
+    cache is shared by all the dataloader workers. Memory maps are per process and not pickled.
+
+    The store can be used as the ``feature_loader`` of the feature_to_label datasets, the feature file of the
+    manifest entries being their key in the store.
+
+    Args:
+        store_dir: Directory of the store.
+    """
+
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, INDEX_FILENAME), 'r') as f:
+            index = json.load(f)
+        self.num_features = index['num_features']
+        self.dtype = index['dtype']
+        self.shards = index['shards']
+
+        keys = list(index['entries'].keys())
+        entries = np.array(list(index['entries'].values()), dtype=np.int64).reshape(-1, 3)
+        self._rows = {key: row for row, key in enumerate(keys)}
+        self._shard_ids, self._starts, self._lengths = entries[:, 0], entries[:, 1], entries[:, 2]
+        self._mmaps = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_mmaps'] = {}
+        return state
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, key: str):
+        return key in self._rows
+
+    def keys(self) -> List[str]:
+        return list(self._rows.keys())
+
+    def num_frames(self, key: str) -> int:
+        return int(self._lengths[self._rows[key]])
+
+    def _shard(self, shard_id: int) -> np.ndarray:
+        shard = self._mmaps.get(shard_id)
+        if shard is None:
+            shard = np.load(os.path.join(self.store_dir, self.shards[shard_id]), mmap_mode='r')
+            self._mmaps[shard_id] = shard
+        return shard
+
+    def get(self, key: str) -> np.ndarray:
+        """Returns the features [num_features x num_frames] of the utterance ``key``, as float32."""
+        row = self._rows.get(key)
+        if row is None:
+            raise KeyError(f"No features for {key} in the feature store {self.store_dir}")
+        start = self._starts[row]
+        frames = self._shard(self._shard_ids[row])[start : start + self._lengths[row]]
+        return frames.astype(np.float32).T
+
+    def process(self, file_path: str, offset=0, duration=0, trim=False, orig_sr=None) -> torch.Tensor:
+        """Same interface as `ExternalFeatureLoader.process`, ``file_path`` being the key of the features."""
+        return torch.from_numpy(self.get(file_path))
+
+    def clear(self):
+        """Closes the memory maps of the shards."""
+        self._mmaps = {}
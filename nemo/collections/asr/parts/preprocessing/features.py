@@ -40,7 +40,9 @@ import numpy as np
 import torch
 import torch.nn as nn
 
+from nemo.collections.asr.parts.preprocessing.audio_reader import AudioReader
 from nemo.collections.asr.parts.preprocessing.perturb import AudioAugmentor
+from nemo.collections.asr.parts.preprocessing.resample import get_resampler
 from nemo.collections.asr.parts.preprocessing.segment import AudioSegment
 from nemo.utils import logging
 
@@ -100,10 +102,14 @@ def splice_frames(x, frame_splicing):
 
 
 class WaveformFeaturizer(object):
-    def __init__(self, sample_rate=16000, int_values=False, augmentor=None):
+    def __init__(
+        self, sample_rate=16000, int_values=False, augmentor=None, audio_reader=None, resample_method='librosa'
+    ):
         self.augmentor = augmentor if augmentor is not None else AudioAugmentor()
         self.sample_rate = sample_rate
         self.int_values = int_values
+        self.audio_reader = audio_reader
+        self.resampler = get_resampler(resample_method)
 
     def max_augmentation_length(self, length):
         return self.augmentor.max_augmentation_length(length)
@@ -132,6 +138,8 @@ class WaveformFeaturizer(object):
             trim_frame_length=trim_frame_length,
             trim_hop_length=trim_hop_length,
             orig_sr=orig_sr,
+            audio_reader=self.audio_reader,
+            resampler=self.resampler,
         )
         return self.process_segment(audio)
 
@@ -148,8 +156,17 @@ class WaveformFeaturizer(object):
 
         sample_rate = input_config.get("sample_rate", 16000)
         int_values = input_config.get("int_values", False)
-
-        return cls(sample_rate=sample_rate, int_values=int_values, augmentor=aa)
+        audio_reader_cfg = input_config.get("audio_reader", None)
+        audio_reader = AudioReader(**audio_reader_cfg) if audio_reader_cfg is not None else None
+        resample_method = input_config.get("resample_method", "librosa")
+
+        return cls(
+            sample_rate=sample_rate,
+            int_values=int_values,
+            augmentor=aa,
+            audio_reader=audio_reader,
+            resample_method=resample_method,
+        )
 
 
 class FeaturizerFactory(object):
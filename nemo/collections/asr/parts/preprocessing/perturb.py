@@ -33,16 +33,19 @@
 # SOFTWARE.
 # This file contains code artifacts adapted from https://github.com/ryanleary/patter
 import copy
+import hashlib
 import io
+import json
 import os
 import random
 import subprocess
 from tempfile import NamedTemporaryFile
-from typing import List, Optional, Union
+from typing import List, Optional, Tuple, Union
 
 import librosa
 import numpy as np
 import soundfile as sf
+import torch
 from scipy import signal
 from torch.utils.data import IterableDataset
 
@@ -90,6 +93,98 @@ def read_one_audiosegment(manifest, target_sr, rng, tarred_audio=False, audio_da
     return AudioSegment.from_file(audio_file, target_sr=target_sr, offset=offset, duration=duration)
 
 
+class AudioBank:
+    """
+    Audio of the entries of a manifest (e.g. noise or room impulse responses), decoded once at a given sample rate
+    and concatenated into a single array, for the batched perturbations.
+
+    When ``cache_dir`` is set, the array is written there on first use and memory-mapped afterwards, so that the
+    audio is decoded once for all the runs and shared by all the dataloader workers through the page cache. The array
+    is loaded lazily and not pickled.
+
+    Args:
+        manifest_path: Manifest file(s) with the audio files of the bank.
+        sample_rate: Sample rate of the audio of the bank.
+        cache_dir: Optional directory where the decoded audio is cached.
+    """
+
+    def __init__(self, manifest_path: Union[str, List[str]], sample_rate: int, cache_dir: Optional[str] = None):
+        if isinstance(manifest_path, str):
+            manifest_path = manifest_path.split(',')
+        self.manifest_path = manifest_path
+        self.sample_rate = sample_rate
+        self.cache_dir = cache_dir
+        self._samples = None
+        self._offsets = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_samples'] = None
+        state['_offsets'] = None
+        return state
+
+    def _cache_paths(self) -> Tuple[str, str]:
+        manifests = [(path, os.path.getmtime(path)) for path in self.manifest_path]
+        key = hashlib.sha1(json.dumps([manifests, self.sample_rate]).encode()).hexdigest()
+        prefix = os.path.join(self.cache_dir, f'audio_bank_{key}')
+        return f'{prefix}_samples.npy', f'{prefix}_offsets.npy'
+
+    def _load(self):
+        if self.cache_dir is not None:
+            samples_path, offsets_path = self._cache_paths()
+            if os.path.exists(samples_path) and os.path.exists(offsets_path):
+                self._samples = np.load(samples_path, mmap_mode='r')
+                self._offsets = np.load(offsets_path)
+                return
+
+        manifest = collections.ASRAudioText(self.manifest_path, parser=parsers.make_parser([]))
+        segments = []
+        for record in manifest:
+            offset = 0 if record.offset is None else record.offset
+            duration = 0 if record.duration is None else record.duration
+            segment = AudioSegment.from_file(
+                record.audio_file, target_sr=self.sample_rate, offset=offset, duration=duration
+            )
+            segments.append(segment.samples.astype(np.float32))
+        if not segments:
+            raise ValueError(f"No audio in the manifest(s) {self.manifest_path}")
+        self._samples = np.concatenate(segments)
+        self._offsets = np.cumsum([0] + [len(segment) for segment in segments])
+
+        if self.cache_dir is not None:
+            # Written under temporary names then renamed, as several workers may build the bank concurrently.
+            os.makedirs(self.cache_dir, exist_ok=True)
+            for path, array in zip(self._cache_paths(), [self._samples, self._offsets]):
+                tmp_path = f'{path}.{os.getpid()}.tmp.npy'
+                np.save(tmp_path, array)
+                os.replace(tmp_path, path)
+            self._samples = np.load(samples_path, mmap_mode='r')
+
+    @property
+    def samples(self) -> np.ndarray:
+        """Samples of all the audio of the bank, concatenated."""
+        if self._samples is None:
+            self._load()
+        return self._samples
+
+    @property
+    def offsets(self) -> np.ndarray:
+        """Offsets of the audio of the bank in `samples`, with the total number of samples appended."""
+        if self._offsets is None:
+            self._load()
+        return self._offsets
+
+    @property
+    def lengths(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx: int) -> np.ndarray:
+        return np.asarray(self.samples[self.offsets[idx] : self.offsets[idx + 1]])
+
+
 class Perturbation(object):
     def max_augmentation_length(self, length):
         return length
@@ -97,6 +192,42 @@ class Perturbation(object):
     def perturb(self, data):
         raise NotImplementedError
 
+    def perturb_batch(self, signals: torch.Tensor, lengths: torch.Tensor, sample_rate: int, mask: torch.Tensor):
+        """
+        Perturbs a padded batch of signals at once, on their device. Perturbations implementing it can be applied
+        by `AudioAugmentor.perturb_batch` without going through per-sample `AudioSegment` objects.
+
+        Args:
+            signals: Padded signals [B x T].
+            lengths: Lengths of the signals [B].
+            sample_rate: Sample rate of the signals.
+            mask: Boolean mask [B] of the signals to perturb.
+
+        Returns:
+            The perturbed signals [B x T], whose lengths are unchanged.
+        """
+        raise NotImplementedError
+
+
+def _valid_samples_mask(lengths: torch.Tensor, num_samples: int) -> torch.Tensor:
+    return torch.arange(num_samples, device=lengths.device)[None, :] < lengths[:, None]
+
+
+def _rms_db(signals: torch.Tensor, lengths: torch.Tensor) -> torch.Tensor:
+    mean_square = signals.pow(2).sum(dim=1) / lengths.clamp(min=1)
+    return 10 * torch.log10(mean_square.clamp(min=1e-20))
+
+
+def _get_bank(perturbation: Perturbation, sample_rate: int) -> AudioBank:
+    """Returns the `AudioBank` of the manifest of a noise or impulse perturbation at ``sample_rate``."""
+    if perturbation._tarred_audio:
+        raise ValueError(f"Batched {type(perturbation).__name__} does not support tarred audio")
+    bank = perturbation._banks.get(sample_rate)
+    if bank is None:
+        bank = AudioBank(perturbation._manifest_path, sample_rate, cache_dir=perturbation._bank_cache_dir)
+        perturbation._banks[sample_rate] = bank
+    return bank
+
 
 class SpeedPerturbation(Perturbation):
     """
@@ -295,6 +426,13 @@ class GainPerturbation(Perturbation):
         # logging.debug("gain: %d", gain)
         data._samples = data._samples * (10.0 ** (gain / 20.0))
 
+    def perturb_batch(self, signals, lengths, sample_rate, mask):
+        indices = mask.nonzero().flatten().to(signals.device)
+        gains = [self._rng.uniform(self._min_gain_dbfs, self._max_gain_dbfs) for _ in range(len(indices))]
+        gains = torch.tensor(gains, dtype=signals.dtype, device=signals.device)
+        signals[indices] *= (10.0 ** (gains / 20.0))[:, None]
+        return signals
+
 
 class ImpulsePerturbation(Perturbation):
     """
@@ -305,14 +443,26 @@ class ImpulsePerturbation(Perturbation):
         audio_tar_filepaths (list): Tar files, if RIR audio files are tarred
         shuffle_n (int): Shuffle parameter for shuffling buffered files from the tar files
         shift_impulse (bool): Shift impulse response to adjust for delay at the beginning
+        bank_cache_dir (str): Directory where the RIRs decoded for batched perturbation are cached (see `AudioBank`)
     """
 
-    def __init__(self, manifest_path=None, rng=None, audio_tar_filepaths=None, shuffle_n=128, shift_impulse=False):
+    def __init__(
+        self,
+        manifest_path=None,
+        rng=None,
+        audio_tar_filepaths=None,
+        shuffle_n=128,
+        shift_impulse=False,
+        bank_cache_dir=None,
+    ):
+        self._manifest_path = manifest_path
         self._manifest = collections.ASRAudioText(manifest_path, parser=parsers.make_parser([]), index_by_file_id=True)
         self._audiodataset = None
         self._tarred_audio = False
         self._shift_impulse = shift_impulse
         self._data_iterator = None
+        self._bank_cache_dir = bank_cache_dir
+        self._banks = {}
 
         if audio_tar_filepaths:
             self._tarred_audio = True
@@ -341,6 +491,34 @@ class ImpulsePerturbation(Perturbation):
             delay_after = len(impulse_resp)
             data._samples = signal.fftconvolve(data._samples, impulse_resp, "full")[:-delay_after]
 
+    def perturb_batch(self, signals, lengths, sample_rate, mask):
+        """Convolves the signals with RIRs of a preloaded `AudioBank` with batched FFTs. With ``shift_impulse``,
+        the convolved signals keep their length (instead of losing their last sample)."""
+        bank = _get_bank(self, sample_rate)
+        indices = mask.nonzero().flatten().to(signals.device)
+        impulses, starts = [], []
+        for _ in range(len(indices)):
+            impulse = bank[self._rng.randrange(len(bank))]
+            impulse_norm = (impulse - impulse.min()) / (impulse.max() - impulse.min())
+            if self._shift_impulse:
+                impulse_norm = impulse_norm[np.argmax(np.abs(impulse_norm)) :]
+                starts.append(0)
+            else:
+                # Same output samples as the "same" mode of `scipy.signal.fftconvolve`.
+                starts.append((len(impulse_norm) - 1) // 2)
+            impulses.append(torch.from_numpy(impulse_norm.astype(np.float32)))
+        impulses = torch.nn.utils.rnn.pad_sequence(impulses, batch_first=True).to(signals.device, signals.dtype)
+
+        num_samples = signals.shape[1]
+        n_fft = num_samples + impulses.shape[1] - 1
+        convolved = torch.fft.irfft(
+            torch.fft.rfft(signals[indices], n=n_fft) * torch.fft.rfft(impulses, n=n_fft), n=n_fft
+        )
+        positions = torch.arange(num_samples, device=signals.device)[None, :]
+        convolved = convolved.gather(1, positions + torch.tensor(starts, device=signals.device)[:, None])
+        signals[indices] = convolved * _valid_samples_mask(lengths.to(signals.device)[indices], num_samples)
+        return signals
+
 
 class ShiftPerturbation(Perturbation):
     """
@@ -373,6 +551,24 @@ class ShiftPerturbation(Perturbation):
             data._samples[:-shift_samples] = data._samples[shift_samples:]
             data._samples[-shift_samples:] = 0
 
+    def perturb_batch(self, signals, lengths, sample_rate, mask):
+        indices = mask.nonzero().flatten()
+        shifts = []
+        for length in lengths.cpu()[indices].tolist():
+            shift_ms = self._rng.uniform(self._min_shift_ms, self._max_shift_ms)
+            shifts.append(0 if abs(shift_ms) / 1000 > length / sample_rate else int(shift_ms * sample_rate // 1000))
+
+        indices = indices.to(signals.device)
+        lengths = lengths.to(signals.device)[indices]
+        shifts = torch.tensor(shifts, dtype=torch.long, device=signals.device)
+        time = torch.arange(signals.shape[1], device=signals.device)[None, :]
+        positions = time + shifts[:, None]
+        # As in `perturb`, the signals keep their length: samples shifted beyond it are dropped.
+        valid = (positions >= 0) & (positions < lengths[:, None]) & (time < lengths[:, None])
+        shifted = signals[indices].gather(1, positions.clamp(0, signals.shape[1] - 1))
+        signals[indices] = shifted * valid
+        return signals
+
 
 class NoisePerturbation(Perturbation):
     """
@@ -387,6 +583,7 @@ class NoisePerturbation(Perturbation):
         shuffle_n (int): Shuffle parameter for shuffling buffered files from the tar files
         orig_sr (int): Original sampling rate of the noise files
         rng: Random number generator
+        bank_cache_dir (str): Directory where the noise decoded for batched perturbation is cached (see `AudioBank`)
     """
 
     def __init__(
@@ -399,7 +596,11 @@ class NoisePerturbation(Perturbation):
         audio_tar_filepaths=None,
         shuffle_n=100,
         orig_sr=16000,
+        bank_cache_dir=None,
     ):
+        self._manifest_path = manifest_path
+        self._bank_cache_dir = bank_cache_dir
+        self._banks = {}
         self._manifest = collections.ASRAudioText(manifest_path, parser=parsers.make_parser([]), index_by_file_id=True)
         self._audiodataset = None
         self._tarred_audio = False
@@ -457,6 +658,39 @@ class NoisePerturbation(Perturbation):
         else:
             data._samples += noise._samples
 
+    def perturb_batch(self, signals, lengths, sample_rate, mask):
+        """Adds noise cropped from a preloaded `AudioBank` to the signals. As in `perturb_with_input_noise`, noise
+        longer than a signal is cropped at a random position, and shorter noise is added at a random position."""
+        bank = _get_bank(self, sample_rate)
+        bank_lengths = bank.lengths
+        indices = mask.nonzero().flatten().numpy()
+        lengths = lengths.cpu().numpy()
+        noise_ids, snrs, noise_starts, positions = [], [], [], []
+        for length in lengths[indices].tolist():
+            noise_id = self._rng.randrange(len(bank))
+            noise_length = int(bank_lengths[noise_id])
+            snrs.append(self._rng.uniform(self._min_snr_db, self._max_snr_db))
+            noise_starts.append(int(self._rng.uniform(0, noise_length - length)) if noise_length > length else 0)
+            positions.append(self._rng.randint(0, length - noise_length) if noise_length < length else 0)
+            noise_ids.append(noise_id)
+
+        # Gathers the noise samples added at each position of the signals from the concatenated bank.
+        num_samples = signals.shape[1]
+        noise_ids, positions = np.array(noise_ids, dtype=np.int64), np.array(positions, dtype=np.int64)
+        relative = np.arange(num_samples)[None, :] - positions[:, None]
+        valid = (relative >= 0) & (relative < np.minimum(bank_lengths[noise_ids], lengths[indices])[:, None])
+        bank_positions = bank.offsets[noise_ids][:, None] + np.array(noise_starts)[:, None] + relative
+        noise = np.where(valid, bank.samples[np.clip(bank_positions, 0, len(bank.samples) - 1)], 0.0)
+        noise = torch.from_numpy(noise.astype(np.float32)).to(signals.device, signals.dtype)
+
+        indices = torch.from_numpy(indices).to(signals.device)
+        noise_lengths = torch.from_numpy(valid.sum(axis=1)).to(signals.device)
+        snrs = torch.tensor(snrs, dtype=signals.dtype, device=signals.device)
+        data_rms = _rms_db(signals[indices], torch.from_numpy(lengths).to(signals.device)[indices])
+        noise_gain_db = torch.clamp(data_rms - _rms_db(noise, noise_lengths) - snrs, max=self._max_gain_db)
+        signals[indices] += noise * (10.0 ** (noise_gain_db / 20.0))[:, None]
+        return signals
+
     def perturb_with_foreground_noise(
         self, data, noise, data_rms=None, max_noise_dur=2, max_additions=1,
     ):
@@ -503,6 +737,15 @@ class WhiteNoisePerturbation(Perturbation):
         noise_signal = self._rng.randn(data._samples.shape[0]) * (10.0 ** (noise_level_db / 20.0))
         data._samples += noise_signal
 
+    def perturb_batch(self, signals, lengths, sample_rate, mask):
+        indices = mask.nonzero().flatten().to(signals.device)
+        noise_level_db = self._rng.randint(self.min_level, self.max_level, size=len(indices), dtype='int32')
+        noise_level = torch.from_numpy(10.0 ** (noise_level_db / 20.0)).to(signals.device, signals.dtype)
+        noise = torch.randn(len(indices), signals.shape[1], dtype=signals.dtype, device=signals.device)
+        valid = _valid_samples_mask(lengths.to(signals.device)[indices], signals.shape[1])
+        signals[indices] += noise * noise_level[:, None] * valid
+        return signals
+
 
 class RirAndNoisePerturbation(Perturbation):
     """
@@ -755,6 +998,42 @@ class AudioAugmentor(object):
                 p.perturb(segment)
         return
 
+    def perturb_batch(self, signals: torch.Tensor, lengths: torch.Tensor, sample_rate: int):
+        """
+        Perturbs a padded batch of signals, each perturbation being applied to each signal with its probability.
+
+        Perturbations implementing `Perturbation.perturb_batch` (gain, shift, white noise, noise and impulse) process
+        all the selected signals at once on the device of ``signals``, with the noise and RIR audio preloaded in an
+        `AudioBank`. Other perturbations are applied to each selected signal through an `AudioSegment` on the CPU.
+
+        Args:
+            signals: Padded signals [B x T], on any device.
+            lengths: Lengths of the signals [B].
+            sample_rate: Sample rate of the signals.
+
+        Returns:
+            The perturbed signals and their lengths.
+        """
+        for (prob, p) in self._pipeline:
+            mask = torch.tensor([self._rng.random() < prob for _ in range(len(signals))], dtype=torch.bool)
+            if not mask.any():
+                continue
+            if type(p).perturb_batch is not Perturbation.perturb_batch:
+                signals = p.perturb_batch(signals, lengths, sample_rate, mask)
+            else:
+                signals, lengths = self._perturb_each(p, signals, lengths, sample_rate, mask)
+        return signals, lengths
+
+    @staticmethod
+    def _perturb_each(perturbation, signals, lengths, sample_rate, mask):
+        samples = [signal[:length] for signal, length in zip(signals, lengths.tolist())]
+        for idx in mask.nonzero().flatten().tolist():
+            segment = AudioSegment(samples[idx].cpu().numpy(), sample_rate)
+            perturbation.perturb(segment)
+            samples[idx] = torch.from_numpy(segment.samples).to(signals.device, signals.dtype)
+        lengths = torch.tensor([len(sample) for sample in samples], dtype=lengths.dtype, device=lengths.device)
+        return torch.nn.utils.rnn.pad_sequence(samples, batch_first=True), lengths
+
     def max_augmentation_length(self, length):
         newlen = length
         for (prob, p) in self._pipeline:
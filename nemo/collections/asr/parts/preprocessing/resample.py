@@ -0,0 +1,102 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import math
+from functools import lru_cache
+from typing import Tuple
+
+import librosa
+import numpy as np
+from scipy.signal import firwin, upfirdn
+
+__all__ = ['Resampler', 'get_resampler']
+
+
+@lru_cache(maxsize=64)
+def _polyphase_filter(up: int, down: int, kaiser_beta: float, dtype: str) -> Tuple[np.ndarray, int]:
+    """Designs the anti-aliasing filter of a polyphase resampler, as done by `scipy.signal.resample_poly`.
+
+    Returns:
+        The filter, zero-padded in front so that output samples are centered, and the number of output samples to
+        drop at the start of the filtered signal.
+    """
+    max_rate = max(up, down)
+    half_len = 10 * max_rate
+    h = firwin(2 * half_len + 1, 1.0 / max_rate, window=('kaiser', kaiser_beta)).astype(dtype) * up
+    n_pre_pad = down - half_len % down
+    h = np.concatenate((np.zeros(n_pre_pad, dtype=dtype), h))
+    h.setflags(write=False)
+    return h, (half_len + n_pre_pad) // down
+
+
+class Resampler:
+    """
+    Changes the sample rate of audio signals.
+
+    Two methods are supported:
+        - 'librosa': `librosa.core.resample` with its default settings, resampling each signal independently.
+        - 'polyphase': polyphase filtering, as `scipy.signal.resample_poly`. The sample rates ratio is reduced to
+            up / down integer factors, so integer ratios such as 8 kHz -> 16 kHz use a single upsampling or
+            downsampling stage. The filter of each (up, down) pair is designed once and cached.
+
+    Args:
+        method: Resampling method, either 'librosa' or 'polyphase'.
+        kaiser_beta: Shape parameter of the Kaiser window of the 'polyphase' filter.
+    """
+
+    methods = ('librosa', 'polyphase')
+
+    def __init__(self, method: str = 'librosa', kaiser_beta: float = 5.0):
+        if method not in self.methods:
+            raise ValueError(f"Supported resampling methods are {self.methods}, got {method}")
+        self.method = method
+        self.kaiser_beta = kaiser_beta
+
+    def _factors(self, orig_sr: int, target_sr: int) -> Tuple[int, int]:
+        if int(orig_sr) != orig_sr or int(target_sr) != target_sr:
+            raise ValueError(f"Sample rates should be integers, got {orig_sr} and {target_sr}")
+        gcd = math.gcd(int(orig_sr), int(target_sr))
+        return int(target_sr) // gcd, int(orig_sr) // gcd
+
+    def resample(self, samples: np.ndarray, orig_sr: int, target_sr: int) -> np.ndarray:
+        """Resamples the signal ``samples``, with time on the last axis, from ``orig_sr`` to ``target_sr``."""
+        if orig_sr == target_sr:
+            return samples
+        if self.method == 'librosa':
+            return librosa.core.resample(samples, orig_sr=orig_sr, target_sr=target_sr)
+        return self._resample_polyphase(samples, *self._factors(orig_sr, target_sr))
+
+    @staticmethod
+    def _output_length(length: int, up: int, down: int) -> int:
+        return -(-length * up // down)
+
+    def _resample_polyphase(self, samples: np.ndarray, up: int, down: int) -> np.ndarray:
+        dtype = samples.dtype if samples.dtype in (np.float32, np.float64) else np.float64
+        h, n_pre_remove = _polyphase_filter(up, down, self.kaiser_beta, np.dtype(dtype).name)
+        n_in = samples.shape[-1]
+        n_out = self._output_length(n_in, up, down)
+        # Append zeros to the filter in the rare cases where it is too short to produce all the output samples.
+        n_post_pad = 0
+        while ((n_in - 1) * up + len(h) + n_post_pad - 1) // down + 1 < n_out + n_pre_remove:
+            n_post_pad += 1
+        if n_post_pad:
+            h = np.concatenate((h, np.zeros(n_post_pad, dtype=h.dtype)))
+        resampled = upfirdn(h, samples.astype(dtype, copy=False), up, down, axis=-1)
+        return resampled[..., n_pre_remove : n_pre_remove + n_out]
+
+
+@lru_cache(maxsize=None)
+def get_resampler(method: str = 'librosa') -> Resampler:
+    """Returns a shared `Resampler` using ``method``."""
+    return Resampler(method=method)
@@ -40,12 +40,12 @@ import librosa
 import numpy as np
 import soundfile as sf
 
+from nemo.collections.asr.parts.preprocessing.audio_reader import get_default_audio_reader
 from nemo.utils import logging
 
 # TODO @blisc: Perhaps refactor instead of import guarding
 HAVE_PYDUB = True
 try:
-    from pydub import AudioSegment as Audio
     from pydub.exceptions import CouldntDecodeError
 except ModuleNotFoundError:
     HAVE_PYDUB = False
@@ -75,13 +75,19 @@ class AudioSegment(object):
         trim_frame_length=2048,
         trim_hop_length=512,
         orig_sr=None,
+        resampler=None,
     ):
         """Create audio segment from samples.
         Samples are convert float32 internally, with int scaled to [-1, 1].
+        If target_sr differs from sample_rate, samples are resampled with resampler, a `Resampler`
+        (defaults to librosa).
         """
         samples = self._convert_samples_to_float32(samples)
         if target_sr is not None and target_sr != sample_rate:
-            samples = librosa.core.resample(samples, orig_sr=sample_rate, target_sr=target_sr)
+            if resampler is None:
+                samples = librosa.core.resample(samples, orig_sr=sample_rate, target_sr=target_sr)
+            else:
+                samples = resampler.resample(samples, orig_sr=sample_rate, target_sr=target_sr)
             sample_rate = target_sr
         if trim:
             samples, _ = librosa.effects.trim(
@@ -150,6 +156,8 @@ class AudioSegment(object):
         trim_frame_length=2048,
         trim_hop_length=512,
         orig_sr=None,
+        audio_reader=None,
+        resampler=None,
     ):
         """
         Load a file supported by librosa and return as an AudioSegment.
@@ -165,20 +173,19 @@ class AudioSegment(object):
         :param trim_frame_length: the number of samples per analysis frame
         :param trim_hop_length: the number of samples between analysis frames
         :param orig_sr: the original sample rate
+        :param audio_reader: `AudioReader` caching file handles and decoded audio, defaults to the reader returned by
+                             `get_default_audio_reader`
+        :param resampler: `Resampler` used if target_sr differs from the sample rate of the file, defaults to librosa
         :return: numpy array of samples
         """
+        if audio_reader is None:
+            audio_reader = get_default_audio_reader()
+
         samples = None
         if not isinstance(audio_file, str) or os.path.splitext(audio_file)[-1] in sf_supported_formats:
             try:
-                with sf.SoundFile(audio_file, 'r') as f:
-                    dtype = 'int32' if int_values else 'float32'
-                    sample_rate = f.samplerate
-                    if offset > 0:
-                        f.seek(int(offset * sample_rate))
-                    if duration > 0:
-                        samples = f.read(int(duration * sample_rate), dtype=dtype)
-                    else:
-                        samples = f.read(dtype=dtype)
+                dtype = 'int32' if int_values else 'float32'
+                samples, sample_rate = audio_reader.read(audio_file, offset=offset, duration=duration, dtype=dtype)
                 samples = samples.transpose()
             except RuntimeError as e:
                 logging.error(
@@ -188,16 +195,7 @@ class AudioSegment(object):
 
         if HAVE_PYDUB and samples is None:
             try:
-                samples = Audio.from_file(audio_file)
-                sample_rate = samples.frame_rate
-                if offset > 0:
-                    # pydub does things in milliseconds
-                    seconds = offset * 1000
-                    samples = samples[int(seconds) :]
-                if duration > 0:
-                    seconds = duration * 1000
-                    samples = samples[: int(seconds)]
-                samples = np.array(samples.get_array_of_samples())
+                samples, sample_rate = audio_reader.read_pydub(audio_file, offset=offset, duration=duration)
             except CouldntDecodeError as err:
                 logging.error(f"Loading {audio_file} via pydub raised CouldntDecodeError: `{err}`.")
 
@@ -215,31 +213,40 @@ class AudioSegment(object):
             trim_frame_length=trim_frame_length,
             trim_hop_length=trim_hop_length,
             orig_sr=orig_sr,
+            resampler=resampler,
         )
 
     @classmethod
-    def segment_from_file(cls, audio_file, target_sr=None, n_segments=0, trim=False, orig_sr=None):
+    def segment_from_file(
+        cls, audio_file, target_sr=None, n_segments=0, trim=False, orig_sr=None, audio_reader=None, resampler=None,
+    ):
         """Grabs n_segments number of samples from audio_file randomly from the
         file as opposed to at a specified offset.
 
         Note that audio_file can be either the file path, or a file-like object.
         """
+        if audio_reader is None:
+            audio_reader = get_default_audio_reader()
+
         try:
-            with sf.SoundFile(audio_file, 'r') as f:
-                sample_rate = f.samplerate
-                if 0 < n_segments < len(f):
-                    max_audio_start = len(f) - n_segments
-                    audio_start = random.randint(0, max_audio_start)
-                    f.seek(audio_start)
-                    samples = f.read(n_segments, dtype='float32')
-                else:
-                    samples = f.read(dtype='float32')
+            if isinstance(audio_file, str):
+                _, num_frames = audio_reader.info(audio_file)
+            else:
+                with sf.SoundFile(audio_file, 'r') as f:
+                    num_frames = len(f)
+                audio_file.seek(0)
+            if 0 < n_segments < num_frames:
+                max_audio_start = num_frames - n_segments
+                audio_start = random.randint(0, max_audio_start)
+                samples, sample_rate = audio_reader.read_frames(audio_file, audio_start, n_segments, dtype='float32')
+            else:
+                samples, sample_rate = audio_reader.read_frames(audio_file, dtype='float32')
             samples = samples.transpose()
         except RuntimeError as e:
             logging.error(f"Loading {audio_file} via SoundFile raised RuntimeError: `{e}`.")
 
         samples = samples.transpose()
-        return cls(samples, sample_rate, target_sr=target_sr, trim=trim, orig_sr=orig_sr)
+        return cls(samples, sample_rate, target_sr=target_sr, trim=trim, orig_sr=orig_sr, resampler=resampler)
 
     @property
     def samples(self):
@@ -0,0 +1,447 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import multiprocessing
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+import torch
+
+from nemo.collections.asr.parts.utils import rnnt_utils
+from nemo.collections.asr.parts.utils.ngram_lm_utils import NGramLM
+from nemo.core.classes import Typing, typecheck
+from nemo.core.neural_types import HypothesisType, LengthsType, LogprobsType, NeuralType
+
+# Offset in the unicode table of the characters encoding the tokens of subword models in their n-gram LMs, as in
+# scripts/asr_language_modeling/ngram_lm/train_kenlm.py.
+DEFAULT_TOKEN_OFFSET = 100
+
+# (score, tokens, frame of each token) of a beam.
+BeamResult = Tuple[float, List[int], List[int]]
+
+
+class CTCPrefixBeamSearch:
+    """
+    CTC prefix beam search, with optional shallow fusion of an n-gram language model.
+
+    Each step expands all the beams with all the candidate tokens at once, as NumPy arrays of shape
+    [beams x candidate tokens]. The candidate tokens of a frame are its ``cutoff_top_n`` most probable tokens, further
+    restricted to the smallest set of probability ``cutoff_prob`` if it is lower than 1. The extensions of beams which
+    are also beams of the previous frame are merged into them, then the ``beam_size`` best beams are kept.
+
+    The frame of each token of a beam, which positions it in the frame-level labels of its hypothesis, is the frame
+    emitting it in the most probable path of the beam when it was last merged.
+
+    With a LM, the score of a beam is ``log P_ctc + alpha * log P_lm + beta * num_words``. If the vocabulary contains
+    ``word_separator``, the words of the LM are the strings between separators, scored once complete. Otherwise each
+    token is a word of the LM, e.g. the characters ``chr(token_offset + token_id)`` of LMs of subword models.
+
+    Args:
+        blank_id: Index of the blank token.
+        beam_size: Number of beams kept at each frame.
+        ngram_lm: Optional `NGramLM`, or path to an ARPA file.
+        alpha: Weight of the LM scores.
+        beta: Bonus of each word scored by the LM.
+        cutoff_prob: Cumulative probability of the candidate tokens of each frame, 1.0 for no cutoff.
+        cutoff_top_n: Maximum number of candidate tokens of each frame.
+        vocabulary: Token strings, required to map tokens to the words of the LM unless the tokens are encoded
+            with ``token_offset``.
+        word_separator: Token separating the words, for word-level LMs.
+        token_offset: If ``vocabulary`` is None, the token ``i`` is the word ``chr(token_offset + i)`` of the LM.
+    """
+
+    def __init__(
+        self,
+        blank_id: int,
+        beam_size: int,
+        ngram_lm: Optional[NGramLM] = None,
+        alpha: float = 1.0,
+        beta: float = 0.0,
+        cutoff_prob: float = 1.0,
+        cutoff_top_n: int = 40,
+        vocabulary: Optional[List[str]] = None,
+        word_separator: str = ' ',
+        token_offset: int = DEFAULT_TOKEN_OFFSET,
+    ):
+        if beam_size < 1:
+            raise ValueError("Beam search size cannot be less than 1!")
+        if isinstance(ngram_lm, str):
+            ngram_lm = NGramLM.from_arpa(ngram_lm)
+
+        self.blank_id = blank_id
+        self.beam_size = beam_size
+        self.ngram_lm = ngram_lm
+        self.alpha = alpha
+        self.beta = beta
+        self.cutoff_prob = cutoff_prob
+        self.cutoff_top_n = cutoff_top_n
+        self.vocabulary = vocabulary
+        self.word_separator = word_separator
+        self.token_offset = token_offset
+
+        self.separator_id = None
+        if vocabulary is not None and word_separator in vocabulary:
+            self.separator_id = vocabulary.index(word_separator)
+
+        # Words of the LM of the tokens, when each token is a word.
+        self._token_lm_ids = None
+        if ngram_lm is not None and self.separator_id is None:
+            num_tokens = len(vocabulary) if vocabulary is not None else blank_id
+            tokens = vocabulary if vocabulary is not None else [chr(token_offset + i) for i in range(num_tokens)]
+            self._token_lm_ids = np.array([ngram_lm.word_to_id(token) for token in tokens], dtype=np.int64)
+
+    def _candidate_tokens(self, log_probs: np.ndarray) -> np.ndarray:
+        """Returns the non-blank candidate tokens of a frame."""
+        scores = log_probs.copy()
+        scores[self.blank_id] = -np.inf
+        num_candidates = min(self.cutoff_top_n, len(scores) - 1)
+        if num_candidates < len(scores) - 1:
+            candidates = np.argpartition(-scores, num_candidates - 1)[:num_candidates]
+        else:
+            candidates = np.flatnonzero(np.isfinite(scores))
+
+        if self.cutoff_prob < 1.0:
+            candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+            cumulative_probs = np.cumsum(np.exp(scores[candidates]))
+            num_candidates = int(np.searchsorted(cumulative_probs, self.cutoff_prob)) + 1
+            candidates = candidates[:num_candidates]
+        return candidates[np.isfinite(scores[candidates])]
+
+    def _word_score(self, lm_state: Tuple[int, ...], word: str) -> Tuple[float, Tuple[int, ...]]:
+        """Returns the fused LM score of ``word`` and the next LM state."""
+        word_id = self.ngram_lm.word_to_id(word)
+        score = self.alpha * self.ngram_lm.score(lm_state, word_id) + self.beta
+        return score, self.ngram_lm.next_state(lm_state, word_id)
+
+    def _extension_lm_scores(
+        self, candidates: np.ndarray, lm_states: List[Tuple[int, ...]], words: List[str]
+    ) -> np.ndarray:
+        """Returns the fused LM scores [beams x candidates] of extending the beams with the candidate tokens."""
+        scores = np.zeros([len(lm_states), len(candidates)], dtype=np.float32)
+        if self.ngram_lm is None:
+            return scores
+
+        if self._token_lm_ids is not None:
+            candidate_lm_ids = self._token_lm_ids[candidates]
+            for beam_idx, lm_state in enumerate(lm_states):
+                scores[beam_idx] = self.ngram_lm.score_all(lm_state)[candidate_lm_ids]
+            return self.alpha * scores + self.beta
+
+        # Word-level LM, only the word separator completes a word.
+        separator_col = np.flatnonzero(candidates == self.separator_id)
+        if len(separator_col) > 0:
+            for beam_idx, (lm_state, word) in enumerate(zip(lm_states, words)):
+                if word:
+                    scores[beam_idx, separator_col[0]] = self._word_score(lm_state, word)[0]
+        return scores
+
+    def search(self, log_probs: np.ndarray) -> List[BeamResult]:
+        """
+        Decodes the log probabilities [T x V] of an utterance.
+
+        Returns:
+            The beams sorted by decreasing score, as tuples (score, tokens, frame of each token).
+        """
+        log_probs = np.asarray(log_probs, dtype=np.float32)
+        lm_initial_state = self.ngram_lm.initial_state() if self.ngram_lm is not None else ()
+
+        # Beams of the current frame, with their probabilities of ending with blank / non-blank, and the frames of the
+        # tokens of their most probable paths ending with blank / non-blank. Tracking both keeps a blank frame between
+        # repeated tokens, so that the frame-level labels of a beam collapse to its tokens.
+        prefixes, blank_frames, non_blank_frames = [()], [()], [()]
+        lm_states, words = [lm_initial_state], ['']
+        p_blank, p_non_blank = np.zeros(1, dtype=np.float32), np.full(1, -np.inf, dtype=np.float32)
+        lm_scores = np.zeros(1, dtype=np.float32)
+
+        for t, frame_log_probs in enumerate(log_probs):
+            candidates = self._candidate_tokens(frame_log_probs)
+            num_beams, num_candidates = len(prefixes), len(candidates)
+            last_tokens = np.array([prefix[-1] if prefix else -1 for prefix in prefixes], dtype=np.int64)
+            p_total = np.logaddexp(p_blank, p_non_blank)
+            best_frames = [
+                blank_frames[beam_idx] if p_blank[beam_idx] >= p_non_blank[beam_idx] else non_blank_frames[beam_idx]
+                for beam_idx in range(num_beams)
+            ]
+
+            def extension_frames(beam_idx, col):
+                source = blank_frames if candidates[col] == last_tokens[beam_idx] else best_frames
+                return source[beam_idx] + (t,)
+
+            # Beams of the previous frame followed by blank or by their last token repeated.
+            next_p_blank = p_total + frame_log_probs[self.blank_id]
+            next_p_non_blank = np.where(last_tokens >= 0, p_non_blank + frame_log_probs[last_tokens], -np.inf)
+
+            # Beams of the previous frame extended with a candidate token, repeating the last token requires a blank.
+            extension_p = np.where(candidates[None, :] == last_tokens[:, None], p_blank[:, None], p_total[:, None])
+            extension_p = extension_p + frame_log_probs[candidates][None, :]
+
+            # Extensions which are beams of the previous frame are merged into them.
+            next_non_blank_frames = list(non_blank_frames)
+            if num_beams > 1:
+                beam_index = {prefix: beam_idx for beam_idx, prefix in enumerate(prefixes)}
+                candidate_index = {token: col for col, token in enumerate(candidates.tolist())}
+                for beam_idx, prefix in enumerate(prefixes):
+                    if not prefix:
+                        continue
+                    parent_idx = beam_index.get(prefix[:-1])
+                    col = candidate_index.get(prefix[-1])
+                    if parent_idx is not None and col is not None:
+                        merged_p = extension_p[parent_idx, col]
+                        if merged_p > next_p_non_blank[beam_idx]:
+                            next_non_blank_frames[beam_idx] = extension_frames(parent_idx, col)
+                        next_p_non_blank[beam_idx] = np.logaddexp(next_p_non_blank[beam_idx], merged_p)
+                        extension_p[parent_idx, col] = -np.inf
+
+            extension_lm_scores = self._extension_lm_scores(candidates, lm_states, words)
+            ranking_scores = np.concatenate(
+                [
+                    np.logaddexp(next_p_blank, next_p_non_blank) + lm_scores,
+                    (extension_p + lm_scores[:, None] + extension_lm_scores).reshape(-1),
+                ]
+            )
+            num_kept = max(min(self.beam_size, int(np.isfinite(ranking_scores).sum())), 1)
+            if num_kept < len(ranking_scores):
+                kept = np.argpartition(-ranking_scores, num_kept - 1)[:num_kept]
+            else:
+                kept = np.arange(len(ranking_scores))
+
+            new_prefixes, new_blank_frames, new_non_blank_frames, new_lm_states, new_words = [], [], [], [], []
+            new_p_blank = np.full(len(kept), -np.inf, dtype=np.float32)
+            new_p_non_blank = np.full(len(kept), -np.inf, dtype=np.float32)
+            new_lm_scores = np.zeros(len(kept), dtype=np.float32)
+            for new_idx, idx in enumerate(kept.tolist()):
+                if idx < num_beams:
+                    new_prefixes.append(prefixes[idx])
+                    new_blank_frames.append(best_frames[idx])
+                    new_non_blank_frames.append(next_non_blank_frames[idx])
+                    new_lm_states.append(lm_states[idx])
+                    new_words.append(words[idx])
+                    new_p_blank[new_idx] = next_p_blank[idx]
+                    new_p_non_blank[new_idx] = next_p_non_blank[idx]
+                    new_lm_scores[new_idx] = lm_scores[idx]
+                    continue
+
+                beam_idx, col = divmod(idx - num_beams, num_candidates)
+                token = int(candidates[col])
+                lm_state, word = lm_states[beam_idx], words[beam_idx]
+                if self.ngram_lm is not None:
+                    if self._token_lm_ids is not None:
+                        lm_state = self.ngram_lm.next_state(lm_state, int(self._token_lm_ids[token]))
+                    elif token == self.separator_id:
+                        if word:
+                            lm_state = self._word_score(lm_state, word)[1]
+                        word = ''
+                    else:
+                        word = word + self.vocabulary[token]
+
+                new_prefixes.append(prefixes[beam_idx] + (token,))
+                new_blank_frames.append(())
+                new_non_blank_frames.append(extension_frames(beam_idx, col))
+                new_lm_states.append(lm_state)
+                new_words.append(word)
+                new_p_non_blank[new_idx] = extension_p[beam_idx, col]
+                new_lm_scores[new_idx] = lm_scores[beam_idx] + extension_lm_scores[beam_idx, col]
+
+            prefixes, lm_states, words = new_prefixes, new_lm_states, new_words
+            blank_frames, non_blank_frames = new_blank_frames, new_non_blank_frames
+            p_blank, p_non_blank, lm_scores = new_p_blank, new_p_non_blank, new_lm_scores
+
+        # The last words of the beams are complete.
+        if self.ngram_lm is not None and self._token_lm_ids is None:
+            for beam_idx, (lm_state, word) in enumerate(zip(lm_states, words)):
+                if word:
+                    lm_scores[beam_idx] += self._word_score(lm_state, word)[0]
+
+        scores = np.logaddexp(p_blank, p_non_blank) + lm_scores
+        order = np.argsort(-scores, kind='stable')
+        frames = [
+            blank_frames[idx] if p_blank[idx] >= p_non_blank[idx] else non_blank_frames[idx]
+            for idx in range(len(prefixes))
+        ]
+        return [(float(scores[idx]), list(prefixes[idx]), list(frames[idx])) for idx in order.tolist()]
+
+    def search_batch(self, log_probs: List[np.ndarray], num_workers: int = 1) -> List[List[BeamResult]]:
+        """Decodes the log probabilities [T x V] of several utterances, with a pool of ``num_workers`` processes."""
+        num_workers = min(num_workers, len(log_probs))
+        if num_workers <= 1:
+            return [self.search(log_probs_i) for log_probs_i in log_probs]
+
+        with multiprocessing.Pool(num_workers, initializer=_init_search_worker, initargs=(self,)) as pool:
+            return pool.map(_search_worker, log_probs)
+
+
+_worker_search: Optional[CTCPrefixBeamSearch] = None
+
+
+def _init_search_worker(search: CTCPrefixBeamSearch):
+    global _worker_search
+    _worker_search = search
+
+
+def _search_worker(log_probs: np.ndarray) -> List[BeamResult]:
+    return _worker_search.search(log_probs)
+
+
+class BeamCTCInfer(Typing):
+    """A CTC prefix beam search decoder, with optional n-gram LM fusion.
+
+    Decodes in NumPy on CPU, and needs no external package. See `CTCPrefixBeamSearch` for the details of the search.
+
+    Args:
+        blank_id: int index of the blank token. Can be 0 or len(vocabulary).
+        beam_size: int size of the beam.
+        return_best_hypothesis: bool flag indicating whether to return a single hypothesis per sample, or all the
+            hypotheses of its beam (as a NBestHypotheses).
+        ngram_lm_model: Optional path to an n-gram LM in ARPA format.
+        beam_alpha: Weight of the LM scores.
+        beam_beta: Bonus of each word scored by the LM.
+        cutoff_prob: Cumulative probability of the candidate tokens of each frame, 1.0 for no cutoff.
+        cutoff_top_n: Maximum number of candidate tokens of each frame.
+        num_workers: Number of processes decoding the samples of a batch in parallel.
+        token_offset: Offset of the characters encoding the tokens in the LM, if no vocabulary is given.
+        vocabulary: Optional list of the token strings, the LM being word-level if it contains ``word_separator``.
+        word_separator: Token separating the words.
+        preserve_alignments: Bool flag which preserves the history of logprobs generated during
+            decoding (sample / batched). When set to true, the Hypothesis will contain
+            the non-null value for `logprobs` in it. Here, `logprobs` is a torch.Tensors.
+        compute_timestamps: A bool flag, which determines whether to compute the character/subword, or
+                word based timestamp mapping the output log-probabilities to discrite intervals of timestamps.
+                The timestamps will be available in the returned Hypothesis.timestep as a dictionary.
+    """
+
+    @property
+    def input_types(self):
+        """Returns definitions of module input ports.
+        """
+        return {
+            "decoder_output": NeuralType(('B', 'T', 'D'), LogprobsType()),
+            "decoder_lengths": NeuralType(tuple('B'), LengthsType()),
+        }
+
+    @property
+    def output_types(self):
+        """Returns definitions of module output ports.
+        """
+        return {"predictions": [NeuralType(elements_type=HypothesisType())]}
+
+    def __init__(
+        self,
+        blank_id: int,
+        beam_size: int,
+        return_best_hypothesis: bool = True,
+        ngram_lm_model: Optional[str] = None,
+        beam_alpha: float = 1.0,
+        beam_beta: float = 0.0,
+        cutoff_prob: float = 1.0,
+        cutoff_top_n: int = 40,
+        num_workers: int = 1,
+        token_offset: int = DEFAULT_TOKEN_OFFSET,
+        vocabulary: Optional[List[str]] = None,
+        word_separator: str = ' ',
+        preserve_alignments: bool = False,
+        compute_timestamps: bool = False,
+    ):
+        super().__init__()
+
+        self.blank_id = blank_id
+        self.return_best_hypothesis = return_best_hypothesis
+        self.num_workers = num_workers
+        self.preserve_alignments = preserve_alignments
+        self.compute_timestamps = compute_timestamps
+        self.search = CTCPrefixBeamSearch(
+            blank_id=blank_id,
+            beam_size=beam_size,
+            ngram_lm=ngram_lm_model,
+            alpha=beam_alpha,
+            beta=beam_beta,
+            cutoff_prob=cutoff_prob,
+            cutoff_top_n=cutoff_top_n,
+            vocabulary=vocabulary,
+            word_separator=word_separator,
+            token_offset=token_offset,
+        )
+
+    @typecheck()
+    def forward(
+        self, decoder_output: torch.Tensor, decoder_lengths: torch.Tensor,
+    ):
+        """Returns a list of hypotheses given an input batch of log probabilities.
+
+        Args:
+            decoder_output: A tensor of size (batch, timesteps, features) of log probabilities.
+            decoder_lengths: list of int representing the length of each sequence
+                output sequence.
+
+        Returns:
+            packed list containing batch number of sentences (Hypotheses), or of NBestHypotheses if
+            ``return_best_hypothesis`` is False.
+        """
+        if decoder_output.ndim != 3:
+            raise ValueError(
+                f"`decoder_output` must be a tensor of shape [B, T, V] (log probs, float). "
+                f"Provided shape = {decoder_output.shape}"
+            )
+
+        with torch.inference_mode():
+            log_probs = decoder_output.detach().float().cpu()
+            if decoder_lengths is not None:
+                lengths = decoder_lengths.cpu().tolist()
+            else:
+                lengths = [log_probs.shape[1]] * log_probs.shape[0]
+            log_probs_np = log_probs.numpy()
+            beams = self.search.search_batch(
+                [log_probs_np[idx, :length] for idx, length in enumerate(lengths)], num_workers=self.num_workers
+            )
+
+            hypotheses = []
+            for idx, (beams_i, length) in enumerate(zip(beams, lengths)):
+                hyps = [self._beam_to_hypothesis(beam, log_probs[idx, :length], length) for beam in beams_i]
+                if self.return_best_hypothesis:
+                    hypotheses.append(hyps[0])
+                else:
+                    hypotheses.append(rnnt_utils.NBestHypotheses(hyps))
+
+        return (hypotheses,)
+
+    def _beam_to_hypothesis(self, beam: BeamResult, log_probs: torch.Tensor, length: int) -> rnnt_utils.Hypothesis:
+        score, tokens, frames = beam
+        # Frame-level labels, blank but at the frames emitting the tokens, so that CTC collapse recovers the tokens.
+        labels = torch.full([length], self.blank_id, dtype=torch.long)
+        labels[frames] = torch.tensor(tokens, dtype=torch.long)
+
+        hypothesis = rnnt_utils.Hypothesis(score=score, y_sequence=labels, dec_state=None, timestep=[], length=length)
+        if self.preserve_alignments:
+            hypothesis.alignments = (log_probs.clone(), labels.clone())
+        if self.compute_timestamps:
+            hypothesis.timestep = frames
+        return hypothesis
+
+    def __call__(self, *args, **kwargs):
+        return self.forward(*args, **kwargs)
+
+
+@dataclass
+class BeamCTCInferConfig:
+    beam_size: int
+    return_best_hypothesis: bool = True
+    ngram_lm_model: Optional[str] = None
+    beam_alpha: float = 1.0
+    beam_beta: float = 0.0
+    cutoff_prob: float = 1.0
+    cutoff_top_n: int = 40
+    num_workers: int = 1
+    token_offset: int = DEFAULT_TOKEN_OFFSET
+    preserve_alignments: bool = False
+    compute_timestamps: bool = False
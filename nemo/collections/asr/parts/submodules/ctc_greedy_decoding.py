@@ -12,9 +12,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from collections.abc import Sequence
 from dataclasses import dataclass
-from typing import List
+from typing import List, Optional
 
+import numpy as np
 import torch
 
 from nemo.collections.asr.parts.utils import rnnt_utils
@@ -52,6 +54,89 @@ def _states_to_device(dec_state, device='cpu'):
     return dec_state
 
 
+class BatchedGreedyCTCHypotheses(Sequence):
+    """
+    Greedy CTC hypotheses of a batch, stored as flat tensors of the CTC collapsed tokens of all the samples.
+
+    The `Hypothesis` of a sample, with its frame-level labels as ``y_sequence`` as returned by the per-sample greedy
+    decoding, is only created when it is accessed, and then cached so that changes to it persist. Callers which only
+    need the tokens of the samples (e.g. to decode texts) use `token_ids` without creating any Hypothesis.
+
+    Args:
+        tokens: CTC collapsed tokens of all the samples, concatenated.
+        token_frames: Frame of each token.
+        token_offsets: Offsets of the tokens of each sample in ``tokens``, of length batch + 1.
+        scores: Score of each sample.
+        lengths: Number of frames of each sample, or None if the samples were not padded.
+        labels: Frame-level labels [B, T] of the batch, on any device, moved to CPU when a Hypothesis is created.
+        blank_id: Index of the blank token.
+        compute_timestamps: Whether the hypotheses hold the frames of their non-blank labels as ``timestep``.
+    """
+
+    def __init__(
+        self,
+        tokens: torch.Tensor,
+        token_frames: torch.Tensor,
+        token_offsets: np.ndarray,
+        scores: torch.Tensor,
+        lengths: Optional[torch.Tensor],
+        labels: torch.Tensor,
+        blank_id: int,
+        compute_timestamps: bool = False,
+    ):
+        self.tokens = tokens
+        self.token_frames = token_frames
+        self.token_offsets = token_offsets
+        self.scores = scores
+        self.lengths = lengths
+        self.labels = labels
+        self.blank_id = blank_id
+        self.compute_timestamps = compute_timestamps
+        # Decoded text of each sample, set on the created hypotheses if available.
+        self.texts: Optional[List[str]] = None
+        self._hypotheses = {}
+
+    def __len__(self):
+        return len(self.scores)
+
+    def token_ids(self, idx: int) -> List[int]:
+        """Returns the CTC collapsed tokens of the sample ``idx``."""
+        return self.tokens[self.token_offsets[idx] : self.token_offsets[idx + 1]].tolist()
+
+    def token_repetitions(self, idx: int) -> List[int]:
+        """Returns the number of frames between each token of the sample ``idx`` and the previous one."""
+        frames = self.token_frames[self.token_offsets[idx] : self.token_offsets[idx + 1]].numpy()
+        return np.diff(frames, prepend=0).tolist()
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(f"Hypothesis index {idx} out of range for a batch of {len(self)}")
+
+        hypothesis = self._hypotheses.get(idx)
+        if hypothesis is None:
+            if self.labels.device.type != 'cpu':
+                self.labels = self.labels.cpu()
+            labels = self.labels[idx]
+            if self.lengths is not None:
+                labels = labels[: self.lengths[idx]]
+
+            hypothesis = rnnt_utils.Hypothesis(
+                score=self.scores[idx], y_sequence=labels.long(), dec_state=None, timestep=[], last_token=None
+            )
+            if self.lengths is not None:
+                hypothesis.length = self.lengths[idx]
+            if self.compute_timestamps:
+                hypothesis.timestep = torch.nonzero(labels != self.blank_id, as_tuple=False)[:, 0].numpy().tolist()
+            if self.texts is not None:
+                hypothesis.text = self.texts[idx]
+            self._hypotheses[idx] = hypothesis
+        return hypothesis
+
+
 class GreedyCTCInfer(Typing):
     """A greedy CTC decoder.
 
@@ -65,6 +150,9 @@ class GreedyCTCInfer(Typing):
         compute_timestamps: A bool flag, which determines whether to compute the character/subword, or
                 word based timestamp mapping the output log-probabilities to discrite intervals of timestamps.
                 The timestamps will be available in the returned Hypothesis.timestep as a dictionary.
+        batched_inference: Bool flag to decode the whole batch at once with tensor operations on the device of the
+            inputs, returning a `BatchedGreedyCTCHypotheses`. Only the collapsed tokens are moved to CPU.
+            Alignments are preserved by the per-sample decoding only.
 
     """
 
@@ -84,16 +172,24 @@ class GreedyCTCInfer(Typing):
     def output_types(self):
         """Returns definitions of module output ports.
         """
+        if self._use_batched_decoding:
+            # Single container, whose hypotheses are only created when accessed
+            return {"predictions": NeuralType(elements_type=HypothesisType())}
         return {"predictions": [NeuralType(elements_type=HypothesisType())]}
 
     def __init__(
-        self, blank_id: int, preserve_alignments: bool = False, compute_timestamps: bool = False,
+        self,
+        blank_id: int,
+        preserve_alignments: bool = False,
+        compute_timestamps: bool = False,
+        batched_inference: bool = True,
     ):
         super().__init__()
 
         self.blank_id = blank_id
         self.preserve_alignments = preserve_alignments
         self.compute_timestamps = compute_timestamps
+        self.batched_inference = batched_inference
 
     @typecheck()
     def forward(
@@ -110,6 +206,14 @@ class GreedyCTCInfer(Typing):
         Returns:
             packed list containing batch number of sentences (Hypotheses).
         """
+        if self._use_batched_decoding:
+            if decoder_output.ndim < 2 or decoder_output.ndim > 3:
+                raise ValueError(
+                    f"`decoder_output` must be a tensor of shape [B, T] (labels, int) or "
+                    f"[B, T, V] (log probs, float). Provided shape = {decoder_output.shape}"
+                )
+            return (self._greedy_decode_batch(decoder_output, decoder_lengths),)
+
         with torch.inference_mode():
             hypotheses = []
             # Process each sequence independently
@@ -137,6 +241,51 @@ class GreedyCTCInfer(Typing):
 
         return (packed_result,)
 
+    @property
+    def _use_batched_decoding(self) -> bool:
+        return self.batched_inference and not self.preserve_alignments
+
+    @torch.no_grad()
+    def _greedy_decode_batch(self, x: torch.Tensor, out_len: Optional[torch.Tensor]) -> BatchedGreedyCTCHypotheses:
+        # x: [B, T, D] or [B, T]
+        # out_len: [B]
+        with torch.inference_mode():
+            if x.ndim == 3:
+                label_logprobs, labels = x.max(dim=-1)
+            else:
+                label_logprobs, labels = None, x
+
+            batch_size, max_time = labels.shape
+            frames = torch.arange(max_time, device=labels.device)
+            non_blank = labels != self.blank_id
+            if out_len is not None:
+                non_blank &= frames[None, :] < out_len.to(labels.device)[:, None]
+
+            # CTC collapse: the first frame of each run of a non-blank label
+            new_token = non_blank.clone()
+            new_token[:, 1:] &= labels[:, 1:] != labels[:, :-1]
+
+            if label_logprobs is not None:
+                scores = torch.where(non_blank, label_logprobs, torch.zeros_like(label_logprobs)).sum(dim=-1)
+            else:
+                scores = torch.full([batch_size], -1.0, device=labels.device)
+
+            # Tokens are in batch-major order, thus grouped by sample
+            tokens = labels[new_token].long().cpu()
+            token_frames = new_token.nonzero(as_tuple=False)[:, 1].cpu()
+            token_offsets = np.concatenate([[0], new_token.sum(dim=-1).cumsum(dim=0).cpu().numpy()])
+
+            return BatchedGreedyCTCHypotheses(
+                tokens=tokens,
+                token_frames=token_frames,
+                token_offsets=token_offsets,
+                scores=scores.cpu(),
+                lengths=out_len.cpu() if out_len is not None else None,
+                labels=labels,
+                blank_id=self.blank_id,
+                compute_timestamps=self.compute_timestamps,
+            )
+
     @torch.no_grad()
     def _greedy_decode_logprobs(self, x: torch.Tensor, out_len: torch.Tensor):
         # x: [T, D]
@@ -196,3 +345,4 @@ class GreedyCTCInfer(Typing):
 class GreedyCTCInferConfig:
     preserve_alignments: bool = False
     compute_timestamps: bool = False
+    batched_inference: bool = True
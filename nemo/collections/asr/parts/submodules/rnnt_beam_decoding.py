@@ -27,7 +27,7 @@
 # limitations under the License.
 
 import copy
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from typing import Any, Dict, List, Optional, Union
 
 import numpy as np
@@ -35,7 +35,13 @@ import torch
 from tqdm import tqdm
 
 from nemo.collections.asr.modules import rnnt_abstract
-from nemo.collections.asr.parts.utils.rnnt_utils import Hypothesis, NBestHypotheses, is_prefix, select_k_expansions
+from nemo.collections.asr.parts.utils.rnnt_utils import (
+    Hypothesis,
+    NBestHypotheses,
+    PredictionCache,
+    is_prefix,
+    select_k_expansions,
+)
 from nemo.core.classes import Typing, typecheck
 from nemo.core.neural_types import AcousticEncodedRepresentation, HypothesisType, LengthsType, NeuralType
 from nemo.utils import logging
@@ -61,6 +67,80 @@ def _states_to_device(dec_state, device='cpu'):
     return dec_state
 
 
+# Multiplier of the rolling hash identifying the token sequence of a hypothesis in batched beam search.
+_SEQUENCE_HASH_MULTIPLIER = 1000003
+
+
+@dataclass
+class _BatchedBeams:
+    """
+    Hypotheses of the beams of all the samples of a batch, used by batched beam search.
+
+    Tensors are of shape [B, K, ...] for K hypotheses per sample, except the decoder states which are of shape
+    [L, B, K, H]. Empty hypotheses have a score of -inf.
+    """
+
+    scores: torch.Tensor  # [B, K]
+    dec_out: torch.Tensor  # [B, K, H]
+    dec_states: List[torch.Tensor]  # [L, B, K, H]
+    labels: torch.Tensor  # [B, K, U_max]
+    timesteps: torch.Tensor  # [B, K, U_max]
+    lengths: torch.Tensor  # [B, K]
+    hashes: torch.Tensor  # [B, K]
+
+    def with_scores(self, scores: torch.Tensor) -> '_BatchedBeams':
+        return replace(self, scores=scores)
+
+    def select(self, indices: torch.Tensor) -> '_BatchedBeams':
+        """Returns the hypotheses of indices [B, K'] along the beam dimension."""
+
+        def _gather(tensor, dim):
+            index_shape = [1] * tensor.dim()
+            index_shape[dim - 1], index_shape[dim] = indices.shape
+            expanded_shape = list(tensor.shape)
+            expanded_shape[dim] = indices.shape[1]
+            return torch.gather(tensor, dim, indices.view(index_shape).expand(expanded_shape))
+
+        return _BatchedBeams(
+            scores=_gather(self.scores, 1),
+            dec_out=_gather(self.dec_out, 1),
+            dec_states=[_gather(state, 2) for state in self.dec_states],
+            labels=_gather(self.labels, 1),
+            timesteps=_gather(self.timesteps, 1),
+            lengths=_gather(self.lengths, 1),
+            hashes=_gather(self.hashes, 1),
+        )
+
+    def concat(self, other: '_BatchedBeams') -> '_BatchedBeams':
+        return _BatchedBeams(
+            scores=torch.cat([self.scores, other.scores], dim=1),
+            dec_out=torch.cat([self.dec_out, other.dec_out], dim=1),
+            dec_states=[
+                torch.cat([state, other_state], dim=2) for state, other_state in zip(self.dec_states, other.dec_states)
+            ],
+            labels=torch.cat([self.labels, other.labels], dim=1),
+            timesteps=torch.cat([self.timesteps, other.timesteps], dim=1),
+            lengths=torch.cat([self.lengths, other.lengths], dim=1),
+            hashes=torch.cat([self.hashes, other.hashes], dim=1),
+        )
+
+    def reserve(self, num_labels: int):
+        """Grows the label buffers so that `num_labels` more labels can be appended to every hypothesis."""
+        capacity = self.labels.shape[-1]
+        required = int(self.lengths.max()) + num_labels
+        if required > capacity:
+            padding = [0, max(required, 2 * capacity) - capacity]
+            self.labels = torch.nn.functional.pad(self.labels, padding)
+            self.timesteps = torch.nn.functional.pad(self.timesteps, padding)
+
+    def append(self, labels: torch.Tensor, timestep: int):
+        """Appends the labels [B, K] emitted at `timestep`, in place."""
+        self.labels.scatter_(2, self.lengths.unsqueeze(-1), labels.unsqueeze(-1))
+        self.timesteps.scatter_(2, self.lengths.unsqueeze(-1), torch.full_like(labels, timestep).unsqueeze(-1))
+        self.lengths = self.lengths + 1
+        self.hashes = self.hashes * _SEQUENCE_HASH_MULTIPLIER + labels + 1
+
+
 class BeamRNNTInfer(Typing):
     """
     Beam Search implementation ported from ESPNet implementation -
@@ -117,6 +197,15 @@ class BeamRNNTInfer(Typing):
 
                 This beam search technique can possibly obtain superior WER while sacrificing some evaluation time.
 
+            `batch` - batched beam search. All the samples of the batch are decoded at once: the beams are kept
+                as tensors of shape (B, beam), and each step runs the prediction and joint networks in a single
+                call for all the active hypotheses of the batch. Samples shorter than the longest one of the batch
+                are masked once all of their frames are decoded.
+
+                Each hypothesis can emit up to `batch_max_symbols_per_step` tokens per timestep, and hypotheses
+                with the same token sequence are merged. Decoding a batch is much faster than decoding its
+                samples one by one with the other search types.
+
         score_norm: bool, whether to normalize the scores of the log probabilities.
 
         return_best_hypothesis: bool, decides whether to return a single hypothesis (the best out of N),
@@ -160,6 +249,14 @@ class BeamRNNTInfer(Typing):
             thereby reducing speed but potentially improving accuracy). This is a hyper parameter to be experimentally
             tuned on a validation set.
 
+        # Batched beam search flags
+        batch_max_symbols_per_step: Used for `search_type=batch`. The maximum number of tokens emitted by a
+            hypothesis per timestep. int >= 1.
+
+        prediction_cache_size: Maximum number of label sequences whose prediction network outputs and states are
+            cached during a decode call. The cache is shared by all the samples of the batch, and its least recently
+            used entries are evicted once full. None for an unbounded cache. Unused by `search_type=batch`.
+
         softmax_temperature: Scales the logits of the joint prior to computing log_softmax.
 
         preserve_alignments: Bool flag which preserves the history of alignments generated during
@@ -206,6 +303,8 @@ class BeamRNNTInfer(Typing):
         maes_prefix_alpha: int = 1,
         maes_expansion_gamma: float = 2.3,
         maes_expansion_beta: int = 2,
+        batch_max_symbols_per_step: int = 10,
+        prediction_cache_size: Optional[int] = 4096,
         language_model: Optional[Dict[str, Any]] = None,
         softmax_temperature: float = 1.0,
         preserve_alignments: bool = False,
@@ -239,10 +338,12 @@ class BeamRNNTInfer(Typing):
             # self.search_algorithm = self.nsc_beam_search
         elif search_type == "maes":
             self.search_algorithm = self.modified_adaptive_expansion_search
+        elif search_type == "batch":
+            self.search_algorithm = self.batched_beam_search
         else:
             raise NotImplementedError(
                 f"The search type ({search_type}) supplied is not supported!\n"
-                f"Please use one of : (default, tsd, alsd, nsc)"
+                f"Please use one of : (default, tsd, alsd, nsc, maes, batch)"
             )
 
         if tsd_max_sym_exp_per_step is None:
@@ -265,6 +366,7 @@ class BeamRNNTInfer(Typing):
         self.maes_num_steps = int(maes_num_steps)
         self.maes_expansion_gamma = float(maes_expansion_gamma)
         self.maes_expansion_beta = int(maes_expansion_beta)
+        self.batch_max_symbols_per_step = int(batch_max_symbols_per_step)
 
         if self.maes_prefix_alpha < 0:
             raise ValueError("`maes_prefix_alpha` must be a positive integer.")
@@ -281,6 +383,9 @@ class BeamRNNTInfer(Typing):
         if self.maes_num_steps < 2:
             raise ValueError("`maes_num_steps` must be greater than 1.")
 
+        if self.batch_max_symbols_per_step < 1:
+            raise ValueError("`batch_max_symbols_per_step` must be a positive integer.")
+
         if softmax_temperature != 1.0 and language_model is not None:
             logging.warning(
                 "Softmax temperature is not supported with LM decoding." "Setting softmax-temperature value to 1.0."
@@ -292,6 +397,10 @@ class BeamRNNTInfer(Typing):
         self.language_model = language_model
         self.preserve_alignments = preserve_alignments
 
+        # Cache of the prediction network, shared by the samples of a decode call
+        self.prediction_cache_size = prediction_cache_size
+        self.prediction_cache = PredictionCache(max_size=prediction_cache_size)
+
     @typecheck()
     def __call__(
         self,
@@ -321,52 +430,96 @@ class BeamRNNTInfer(Typing):
             self.decoder.eval()
             self.joint.eval()
 
-            hypotheses = []
-            with tqdm(
-                range(encoder_output.size(0)),
-                desc='Beam search progress:',
-                total=encoder_output.size(0),
-                unit='sample',
-            ) as idx_gen:
-
-                # Freeze the decoder and joint to prevent recording of gradients
-                # during the beam loop.
+            if self.search_algorithm == self.batched_beam_search:
                 with self.decoder.as_frozen(), self.joint.as_frozen():
-
                     _p = next(self.joint.parameters())
                     dtype = _p.dtype
 
-                    # Decode every sample in the batch independently.
-                    for batch_idx in idx_gen:
-                        inseq = encoder_output[batch_idx : batch_idx + 1, : encoded_lengths[batch_idx], :]  # [1, T, D]
-                        logitlen = encoded_lengths[batch_idx]
+                    if encoder_output.dtype != dtype:
+                        encoder_output = encoder_output.to(dtype=dtype)
 
-                        if inseq.dtype != dtype:
-                            inseq = inseq.to(dtype=dtype)
+                    # Decode all the samples of the batch at once.
+                    batch_nbest_hyps = self.batched_beam_search(
+                        encoder_output, encoded_lengths, partial_hypotheses=partial_hypotheses
+                    )
 
-                        # Extract partial hypothesis if exists
-                        partial_hypothesis = partial_hypotheses[batch_idx] if partial_hypotheses is not None else None
+                hypotheses = []
+                for nbest_hyps in batch_nbest_hyps:
+                    nbest_hyps = pack_hypotheses(nbest_hyps)
+                    if self.return_best_hypothesis:
+                        hypotheses.append(nbest_hyps[0])
+                    else:
+                        hypotheses.append(NBestHypotheses(nbest_hyps))
+            else:
+                # Outputs of the prediction network are only shared within a decode call, as its weights may change
+                self.prediction_cache.clear()
+
+                hypotheses = []
+                with tqdm(
+                    range(encoder_output.size(0)),
+                    desc='Beam search progress:',
+                    total=encoder_output.size(0),
+                    unit='sample',
+                ) as idx_gen:
+
+                    # Freeze the decoder and joint to prevent recording of gradients
+                    # during the beam loop.
+                    with self.decoder.as_frozen(), self.joint.as_frozen():
+
+                        _p = next(self.joint.parameters())
+                        dtype = _p.dtype
+
+                        # Decode every sample in the batch independently.
+                        for batch_idx in idx_gen:
+                            inseq = encoder_output[
+                                batch_idx : batch_idx + 1, : encoded_lengths[batch_idx], :
+                            ]  # [1, T, D]
+                            logitlen = encoded_lengths[batch_idx]
+
+                            if inseq.dtype != dtype:
+                                inseq = inseq.to(dtype=dtype)
+
+                            # Extract partial hypothesis if exists
+                            partial_hypothesis = (
+                                partial_hypotheses[batch_idx] if partial_hypotheses is not None else None
+                            )
 
-                        # Execute the specific search strategy
-                        nbest_hyps = self.search_algorithm(
-                            inseq, logitlen, partial_hypotheses=partial_hypothesis
-                        )  # sorted list of hypothesis
+                            # Execute the specific search strategy
+                            nbest_hyps = self.search_algorithm(
+                                inseq, logitlen, partial_hypotheses=partial_hypothesis
+                            )  # sorted list of hypothesis
 
-                        # Prepare the list of hypotheses
-                        nbest_hyps = pack_hypotheses(nbest_hyps)
+                            # Prepare the list of hypotheses
+                            nbest_hyps = pack_hypotheses(nbest_hyps)
 
-                        # Pack the result
-                        if self.return_best_hypothesis:
-                            best_hypothesis = nbest_hyps[0]  # type: Hypothesis
-                        else:
-                            best_hypothesis = NBestHypotheses(nbest_hyps)  # type: NBestHypotheses
-                        hypotheses.append(best_hypothesis)
+                            # Pack the result
+                            if self.return_best_hypothesis:
+                                best_hypothesis = nbest_hyps[0]  # type: Hypothesis
+                            else:
+                                best_hypothesis = NBestHypotheses(nbest_hyps)  # type: NBestHypotheses
+                            hypotheses.append(best_hypothesis)
+
+                logging.debug(
+                    f"Prediction network cache: {self.prediction_cache.hits} hits, "
+                    f"{self.prediction_cache.misses} misses, {len(self.prediction_cache)} entries"
+                )
+                self.prediction_cache.clear()
 
         self.decoder.train(decoder_training_state)
         self.joint.train(joint_training_state)
 
         return (hypotheses,)
 
+    def _get_prediction_cache(self, partial_hypotheses: Optional[Hypothesis] = None) -> PredictionCache:
+        """Returns the cache of the prediction network shared by the samples of the current decode call.
+
+        Continuing a partial hypothesis starts from a decoder state which is not described by its labels,
+        so its outputs are cached separately.
+        """
+        if partial_hypotheses is not None:
+            return PredictionCache(max_size=self.prediction_cache_size)
+        return self.prediction_cache
+
     def sort_nbest(self, hyps: List[Hypothesis]) -> List[Hypothesis]:
         """Sort hypotheses by score or score given sequence length.
 
@@ -414,7 +567,7 @@ class BeamRNNTInfer(Typing):
                 hyp.dec_state = partial_hypotheses.dec_state
                 hyp.dec_state = _states_to_device(hyp.dec_state, h.device)
 
-        cache = {}
+        cache = self._get_prediction_cache(partial_hypotheses)
 
         # Initialize state and first token
         y, state, _ = self.decoder.score_hypothesis(hyp, cache)
@@ -502,7 +655,7 @@ class BeamRNNTInfer(Typing):
 
         # Initialize first hypothesis for the beam (blank)
         kept_hyps = [Hypothesis(score=0.0, y_sequence=[self.blank], dec_state=dec_state, timestep=[-1], length=0)]
-        cache = {}
+        cache = self._get_prediction_cache(partial_hypotheses)
 
         if partial_hypotheses is not None:
             if len(partial_hypotheses.y_sequence) > 0:
@@ -651,7 +804,7 @@ class BeamRNNTInfer(Typing):
                 length=0,
             )
         ]
-        cache = {}
+        cache = self._get_prediction_cache(partial_hypotheses)
 
         for i in range(int(encoded_lengths)):
             hi = h[:, i : i + 1, :]
@@ -785,7 +938,7 @@ class BeamRNNTInfer(Typing):
         ]
 
         final = []
-        cache = {}
+        cache = self._get_prediction_cache(partial_hypotheses)
 
         # ALSD runs for T + U_max steps
         for i in range(h_length + u_max):
@@ -950,7 +1103,7 @@ class BeamRNNTInfer(Typing):
             )
         ]
 
-        cache = {}
+        cache = self._get_prediction_cache(partial_hypotheses)
 
         # Decode a batch of beam states and scores
         beam_dec_out, beam_state, beam_lm_tokens = self.decoder.batch_score_hypothesis(init_tokens, cache, beam_state)
@@ -1131,6 +1284,155 @@ class BeamRNNTInfer(Typing):
         # Sort the hypothesis with best scores
         return self.sort_nbest(kept_hyps)
 
+    def batched_beam_search(
+        self, h: torch.Tensor, encoded_lengths: torch.Tensor, partial_hypotheses: Optional[List[Hypothesis]] = None
+    ) -> List[List[Hypothesis]]:
+        """Batched beam search implementation, decoding all the samples of the batch at once.
+
+        The beams of the samples are kept as tensors of shape [B, beam]. At each timestep, the hypotheses of
+        the beams either emit blank, or up to `batch_max_symbols_per_step` tokens; each expansion step runs the
+        joint network, then the prediction network, once for all the active hypotheses of the batch. Hypotheses
+        with the same token sequence are merged.
+
+        Args:
+            h: Encoded speech features (B, T_max, D_enc)
+            encoded_lengths: Lengths of the encoded speech features (B)
+
+        Returns:
+            nbest_hyps: N-best decoding results of every sample of the batch
+        """
+        if self.preserve_alignments:
+            raise NotImplementedError("`preseve_alignments` is not implemented for batched beam search.")
+
+        if partial_hypotheses is not None:
+            raise NotImplementedError("`partial_hypotheses` support is not supported")
+
+        batch_size = h.shape[0]
+        device = h.device
+        beam = min(self.beam_size, self.vocab_size)
+        encoded_lengths = encoded_lengths.to(device)
+
+        # Precompute the ids of the non-blank tokens
+        ids = torch.tensor([k for k in range(self.vocab_size + 1) if k != self.blank], device=device)
+
+        # Prime the prediction network with the start of signal token; only the first hypothesis of each beam is set
+        dec_out, dec_states = self.decoder.predict(None, None, add_sos=False, batch_size=batch_size)  # [B, 1, H]
+        scores = torch.full([batch_size, beam], float('-inf'), device=device)
+        scores[:, 0] = 0.0
+        beams = _BatchedBeams(
+            scores=scores,
+            dec_out=dec_out.expand(-1, beam, -1).contiguous(),
+            dec_states=[state.unsqueeze(2).expand(-1, -1, beam, -1).contiguous() for state in dec_states],
+            labels=torch.zeros([batch_size, beam, 0], dtype=torch.long, device=device),
+            timesteps=torch.zeros([batch_size, beam, 0], dtype=torch.long, device=device),
+            lengths=torch.zeros([batch_size, beam], dtype=torch.long, device=device),
+            hashes=torch.zeros([batch_size, beam], dtype=torch.long, device=device),
+        )
+
+        for t in range(int(encoded_lengths.max())):
+            beams.reserve(self.batch_max_symbols_per_step)
+            f = h[:, t].repeat_interleave(beam, dim=0)  # [B * beam, D]
+
+            # The beams of the samples which are shorter than t are kept as is
+            active = (t < encoded_lengths).unsqueeze(1)  # [B, 1]
+            kept = beams.with_scores(beams.scores.masked_fill(active, float('-inf')))
+            expanding = beams.with_scores(beams.scores.masked_fill(~active, float('-inf')))
+
+            for symbols_added in range(self.batch_max_symbols_per_step + 1):
+                # Joint step for all the expanding hypotheses of the batch
+                rows = torch.isfinite(expanding.scores).view(-1).nonzero(as_tuple=True)[0]
+                if rows.numel() == 0:
+                    break
+
+                logits = self.joint.joint(
+                    f[rows].unsqueeze(1), expanding.dec_out.view(batch_size * beam, 1, -1)[rows]
+                )  # [N, 1, 1, V + 1]
+                logp = torch.full(
+                    [batch_size * beam, self.vocab_size + 1], float('-inf'), device=device, dtype=torch.float32
+                )
+                logp[rows] = torch.log_softmax(logits[:, 0, 0, :].float() / self.softmax_temperature, dim=-1)
+                logp = logp.view(batch_size, beam, -1)  # [B, beam, V + 1]
+
+                # Hypotheses emitting blank move to the next timestep
+                kept = self._merge_batched_beams(
+                    kept, expanding.with_scores(expanding.scores + logp[:, :, self.blank]), beam
+                )
+
+                if symbols_added == self.batch_max_symbols_per_step:
+                    break
+
+                # Select the best token expansions of each sample
+                token_scores = expanding.scores.unsqueeze(-1) + logp[:, :, ids]  # [B, beam, V]
+                top_scores, top_ids = token_scores.view(batch_size, -1).topk(beam, dim=-1)  # [B, beam]
+
+                # Expansions scoring below the worst kept hypothesis cannot enter the beam anymore
+                top_scores = top_scores.masked_fill(top_scores <= kept.scores[:, -1:], float('-inf'))
+                expanding = expanding.select(torch.div(top_ids, len(ids), rounding_mode='floor')).with_scores(
+                    top_scores
+                )
+                labels = ids[top_ids % len(ids)]
+                expanding.append(labels, t)
+
+                # Prediction step for all the remaining expansions of the batch
+                rows = torch.isfinite(top_scores).view(-1).nonzero(as_tuple=True)[0]
+                if rows.numel() == 0:
+                    break
+
+                dec_states = [state.view(state.shape[0], batch_size * beam, -1) for state in expanding.dec_states]
+                dec_out, dec_states_prime = self.decoder.predict(
+                    labels.view(-1, 1)[rows], [state[:, rows] for state in dec_states], add_sos=False,
+                )
+                expanding.dec_out.view(batch_size * beam, -1)[rows] = dec_out[:, 0]
+                for state, state_prime in zip(dec_states, dec_states_prime):
+                    state[:, rows] = state_prime
+
+            beams = kept
+
+        # Unpack the beams into lists of hypotheses
+        scores, labels, timesteps, lengths = [
+            x.cpu() for x in (beams.scores, beams.labels, beams.timesteps, beams.lengths)
+        ]
+        dec_states = [state.view(state.shape[0], batch_size * beam, -1) for state in beams.dec_states]
+        nbest_hyps = []
+        for batch_idx in range(batch_size):
+            hyps = []
+            for beam_idx in range(beam):
+                if not torch.isfinite(scores[batch_idx, beam_idx]):
+                    continue
+                length = int(lengths[batch_idx, beam_idx])
+                hyps.append(
+                    Hypothesis(
+                        score=float(scores[batch_idx, beam_idx]),
+                        y_sequence=[self.blank] + labels[batch_idx, beam_idx, :length].tolist(),
+                        dec_state=self.decoder.batch_select_state(dec_states, batch_idx * beam + beam_idx),
+                        timestep=[-1] + timesteps[batch_idx, beam_idx, :length].tolist(),
+                        length=encoded_lengths[batch_idx],
+                    )
+                )
+            nbest_hyps.append(self.sort_nbest(hyps))
+
+        return nbest_hyps
+
+    def _merge_batched_beams(self, beams: _BatchedBeams, other: _BatchedBeams, beam: int) -> _BatchedBeams:
+        """Merges two sets of hypotheses into the `beam` best ones of each sample, sorted by decreasing scores.
+        Hypotheses with the same token sequence are recombined."""
+        merged = beams.concat(other)
+        finite = torch.isfinite(merged.scores)
+        same = (
+            (merged.hashes.unsqueeze(2) == merged.hashes.unsqueeze(1))
+            & (merged.lengths.unsqueeze(2) == merged.lengths.unsqueeze(1))
+            & finite.unsqueeze(2)
+            & finite.unsqueeze(1)
+        )  # [B, 2 * beam, 2 * beam]
+        scores = torch.logsumexp(merged.scores.unsqueeze(1).masked_fill(~same, float('-inf')), dim=-1)
+
+        # Only the first of the recombined hypotheses is kept
+        duplicate = (same & torch.ones_like(same[0]).tril(diagonal=-1)).any(dim=-1)
+        scores = scores.masked_fill(duplicate, float('-inf'))
+
+        top_scores, top_ids = scores.topk(beam, dim=-1)
+        return merged.select(top_ids).with_scores(top_scores)
+
     def recombine_hypotheses(self, hypotheses: List[Hypothesis]) -> List[Hypothesis]:
         """Recombine hypotheses with equivalent output sequence.
 
@@ -1202,6 +1504,8 @@ class BeamRNNTInferConfig:
     maes_prefix_alpha: int = 1
     maes_expansion_gamma: float = 2.3
     maes_expansion_beta: int = 2
+    batch_max_symbols_per_step: int = 10
+    prediction_cache_size: Optional[int] = 4096
     language_model: Optional[Dict[str, Any]] = None
     softmax_temperature: float = 1.0
     preserve_alignments: bool = False
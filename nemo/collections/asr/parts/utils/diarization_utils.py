@@ -237,7 +237,7 @@ class ASR_DIAR_OFFLINE(object):
         diar_model = ClusteringDiarizer(cfg=diar_model_config)
         score = diar_model.diarize()
         if diar_model_config.diarizer.vad.model_path is not None and not diar_model_config.diarizer.oracle_vad:
-            self.get_frame_level_VAD(vad_processing_dir=diar_model.vad_pred_dir)
+            self.get_frame_level_VAD(vad_processing_dir=diar_model.vad_pred_dir, vad_preds=diar_model.vad_preds)
 
         diar_hyp = {}
         for k, audio_file_path in enumerate(self.audio_file_list):
@@ -246,14 +246,21 @@ class ASR_DIAR_OFFLINE(object):
             diar_hyp[uniq_id] = rttm_to_labels(pred_rttm)
         return diar_hyp, score
 
-    def get_frame_level_VAD(self, vad_processing_dir):
+    def get_frame_level_VAD(self, vad_processing_dir, vad_preds=None):
         """
         Read frame-level VAD outputs.
 
         Args:
             vad_processing_dir (str):
                 The path where VAD results are saved.
+            vad_preds (dict):
+                Frame-level VAD outputs of each uniq_id, read from vad_processing_dir if not provided.
         """
+        if vad_preds is not None:
+            for uniq_id in self.AUDIO_RTTM_MAP:
+                self.frame_VAD[uniq_id] = vad_preds[uniq_id].tolist()
+            return
+
         for uniq_id in self.AUDIO_RTTM_MAP:
             frame_vad = os.path.join(vad_processing_dir, uniq_id + '.median')
             frame_vad_float_list = []
@@ -0,0 +1,484 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+from numba import jit
+
+__all__ = ['ErrorRateStats', 'batch_edit_distance', 'compute_error_rate_stats']
+
+# Edit operations of the alignments. Between paths of equal cost, correct / substitution is preferred to deletion,
+# which is preferred to insertion.
+OP_CORRECT, OP_SUBSTITUTION, OP_DELETION, OP_INSERTION = 0, 1, 2, 3
+ALIGNMENT_OPS = ('C', 'S', 'D', 'I')
+
+_FNV_OFFSET = np.uint64(14695981039346656037)
+_FNV_PRIME = np.uint64(1099511628211)
+
+# Minimum number of pairs per thread of batch_edit_distance, below which threads cost more than they save.
+_MIN_PAIRS_PER_WORKER = 64
+
+
+@dataclass
+class ErrorRateStats:
+    """Edit operations between hypotheses and their references.
+
+    substitutions: Number of substituted tokens of each hypothesis.
+    insertions: Number of inserted tokens (in the hypothesis but not in the reference) of each hypothesis.
+    deletions: Number of deleted tokens (in the reference but not in the hypothesis) of each hypothesis.
+    reference_lengths: Number of tokens of each reference.
+    alignments: If requested, the alignment of each hypothesis with its reference, as a list of
+        ``(op, hypothesis_token, reference_token)`` where ``op`` is one of 'C' (correct), 'S' (substitution),
+        'D' (deletion) or 'I' (insertion), and the missing token of deletions and insertions is None.
+    """
+
+    substitutions: np.ndarray
+    insertions: np.ndarray
+    deletions: np.ndarray
+    reference_lengths: np.ndarray
+    alignments: Optional[List[List[Tuple[str, Optional[str], Optional[str]]]]] = None
+
+    @property
+    def errors(self) -> np.ndarray:
+        """Edit distance of each hypothesis to its reference."""
+        return self.substitutions + self.insertions + self.deletions
+
+    @property
+    def total_errors(self) -> int:
+        return int(self.errors.sum())
+
+    @property
+    def total_words(self) -> int:
+        return int(self.reference_lengths.sum())
+
+    @property
+    def error_rate(self) -> float:
+        """Corpus level error rate, inf if the references are empty."""
+        total_words = self.total_words
+        return 1.0 * self.total_errors / total_words if total_words != 0 else float('inf')
+
+
+def _offsets(lengths) -> np.ndarray:
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets
+
+
+@jit(nopython=True, nogil=True)
+def _is_whitespace(code):
+    # Code points of `str.isspace`, on which `str.split` splits.
+    if code <= 0x20:
+        return code >= 0x1C or 0x09 <= code <= 0x0D
+    if code < 0x85:
+        return False
+    return (
+        code == 0x85
+        or code == 0xA0
+        or code == 0x1680
+        or (0x2000 <= code <= 0x200A)
+        or code == 0x2028
+        or code == 0x2029
+        or code == 0x202F
+        or code == 0x205F
+        or code == 0x3000
+    )
+
+
+@jit(nopython=True, nogil=True)
+def _split_words(codes, offsets):
+    """
+    Splits the texts of code points ``codes[offsets[i] : offsets[i + 1]]`` into whitespace separated words, as
+    `str.split`. Returns the start and end of each word in ``codes`` and the offsets of the words of each text.
+    """
+    num_texts = len(offsets) - 1
+    starts = np.empty(len(codes), dtype=np.int64)
+    ends = np.empty(len(codes), dtype=np.int64)
+    word_offsets = np.zeros(num_texts + 1, dtype=np.int64)
+    num_words = 0
+    for text in range(num_texts):
+        in_word = False
+        for pos in range(offsets[text], offsets[text + 1]):
+            if _is_whitespace(codes[pos]):
+                if in_word:
+                    ends[num_words - 1] = pos
+                    in_word = False
+            elif not in_word:
+                starts[num_words] = pos
+                num_words += 1
+                in_word = True
+        if in_word:
+            ends[num_words - 1] = offsets[text + 1]
+        word_offsets[text + 1] = num_words
+    return starts[:num_words].copy(), ends[:num_words].copy(), word_offsets
+
+
+@jit(nopython=True, nogil=True)
+def _intern_words(codes, starts, ends):
+    """
+    Interns words to integer ids: the id of a word is the index of its first occurrence. The first occurrences are
+    kept in an open addressing hash table, grown to stay at most half full.
+    """
+    num_words = len(starts)
+    hashes = np.empty(num_words, dtype=np.uint64)
+    for word in range(num_words):
+        word_hash = _FNV_OFFSET
+        for pos in range(starts[word], ends[word]):
+            word_hash = (word_hash ^ np.uint64(codes[pos])) * _FNV_PRIME
+        hashes[word] = word_hash
+
+    table = np.full(1024, -1, dtype=np.int64)
+    num_unique = 0
+    ids = np.empty(num_words, dtype=np.int64)
+    for word in range(num_words):
+        mask = np.uint64(len(table) - 1)
+        slot = hashes[word] & mask
+        while True:
+            other = table[slot]
+            if other < 0:
+                table[slot] = word
+                ids[word] = word
+                num_unique += 1
+                break
+            if hashes[other] == hashes[word] and _same_word(
+                codes, starts[word], ends[word], starts[other], ends[other]
+            ):
+                ids[word] = other
+                break
+            slot = (slot + np.uint64(1)) & mask
+
+        if 2 * num_unique > len(table):
+            old_table = table
+            table = np.full(2 * len(old_table), -1, dtype=np.int64)
+            mask = np.uint64(len(table) - 1)
+            for other in old_table:
+                if other >= 0:
+                    slot = hashes[other] & mask
+                    while table[slot] >= 0:
+                        slot = (slot + np.uint64(1)) & mask
+                    table[slot] = other
+    return ids
+
+
+@jit(nopython=True, nogil=True)
+def _same_word(codes, start, end, other_start, other_end):
+    if end - start != other_end - other_start:
+        return False
+    for offset in range(end - start):
+        if codes[start + offset] != codes[other_start + offset]:
+            return False
+    return True
+
+
+@jit(nopython=True, nogil=True)
+def _edit_ops(hyp, ref, band, ops):
+    """
+    Minimum edit path between two id sequences among the paths within ``band`` cells of the diagonal of the
+    dynamic programming matrix, computed row by row over the hypothesis. The best operation ending at each cell
+    (i, j) of the band is written into ``ops[i, j - i + band]``, ``ops`` being of shape
+    [len(hyp) + 1 x 2 * band + 1]. Returns the cost of the path. If it is at most ``band``, no path leaving the band
+    is cheaper.
+    """
+    num_hyp, num_ref = len(hyp), len(ref)
+    out_of_band = num_hyp + num_ref + 1
+    # Costs of the best paths ending at the cells of the previous and current rows. Cells right after the band of a
+    # row have an out of band cost.
+    prev = np.empty(num_ref + 2, dtype=np.int64)
+    cur = np.empty(num_ref + 2, dtype=np.int64)
+    for j in range(min(num_ref, band) + 1):
+        prev[j] = j
+        ops[0, j + band] = OP_DELETION
+    prev[min(num_ref, band) + 1] = out_of_band
+
+    for i in range(1, num_hyp + 1):
+        lo, hi = max(1, i - band), min(num_ref, i + band)
+        if lo == 1:
+            cur[0] = i
+            if i <= band:
+                ops[i, band - i] = OP_INSERTION
+        else:
+            cur[lo - 1] = out_of_band
+        for j in range(lo, hi + 1):
+            match = hyp[i - 1] == ref[j - 1]
+            diag_cost = prev[j - 1] + (0 if match else 1)
+            del_cost = cur[j - 1] + 1
+            ins_cost = prev[j] + 1
+            if diag_cost <= del_cost and diag_cost <= ins_cost:
+                cur[j] = diag_cost
+                ops[i, j - i + band] = OP_CORRECT if match else OP_SUBSTITUTION
+            elif del_cost <= ins_cost:
+                cur[j] = del_cost
+                ops[i, j - i + band] = OP_DELETION
+            else:
+                cur[j] = ins_cost
+                ops[i, j - i + band] = OP_INSERTION
+        cur[hi + 1] = out_of_band
+        prev, cur = cur, prev
+    return prev[num_ref]
+
+
+@jit(nopython=True, nogil=True)
+def _pair_edit_ops(hyp, ref, counts, alignment):
+    """
+    Adds the numbers of substitutions, insertions and deletions of a minimum edit path between two id sequences to
+    ``counts``. Its alignment is written at the end of ``alignment``, if it is not empty.
+    """
+    # Common prefixes and suffixes are always part of a minimum edit path, only the rest goes through the DP.
+    prefix = 0
+    while prefix < len(hyp) and prefix < len(ref) and hyp[prefix] == ref[prefix]:
+        prefix += 1
+    suffix = 0
+    while (
+        suffix < len(hyp) - prefix
+        and suffix < len(ref) - prefix
+        and hyp[len(hyp) - 1 - suffix] == ref[len(ref) - 1 - suffix]
+    ):
+        suffix += 1
+    hyp = hyp[prefix : len(hyp) - suffix]
+    ref = ref[prefix : len(ref) - suffix]
+
+    # Substituting the tokens that differ position by position and inserting or deleting the remaining ones is an
+    # edit path, whose cost bounds the minimum cost: a band that wide is wide enough. Otherwise, the band is widened
+    # until it contains a minimum edit path, at the latest when it covers the whole matrix.
+    band = abs(len(hyp) - len(ref))
+    for pos in range(min(len(hyp), len(ref))):
+        band += hyp[pos] != ref[pos]
+    band = max(abs(len(hyp) - len(ref)), min(band, 32))
+    while True:
+        ops = np.empty((len(hyp) + 1, 2 * band + 1), dtype=np.int8)
+        if _edit_ops(hyp, ref, band, ops) <= band:
+            break
+        band *= 2
+
+    store_alignment = len(alignment) > 0
+    pos = len(alignment)
+    if store_alignment:
+        for _ in range(suffix):
+            pos -= 1
+            alignment[pos] = OP_CORRECT
+    # Backtrace from the last cell.
+    i, j = len(hyp), len(ref)
+    while i > 0 or j > 0:
+        op = ops[i, j - i + band]
+        if op == OP_SUBSTITUTION:
+            counts[0] += 1
+        elif op == OP_INSERTION:
+            counts[1] += 1
+        elif op == OP_DELETION:
+            counts[2] += 1
+        if store_alignment:
+            pos -= 1
+            alignment[pos] = op
+        if op != OP_DELETION:
+            i -= 1
+        if op != OP_INSERTION:
+            j -= 1
+    if store_alignment:
+        for _ in range(prefix):
+            pos -= 1
+            alignment[pos] = OP_CORRECT
+
+
+@jit(nopython=True, nogil=True)
+def _batch_edit_ops(hyp_ids, hyp_offsets, ref_ids, ref_offsets, counts, alignment_offsets, alignment_ops):
+    """Edit operations of all the pairs. Alignments are computed if ``alignment_ops`` is not empty."""
+    for idx in range(len(counts)):
+        _pair_edit_ops(
+            hyp_ids[hyp_offsets[idx] : hyp_offsets[idx + 1]],
+            ref_ids[ref_offsets[idx] : ref_offsets[idx + 1]],
+            counts[idx],
+            alignment_ops[alignment_offsets[idx] : alignment_offsets[idx + 1]],
+        )
+
+
+def _parallel_batch_edit_ops(
+    hyp_ids, hyp_offsets, ref_ids, ref_offsets, counts, alignment_offsets, alignment_ops, num_workers
+):
+    """
+    Runs `_batch_edit_ops` over contiguous chunks of pairs of similar total lengths, in a pool of threads. The kernel
+    releases the GIL, and each chunk writes to its own rows of ``counts`` and spans of ``alignment_ops``.
+    """
+    num_pairs = len(counts)
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    num_workers = max(1, min(num_workers, num_pairs // _MIN_PAIRS_PER_WORKER))
+    if num_workers == 1:
+        _batch_edit_ops(hyp_ids, hyp_offsets, ref_ids, ref_offsets, counts, alignment_offsets, alignment_ops)
+        return
+
+    costs = np.cumsum(np.diff(hyp_offsets) + np.diff(ref_offsets) + 1)
+    bounds = [0] + np.searchsorted(costs, np.linspace(0, costs[-1], num_workers + 1)[1:-1]).tolist() + [num_pairs]
+    with ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix='nemo_edit_distance') as pool:
+        futures = [
+            pool.submit(
+                _batch_edit_ops,
+                hyp_ids,
+                hyp_offsets[start : end + 1],
+                ref_ids,
+                ref_offsets[start : end + 1],
+                counts[start:end],
+                alignment_offsets[start : end + 1],
+                alignment_ops,
+            )
+            for start, end in zip(bounds[:-1], bounds[1:])
+            if end > start
+        ]
+        for future in futures:
+            future.result()
+
+
+def batch_edit_distance(
+    hyp_ids: np.ndarray,
+    hyp_offsets: np.ndarray,
+    ref_ids: np.ndarray,
+    ref_offsets: np.ndarray,
+    return_alignments: bool = False,
+    num_workers: Optional[int] = None,
+) -> Tuple[np.ndarray, Optional[List[np.ndarray]]]:
+    """
+    Computes the minimum edit paths between pairs of integer id sequences, in parallel over chunks of pairs.
+
+    The pairs are aligned by a compiled kernel which releases the GIL, run by a pool of threads rather than by
+    numba's parallel loops: starting numba's threading layer in a training process makes later forks (dataloader
+    workers, multiprocessing pools) hang with some layers, and processes would have to pickle every batch.
+
+    Args:
+        hyp_ids: Concatenated ids of the hypotheses.
+        hyp_offsets: Offsets of the hypotheses in ``hyp_ids``, of length num_pairs + 1.
+        ref_ids: Concatenated ids of the references.
+        ref_offsets: Offsets of the references in ``ref_ids``, of length num_pairs + 1.
+        return_alignments: Whether to also return the sequence of ``OP_*`` operations of each pair.
+        num_workers: Number of threads aligning the pairs, defaults to the number of CPUs. Each thread aligns at
+            least 64 pairs, so small batches are aligned in the calling thread.
+
+    Returns:
+        An int64 array [num_pairs x 3] of the numbers of substitutions, insertions and deletions of each pair, and
+        their alignments if requested else None.
+    """
+    if len(hyp_offsets) != len(ref_offsets):
+        raise ValueError(
+            f"Expected as many hypotheses as references, got {len(hyp_offsets) - 1} and {len(ref_offsets) - 1}"
+        )
+    num_pairs = len(hyp_offsets) - 1
+    counts = np.zeros((num_pairs, 3), dtype=np.int64)
+    if not return_alignments:
+        no_alignment_offsets = np.zeros(num_pairs + 1, dtype=np.int64)
+        _parallel_batch_edit_ops(
+            hyp_ids,
+            hyp_offsets,
+            ref_ids,
+            ref_offsets,
+            counts,
+            no_alignment_offsets,
+            np.zeros(0, dtype=np.int8),
+            num_workers,
+        )
+        return counts, None
+
+    # The lengths of the alignments are only known after the edit distance, so the buffer is sized for the longest
+    # possible alignments (num_hyp + num_ref tokens).
+    alignment_offsets = _offsets(np.diff(hyp_offsets) + np.diff(ref_offsets))
+    alignment_ops = np.zeros(alignment_offsets[-1], dtype=np.int8)
+    _parallel_batch_edit_ops(
+        hyp_ids, hyp_offsets, ref_ids, ref_offsets, counts, alignment_offsets, alignment_ops, num_workers
+    )
+
+    # Alignments were written at the end of their buffer. Every operation but insertions consumes a reference token.
+    lengths = np.diff(ref_offsets) + counts[:, 1]
+    alignments = [
+        alignment_ops[alignment_offsets[idx + 1] - lengths[idx] : alignment_offsets[idx + 1]]
+        for idx in range(num_pairs)
+    ]
+    return counts, alignments
+
+
+def compute_error_rate_stats(
+    hypotheses: List[str],
+    references: List[str],
+    use_cer: bool = False,
+    return_alignments: bool = False,
+    num_workers: Optional[int] = None,
+) -> ErrorRateStats:
+    """
+    Computes the edit operations between hypotheses and references, at the word level (whitespace separated words)
+    or at the character level if ``use_cer``.
+
+    All the texts are converted at once to an array of code points. Words are split and interned to integer ids
+    shared by all the pairs (characters are their code points), and the edit distances of all the pairs are
+    computed by `batch_edit_distance`.
+
+    Args:
+        hypotheses: list of hypotheses
+        references: list of references
+        use_cer: bool, set True to compute character level statistics
+        return_alignments: whether to compute the alignment of each hypothesis with its reference
+        num_workers: number of threads computing the edit distances, see `batch_edit_distance`
+
+    Returns:
+        ErrorRateStats of the hypotheses.
+    """
+    if len(hypotheses) != len(references):
+        raise ValueError(
+            "In word error rate calculation, hypotheses and reference"
+            " lists must have the same number of elements. But I got:"
+            "{0} and {1} correspondingly".format(len(hypotheses), len(references))
+        )
+    num_pairs = len(hypotheses)
+    texts = list(hypotheses) + list(references)
+    text = ''.join(texts)
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+    text_offsets = _offsets(list(map(len, texts)))
+
+    if use_cer:
+        ids = codes.astype(np.int64)
+        token_offsets = text_offsets
+    else:
+        starts, ends, token_offsets = _split_words(codes, text_offsets)
+        ids = _intern_words(codes, starts, ends)
+
+    hyp_offsets, ref_offsets = token_offsets[: num_pairs + 1], token_offsets[num_pairs:]
+    counts, id_alignments = batch_edit_distance(
+        ids, hyp_offsets, ids, ref_offsets, return_alignments=return_alignments, num_workers=num_workers
+    )
+
+    alignments = None
+    if return_alignments:
+        if use_cer:
+            tokens = list(text)
+        else:
+            tokens = [text[start:end] for start, end in zip(starts.tolist(), ends.tolist())]
+        alignments = []
+        for hyp_pos, ref_pos, ops in zip(hyp_offsets[:-1].tolist(), ref_offsets[:-1].tolist(), id_alignments):
+            alignment = []
+            for op in ops.tolist():
+                hyp_token = ref_token = None
+                if op != OP_DELETION:
+                    hyp_token = tokens[hyp_pos]
+                    hyp_pos += 1
+                if op != OP_INSERTION:
+                    ref_token = tokens[ref_pos]
+                    ref_pos += 1
+                alignment.append((ALIGNMENT_OPS[op], hyp_token, ref_token))
+            alignments.append(alignment)
+
+    return ErrorRateStats(
+        substitutions=counts[:, 0],
+        insertions=counts[:, 1],
+        deletions=counts[:, 2],
+        reference_lengths=np.diff(ref_offsets),
+        alignments=alignments,
+    )
@@ -0,0 +1,164 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import torch
+
+__all__ = ['SpeakerEmbeddingCache', 'get_audio_file_hash', 'get_model_checksum']
+
+_HASH_CHUNK_SIZE = 1 << 20
+
+
+def get_audio_file_hash(audio_filepath: str) -> str:
+    """Returns the SHA-1 hex digest of the content of an audio file."""
+    sha1 = hashlib.sha1()
+    with open(audio_filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def get_model_checksum(model: torch.nn.Module) -> str:
+    """Returns the SHA-1 hex digest of the names, shapes and values of the parameters and buffers of a model."""
+    sha1 = hashlib.sha1()
+    for name, tensor in model.state_dict().items():
+        tensor = tensor.detach().cpu().contiguous()
+        sha1.update(f'{name} {tensor.dtype} {tuple(tensor.shape)}'.encode())
+        sha1.update(tensor.view(-1).view(torch.uint8).numpy().tobytes() if tensor.numel() else b'')
+    return sha1.hexdigest()
+
+
+class SpeakerEmbeddingCache:
+    """
+    Content-addressed cache of the speaker embeddings of audio segments, persisted in a directory.
+
+    Segments are keyed by the hash of the content of their audio file, their offset and their duration (rounded to
+    the millisecond), under a namespace which identifies the model (see `get_model_checksum`). The embeddings of the
+    segments of an audio file are stored as a NumPy array ``<audio hash>.<version>.npy``, read as a memory-mapped
+    array, and ``<audio hash>.json`` holds the version of the array and the offsets and durations of its rows. Arrays
+    are never modified: adding rows writes a new version, then replaces the index, so that readers always see an
+    index and an array which match. Since the keys do not depend on the scale, the segments shared by several
+    scales, or by several runs with different VAD outputs, are only extracted once.
+
+    Args:
+        cache_dir: Directory of the cache, shared by all the models.
+        namespace: Identifier of the model and of the parameters of the extraction, e.g. the checksum of the model.
+    """
+
+    def __init__(self, cache_dir: str, namespace: str):
+        self.cache_dir = os.path.join(cache_dir, namespace)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Hashes of the audio files, indexed by path, modification time and size.
+        self._audio_hashes: Dict[Tuple[str, int, int], str] = {}
+
+    @staticmethod
+    def _segment_key(offset: float, duration: float) -> str:
+        return f'{int(round(offset * 1000))} {int(round(duration * 1000))}'
+
+    def _index_path(self, audio_hash: str) -> str:
+        return os.path.join(self.cache_dir, audio_hash + '.json')
+
+    def _embs_path(self, audio_hash: str, version: str) -> str:
+        return os.path.join(self.cache_dir, f'{audio_hash}.{version}.npy')
+
+    def _write(self, path: str, write_fn):
+        """Writes a file of the cache through a temporary file, so that it is replaced atomically."""
+        with tempfile.NamedTemporaryFile(dir=self.cache_dir, delete=False) as f:
+            write_fn(f)
+        os.replace(f.name, path)
+
+    def get_audio_hash(self, audio_filepath: str) -> str:
+        """Returns the hash of an audio file, only reading files which are new or modified since the last call."""
+        stat = os.stat(audio_filepath)
+        file_id = (os.path.abspath(audio_filepath), stat.st_mtime_ns, stat.st_size)
+        if file_id not in self._audio_hashes:
+            self._audio_hashes[file_id] = get_audio_file_hash(audio_filepath)
+        return self._audio_hashes[file_id]
+
+    def _load(self, audio_hash: str) -> Tuple[Optional[np.ndarray], Dict[str, int], Optional[str]]:
+        """Returns the memory-mapped embeddings of an audio file, the rows of its keys and the version of its array."""
+        try:
+            with open(self._index_path(audio_hash), 'r') as f:
+                index = json.load(f)
+            cached_embs = np.load(self._embs_path(audio_hash, index['version']), mmap_mode='r')
+        except FileNotFoundError:
+            # No entry, or an array removed since its index was read.
+            return None, {}, None
+        return cached_embs, {key: row for row, key in enumerate(index['keys'])}, index['version']
+
+    def lookup(self, segments: List[dict]) -> List[Optional[np.ndarray]]:
+        """
+        Looks up the embeddings of segments.
+
+        Args:
+            segments: Manifest entries with the `audio_filepath`, `offset` and `duration` of each segment.
+
+        Returns:
+            The embedding of each segment, or None if the segment is not in the cache.
+        """
+        entries = {}
+        embs = []
+        for segment in segments:
+            audio_hash = self.get_audio_hash(segment['audio_filepath'])
+            if audio_hash not in entries:
+                entries[audio_hash] = self._load(audio_hash)
+            cached_embs, index, _ = entries[audio_hash]
+            row = index.get(self._segment_key(segment['offset'], segment['duration']))
+            embs.append(None if row is None else np.array(cached_embs[row]))
+        return embs
+
+    def store(self, segments: List[dict], embs: np.ndarray):
+        """
+        Adds the embeddings of segments to the cache. The rows of an audio file are written to a new version of its
+        array, which is published by replacing its index, and the previous version is removed. Rows of concurrent
+        writers of the same audio file may be lost, and are then extracted again by a later run.
+
+        Args:
+            segments: Manifest entries with the `audio_filepath`, `offset` and `duration` of each segment.
+            embs: Embeddings of the segments [num_segments x emb_dim].
+        """
+        rows_per_audio = {}
+        for row, segment in enumerate(segments):
+            audio_hash = self.get_audio_hash(segment['audio_filepath'])
+            key = self._segment_key(segment['offset'], segment['duration'])
+            rows_per_audio.setdefault(audio_hash, {})[key] = row
+
+        for audio_hash, new_rows in rows_per_audio.items():
+            cached_embs, index, version = self._load(audio_hash)
+            new_keys = [key for key in new_rows if key not in index]
+            if not new_keys:
+                continue
+            keys = list(index) + new_keys
+            new_embs = np.asarray(embs[[new_rows[key] for key in new_keys]], dtype=np.float32)
+            if cached_embs is not None:
+                new_embs = np.concatenate([cached_embs, new_embs])
+
+            new_version = uuid.uuid4().hex
+            self._write(self._embs_path(audio_hash, new_version), lambda f: np.save(f, new_embs))
+            self._write(
+                self._index_path(audio_hash),
+                lambda f: f.write(json.dumps({'version': new_version, 'keys': keys}).encode()),
+            )
+            if version is not None:
+                # Readers which already mapped the previous array keep reading it.
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(self._embs_path(audio_hash, version))
@@ -0,0 +1,246 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import gzip
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from nemo.utils import logging
+
+__all__ = ['NGramLM']
+
+# ARPA files store log10 probabilities, scores are returned as natural logarithms.
+LOG10_TO_LN = float(np.log(10.0))
+
+UNK_TOKEN = '<unk>'
+BOS_TOKEN = '<s>'
+
+# log10 probability of the words out of the vocabulary of a LM without <unk>.
+DEFAULT_UNK_LOG10_PROB = -100.0
+
+
+class NGramLM:
+    """
+    Backoff n-gram language model read from an ARPA file, stored as a compact trie of NumPy arrays.
+
+    The n-grams of each order are sorted by the index of their context, the (n-1)-gram, in the arrays of the previous
+    order, then by word id. The children of an (n-1)-gram are thus a contiguous range of the n-gram arrays, located by
+    ``child_starts`` and searched by bisection. Words are int32 ids, probabilities and backoff weights float32.
+
+    A state of the LM is the tuple of the ids of the (at most ``order - 1``) previous words.
+
+    Args:
+        words: Vocabulary of the LM, the index of a word being its id.
+        words_by_order: For each order, the word ids of the n-grams.
+        log_probs_by_order: For each order, the log10 probabilities of the n-grams.
+        backoffs_by_order: For each order but the highest, the log10 backoff weights of the n-grams.
+        child_starts_by_order: For each order but the highest, the index of the first child of each n-gram in the
+            arrays of the next order (with a last element, the number of n-grams of the next order).
+        cache_size: Number of states of which the scores of all the words are cached by `score_all`.
+    """
+
+    def __init__(
+        self,
+        words: List[str],
+        words_by_order: List[np.ndarray],
+        log_probs_by_order: List[np.ndarray],
+        backoffs_by_order: List[np.ndarray],
+        child_starts_by_order: List[np.ndarray],
+        cache_size: int = 4096,
+    ):
+        self.words = words
+        self.word_ids = {word: idx for idx, word in enumerate(words)}
+        self.order = len(words_by_order)
+        self._words = words_by_order
+        self._log_probs = [log_probs * LOG10_TO_LN for log_probs in log_probs_by_order]
+        self._backoffs = [backoffs * LOG10_TO_LN for backoffs in backoffs_by_order]
+        self._child_starts = child_starts_by_order
+
+        self.unk_id = self.word_ids.get(UNK_TOKEN)
+        if self.unk_id is None:
+            self.unk_id = len(self.words)
+            self.words.append(UNK_TOKEN)
+            self.word_ids[UNK_TOKEN] = self.unk_id
+            self._words[0] = np.append(self._words[0], np.int32(self.unk_id))
+            self._log_probs[0] = np.append(self._log_probs[0], np.float32(DEFAULT_UNK_LOG10_PROB * LOG10_TO_LN))
+            if self.order > 1:
+                self._backoffs[0] = np.append(self._backoffs[0], np.float32(0.0))
+                self._child_starts[0] = np.append(self._child_starts[0], self._child_starts[0][-1])
+
+        self.cache_size = cache_size
+        self._score_cache = {}
+        self._score_all_cache = {}
+
+    @classmethod
+    def from_arpa(cls, arpa_path: str, cache_size: int = 4096) -> 'NGramLM':
+        """Reads an ARPA file (optionally gzipped), e.g. written by KenLM's ``lmplz``."""
+        open_fn = gzip.open if arpa_path.endswith('.gz') else open
+        with open_fn(arpa_path, 'rt', encoding='utf-8') as f:
+            ngrams = _read_arpa(f)
+
+        # Unigrams are indexed by word id.
+        words = [ngram[0] for ngram, _, _ in ngrams[0]]
+        word_ids = {word: idx for idx, word in enumerate(words)}
+
+        words_by_order, log_probs_by_order, backoffs_by_order, child_starts_by_order = [], [], [], []
+        prev_index = {(idx,): idx for idx in range(len(words))}
+        for order, entries in enumerate(ngrams, start=1):
+            ids = np.array([[word_ids[word] for word in ngram] for ngram, _, _ in entries], dtype=np.int64)
+            ids = ids.reshape(len(entries), order)
+            log_probs = np.array([log_prob for _, log_prob, _ in entries], dtype=np.float32)
+            backoffs = np.array([backoff for _, _, backoff in entries], dtype=np.float32)
+
+            if order > 1:
+                parents = np.array([prev_index[tuple(context)] for context in ids[:, :-1].tolist()], dtype=np.int64)
+                sort_idx = np.lexsort((ids[:, -1], parents))
+                ids, parents = ids[sort_idx], parents[sort_idx]
+                log_probs, backoffs = log_probs[sort_idx], backoffs[sort_idx]
+                child_starts_by_order.append(np.searchsorted(parents, np.arange(len(words_by_order[-1]) + 1)))
+            if order < len(ngrams):
+                prev_index = {tuple(ngram): idx for idx, ngram in enumerate(ids.tolist())}
+                backoffs_by_order.append(backoffs)
+
+            words_by_order.append(ids[:, -1].astype(np.int32))
+            log_probs_by_order.append(log_probs)
+
+        logging.info(
+            f"Loaded a {len(ngrams)}-gram LM with {[len(entries) for entries in ngrams]} n-grams from {arpa_path}"
+        )
+        return cls(
+            words, words_by_order, log_probs_by_order, backoffs_by_order, child_starts_by_order, cache_size=cache_size
+        )
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_score_cache'] = {}
+        state['_score_all_cache'] = {}
+        return state
+
+    @property
+    def vocab_size(self) -> int:
+        return len(self.words)
+
+    def word_to_id(self, word: str) -> int:
+        return self.word_ids.get(word, self.unk_id)
+
+    def initial_state(self, bos: bool = True) -> Tuple[int, ...]:
+        """Returns the state at the start of a sentence, after <s> if ``bos``."""
+        if bos and self.order > 1 and BOS_TOKEN in self.word_ids:
+            return (self.word_ids[BOS_TOKEN],)
+        return ()
+
+    def next_state(self, state: Tuple[int, ...], word_id: int) -> Tuple[int, ...]:
+        if self.order == 1:
+            return ()
+        return (state + (word_id,))[-(self.order - 1) :]
+
+    def _find(self, ngram: Tuple[int, ...]) -> int:
+        """Returns the index of ``ngram`` in the arrays of its order, or -1 if it is not in the LM."""
+        node = ngram[0]
+        for order in range(1, len(ngram)):
+            start, end = self._child_starts[order - 1][node], self._child_starts[order - 1][node + 1]
+            children = self._words[order][start:end]
+            pos = int(np.searchsorted(children, ngram[order]))
+            if pos == len(children) or children[pos] != ngram[order]:
+                return -1
+            node = start + pos
+        return node
+
+    def score(self, state: Tuple[int, ...], word_id: int) -> float:
+        """Returns the natural log probability of the word ``word_id`` after the words of ``state``."""
+        key = (state, word_id)
+        log_prob = self._score_cache.get(key)
+        if log_prob is not None:
+            return log_prob
+
+        # Backs off from the longest context until the n-gram is found.
+        log_prob = 0.0
+        for start in range(len(state) + 1):
+            context = state[start:]
+            node = self._find(context + (word_id,))
+            if node >= 0:
+                log_prob += float(self._log_probs[len(context)][node])
+                break
+            if context:
+                context_node = self._find(context)
+                if context_node >= 0:
+                    log_prob += float(self._backoffs[len(context) - 1][context_node])
+
+        if len(self._score_cache) >= self.cache_size * 64:
+            self._score_cache.clear()
+        self._score_cache[key] = log_prob
+        return log_prob
+
+    def score_all(self, state: Tuple[int, ...]) -> np.ndarray:
+        """Returns the natural log probabilities of all the words of the vocabulary after the words of ``state``."""
+        log_probs = self._score_all_cache.get(state)
+        if log_probs is not None:
+            return log_probs
+
+        # Starting from the unigrams, each longer context found in the LM adds its backoff weight to all the words and
+        # overrides the probabilities of its children.
+        log_probs = self._log_probs[0].copy()
+        for length in range(1, len(state) + 1):
+            node = self._find(state[-length:])
+            if node < 0:
+                break
+            log_probs += self._backoffs[length - 1][node]
+            start, end = self._child_starts[length - 1][node], self._child_starts[length - 1][node + 1]
+            log_probs[self._words[length][start:end]] = self._log_probs[length][start:end]
+
+        if len(self._score_all_cache) >= self.cache_size:
+            self._score_all_cache.clear()
+        self._score_all_cache[state] = log_probs
+        return log_probs
+
+
+def _read_arpa(f) -> List[List[Tuple[Tuple[str, ...], float, float]]]:
+    """Returns the (n-gram, log10 probability, log10 backoff) entries of each order of an ARPA file."""
+    counts: Dict[int, int] = {}
+    ngrams: List[List[Tuple[Tuple[str, ...], float, float]]] = []
+    order: Optional[int] = None
+    section = None
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        if line == '\\data\\':
+            section = 'data'
+        elif line == '\\end\\':
+            break
+        elif line.startswith('\\') and line.endswith('-grams:'):
+            order = int(line[1 : -len('-grams:')])
+            section = 'ngrams'
+            ngrams.append([])
+            if order != len(ngrams):
+                raise ValueError(f"Expected the {len(ngrams)}-grams section of the ARPA file, got {line}")
+        elif section == 'data' and line.startswith('ngram '):
+            n, count = line[len('ngram ') :].split('=')
+            counts[int(n)] = int(count)
+        elif section == 'ngrams':
+            fields = line.split('\t')
+            if len(fields) == 1:
+                fields = line.split()
+                fields = [fields[0], ' '.join(fields[1 : order + 1])] + fields[order + 1 :]
+            ngram = tuple(fields[1].split(' '))
+            backoff = float(fields[2]) if len(fields) > 2 else 0.0
+            ngrams[-1].append((ngram, float(fields[0]), backoff))
+
+    if not ngrams:
+        raise ValueError("No n-grams found in the ARPA file")
+    for n, count in counts.items():
+        if n > len(ngrams) or len(ngrams[n - 1]) != count:
+            raise ValueError(f"Expected {count} {n}-grams in the ARPA file")
+    return ngrams
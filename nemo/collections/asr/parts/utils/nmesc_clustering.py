@@ -32,9 +32,12 @@
 # https://github.com/tango4j/Auto-Tuning-Spectral-Clustering.
 
 from collections import Counter
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
+import numpy as np
 import torch
+from scipy.sparse import csr_matrix, diags
+from scipy.sparse.linalg import eigsh
 from torch.linalg import eigh
 
 
@@ -321,11 +324,9 @@ def getKneighborsConnections(affinity_mat: torch.Tensor, p_value: int):
     Binarize top-p values for each row from the given affinity matrix.
     """
     binarized_affinity_mat = torch.zeros_like(affinity_mat).int()
-    for i in range(affinity_mat.shape[0]):
-        line = affinity_mat[i, :]
-        sorted_idx = torch.argsort(line, descending=True)
-        indices = sorted_idx[:p_value]
-        binarized_affinity_mat[indices, i] = torch.ones(indices.shape[0]).to(affinity_mat.device).int()
+    sorted_idx = torch.argsort(affinity_mat, dim=1, descending=True)
+    indices = sorted_idx[:, :p_value].t()
+    binarized_affinity_mat.scatter_(0, indices, torch.ones_like(indices, dtype=torch.int))
     return binarized_affinity_mat
 
 
@@ -340,6 +341,32 @@ def getAffinityGraphMat(affinity_mat_raw: torch.Tensor, p_value: int):
     return symm_affinity_mat
 
 
+@torch.jit.script
+def getAffinityGraphMatBatch(affinity_mat_raw: torch.Tensor, p_value_list: torch.Tensor):
+    """
+    Calculate the symmetrized binarized graph matrices of getAffinityGraphMat for all the given p-values at once,
+    sorting each row of the affinity matrix only once.
+
+    Args:
+        affinity_mat_raw: (torch.tensor)
+            N by N affinity matrix
+        p_value_list: (torch.tensor)
+            P p-values
+
+    Returns:
+        symm_affinity_mats: (torch.tensor)
+            P by N by N stacked graph matrices
+    """
+    N = affinity_mat_raw.shape[0]
+    sorted_idx = torch.argsort(affinity_mat_raw, dim=1, descending=True)
+    ranks = torch.empty_like(sorted_idx)
+    ranks.scatter_(1, sorted_idx, torch.arange(N, device=sorted_idx.device).expand(N, N))
+    # X[p, j, i] is 1 if j is among the top-p values of the row i, as in getKneighborsConnections.
+    X = (ranks.t().unsqueeze(0) < p_value_list.to(ranks.device).view(-1, 1, 1)).float()
+    symm_affinity_mats = 0.5 * (X + X.transpose(1, 2))
+    return symm_affinity_mats
+
+
 @torch.jit.script
 def getMinimumConnection(mat: torch.Tensor, max_N: torch.Tensor, n_list: torch.Tensor, device: torch.device):
     """
@@ -370,7 +397,7 @@ def getRepeatedList(mapping_argmat: torch.Tensor, score_mat_size: torch.Tensor):
     return repeat_list
 
 
-def get_argmin_mat(uniq_scale_dict: dict):
+def get_argmin_mat(uniq_scale_dict: dict, chunk_size: int = 1024):
     """
     Calculate the mapping between the base scale and other scales. A segment from a longer scale is
     repeatedly mapped to a segment from a shorter scale or the base scale.
@@ -378,6 +405,8 @@ def get_argmin_mat(uniq_scale_dict: dict):
     Args:
         uniq_scale_dict (dict) :
             Dictionary of embeddings and timestamps for each scale.
+        chunk_size (int) :
+            Number of base scale segments mapped at once, which bounds the size of the distance matrices.
 
     Returns:
         session_scale_mapping_dict (dict) :
@@ -395,10 +424,11 @@ def get_argmin_mat(uniq_scale_dict: dict):
     session_scale_mapping_dict = {}
     for scale_idx in scale_list:
         curr_scale_anchor = segment_anchor_dict[scale_idx]
-        curr_mat = torch.tile(curr_scale_anchor, (base_scale_anchor.shape[0], 1))
-        base_mat = torch.tile(base_scale_anchor, (curr_scale_anchor.shape[0], 1)).t()
-        argmin_mat = torch.argmin(torch.abs(curr_mat - base_mat), dim=1)
-        session_scale_mapping_dict[scale_idx] = argmin_mat
+        argmin_mat_list = []
+        for start in range(0, base_scale_anchor.shape[0], chunk_size):
+            base_mat = base_scale_anchor[start : start + chunk_size].unsqueeze(1)
+            argmin_mat_list.append(torch.argmin(torch.abs(curr_scale_anchor.unsqueeze(0) - base_mat), dim=1))
+        session_scale_mapping_dict[scale_idx] = torch.cat(argmin_mat_list)
     return session_scale_mapping_dict
 
 
@@ -440,6 +470,102 @@ def getMultiScaleCosAffinityMatrix(uniq_embs_and_timestamps: dict, device: torch
     return fused_sim_d, base_scale_emb
 
 
+class TiledMultiScaleCosAffinity:
+    """
+    Fused multiscale affinity of getMultiScaleCosAffinityMatrix, computed by tiles of rows for long sessions.
+    Neither the N x N affinity matrices of the scales nor their repeated versions are materialized: blocks of the
+    fused affinity are computed on demand, and the affinity graph is kept as a sparse matrix.
+    """
+
+    def __init__(
+        self, uniq_embs_and_timestamps: dict, tile_size: int = 4096, device: torch.device = torch.device('cpu'),
+    ):
+        """
+        Args:
+            uniq_embs_and_timestamps: (dict)
+                The dictionary containing embeddings, timestamps and multiscale weights.
+            tile_size: (int)
+                Number of rows of the affinity matrices computed at once.
+            device: (torch.device)
+                Torch device variable
+        """
+        uniq_scale_dict = uniq_embs_and_timestamps['scale_dict']
+        self.tile_size = tile_size
+        self.device = device
+        self.multiscale_weights = uniq_embs_and_timestamps['multiscale_weights'].float().flatten().tolist()
+        session_scale_mapping_dict = get_argmin_mat(uniq_scale_dict)
+
+        self.scale_embs, self.scale_mappings, self.scale_min_max = [], [], []
+        for scale_idx in sorted(uniq_scale_dict.keys()):
+            # Same precision and normalization as cos_similarity in getCosAffinityMatrix
+            emb = uniq_scale_dict[scale_idx]['embeddings'].half().to(device).float()
+            emb = emb / (torch.norm(emb, dim=1).unsqueeze(1) + 3.5e-4)
+            self.scale_embs.append(emb)
+            self.scale_mappings.append(session_scale_mapping_dict[scale_idx].to(device))
+            self.scale_min_max.append(self._getScaleMinMax(emb))
+        self.num_segments = self.scale_mappings[0].shape[0]
+
+    def _getScaleMinMax(self, emb: torch.Tensor):
+        # Minimum and maximum cosine similarity of a scale, used for the min-max normalization of ScalerMinMax
+        v_min, v_max = float('inf'), float('-inf')
+        for start in range(0, emb.shape[0], self.tile_size):
+            sim = torch.mm(emb[start : start + self.tile_size], emb.t())
+            rows = torch.arange(sim.shape[0], device=sim.device)
+            sim[rows, rows + start] = 1
+            v_min, v_max = min(v_min, sim.min().item()), max(v_max, sim.max().item())
+        return v_min, v_max
+
+    def getAffinityBlock(self, row_idx: torch.Tensor, col_idx: torch.Tensor):
+        """
+        Calculate the block of the fused affinity matrix between the given base scale segments.
+
+        Args:
+            row_idx: (torch.tensor)
+                Base scale segment indices of the rows of the block.
+            col_idx: (torch.tensor)
+                Base scale segment indices of the columns of the block.
+
+        Returns:
+            fused_sim_d: (torch.tensor)
+                The affinity values of the block (len(row_idx) x len(col_idx)).
+        """
+        row_idx, col_idx = row_idx.to(self.device), col_idx.to(self.device)
+        fused_sim_d = torch.zeros(row_idx.shape[0], col_idx.shape[0], device=self.device)
+        for emb, mapping, (v_min, v_max), weight in zip(
+            self.scale_embs, self.scale_mappings, self.scale_min_max, self.multiscale_weights
+        ):
+            row_map, col_map = mapping[row_idx], mapping[col_idx]
+            sim = torch.mm(emb[row_map], emb[col_map].t())
+            sim.masked_fill_(row_map.unsqueeze(1) == col_map.unsqueeze(0), 1)
+            fused_sim_d.add_(sim.sub_(v_min), alpha=weight / (v_max - v_min))
+        return fused_sim_d
+
+    def getAffinityGraph(self, p_value: int):
+        """
+        Sparse counterpart of getAffinityGraphMat on the full fused affinity matrix: binarize the top-p values of each
+        row and symmetrize the binarized graph matrix.
+
+        Args:
+            p_value: (int)
+                Number of connections kept for each row.
+
+        Returns:
+            graph: (scipy.sparse.csr_matrix)
+                The symmetrized binarized affinity graph (N x N).
+        """
+        N = self.num_segments
+        all_idx = torch.arange(N, device=self.device)
+        neighbors = []
+        for start in range(0, N, self.tile_size):
+            block = self.getAffinityBlock(all_idx[start : start + self.tile_size], all_idx)
+            neighbors.append(torch.topk(block, k=min(p_value, N), dim=1).indices.int().cpu())
+        neighbors = torch.cat(neighbors).numpy()
+        k = neighbors.shape[1]
+        indptr = np.arange(0, N * k + 1, k, dtype=np.int64 if N * k > np.iinfo(np.int32).max else np.int32)
+        knn_graph = csr_matrix((np.ones(N * k, dtype=np.float32), neighbors.ravel(), indptr), shape=(N, N))
+        return 0.5 * (knn_graph + knn_graph.T)
+
+
 @torch.jit.script
 def getCosAffinityMatrix(emb: torch.Tensor):
     """
@@ -464,10 +590,10 @@ def getCosAffinityMatrix(emb: torch.Tensor):
 @torch.jit.script
 def getLaplacian(X: torch.Tensor):
     """
-    Calculate a laplacian matrix from an affinity matrix X.
+    Calculate a laplacian matrix from an affinity matrix X, or laplacian matrices from stacked affinity matrices.
     """
-    X.fill_diagonal_(0)
-    D = torch.sum(torch.abs(X), dim=1)
+    X.diagonal(dim1=-2, dim2=-1).fill_(0)
+    D = torch.sum(torch.abs(X), dim=-1)
     D = torch.diag_embed(D)
     L = D - X
     return L
@@ -630,6 +756,41 @@ def estimateNumofSpeakers(affinity_mat: torch.Tensor, max_num_speaker: int, cuda
     return num_of_spk, lambdas, lambda_gap
 
 
+@torch.jit.script
+def estimateNumofSpeakersBatch(affinity_mats: torch.Tensor, max_num_speaker: int, cuda: bool = False):
+    """
+    Batched estimateNumofSpeakers() on stacked affinity matrices. Since only the eigenvalues are used, the laplacian
+    matrices are decomposed with a single batched call of eigvalsh, which skips the eigenvectors.
+
+    Args:
+        affinity_mats: (torch.tensor)
+            P by N by N stacked affinity matrices
+
+        max_num_speaker: (int)
+            Maximum number of clusters to consider for each session
+
+        cuda: (bool)
+            If cuda available eigendecomposition is computed on GPUs.
+
+    Returns:
+        num_of_spk: (torch.tensor)
+            The estimated number of speakers of each affinity matrix
+
+        lambdas: (torch.tensor)
+            P by N sorted lambda values from eigendecomposition
+
+        lambda_gap: (torch.tensor)
+            P by (N - 1) gaps between the lambda values
+    """
+    laplacians = getLaplacian(affinity_mats).float()
+    if cuda:
+        laplacians = laplacians.to(torch.cuda.current_device())
+    lambdas = torch.linalg.eigvalsh(laplacians)
+    lambda_gap = lambdas[:, 1:] - lambdas[:, :-1]
+    num_of_spk = torch.argmax(lambda_gap[:, : min(max_num_speaker, lambda_gap.shape[1])], dim=1) + 1
+    return num_of_spk, lambdas, lambda_gap
+
+
 @torch.jit.script
 class SpectralClustering:
     """
@@ -711,6 +872,23 @@ class SpectralClustering:
 
         """
         spectral_emb = self.getSpectralEmbeddings(affinity, n_spks=self.n_clusters, cuda=cuda)
+        return self.clusterEmbeddings(spectral_emb, device=device)
+
+    def clusterEmbeddings(self, spectral_emb: torch.Tensor, device: torch.device = torch.device('cpu')):
+        """
+        Perform k-means clustering on the given spectral embeddings, with a majority vote on the labels of
+        (self.n_random_trials) trials.
+
+        Args:
+            spectral_emb (torch.tensor):
+                Spectral embeddings of the segments
+            device (torch.device):
+                Torch device variable
+
+        Returns:
+            labels (torch.tensor):
+                clustering label output
+        """
         labels_set = []
         for random_state_seed in range(self.random_state, self.random_state + self.n_random_trials):
             _labels = kmeans_torch(
@@ -746,6 +924,37 @@ class SpectralClustering:
         return embedding[:n_spks].T
 
 
+def getSparseLaplacian(graph: csr_matrix):
+    """
+    Calculate a sparse laplacian matrix from a sparse affinity graph, as getLaplacian does for dense matrices.
+    """
+    graph = graph - diags(graph.diagonal())
+    degree = np.asarray(abs(graph).sum(axis=1)).flatten()
+    return diags(degree) - graph
+
+
+def getSparseSpectralEmbeddings(graph: csr_matrix, n_spks: int):
+    """
+    Calculate the spectral embeddings of a sparse affinity graph with an iterative eigensolver, which only computes
+    the n_spks eigenvectors of the smallest eigenvalues of the laplacian instead of the full eigendecomposition.
+
+    Args:
+        graph (scipy.sparse.csr_matrix):
+            Sparse affinity graph, as returned by TiledMultiScaleCosAffinity.getAffinityGraph
+        n_spks (int):
+            Number of speakers, which is the dimension of the spectral embeddings
+
+    Returns:
+        embedding (torch.tensor):
+            Spectral embeddings of the segments (N x n_spks)
+    """
+    laplacian = getSparseLaplacian(graph)
+    # Fixed starting vector for deterministic results, which must not be the constant eigenvector of the laplacian
+    v0 = np.random.RandomState(0).rand(laplacian.shape[0])
+    _, diffusion_map = eigsh(laplacian, k=n_spks, which='SA', v0=v0)
+    return torch.from_numpy(diffusion_map[:, ::-1].copy()).float()
+
+
 @torch.jit.script
 class NMESC:
     """
@@ -801,6 +1010,8 @@ class NMESC:
         use_subsampling_for_NME: bool = True,
         fixed_thres: float = 0.0,
         maj_vote_spk_count: bool = False,
+        parallel_pvalue_search: bool = False,
+        batched_pvalue_search: bool = False,
         cuda: bool = False,
         device: torch.device = torch.device('cpu'),
     ):
@@ -847,6 +1058,13 @@ class NMESC:
             NME_mat_size: (int)
                 Targeted size of matrix for NME analysis.
 
+            parallel_pvalue_search: (bool)
+                If True, the eigen ratios of the p-values are calculated in parallel by the inter-op thread pool
+                of torch (see torch.set_num_interop_threads).
+
+            batched_pvalue_search: (bool)
+                If True, the eigen ratios of all the p-values are calculated at once by getEigRatioBatch().
+                This takes precedence over parallel_pvalue_search.
 
         """
         self.max_num_speaker: int = max_num_speaker
@@ -864,6 +1082,8 @@ class NMESC:
         self.p_value_list: torch.Tensor = self.min_p_value.unsqueeze(0)
         self.device = device
         self.maj_vote_spk_count = maj_vote_spk_count
+        self.parallel_pvalue_search = parallel_pvalue_search
+        self.batched_pvalue_search = batched_pvalue_search
 
     def NMEanalysis(self):
         """
@@ -879,8 +1099,15 @@ class NMESC:
         eig_ratio_list, est_num_of_spk_list = [], []
         est_spk_n_dict: Dict[int, torch.Tensor] = {}
         self.p_value_list = self.getPvalueList()
-        for p_value in self.p_value_list:
-            est_num_of_spk, g_p = self.getEigRatio(p_value)
+        if self.batched_pvalue_search:
+            est_num_of_spk_batch, g_p_batch = self.getEigRatioBatch(self.p_value_list)
+            eig_ratio_results = [(est_num_of_spk_batch[i], g_p_batch[i]) for i in range(self.p_value_list.shape[0])]
+        elif self.parallel_pvalue_search:
+            futures = [torch.jit.fork(self.getEigRatio, int(p_value.item())) for p_value in self.p_value_list]
+            eig_ratio_results = [torch.jit.wait(future) for future in futures]
+        else:
+            eig_ratio_results = [self.getEigRatio(int(p_value.item())) for p_value in self.p_value_list]
+        for p_value, (est_num_of_spk, g_p) in zip(self.p_value_list, eig_ratio_results):
             est_spk_n_dict[p_value.item()] = est_num_of_spk
             eig_ratio_list.append(g_p)
             est_num_of_spk_list.append(est_num_of_spk)
@@ -955,6 +1182,31 @@ class NMESC:
         g_p = (p_neighbors / self.mat.shape[0]) / (max_eig_gap + self.eps)
         return est_num_of_spk, g_p
 
+    def getEigRatioBatch(self, p_value_list: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Batched getEigRatio() for all the given p-values. The graph matrices and laplacians of the p-values are
+        stacked, then decomposed with a single batched call.
+
+        Args:
+            p_value_list: (torch.tensor)
+                The p-values to evaluate.
+
+        Returns:
+            est_num_of_spk: (torch.tensor)
+                Estimated number of speakers for each p-value
+            g_p: (torch.tensor)
+                The ratio between p_neighbors value and the maximum eigen gap value for each p-value.
+        """
+        affinity_mats = getAffinityGraphMatBatch(self.mat, p_value_list)
+        est_num_of_spk, lambdas, lambda_gap_list = estimateNumofSpeakersBatch(
+            affinity_mats, self.max_num_speaker, self.cuda
+        )
+        max_eig_gap = torch.max(lambda_gap_list[:, : self.max_num_speaker], dim=1)[0] / (
+            torch.max(lambdas, dim=1)[0] + self.eps
+        )
+        g_p = (p_value_list.to(max_eig_gap.device) / self.mat.shape[0]) / (max_eig_gap + self.eps)
+        return est_num_of_spk.cpu(), g_p.cpu()
+
     def getPvalueList(self):
         """
         Generates a p-value (p_neighbour) list for searching. p_value_list must include 2 (min_p_value)
@@ -1005,6 +1257,11 @@ def COSclustering(
     maj_vote_spk_count: bool = False,
     fixed_thres: float = 0.0,
     cuda=False,
+    long_form: bool = False,
+    tile_size: int = 4096,
+    max_num_neighbors: Optional[int] = None,
+    parallel_pvalue_search: bool = False,
+    batched_pvalue_search: bool = False,
 ):
     """
     Clustering method for speaker diarization based on cosine similarity.
@@ -1057,6 +1314,26 @@ def COSclustering(
             This value should be optimized on a development set to obtain a quality result.
             Default is None and performs NME-analysis to estimate the threshold.
 
+        long_form: (bool)
+            If True, the N x N multiscale affinity matrix is never materialized, which bounds the memory usage on
+            long sessions. NME-analysis runs on the affinity of the subsampled segments, the affinity graph is
+            built by tiles of rows as a sparse matrix, and the spectral embeddings are calculated by an iterative
+            eigensolver on the sparse laplacian.
+
+        tile_size: (int)
+            Number of rows of the affinity matrices computed at once in long_form mode.
+
+        max_num_neighbors: (int or None)
+            Upper bound of the number of connections of each segment in the affinity graph in long_form mode.
+            The estimated number of connections grows with the session length, so does the size of the graph.
+            Default is None, which keeps the graph of the estimated p-value.
+
+        parallel_pvalue_search: (bool)
+            If True, the p-values of NME-analysis are evaluated in parallel.
+
+        batched_pvalue_search: (bool)
+            If True, the p-values of NME-analysis are evaluated at once, with a batched eigenvalue decomposition.
+
     Returns:
         Y: (torch.tensor[int])
             Speaker label for each segment.
@@ -1077,6 +1354,24 @@ def COSclustering(
     if oracle_num_speakers:
         max_num_speaker = oracle_num_speakers
 
+    if long_form and emb.shape[0] > min_samples_for_NMESC:
+        return _longFormCOSclustering(
+            uniq_embs_and_timestamps,
+            oracle_num_speakers=oracle_num_speakers,
+            est_num_of_spk_enhanced=est_num_of_spk_enhanced,
+            max_num_speaker=max_num_speaker,
+            max_rp_threshold=max_rp_threshold,
+            sparse_search=sparse_search,
+            sparse_search_volume=sparse_search_volume,
+            maj_vote_spk_count=maj_vote_spk_count,
+            fixed_thres=fixed_thres,
+            cuda=cuda,
+            tile_size=tile_size,
+            max_num_neighbors=max_num_neighbors,
+            parallel_pvalue_search=parallel_pvalue_search,
+            batched_pvalue_search=batched_pvalue_search,
+        )
+
     mat, emb = getMultiScaleCosAffinityMatrix(uniq_embs_and_timestamps, device)
 
     nmesc = NMESC(
@@ -1088,6 +1383,8 @@ def COSclustering(
         fixed_thres=fixed_thres,
         NME_mat_size=300,
         maj_vote_spk_count=maj_vote_spk_count,
+        parallel_pvalue_search=parallel_pvalue_search,
+        batched_pvalue_search=batched_pvalue_search,
         cuda=cuda,
         device=device,
     )
@@ -1106,3 +1403,61 @@ def COSclustering(
     spectral_model = SpectralClustering(n_clusters=est_num_of_spk, cuda=cuda, device=device)
     Y = spectral_model.predict(affinity_mat)
     return Y.cpu().numpy()
+
+
+def _longFormCOSclustering(
+    uniq_embs_and_timestamps: dict,
+    oracle_num_speakers: Optional[int],
+    est_num_of_spk_enhanced: Optional[torch.Tensor],
+    max_num_speaker: int,
+    max_rp_threshold: float,
+    sparse_search: bool,
+    sparse_search_volume: int,
+    maj_vote_spk_count: bool,
+    fixed_thres: float,
+    cuda: bool,
+    tile_size: int,
+    max_num_neighbors: Optional[int] = None,
+    parallel_pvalue_search: bool = False,
+    batched_pvalue_search: bool = False,
+    NME_mat_size: int = 300,
+):
+    """
+    Long-form mode of COSclustering, which keeps the memory usage at O(N * tile_size) instead of O(N^2).
+    Please refer to COSclustering() for the arguments.
+    """
+    device = torch.device("cuda") if cuda else torch.device("cpu")
+    affinity = TiledMultiScaleCosAffinity(uniq_embs_and_timestamps, tile_size=tile_size, device=device)
+
+    # Same subsampled matrix as NMESC.subsampleAffinityMat(), computed without the full affinity matrix.
+    subsample_ratio = max(1, int(affinity.num_segments / NME_mat_size))
+    subsample_idx = torch.arange(0, affinity.num_segments, subsample_ratio)
+    nmesc = NMESC(
+        affinity.getAffinityBlock(subsample_idx, subsample_idx),
+        max_num_speaker=max_num_speaker,
+        max_rp_threshold=max_rp_threshold,
+        sparse_search=sparse_search,
+        sparse_search_volume=sparse_search_volume,
+        fixed_thres=fixed_thres,
+        use_subsampling_for_NME=False,
+        maj_vote_spk_count=maj_vote_spk_count,
+        parallel_pvalue_search=parallel_pvalue_search,
+        batched_pvalue_search=batched_pvalue_search,
+        cuda=cuda,
+        device=device,
+    )
+    est_num_of_spk, rp_p_value = nmesc.NMEanalysis()
+    p_hat_value = subsample_ratio * int(rp_p_value)
+    if max_num_neighbors:
+        p_hat_value = min(p_hat_value, max_num_neighbors)
+    affinity_graph = affinity.getAffinityGraph(p_hat_value)
+
+    if oracle_num_speakers:
+        est_num_of_spk = oracle_num_speakers
+    elif est_num_of_spk_enhanced:
+        est_num_of_spk = est_num_of_spk_enhanced
+
+    spectral_model = SpectralClustering(n_clusters=int(est_num_of_spk), cuda=cuda, device=device)
+    spectral_emb = getSparseSpectralEmbeddings(affinity_graph, n_spks=int(est_num_of_spk)).to(device)
+    Y = spectral_model.clusterEmbeddings(spectral_emb, device=device)
+    return Y.cpu().numpy()
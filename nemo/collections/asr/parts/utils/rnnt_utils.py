@@ -26,8 +26,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from collections import OrderedDict
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 
 import torch
 
@@ -153,3 +154,105 @@ def select_k_expansions(
             k_expansions.append([(k_best_exp_idx, k_best_exp)])
 
     return k_expansions
+
+
+class _PrefixTrieNode:
+    __slots__ = ('label', 'parent', 'children', 'value')
+
+    def __init__(self, label: Optional[int], parent: Optional['_PrefixTrieNode']):
+        self.label = label
+        self.parent = parent
+        self.children = {}
+        self.value = None
+
+
+class PredictionCache:
+    """
+    Cache of the outputs and states of the prediction network during beam search, keyed by label sequence.
+
+    The prediction network only depends on the labels of a hypothesis, so that its outputs can be shared by all the
+    beams, timesteps and samples of a decode call. Label sequences are stored in a prefix trie: hypotheses sharing a
+    prefix share its nodes. Once the cache holds `max_size` entries, the least recently used ones are evicted.
+
+    The cache supports the subset of the dict interface used by `AbstractRNNTDecoder.score_hypothesis` and
+    `AbstractRNNTDecoder.batch_score_hypothesis`. Lookups with `get` are counted in `hits` and `misses`.
+
+    Args:
+        max_size: Maximum number of cached entries. None for an unbounded cache.
+    """
+
+    def __init__(self, max_size: Optional[int] = None):
+        if max_size is not None and max_size < 1:
+            raise ValueError(f"The size of the prediction cache must be positive, got {max_size}")
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.clear()
+
+    def clear(self):
+        """Removes all the entries of the cache. Hit and miss counters are preserved."""
+        self._root = _PrefixTrieNode(None, None)
+        # Nodes holding a value, from the least to the most recently used
+        self._entries = OrderedDict()
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _find(self, sequence: Sequence[int], create: bool = False) -> Optional[_PrefixTrieNode]:
+        node = self._root
+        for label in sequence:
+            child = node.children.get(label)
+            if child is None:
+                if not create:
+                    return None
+                child = _PrefixTrieNode(label, node)
+                node.children[label] = child
+            node = child
+        return node
+
+    def get(self, sequence: Sequence[int], default: Any = None) -> Any:
+        node = self._find(sequence)
+        if node is None or node.value is None:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        self._entries.move_to_end(node)
+        return node.value
+
+    def __contains__(self, sequence: Sequence[int]) -> bool:
+        node = self._find(sequence)
+        return node is not None and node.value is not None
+
+    def __getitem__(self, sequence: Sequence[int]) -> Any:
+        node = self._find(sequence)
+        if node is None or node.value is None:
+            raise KeyError(sequence)
+        return node.value
+
+    def __setitem__(self, sequence: Sequence[int], value: Any):
+        if value is None:
+            raise ValueError("None cannot be cached")
+
+        node = self._find(sequence, create=True)
+        node.value = value
+        self._entries[node] = None
+        self._entries.move_to_end(node)
+
+        if self.max_size is not None:
+            while len(self._entries) > self.max_size:
+                evicted, _ = self._entries.popitem(last=False)
+                evicted.value = None
+                self._prune(evicted)
+
+    @staticmethod
+    def _prune(node: _PrefixTrieNode):
+        # Remove the nodes which neither hold a value nor lead to one
+        while node.parent is not None and node.value is None and not node.children:
+            del node.parent.children[node.label]
+            node = node.parent
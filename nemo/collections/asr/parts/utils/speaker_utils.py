@@ -14,7 +14,9 @@
 
 import json
 import math
+import multiprocessing
 import os
+import time
 from copy import deepcopy
 from functools import reduce
 from typing import List
@@ -395,6 +397,16 @@ def write_cluster_labels(base_scale_idx, lines_cluster_labels, out_rttm_dir):
             f.write(clus_label_line)
 
 
+def _cluster_session(args):
+    """
+    Clusters the embeddings of one session, and returns the cluster labels with the clustering time in seconds.
+    """
+    uniq_embs_and_timestamps, clustering_kwargs = args
+    start_time = time.time()
+    cluster_labels = COSclustering(uniq_embs_and_timestamps=uniq_embs_and_timestamps, **clustering_kwargs)
+    return cluster_labels, time.time() - start_time
+
+
 def perform_clustering(embs_and_timestamps, AUDIO_RTTM_MAP, out_rttm_dir, clustering_params):
     """
     Performs spectral clustering on embeddings with time stamps generated from VAD output
@@ -407,6 +419,10 @@ def perform_clustering(embs_and_timestamps, AUDIO_RTTM_MAP, out_rttm_dir, cluste
         out_rttm_dir (str): Path to write predicted rttms
         clustering_params (dict): clustering parameters provided through config that contains max_num_speakers (int),
         oracle_num_speakers (bool), max_rp_threshold(float), sparse_search_volume(int) and enhance_count_threshold (int)
+        If num_workers (int) is greater than 1, sessions are clustered by a pool of num_workers processes on CPU,
+        each using a single intra-op thread. The outputs keep the order of AUDIO_RTTM_MAP in both modes.
+        The clustering time of each session is logged, and saved to clustering_times.json next to the
+        cluster labels if out_rttm_dir is provided.
 
     Returns:
         all_reference (list[uniq_name,Annotation]): reference annotations for score calculation
@@ -417,14 +433,19 @@ def perform_clustering(embs_and_timestamps, AUDIO_RTTM_MAP, out_rttm_dir, cluste
     all_reference = []
     no_references = False
     max_num_speakers = clustering_params['max_num_speakers']
+    num_workers = clustering_params.get('num_workers', 1)
     lines_cluster_labels = []
 
     cuda = True
     if not torch.cuda.is_available():
         logging.warning("cuda=False, using CPU for Eigen decomposition. This might slow down the clustering process.")
         cuda = False
+    elif num_workers > 1:
+        logging.info(f"Clustering sessions with {num_workers} processes on CPU.")
+        cuda = False
 
-    for uniq_id, value in tqdm(AUDIO_RTTM_MAP.items()):
+    session_args = []
+    for uniq_id, value in AUDIO_RTTM_MAP.items():
         if clustering_params.oracle_num_speakers:
             num_speakers = value.get('num_speakers', None)
             if num_speakers is None:
@@ -432,16 +453,30 @@ def perform_clustering(embs_and_timestamps, AUDIO_RTTM_MAP, out_rttm_dir, cluste
         else:
             num_speakers = None
 
-        cluster_labels = COSclustering(
-            uniq_embs_and_timestamps=embs_and_timestamps[uniq_id],
+        clustering_kwargs = dict(
             oracle_num_speakers=num_speakers,
             max_num_speaker=max_num_speakers,
             enhanced_count_thres=clustering_params.enhanced_count_thres,
             max_rp_threshold=clustering_params.max_rp_threshold,
             sparse_search_volume=clustering_params.sparse_search_volume,
             cuda=cuda,
+            long_form=clustering_params.get('long_form', False),
+            tile_size=clustering_params.get('long_form_tile_size', 4096),
+            max_num_neighbors=clustering_params.get('long_form_max_num_neighbors', None),
+            parallel_pvalue_search=clustering_params.get('parallel_pvalue_search', False),
+            batched_pvalue_search=clustering_params.get('batched_pvalue_search', False),
         )
+        session_args.append((embs_and_timestamps[uniq_id], clustering_kwargs))
 
+    if num_workers > 1:
+        with multiprocessing.Pool(processes=num_workers, initializer=torch.set_num_threads, initargs=(1,)) as p:
+            results = list(tqdm(p.imap(_cluster_session, session_args), total=len(session_args)))
+    else:
+        results = [_cluster_session(args) for args in tqdm(session_args)]
+
+    clustering_times = {}
+    for (uniq_id, value), (cluster_labels, clustering_time) in zip(AUDIO_RTTM_MAP.items(), results):
+        clustering_times[uniq_id] = clustering_time
         base_scale_idx = max(embs_and_timestamps[uniq_id]['scale_dict'].keys())
         lines = embs_and_timestamps[uniq_id]['scale_dict'][base_scale_idx]['time_stamps']
         assert len(cluster_labels) == len(lines)
@@ -466,8 +501,18 @@ def perform_clustering(embs_and_timestamps, AUDIO_RTTM_MAP, out_rttm_dir, cluste
             no_references = True
             all_reference = []
 
+    if clustering_times:
+        slowest_uniq_id = max(clustering_times, key=clustering_times.get)
+        logging.info(
+            f"Clustered {len(clustering_times)} sessions in {sum(clustering_times.values()):.2f}s "
+            f"(mean {np.mean(list(clustering_times.values())):.3f}s, "
+            f"max {clustering_times[slowest_uniq_id]:.3f}s for {slowest_uniq_id})"
+        )
+
     if out_rttm_dir:
         write_cluster_labels(base_scale_idx, lines_cluster_labels, out_rttm_dir)
+        with open(os.path.join(out_rttm_dir, '../speaker_outputs', 'clustering_times.json'), 'w') as f:
+            json.dump(clustering_times, f, indent=2)
 
     return all_reference, all_hypothesis
 
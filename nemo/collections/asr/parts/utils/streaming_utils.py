@@ -14,6 +14,9 @@
 
 import copy
 import os
+import queue
+import threading
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Union
 
 import numpy as np
 import soundfile as sf
@@ -24,6 +27,7 @@ from torch.utils.data import DataLoader
 from nemo.collections.asr.models.ctc_bpe_models import EncDecCTCModelBPE
 from nemo.collections.asr.parts.mixins.streaming import StreamingEncoder
 from nemo.collections.asr.parts.preprocessing.features import normalize_batch
+from nemo.collections.asr.parts.utils.rnnt_utils import Hypothesis
 from nemo.core.classes import IterableDataset
 from nemo.core.neural_types import LengthsType, NeuralType
 
@@ -66,67 +70,53 @@ def write_lcs_alignment_to_pickle(alignment, filepath, extras=None):
     torch.save(extras, filepath)
 
 
-def longest_common_subsequence_merge(X, Y, filepath=None):
+def _longest_common_suffix_tables(X: np.ndarray, Y: np.ndarray) -> np.ndarray:
     """
-    Longest Common Subsequence merge algorithm for aligning two consecutive buffers.
-
-    Base alignment construction algorithm is Longest Common Subsequence (reffered to as LCS hear after)
+    Computes the Longest Common Suffix tables of batches of token sequences.
 
-    LCS Merge algorithm looks at two chunks i-1 and i, determins the aligned overlap at the
-    end of i-1 and beginning of ith chunk, and then clips the subsegment of the ith chunk.
-
-    Assumption is that the two chunks are consecutive chunks, and there exists at least small overlap acoustically.
+    A cell (i, j) of the table extends the cell (i - 1, j - 1) of its diagonal when X[i - 1] == Y[j - 1], so all the
+    cells of a column (or row) only depend on the previous column. The tables are filled one column at a time along
+    their shorter side, each step being vectorized over the other side and over the batch.
 
-    It is a sub-word token merge algorithm, operating on the abstract notion of integer ids representing the subword ids.
-    It is independent of text or character encoding.
-
-    Since the algorithm is merge based, and depends on consecutive buffers, the very first buffer is processes using
-    the "middle tokens" algorithm.
+    Args:
+        X: Token ids of shape [B, m]. Padding must be on the left, with ids matching no token of Y.
+        Y: Token ids of shape [B, n]. Padding must be on the right, with ids matching no token of X.
 
-    It requires a delay of some number of tokens such that:
-        lcs_delay = math.floor(((total_buffer_in_secs - chunk_len_in_sec)) / model_stride_in_secs)
+    Returns:
+        An integer array of shape [B, m + 1, n + 1], whose cell (b, i, j) is the length of the longest common suffix
+        of X[b, :i] and Y[b, :j].
+    """
+    batch_size, m = X.shape
+    n = Y.shape[1]
+    tables = np.zeros((batch_size, m + 1, n + 1), dtype=np.int64)
+    matches = X[:, :, None] == Y[:, None, :]
+    if n <= m:
+        for j in range(n):
+            tables[:, 1:, j + 1] = (tables[:, :-1, j] + 1) * matches[:, :, j]
+    else:
+        for i in range(m):
+            tables[:, i + 1, 1:] = (tables[:, i, :-1] + 1) * matches[:, i, :]
+    return tables
 
-    Total cost of the model is O(m_{i-1} * n_{i}) where (m, n) represents the number of subword ids of the buffer.
 
-    Args:
-        X: The subset of the previous chunk i-1, sliced such X = X[-(lcs_delay * max_steps_per_timestep):]
-            Therefore there can be at most lcs_delay * max_steps_per_timestep symbols for X, preserving computation.
-        Y: The entire current chunk i.
-        filepath: Optional filepath to save the LCS alignment matrix for later introspection.
+def _lcs_merge_from_table(LCSuff: np.ndarray):
+    """
+    Finds the slice of the new buffer to merge from a Longest Common Suffix table of shape [m + 1, n + 1].
+    See `longest_common_subsequence_merge` for the description of the algorithm.
 
     Returns:
-        A tuple containing -
-            - i: Start index of alignment along the i-1 chunk.
-            - j: Start index of alignment along the ith chunk.
-            - slice_len: number of tokens to slice off from the ith chunk.
-        The LCS alignment matrix itself (shape m + 1, n + 1)
+        A list containing (i, j, slice_len).
     """
-    # LCSuff is the table with zero
-    # value initially in each cell
-    m = len(X)
-    n = len(Y)
-    LCSuff = [[0 for k in range(n + 1)] for l in range(m + 1)]
-
-    # To store the length of
-    # longest common substring
-    result = 0
-    result_idx = [0, 0, 0]  # Contains (i, j, slice_len)
-
-    # Following steps to build
-    # LCSuff[m+1][n+1] in bottom up fashion
-    for i in range(m + 1):
-        for j in range(n + 1):
-            if i == 0 or j == 0:
-                LCSuff[i][j] = 0
-            elif X[i - 1] == Y[j - 1]:
-                LCSuff[i][j] = LCSuff[i - 1][j - 1] + 1
-
-                if result <= LCSuff[i][j]:
-                    result = LCSuff[i][j]  # max(result, LCSuff[i][j])
-                    result_idx = [i, j, result]
-
-            else:
-                LCSuff[i][j] = 0
+    m = LCSuff.shape[0] - 1
+    n = LCSuff.shape[1] - 1
+
+    # The alignment is the last cell, in row-major order, with the longest common suffix
+    result = LCSuff.max()
+    if result > 0:
+        flat_idx = LCSuff.size - 1 - int(np.argmax(LCSuff.ravel()[::-1] == result))
+        result_idx = [flat_idx // (n + 1), flat_idx % (n + 1), int(result)]
+    else:
+        result_idx = [0, 0, 0]  # Contains (i, j, slice_len)
 
     # Check if perfect alignment was found or not
     # Perfect alignment is found if :
@@ -143,7 +133,7 @@ def longest_common_subsequence_merge(X, Y, filepath=None):
         # Perform backtrack to find the origin point of the slice (j) and how many tokens should be sliced
         while length >= 0 and i > 0 and j > 0:
             # Alignment exists at the required diagonal
-            if LCSuff[i - 1][j - 1] > 0:
+            if LCSuff[i - 1, j - 1] > 0:
                 length -= 1
                 i, j = i - 1, j - 1
 
@@ -176,17 +166,22 @@ def longest_common_subsequence_merge(X, Y, filepath=None):
         j_skip = 0  # Number of tokens that were skipped along the diagonal
         slice_count = 0  # Number of tokens that should be sliced
 
-        # Select leftmost LCS
-        for i_idx in range(m, -1, -1):  # start from last timestep of old buffer
-            for j_idx in range(0, n + 1):  # start from first token from new buffer
-                # Select the longest LCSuff, while minimizing the index of j (token index for new buffer)
-                if LCSuff[i_idx][j_idx] > max_j and j_idx <= max_j_idx:
-                    max_j = LCSuff[i_idx][j_idx]
-                    max_j_idx = j_idx
+        # Select leftmost LCS, starting from last timestep of old buffer.
+        # Within a row, only the first token of the new buffer longer than the current LCS can be selected,
+        # as the tokens to its right are not at its left anymore. Rows without any longer LCS are skipped.
+        row_max = LCSuff.max(axis=1)
+        for i_idx in range(m, -1, -1):
+            if row_max[i_idx] <= max_j:
+                continue
+            is_longer = LCSuff[i_idx, : max_j_idx + 1] > max_j
+            j_idx = int(np.argmax(is_longer))
+            if is_longer[j_idx]:
+                max_j = LCSuff[i_idx, j_idx]
+                max_j_idx = j_idx
 
-                    # Update the starting indices of the partial merge
-                    i_partial = i_idx
-                    j_partial = j_idx
+                # Update the starting indices of the partial merge
+                i_partial = i_idx
+                j_partial = j_idx
 
         # EARLY EXIT (if max subsequence length <= MIN merge length)
         # Important case where there is long silence
@@ -226,12 +221,11 @@ def longest_common_subsequence_merge(X, Y, filepath=None):
                 # walk along the diagonal corresponding to i_idx, plus allowing diagonal skips to occur
                 # diagonal elements may not be aligned due to ASR model predicting
                 # incorrect token in between correct tokens
-                for j_idx in range(j_temp, j_temp + j_skip + 1):
-                    if j_idx < n + 1:
-                        if LCSuff[i_idx][j_idx] == 0:
-                            j_any_skip = 1
-                        else:
-                            j_exp = 1 + j_skip + j_any_skip
+                for j_idx in range(j_temp, min(j_temp + j_skip + 1, n + 1)):
+                    if LCSuff[i_idx, j_idx] == 0:
+                        j_any_skip = 1
+                    else:
+                        j_exp = 1 + j_skip + j_any_skip
 
                 # If the diagonal element existed, dont expand the search space,
                 # otherwise expand the search space 1 token to the right
@@ -250,7 +244,7 @@ def longest_common_subsequence_merge(X, Y, filepath=None):
 
             # Partial backward trace to find start of slice
             while i_partial > 0 and j_partial > 0:
-                if LCSuff[i_partial][j_partial] == 0:
+                if LCSuff[i_partial, j_partial] == 0:
                     # diagonal skip occured, move j to left 1 extra time
                     j_partial -= 1
                     j_skip += 1
@@ -271,20 +265,107 @@ def longest_common_subsequence_merge(X, Y, filepath=None):
     # Set the value of i and j
     result_idx[0] = i
     result_idx[1] = j
+    return result_idx, is_complete_merge
+
+
+def _write_lcs_merge(LCSuff, X, Y, result_idx, is_complete_merge, filepath):
+    extras = {
+        "is_complete_merge": is_complete_merge,
+        "X": X,
+        "Y": Y,
+        "slice_idx": result_idx,
+    }
+    write_lcs_alignment_to_pickle(LCSuff, filepath=filepath, extras=extras)
+    print("Wrote alignemnt to :", filepath)
+
+
+def longest_common_subsequence_merge(X, Y, filepath=None):
+    """
+    Longest Common Subsequence merge algorithm for aligning two consecutive buffers.
+
+    Base alignment construction algorithm is Longest Common Subsequence (reffered to as LCS hear after)
+
+    LCS Merge algorithm looks at two chunks i-1 and i, determins the aligned overlap at the
+    end of i-1 and beginning of ith chunk, and then clips the subsegment of the ith chunk.
+
+    Assumption is that the two chunks are consecutive chunks, and there exists at least small overlap acoustically.
+
+    It is a sub-word token merge algorithm, operating on the abstract notion of integer ids representing the subword ids.
+    It is independent of text or character encoding.
+
+    Since the algorithm is merge based, and depends on consecutive buffers, the very first buffer is processes using
+    the "middle tokens" algorithm.
+
+    It requires a delay of some number of tokens such that:
+        lcs_delay = math.floor(((total_buffer_in_secs - chunk_len_in_sec)) / model_stride_in_secs)
+
+    Total cost of the model is O(m_{i-1} * n_{i}) where (m, n) represents the number of subword ids of the buffer.
+    The alignment matrix is computed with NumPy operations vectorized over its longer side.
+
+    Args:
+        X: The subset of the previous chunk i-1, sliced such X = X[-(lcs_delay * max_steps_per_timestep):]
+            Therefore there can be at most lcs_delay * max_steps_per_timestep symbols for X, preserving computation.
+        Y: The entire current chunk i.
+        filepath: Optional filepath to save the LCS alignment matrix for later introspection.
+
+    Returns:
+        A tuple containing -
+            - i: Start index of alignment along the i-1 chunk.
+            - j: Start index of alignment along the ith chunk.
+            - slice_len: number of tokens to slice off from the ith chunk.
+        The LCS alignment matrix itself (shape m + 1, n + 1)
+    """
+    LCSuff = _longest_common_suffix_tables(
+        np.asarray(X, dtype=np.int64).reshape(1, -1), np.asarray(Y, dtype=np.int64).reshape(1, -1)
+    )[0]
+    result_idx, is_complete_merge = _lcs_merge_from_table(LCSuff)
 
     if filepath is not None:
-        extras = {
-            "is_complete_merge": is_complete_merge,
-            "X": X,
-            "Y": Y,
-            "slice_idx": result_idx,
-        }
-        write_lcs_alignment_to_pickle(LCSuff, filepath=filepath, extras=extras)
-        print("Wrote alignemnt to :", filepath)
+        _write_lcs_merge(LCSuff, X, Y, result_idx, is_complete_merge, filepath)
 
     return result_idx, LCSuff
 
 
+def batched_longest_common_subsequence_merge(X, Y, filepaths=None):
+    """
+    Longest Common Subsequence merge of the buffers of several streams at once. The alignment matrices of all the
+    streams are computed together, see `longest_common_subsequence_merge` for the description of the algorithm.
+
+    Args:
+        X: List of the subsets of the previous chunks i-1 of the streams.
+        Y: List of the current chunks i of the streams.
+        filepaths: Optional list of filepaths (or None) to save the LCS alignment matrices of the streams.
+
+    Returns:
+        A list containing, for each stream, the (i, j, slice_len) tuple and the LCS alignment matrix as returned by
+        `longest_common_subsequence_merge`.
+    """
+    if len(X) != len(Y):
+        raise ValueError(f"Got {len(X)} previous chunks for {len(Y)} current chunks!")
+    if len(X) == 0:
+        return []
+
+    # Token ids are non-negative, so the paddings of X and Y never match any token.
+    max_m = max(len(x) for x in X)
+    max_n = max(len(y) for y in Y)
+    X_batch = np.full((len(X), max_m), -1, dtype=np.int64)
+    Y_batch = np.full((len(Y), max_n), -2, dtype=np.int64)
+    for idx, (x, y) in enumerate(zip(X, Y)):
+        X_batch[idx, max_m - len(x) :] = x
+        Y_batch[idx, : len(y)] = y
+    tables = _longest_common_suffix_tables(X_batch, Y_batch)
+
+    results = []
+    for idx, (x, y) in enumerate(zip(X, Y)):
+        # The rows of the left padding of X are zeros, the row before the first token of X is the first row
+        LCSuff = tables[idx, max_m - len(x) :, : len(y) + 1]
+        result_idx, is_complete_merge = _lcs_merge_from_table(LCSuff)
+        if filepaths is not None and filepaths[idx] is not None:
+            _write_lcs_merge(LCSuff, x, y, result_idx, is_complete_merge, filepaths[idx])
+        results.append((result_idx, LCSuff))
+    return results
+
+
 def lcs_alignment_merge_buffer(buffer, data, delay, model, max_steps_per_timestep: int = 5, filepath: str = None):
     """
     Merges the new text from the current frame with the previous text contained in the buffer.
@@ -320,6 +401,42 @@ def lcs_alignment_merge_buffer(buffer, data, delay, model, max_steps_per_timeste
     return buffer
 
 
+def batched_lcs_alignment_merge_buffer(
+    buffers, data, delay, model, max_steps_per_timestep: int = 5, filepaths: Optional[List[str]] = None
+):
+    """
+    Merges the new text from the current frames of several streams with the previous texts contained in their buffers,
+    computing the LCS alignments of all the streams at once. See `lcs_alignment_merge_buffer`.
+
+    Args:
+        buffers: List of the token buffers of the streams, which are extended in place.
+        data: List of the new tokens of the streams.
+        delay: LCS delay, in timesteps.
+        model: The ASR model.
+        max_steps_per_timestep: Maximum number of tokens per timestep.
+        filepaths: Optional list of filepaths (or None) to save the LCS alignments of the streams.
+
+    Returns:
+        The list of merged buffers.
+    """
+    # Prepare the subsets of the buffers that will be LCS Merged with new data.
+    # If delay timesteps is 0 or a buffer is empty, simply concatenate the buffer and data.
+    search_size = int(delay * max_steps_per_timestep)
+    merge_idx = [idx for idx, buffer in enumerate(buffers) if delay >= 1 and len(buffer) > 0]
+    lcs_results = batched_longest_common_subsequence_merge(
+        [buffers[idx][-search_size:] for idx in merge_idx],
+        [data[idx] for idx in merge_idx],
+        filepaths=[filepaths[idx] for idx in merge_idx] if filepaths is not None else None,
+    )
+    slice_indices = [0] * len(buffers)
+    for idx, (lcs_idx, _) in zip(merge_idx, lcs_results):
+        slice_indices[idx] = lcs_idx[1] + lcs_idx[-1]  # slice = j + slice_len
+
+    for buffer, new_data, slice_idx in zip(buffers, data, slice_indices):
+        buffer += new_data[slice_idx:]
+    return buffers
+
+
 def inplace_buffer_merge(buffer, data, timesteps, model):
     """
     Merges the new text from the current frame with the previous text contained in the buffer.
@@ -459,12 +576,14 @@ class FeatureFrameBufferer:
     an array of buffers.
     """
 
-    def __init__(self, asr_model, frame_len=1.6, batch_size=4, total_buffer=4.0):
+    def __init__(self, asr_model, frame_len=1.6, batch_size=4, total_buffer=4.0, num_buffer_slots: int = 1):
         '''
         Args:
           frame_len: frame's duration, seconds
           frame_overlap: duration of overlaps before and after current frame, seconds
           offset: number of symbols to drop for smooth streaming
+          num_buffer_slots: number of preallocated batches of frame buffers, used in turn. The buffers returned by
+            get_buffers_batch are overwritten after num_buffer_slots further calls.
         '''
         self.ZERO_LEVEL_SPEC_DB_VAL = -16.635  # Log-Melspectrogram value for zero signal
         self.asr_model = asr_model
@@ -487,6 +606,10 @@ class FeatureFrameBufferer:
             np.ones([self.n_feat, self.feature_buffer_len], dtype=np.float32) * self.ZERO_LEVEL_SPEC_DB_VAL
         )
         self.frame_buffers = []
+        self.frame_buffer_slots = np.empty(
+            [num_buffer_slots, batch_size, self.n_feat, total_buffer_len], dtype=np.float32
+        )
+        self.slot_idx = 0
         self.buffered_features_size = 0
         self.reset()
         self.buffered_len = 0
@@ -517,13 +640,16 @@ class FeatureFrameBufferer:
         return batch_frames
 
     def get_frame_buffers(self, frames):
-        # Build buffers for each frame
+        # Build buffers for each frame in the next preallocated slot
+        slot = self.frame_buffer_slots[self.slot_idx]
+        self.slot_idx = (self.slot_idx + 1) % len(self.frame_buffer_slots)
         self.frame_buffers = []
-        for frame in frames:
+        for idx, frame in enumerate(frames):
             self.buffer[:, : -self.n_frame_len] = self.buffer[:, self.n_frame_len :]
             self.buffer[:, -self.n_frame_len :] = frame
             self.buffered_len += frame.shape[1]
-            self.frame_buffers.append(np.copy(self.buffer))
+            slot[idx] = self.buffer
+            self.frame_buffers.append(slot[idx])
         return self.frame_buffers
 
     def set_frame_reader(self, frame_reader):
@@ -547,7 +673,8 @@ class FeatureFrameBufferer:
     def normalize_frame_buffers(self, frame_buffers, norm_consts):
         CONSTANT = 1e-5
         for i, frame_buffer in enumerate(frame_buffers):
-            frame_buffers[i] = (frame_buffer - norm_consts[i][0]) / (norm_consts[i][1] + CONSTANT)
+            np.subtract(frame_buffer, norm_consts[i][0], out=frame_buffer)
+            np.divide(frame_buffer, norm_consts[i][1] + CONSTANT, out=frame_buffer)
 
     def get_buffers_batch(self):
         batch_frames = self.get_batch_frames()
@@ -563,6 +690,47 @@ class FeatureFrameBufferer:
         return []
 
 
+def _prefetch_batches(get_batch: Callable[[], List], num_batches: int) -> Iterator[List]:
+    """
+    Yields the batches returned by get_batch until it returns an empty batch. A background thread calls get_batch
+    ahead of the consumer, holding up to num_batches batches in a queue.
+    """
+    batches = queue.Queue(maxsize=num_batches)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def produce():
+        try:
+            while not stop.is_set():
+                batch = get_batch()
+                put(batch)
+                if len(batch) == 0:
+                    return
+        except BaseException as e:
+            put(e)
+
+    thread = threading.Thread(target=produce, name='nemo_frame_prefetch', daemon=True)
+    thread.start()
+    try:
+        while True:
+            batch = batches.get()
+            if isinstance(batch, BaseException):
+                raise batch
+            if len(batch) == 0:
+                return
+            yield batch
+    finally:
+        stop.set()
+        thread.join()
+
+
 # class for streaming frame-based ASR
 # 1) use reset() method to reset FrameASR's state
 # 2) call transcribe(frame) to do ASR on
@@ -574,16 +742,24 @@ class FrameBatchASR:
     """
 
     def __init__(
-        self, asr_model, frame_len=1.6, total_buffer=4.0, batch_size=4,
+        self, asr_model, frame_len=1.6, total_buffer=4.0, batch_size=4, prefetch_batches: int = 0,
     ):
         '''
         Args:
           frame_len: frame's duration, seconds
           frame_overlap: duration of overlaps before and after current frame, seconds
           offset: number of symbols to drop for smooth streaming
+          prefetch_batches: number of batches of normalized feature buffers prepared by a background thread while
+            the model runs on the current batch. 0 prepares each batch synchronously.
         '''
+        # Buffers are reused in turn, with a slot for each queued batch and the batches being produced and consumed
+        self.prefetch_batches = prefetch_batches
         self.frame_bufferer = FeatureFrameBufferer(
-            asr_model=asr_model, frame_len=frame_len, batch_size=batch_size, total_buffer=total_buffer
+            asr_model=asr_model,
+            frame_len=frame_len,
+            batch_size=batch_size,
+            total_buffer=total_buffer,
+            num_buffer_slots=prefetch_batches + 2 if prefetch_batches > 0 else 1,
         )
 
         self.asr_model = asr_model
@@ -638,13 +814,14 @@ class FrameBatchASR:
 
     @torch.no_grad()
     def infer_logits(self):
-        frame_buffers = self.frame_bufferer.get_buffers_batch()
+        if self.prefetch_batches > 0:
+            buffers_batches = _prefetch_batches(self.frame_bufferer.get_buffers_batch, self.prefetch_batches)
+        else:
+            buffers_batches = iter(self.frame_bufferer.get_buffers_batch, [])
 
-        while len(frame_buffers) > 0:
-            self.frame_buffers += frame_buffers[:]
+        for frame_buffers in buffers_batches:
             self.data_layer.set_signal(frame_buffers[:])
             self._get_batch_preds()
-            frame_buffers = self.frame_bufferer.get_buffers_batch()
 
     @torch.no_grad()
     def _get_batch_preds(self):
@@ -667,12 +844,18 @@ class FrameBatchASR:
         self, tokens_per_chunk: int, delay: int,
     ):
         self.infer_logits()
-        self.unmerged = []
-        for pred in self.all_preds:
-            decoded = pred.tolist()
-            self.unmerged += decoded[len(decoded) - 1 - delay : len(decoded) - 1 - delay + tokens_per_chunk]
+        self.unmerged = self._merge_chunk_preds(self.all_preds, tokens_per_chunk, delay)
         return self.greedy_merge(self.unmerged)
 
+    @staticmethod
+    def _merge_chunk_preds(preds, tokens_per_chunk: int, delay: int):
+        # Keep the predictions of the chunk from each buffer
+        unmerged = []
+        for pred in preds:
+            decoded = pred.tolist()
+            unmerged += decoded[len(decoded) - 1 - delay : len(decoded) - 1 - delay + tokens_per_chunk]
+        return unmerged
+
     def greedy_merge(self, preds):
         decoded_prediction = []
         previous = self.blank_id
@@ -684,6 +867,119 @@ class FrameBatchASR:
         return hypothesis
 
 
+class MultiFileFrameBatchASR(FrameBatchASR):
+    """
+    Buffered inference of CTC models over many audio files, where the buffers of consecutive files are packed into
+    the same batches. Batches are full whatever the durations of the files, instead of holding the buffers of a
+    single file as in FrameBatchASR.
+    """
+
+    def __init__(
+        self, asr_model, frame_len=1.6, total_buffer=4.0, batch_size=4, prefetch_batches: int = 0,
+    ):
+        '''
+        Args:
+          asr_model: A CTC model.
+          frame_len: frame's duration, seconds
+          total_buffer: duration of total audio chunk size, in seconds.
+          batch_size: number of buffers per batch, from one or more files.
+          prefetch_batches: number of batches of normalized feature buffers prepared by a background thread while
+            the model runs on the current batch, including the loading of the next files. 0 prepares each batch
+            synchronously.
+        '''
+        super().__init__(
+            asr_model,
+            frame_len=frame_len,
+            total_buffer=total_buffer,
+            batch_size=batch_size,
+            prefetch_batches=prefetch_batches,
+        )
+
+        # OVERRIDES OF THE BASE CLASS
+        # The buffers of the file being read are returned one at a time and copied into the batch slots
+        self.frame_bufferer = FeatureFrameBufferer(
+            asr_model=asr_model, frame_len=frame_len, batch_size=1, total_buffer=total_buffer
+        )
+        num_batch_slots = prefetch_batches + 2 if prefetch_batches > 0 else 1
+        self.batch_slots = np.empty(
+            [num_batch_slots, batch_size, self.frame_bufferer.n_feat, self.frame_bufferer.feature_buffer_len],
+            dtype=np.float32,
+        )
+
+    def transcribe_files(
+        self, audio_filepaths: Iterable[str], tokens_per_chunk: int, delay: int, model_stride_in_secs: float,
+    ) -> Iterator[str]:
+        """
+        Transcribes audio files, yielding the transcription of each file in the order of the files.
+
+        Args:
+            audio_filepaths: Paths of the audio files, which are read when their first buffer is batched.
+            tokens_per_chunk: Number of predictions of each chunk.
+            delay: Delay of the predictions of a chunk in its buffer, in model steps.
+            model_stride_in_secs: Duration of a model step, in seconds.
+
+        Returns:
+            Generator of the transcription of each file.
+        """
+        audio_filepaths = iter(audio_filepaths)
+        # Index of the last file read, and whether the frame bufferer still has buffers of it
+        last_file_idx, reading = -1, False
+        slot_idx = 0
+
+        def get_batch():
+            # Fill a batch with the next buffers of the current file, then of the following files
+            nonlocal last_file_idx, reading, slot_idx
+            slot = self.batch_slots[slot_idx]
+            slot_idx = (slot_idx + 1) % len(self.batch_slots)
+            batch = []
+            while len(batch) < self.batch_size:
+                if not reading:
+                    audio_filepath = next(audio_filepaths, None)
+                    if audio_filepath is None:
+                        break
+                    self.frame_bufferer.reset()
+                    self.read_audio_file(audio_filepath, delay, model_stride_in_secs)
+                    last_file_idx += 1
+                    reading = True
+                frame_buffers = self.frame_bufferer.get_buffers_batch()
+                if len(frame_buffers) == 0:
+                    reading = False
+                    continue
+                slot[len(batch)] = frame_buffers[0]
+                batch.append((last_file_idx, slot[len(batch)]))
+            return batch
+
+        if self.prefetch_batches > 0:
+            batches = _prefetch_batches(get_batch, self.prefetch_batches)
+        else:
+            batches = iter(get_batch, [])
+
+        device = self.asr_model.device
+        file_preds = {}
+        next_file_idx = 0
+        for batch in batches:
+            feat_signal = torch.from_numpy(np.stack([frame_buffer for _, frame_buffer in batch])).to(device)
+            feat_signal_len = torch.full([len(batch)], feat_signal.shape[2], dtype=torch.int64, device=device)
+            with torch.no_grad():
+                _, _, predictions = self.asr_model(
+                    processed_signal=feat_signal, processed_signal_length=feat_signal_len
+                )
+            for (file_idx, _), pred in zip(batch, predictions.cpu().numpy()):
+                file_preds.setdefault(file_idx, []).append(pred)
+
+            # Files before the last file of the batch have no buffers left
+            while next_file_idx < batch[-1][0]:
+                yield self._transcribe_file_preds(file_preds.pop(next_file_idx, []), tokens_per_chunk, delay)
+                next_file_idx += 1
+
+        while next_file_idx <= last_file_idx:
+            yield self._transcribe_file_preds(file_preds.pop(next_file_idx, []), tokens_per_chunk, delay)
+            next_file_idx += 1
+
+    def _transcribe_file_preds(self, preds, tokens_per_chunk: int, delay: int):
+        return self.greedy_merge(self._merge_chunk_preds(preds, tokens_per_chunk, delay))
+
+
 class BatchedFeatureFrameBufferer(FeatureFrameBufferer):
     """
     Batched variant of FeatureFrameBufferer where batch dimension is the independent audio samples.
@@ -1120,14 +1416,19 @@ class LongestCommonSubsequenceBatchedFrameASRRNNT(BatchedFrameASRRNNT):
 
         self.infer_logits()
 
-        self.unmerged = [[] for _ in range(self.batch_size)]
-        for idx, alignments in enumerate(self.all_alignments):
-
-            signal_end_idx = self.frame_bufferer.signal_end_index[idx]
-            if signal_end_idx is None:
+        for idx in range(len(self.all_alignments)):
+            if self.frame_bufferer.signal_end_index[idx] is None:
                 raise ValueError("Signal did not end")
 
-            for a_idx, alignment in enumerate(alignments):
+        # The chunks of all the streams are merged together, one chunk index at a time
+        self.unmerged = [[] for _ in range(self.batch_size)]
+        num_chunks = max([len(alignments) for alignments in self.all_alignments], default=0)
+        for a_idx in range(num_chunks):
+            merge_idx, merge_ids, filepaths = [], [], []
+            for idx, alignments in enumerate(self.all_alignments):
+                if a_idx >= len(alignments):
+                    continue
+                alignment = alignments[a_idx]
 
                 # Middle token first chunk
                 if a_idx == 0:
@@ -1142,7 +1443,7 @@ class LongestCommonSubsequenceBatchedFrameASRRNNT(BatchedFrameASRRNNT):
 
                 else:
                     ids, toks = self._alignment_decoder(alignment, self.asr_model.tokenizer, self.blank_id)
-                    if len(ids) > 0 and a_idx < signal_end_idx:
+                    if len(ids) > 0 and a_idx < self.frame_bufferer.signal_end_index[idx]:
 
                         if self.alignment_basepath is not None:
                             basepath = self.alignment_basepath
@@ -1157,14 +1458,21 @@ class LongestCommonSubsequenceBatchedFrameASRRNNT(BatchedFrameASRRNNT):
                         else:
                             filepath = None
 
-                        self.unmerged[idx] = lcs_alignment_merge_buffer(
-                            self.unmerged[idx],
-                            ids,
-                            self.lcs_delay,
-                            model=self.asr_model,
-                            max_steps_per_timestep=self.max_steps_per_timestep,
-                            filepath=filepath,
-                        )
+                        merge_idx.append(idx)
+                        merge_ids.append(ids)
+                        filepaths.append(filepath)
+
+            if len(merge_idx) > 0:
+                merged = batched_lcs_alignment_merge_buffer(
+                    [self.unmerged[idx] for idx in merge_idx],
+                    merge_ids,
+                    self.lcs_delay,
+                    model=self.asr_model,
+                    max_steps_per_timestep=self.max_steps_per_timestep,
+                    filepaths=filepaths,
+                )
+                for idx, buffer in zip(merge_idx, merged):
+                    self.unmerged[idx] = buffer
 
         output = []
         for idx in range(self.batch_size):
@@ -1381,3 +1689,406 @@ class FramewiseStreamingAudioBuffer:
                 normalize_type=self.model_normalize_type,
             )
         return processed_signal, self.streams_length
+
+
+class _StreamState:
+    """State of a stream of a `StreamingSession`."""
+
+    def __init__(self, slot: int):
+        # slot of the stream in the encoder caches of the session
+        self.slot = slot
+        # samples not yet converted to features, the first one being sample `samples_offset` of the stream
+        self.samples = np.zeros(0, dtype=np.float32)
+        self.samples_offset = 0
+        self.num_samples = 0
+        # features of the stream from frame `features_offset`, which the next chunks and pre-encode caches use
+        self.features = None
+        self.features_offset = 0
+        self.num_frames = 0
+        self.ended = False
+        # first frame of the next chunk, and number of chunks processed
+        self.buffer_idx = 0
+        self.step = 0
+        # length of the cache of the last channel layers (the cache of the last time layers has a fixed length)
+        self.cache_len = 0
+        # last greedy prediction of CTC models, to merge the repeated tokens across chunks
+        self.last_label = None
+        self.tokens = []
+        self.hypothesis = None
+
+
+class StreamingSession:
+    """
+    Cache-aware streaming inference of many concurrent audio streams, for CTC and Transducer models whose encoder
+    supports cache-aware streaming (like the streaming Conformer models). Contrary to the buffered inference of
+    `FrameBatchASR`, every frame goes through the encoder once: the encoder keeps caches of its previous chunks, and
+    the decoder only processes the new outputs of the encoder.
+
+    Each stream holds its own audio and feature buffers, decoder state and a slot in the encoder caches of the session.
+    Audio can be pushed in pieces of any size, and gets converted incrementally to the same features the preprocessor
+    computes on the whole audio. Every call to `step` runs the next chunk of all the streams which have enough audio
+    as batches, gathering the caches of the streams from their slots and scattering the updated caches back.
+    Streams are batched with the streams having caches and chunks of the same length, which are all the streams past
+    their first few chunks, except for the last chunks of the streams, as padding changes the outputs of the
+    subsampling of the encoder.
+
+    The whole audio not being available in streaming, the features of models normalizing them are normalized per
+    chunk, as `FramewiseStreamingAudioBuffer` does with online normalization. Transducer models need a decoding
+    strategy supporting partial hypotheses (the 'greedy' strategy).
+
+    Example:
+        session = StreamingSession(asr_model)
+        stream_id = session.add_stream()
+        session.push(stream_id, samples)
+        for stream_id, hypothesis in session.step().items():
+            print(stream_id, hypothesis.text)
+        session.end_stream(stream_id)
+        hypotheses = session.flush()
+    """
+
+    def __init__(self, model, max_batch_size: int = 32):
+        '''
+        Args:
+            model: A CTC or Transducer ASR model, in evaluation mode.
+            max_batch_size (int): maximum number of streams per batch.
+        '''
+        if not isinstance(model.encoder, StreamingEncoder):
+            raise ValueError(
+                "The model's encoder is not inherited from StreamingEncoder, and likely not to support streaming!"
+            )
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.is_transducer = hasattr(model, 'joint')
+        if self.is_transducer and model.decoding.cfg.strategy != 'greedy':
+            raise ValueError(
+                f"Streaming with Transducer models needs the 'greedy' decoding strategy, "
+                f"got '{model.decoding.cfg.strategy}'. Use `model.change_decoding_strategy()` to change it."
+            )
+
+        if model.encoder.streaming_cfg is None:
+            model.encoder.setup_streaming_params()
+        self.streaming_cfg = model.encoder.streaming_cfg
+
+        cfg = copy.deepcopy(model._cfg.preprocessor)
+        self.normalize_type = cfg.get('normalize', None)
+        OmegaConf.set_struct(cfg, False)
+        cfg.dither = 0.0
+        cfg.pad_to = 0
+        cfg.normalize = "None"
+        self.preprocessor = model.from_config_dict(cfg).to(model.device)
+        self.preprocessor.eval()
+
+        featurizer = self.preprocessor.featurizer
+        if featurizer.frame_splicing > 1:
+            raise ValueError("Streaming does not support preprocessors with frame splicing.")
+        self._hop_length = featurizer.hop_length
+        self._n_fft = featurizer.n_fft
+        self._stft_pad_amount = (
+            featurizer.stft_pad_amount if featurizer.stft_pad_amount is not None else featurizer.n_fft // 2
+        )
+        # Features are computed with this number of frames of left context, so that the frames kept are not affected
+        # by the reflection padding or the pre-emphasis of the start of the computed samples.
+        self._context_frames = (self._stft_pad_amount + self._hop_length) // self._hop_length
+
+        pre_encode_cache_size = self.streaming_cfg.pre_encode_cache_size
+        self._max_pre_encode_cache_size = (
+            max(pre_encode_cache_size) if isinstance(pre_encode_cache_size, list) else pre_encode_cache_size
+        )
+
+        self._streams: Dict[int, _StreamState] = {}
+        self._next_stream_id = 0
+        self._free_slots: List[int] = []
+        self._num_slots = 0
+        self._cache_last_channel = None
+        self._cache_last_time = None
+
+    def __len__(self):
+        return len(self._streams)
+
+    @property
+    def stream_ids(self) -> List[int]:
+        return list(self._streams.keys())
+
+    @staticmethod
+    def _get_streaming_size(size: Union[int, List[int]], first_step: bool) -> int:
+        if isinstance(size, list):
+            return size[0] if first_step else size[1]
+        return size
+
+    def _get_state(self, stream_id: int) -> _StreamState:
+        if stream_id not in self._streams:
+            raise ValueError(f"Unknown stream {stream_id}!")
+        return self._streams[stream_id]
+
+    def add_stream(self) -> int:
+        """
+        Adds a new stream to the session.
+
+        Returns:
+            The id of the stream.
+        """
+        if self._free_slots:
+            slot = self._free_slots.pop()
+        else:
+            slot = self._num_slots
+            self._grow_slots(self._num_slots + 1)
+        self._cache_last_time[:, slot] = 0.0
+
+        stream_id = self._next_stream_id
+        self._next_stream_id += 1
+        self._streams[stream_id] = _StreamState(slot)
+        return stream_id
+
+    def _grow_slots(self, num_slots: int):
+        """Makes room in the caches for at least `num_slots` streams."""
+        capacity = self._cache_last_time.size(1) if self._cache_last_time is not None else 0
+        if num_slots > capacity:
+            param = next(self.model.encoder.parameters())
+            extra = max(num_slots, 2 * capacity) - capacity
+            cache_last_channel, cache_last_time = self.model.encoder.get_initial_cache_state(
+                batch_size=extra, dtype=param.dtype, device=param.device
+            )
+            if self._cache_last_time is None:
+                self._cache_last_channel, self._cache_last_time = cache_last_channel, cache_last_time
+            else:
+                cache_last_channel = self._cache_last_channel.new_zeros(
+                    (self._cache_last_channel.size(0), extra, *self._cache_last_channel.shape[2:])
+                )
+                self._cache_last_channel = torch.cat((self._cache_last_channel, cache_last_channel), dim=1)
+                self._cache_last_time = torch.cat((self._cache_last_time, cache_last_time), dim=1)
+        self._num_slots = num_slots
+
+    def push(self, stream_id: int, audio: Union[np.ndarray, torch.Tensor]):
+        """
+        Appends audio to a stream.
+
+        Args:
+            stream_id: The id of the stream.
+            audio: Samples [num_samples] of the audio, at the sample rate of the model.
+        """
+        state = self._get_state(stream_id)
+        if state.ended:
+            raise ValueError(f"Stream {stream_id} has ended!")
+        if isinstance(audio, torch.Tensor):
+            audio = audio.detach().cpu().numpy()
+        audio = np.asarray(audio, dtype=np.float32)
+        if audio.ndim != 1:
+            raise ValueError(f"Audio must be of shape [num_samples], got {audio.shape}")
+        state.samples = np.concatenate((state.samples, audio))
+        state.num_samples += audio.shape[0]
+        self._featurize(state)
+
+    def end_stream(self, stream_id: int):
+        """Marks the end of the audio of a stream, so that the next steps process its remaining audio."""
+        state = self._get_state(stream_id)
+        if not state.ended:
+            state.ended = True
+            self._featurize(state)
+
+    def remove_stream(self, stream_id: int) -> Optional[Hypothesis]:
+        """
+        Removes a stream from the session, releasing its slot.
+
+        Returns:
+            The last hypothesis of the stream, or None if no audio of the stream was processed.
+        """
+        state = self._get_state(stream_id)
+        del self._streams[stream_id]
+        self._free_slots.append(state.slot)
+        return state.hypothesis
+
+    def get_hypothesis(self, stream_id: int) -> Optional[Hypothesis]:
+        """Returns the current hypothesis of a stream, or None if no audio of the stream was processed."""
+        return self._get_state(stream_id).hypothesis
+
+    def is_finished(self, stream_id: int) -> bool:
+        """Returns whether a stream has ended and all its audio has been processed."""
+        state = self._get_state(stream_id)
+        return state.ended and state.buffer_idx >= state.num_frames
+
+    def _featurize(self, state: _StreamState):
+        """Converts the buffered samples of a stream to the features which the next samples can not change anymore."""
+        if state.ended:
+            if state.num_samples == 0:
+                return
+            num_frames = int(self.preprocessor.featurizer.get_seq_len(torch.tensor(float(state.num_samples))))
+        else:
+            # frames whose window ends within the samples received so far
+            num_frames = max((state.num_samples + self._stft_pad_amount - self._n_fft) // self._hop_length + 1, 0)
+        if num_frames <= state.num_frames:
+            return
+
+        start_frame = max(state.num_frames - self._context_frames, 0)
+        segment = state.samples[start_frame * self._hop_length - state.samples_offset :]
+        device = self.model.device
+        with torch.inference_mode():
+            features, _ = self.preprocessor(
+                input_signal=torch.from_numpy(segment).unsqueeze(0).to(device),
+                length=torch.tensor([segment.shape[0]], device=device),
+            )
+        features = features[0, :, state.num_frames - start_frame : num_frames - start_frame]
+        state.features = features if state.features is None else torch.cat((state.features, features), dim=-1)
+        state.num_frames = num_frames
+
+        next_start = max(num_frames - self._context_frames, 0) * self._hop_length
+        state.samples = state.samples[next_start - state.samples_offset :]
+        state.samples_offset = next_start
+
+    def _is_ready(self, state: _StreamState) -> bool:
+        """Returns whether the next chunk of a stream can be processed."""
+        if state.ended:
+            return state.buffer_idx < state.num_frames
+        first_step = state.step == 0
+        chunk_size = self._get_streaming_size(self.streaming_cfg.chunk_size, first_step)
+        shift_size = self._get_streaming_size(self.streaming_cfg.shift_size, first_step)
+        # the chunk must not be the last one of the stream, whose outputs are all kept
+        return state.num_frames >= state.buffer_idx + chunk_size and state.num_frames > state.buffer_idx + shift_size
+
+    def _get_chunk(self, state: _StreamState) -> torch.Tensor:
+        """Returns the features of the next chunk of a stream, preceded by the pre-encode cache."""
+        first_step = state.step == 0
+        chunk_size = self._get_streaming_size(self.streaming_cfg.chunk_size, first_step)
+        pre_encode_cache_size = self._get_streaming_size(self.streaming_cfg.pre_encode_cache_size, first_step)
+        start = state.buffer_idx - state.features_offset
+        chunk = state.features[:, start : start + chunk_size]
+
+        if first_step and isinstance(self.streaming_cfg.pre_encode_cache_size, list):
+            cache_pre_encode = chunk.new_zeros((chunk.size(0), pre_encode_cache_size))
+        else:
+            cache_pre_encode = state.features[:, max(start - pre_encode_cache_size, 0) : start]
+        zeros_pads = pre_encode_cache_size - cache_pre_encode.size(-1)
+        chunk = torch.cat((cache_pre_encode, chunk), dim=-1)
+
+        if self.normalize_type in ["per_feature", "all_features"]:
+            chunk, _, _ = normalize_batch(
+                x=chunk.unsqueeze(0),
+                seq_len=torch.tensor([chunk.size(-1)], device=chunk.device),
+                normalize_type=self.normalize_type,
+            )
+            chunk = chunk[0]
+        if zeros_pads > 0:
+            chunk = torch.nn.functional.pad(chunk, pad=(zeros_pads, 0))
+        return chunk
+
+    def step(self) -> Dict[int, Hypothesis]:
+        """
+        Processes the next chunk of every stream which has enough audio for it.
+
+        Returns:
+            The updated hypotheses of the streams which were processed, by stream id.
+        """
+        groups = {}
+        for stream_id, state in self._streams.items():
+            if self._is_ready(state):
+                first_step = state.step == 0
+                chunk_size = self._get_streaming_size(self.streaming_cfg.chunk_size, first_step)
+                chunk_len = min(chunk_size, state.num_frames - state.buffer_idx)
+                groups.setdefault((first_step, state.cache_len, chunk_len), []).append(stream_id)
+
+        hypotheses = {}
+        with torch.inference_mode():
+            for (first_step, cache_len, _), stream_ids in groups.items():
+                for start in range(0, len(stream_ids), self.max_batch_size):
+                    batch_ids = stream_ids[start : start + self.max_batch_size]
+                    self._step_batch([self._streams[stream_id] for stream_id in batch_ids], first_step, cache_len)
+                    for stream_id in batch_ids:
+                        hypotheses[stream_id] = self._streams[stream_id].hypothesis
+        return hypotheses
+
+    def flush(self) -> Dict[int, Hypothesis]:
+        """
+        Processes chunks until no stream has enough audio for its next chunk, which processes all the audio of the
+        ended streams.
+
+        Returns:
+            The updated hypotheses of the streams which were processed, by stream id.
+        """
+        hypotheses = {}
+        while True:
+            updated = self.step()
+            if not updated:
+                return hypotheses
+            hypotheses.update(updated)
+
+    def _step_batch(self, states: List[_StreamState], first_step: bool, cache_len: int):
+        """Processes the next chunk of streams whose caches and chunks have the same length."""
+        processed_signal = torch.stack([self._get_chunk(state) for state in states])
+        chunk_lengths = processed_signal.new_full((len(states),), processed_signal.size(-1), dtype=torch.long)
+
+        slots = torch.tensor([state.slot for state in states], device=self._cache_last_time.device)
+        capacity = self._cache_last_channel.size(2)
+        (
+            encoded,
+            encoded_len,
+            cache_last_channel_next,
+            cache_last_time_next,
+        ) = self.model.encoder.cache_aware_stream_step(
+            processed_signal=processed_signal,
+            processed_signal_length=chunk_lengths,
+            cache_last_channel=self._cache_last_channel[:, slots, capacity - cache_len :],
+            cache_last_time=self._cache_last_time[:, slots],
+            keep_all_outputs=True,
+            drop_extra_pre_encoded=0 if first_step else None,
+        )
+
+        # the caches are stored right-aligned in the slots, growing up to the size of the last channel cache
+        next_cache_len = cache_last_channel_next.size(2)
+        if next_cache_len > capacity:
+            self._cache_last_channel = torch.nn.functional.pad(
+                self._cache_last_channel, pad=(0, 0, next_cache_len - capacity, 0)
+            )
+            capacity = next_cache_len
+        self._cache_last_channel[:, slots, capacity - next_cache_len :] = cache_last_channel_next
+        self._cache_last_time[:, slots] = cache_last_time_next
+
+        # outputs beyond valid_out_len are dropped except for the last chunk of a stream, as they would be computed
+        # again with the next chunk
+        shift_size = self._get_streaming_size(self.streaming_cfg.shift_size, first_step)
+        for idx, state in enumerate(states):
+            state.buffer_idx += shift_size
+            state.step += 1
+            state.cache_len = next_cache_len
+            if not (state.ended and state.buffer_idx >= state.num_frames):
+                encoded_len[idx] = min(int(encoded_len[idx]), self.streaming_cfg.valid_out_len)
+
+            drop = state.buffer_idx - self._max_pre_encode_cache_size - state.features_offset
+            if drop > 0:
+                state.features = state.features[:, drop:]
+                state.features_offset += drop
+
+        if self.is_transducer:
+            best_hyp, _ = self.model.decoding.rnnt_decoder_predictions_tensor(
+                encoder_output=encoded,
+                encoded_lengths=encoded_len,
+                return_hypotheses=True,
+                partial_hypotheses=None if first_step else [state.hypothesis for state in states],
+            )
+            for state, hypothesis in zip(states, best_hyp):
+                state.hypothesis = hypothesis
+        else:
+            self._ctc_decode(states, encoded, encoded_len)
+
+    def _ctc_decode(self, states: List[_StreamState], encoded: torch.Tensor, encoded_len: torch.Tensor):
+        """Greedy decoding of the new outputs of the encoder, merging the repeated tokens with the previous chunks."""
+        blank_id = self.model.decoding.blank_id
+        log_probs = self.model.decoder(encoder_output=encoded)
+        predictions = log_probs.argmax(dim=-1).cpu()
+        encoded_len = encoded_len.cpu()
+
+        previous = torch.tensor([blank_id if state.last_label is None else state.last_label for state in states])
+        previous = torch.cat((previous.unsqueeze(1), predictions[:, :-1]), dim=1)
+        valid = torch.arange(predictions.size(1)).unsqueeze(0) < encoded_len.unsqueeze(1)
+        new_tokens = valid & (predictions != previous) & (predictions != blank_id)
+
+        for idx, state in enumerate(states):
+            length = int(encoded_len[idx])
+            if length > 0:
+                state.last_label = int(predictions[idx, length - 1])
+            state.tokens.extend(predictions[idx][new_tokens[idx]].tolist())
+            length += state.hypothesis.length if state.hypothesis is not None else 0
+            state.hypothesis = Hypothesis(
+                score=0.0,
+                y_sequence=torch.tensor(state.tokens, dtype=torch.long),
+                text=self.model.decoding.decode_tokens_to_str(state.tokens),
+                length=length,
+            )
@@ -18,7 +18,7 @@ import multiprocessing
 import os
 import shutil
 from itertools import repeat
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
 
 import IPython.display as ipd
 import librosa
@@ -222,6 +222,14 @@ def load_tensor_from_file(filepath: str) -> Tuple[torch.Tensor, str]:
     return torch.tensor(frame), name
 
 
+def write_tensor_to_file(tensor: torch.Tensor, filepath: str):
+    """
+    Write the values of a torch.Tensor to file, one per line, in the format read by load_tensor_from_file
+    """
+    with open(filepath, "w", encoding='utf-8') as f:
+        f.write("".join(f"{value:.4f}\n" for value in tensor.tolist()))
+
+
 def generate_overlap_vad_seq(
     frame_pred_dir: str,
     smoothing_method: str,
@@ -291,8 +299,6 @@ def generate_overlap_vad_seq_per_tensor(
     See description in generate_overlap_vad_seq.
     Use this for single instance pipeline. 
     """
-    # This function will be refactor for vectorization but this is okay for now
-
     overlap = per_args['overlap']
     window_length_in_sec = per_args['window_length_in_sec']
     shift_length_in_sec = per_args['shift_length_in_sec']
@@ -315,35 +321,31 @@ def generate_overlap_vad_seq_per_tensor(
 
     target_len = int(len(frame) * shift)
 
-    if smoothing_method == 'mean':
-        preds = torch.zeros(target_len)
-        pred_count = torch.zeros(target_len)
+    # Every jump_on_frame-th frame prediction is spread over the seg target units of its window
+    window_idx = torch.arange(0, len(frame), jump_on_frame)
+    window_start = window_idx * shift
+    target_idx = window_start.unsqueeze(1) + torch.arange(seg).unsqueeze(0)
+    in_target = target_idx < target_len
+    window_pred = frame[window_idx].unsqueeze(1).expand(target_idx.shape)
 
-        for i, og_pred in enumerate(frame):
-            if i % jump_on_frame != 0:
-                continue
-            start = i * shift
-            end = start + seg
-            preds[start:end] = preds[start:end] + og_pred
-            pred_count[start:end] = pred_count[start:end] + 1
+    if smoothing_method == 'mean':
+        preds = torch.zeros(target_len, dtype=frame.dtype)
+        pred_count = torch.zeros(target_len, dtype=frame.dtype)
+        preds.index_add_(0, target_idx[in_target], window_pred[in_target])
+        pred_count.index_add_(0, target_idx[in_target], torch.ones_like(window_pred[in_target]))
 
         preds = preds / pred_count
         last_non_zero_pred = preds[pred_count != 0][-1]
         preds[pred_count == 0] = last_non_zero_pred
 
     elif smoothing_method == 'median':
-        preds = [torch.empty(0) for _ in range(target_len)]
-        for i, og_pred in enumerate(frame):
-            if i % jump_on_frame != 0:
-                continue
-
-            start = i * shift
-            end = start + seg
-            for j in range(start, end):
-                if j <= target_len - 1:
-                    preds[j] = torch.cat((preds[j], og_pred.unsqueeze(0)), 0)
-
-        preds = torch.stack([torch.nanquantile(l, q=0.5) for l in preds])
+        # Consecutive windows covering a target unit fall into different columns, the others are left to nan
+        num_columns = (seg + jump_on_frame * shift - 1) // (jump_on_frame * shift)
+        column_idx = (torch.arange(len(window_idx)) % num_columns).unsqueeze(1).expand(target_idx.shape)
+        window_preds = torch.full([target_len, num_columns], float('nan'), dtype=frame.dtype)
+        window_preds[target_idx[in_target], column_idx[in_target]] = window_pred[in_target]
+
+        preds = torch.nanquantile(window_preds, q=0.5, dim=1)
         nan_idx = torch.isnan(preds)
         last_non_nan_pred = preds[~nan_idx][-1]
         preds[nan_idx] = last_non_nan_pred
@@ -371,13 +373,49 @@ def generate_overlap_vad_seq_per_file(frame_filepath: str, per_args: dict) -> st
     preds = generate_overlap_vad_seq_per_tensor(frame, per_args_float, smoothing_method)
 
     overlap_filepath = os.path.join(out_dir, name + "." + smoothing_method)
-    with open(overlap_filepath, "w", encoding='utf-8') as f:
-        for pred in preds:
-            f.write(f"{pred:.4f}\n")
+    write_tensor_to_file(preds, overlap_filepath)
 
     return overlap_filepath
 
 
+def generate_overlap_vad_seq_from_tensors(
+    frame_preds: Dict[str, torch.Tensor],
+    smoothing_method: str,
+    overlap: float,
+    window_length_in_sec: float,
+    shift_length_in_sec: float,
+    out_dir: Optional[str] = None,
+) -> Dict[str, torch.Tensor]:
+    """
+    In-memory variant of generate_overlap_vad_seq, smoothing the frame predictions of each audio file without
+    reading them from files.
+    Args:
+        frame_preds (dict): frame predictions of each audio file, keyed by the name of the file.
+        smoothing_method (str): median or mean smoothing filter.
+        overlap (float): amounts of overlap of adjacent windows.
+        window_length_in_sec (float): length of window for generating the frame.
+        shift_length_in_sec (float): amount of shift of window for generating the frame.
+        out_dir (str): if provided, directory where the generated predictions are also saved.
+    Returns:
+        overlap_preds (dict): generated predictions of each audio file.
+    """
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+
+    per_args = {
+        "overlap": float(overlap),
+        "window_length_in_sec": float(window_length_in_sec),
+        "shift_length_in_sec": float(shift_length_in_sec),
+    }
+    overlap_preds = {}
+    for name, frame in tqdm(frame_preds.items()):
+        overlap_preds[name] = generate_overlap_vad_seq_per_tensor(frame, per_args, smoothing_method)
+        if out_dir:
+            write_tensor_to_file(overlap_preds[name], os.path.join(out_dir, name + "." + smoothing_method))
+
+    return overlap_preds
+
+
 @torch.jit.script
 def merge_overlap_segment(segments: torch.Tensor) -> torch.Tensor:
     """
@@ -653,18 +691,24 @@ def generate_vad_segment_table_per_file(pred_filepath: str, per_args: dict) -> s
     preds = generate_vad_segment_table_per_tensor(sequence, per_args_float)
     save_name = name + ".txt"
     save_path = os.path.join(out_dir, save_name)
+    write_vad_segment_table(preds, save_path)
+
+    return save_path
+
 
-    if preds.shape == torch.Size([0]):
+def write_vad_segment_table(speech_segments: torch.Tensor, save_path: str):
+    """
+    Save the speech segments generated by generate_vad_segment_table_per_tensor in rttm-like format
+    """
+    if speech_segments.shape == torch.Size([0]):
         with open(save_path, "w", encoding='utf-8') as fp:
             fp.write(f"0 0 speech\n")
 
     else:
         with open(save_path, "w", encoding='utf-8') as fp:
-            for i in preds:
+            for i in speech_segments:
                 fp.write(f"{i[0]:.4f} {i[2]:.4f} speech\n")
 
-    return save_path
-
 
 def generate_vad_segment_table(
     vad_pred_dir: str, postprocessing_params: dict, frame_length_in_sec: float, num_workers: int, out_dir: str = None,
@@ -724,6 +768,32 @@ def generate_vad_segment_table_per_file_star(args):
     return generate_vad_segment_table_per_file(*args)
 
 
+def generate_vad_segment_table_from_tensors(
+    vad_preds: Dict[str, torch.Tensor], postprocessing_params: dict, frame_length_in_sec: float, out_dir: str,
+) -> str:
+    """
+    In-memory variant of generate_vad_segment_table, converting the frame level predictions of each audio file to
+    speech segments without reading them from files. The tables are saved in rttm-like format.
+    Args:
+        vad_preds (dict): frame level predictions of each audio file, keyed by the name of the file.
+        postprocessing_params (dict): dictionary of thresholds for prediction score. See details in binarization and filtering.
+        frame_length_in_sec (float): frame length.
+        out_dir (str): output dir of generated table/csv file.
+    Returns:
+        table_out_dir(str): directory of the generated table.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+
+    for name, sequence in tqdm(vad_preds.items()):
+        # prepare_gen_segment_table updates the thresholds in place for each sequence
+        per_args = {"frame_length_in_sec": frame_length_in_sec, "out_dir": out_dir, **postprocessing_params}
+        _, per_args_float = prepare_gen_segment_table(sequence, per_args)
+        speech_segments = generate_vad_segment_table_per_tensor(sequence, per_args_float)
+        write_vad_segment_table(speech_segments, os.path.join(out_dir, name + ".txt"))
+
+    return out_dir
+
+
 def vad_construct_pyannote_object_per_file(
     vad_table_filepath: str, groundtruth_RTTM_file: str
 ) -> Tuple[Annotation, Annotation]:
@@ -12,16 +12,19 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import array
 import collections
 import json
 import os
+from collections.abc import Sequence
 from itertools import combinations
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, Iterable, List, Optional, Union
 
+import numpy as np
 import pandas as pd
 
 from nemo.collections.asr.parts.utils.speaker_utils import get_rttm_speaker_index, rttm_to_labels
-from nemo.collections.common.parts.preprocessing import manifest, parsers
+from nemo.collections.common.parts.preprocessing import manifest, manifest_cache, parsers
 from nemo.utils import logging
 
 
@@ -31,6 +34,69 @@ class _Collection(collections.UserList):
     OUTPUT_TYPE = None  # Single element output type.
 
 
+class _ColumnarCollection(Sequence):
+    """Parsed and preprocessed data stored column-wise in flat arrays.
+
+    Every field is kept in a numpy array (numbers), a `StringPool` (strings) or a `RaggedArray` (variable-length
+    token sequences) instead of one Python object per entry. Only a handful of objects are allocated regardless of
+    the number of entries, so the memory touched by reference counting in forked dataloader workers stays flat.
+    Entries are materialized as `OUTPUT_TYPE` instances on access.
+    """
+
+    OUTPUT_TYPE = None  # Single element output type.
+
+    def __init__(self, columns: Dict[str, Any], index: np.ndarray):
+        """Instantiates the collection.
+
+        Args:
+            columns: Mapping from field name to column, all columns having the same number of rows.
+            index: Rows of the columns that are part of the collection, in collection order.
+        """
+        self._columns = columns
+        self._index = index
+
+    @staticmethod
+    def _filter_by_duration(
+        durations: np.ndarray,
+        valid: Optional[np.ndarray] = None,
+        min_duration: Optional[float] = None,
+        max_duration: Optional[float] = None,
+        max_number: Optional[int] = None,
+    ):
+        """Vectorized equivalent of the per-entry filters of the list-based collections.
+
+        Returns:
+            Tuple of the kept rows, the number of filtered entries and their total duration. Only the entries read
+            before reaching ``max_number`` are accounted as filtered.
+        """
+        keep = np.ones(len(durations), dtype=bool) if valid is None else np.asarray(valid).copy()
+        if min_duration is not None:
+            keep &= durations >= min_duration
+        if max_duration is not None:
+            keep &= durations <= max_duration
+
+        index = np.flatnonzero(keep)
+        num_seen = len(keep)
+        if max_number and len(index) > max_number:
+            index = index[:max_number]
+            num_seen = index[-1] + 1
+        filtered = ~keep[:num_seen]
+        return index, int(np.count_nonzero(filtered)), float(durations[:num_seen][filtered].sum())
+
+    def _get_row(self, row: int):
+        """Builds the `OUTPUT_TYPE` entry stored at ``row`` of the columns."""
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+
+        return self._get_row(int(self._index[idx]))
+
+
 class Text(_Collection):
     """Simple list of preprocessed text entries, result in list of tokens."""
 
@@ -153,24 +219,11 @@ class AudioText(_Collection):
                 num_filtered += 1
                 continue
 
-            if token_labels is not None:
-                text_tokens = token_labels
-            else:
-                if text != '':
-                    if hasattr(parser, "is_aggregate") and parser.is_aggregate:
-                        if lang is not None:
-                            text_tokens = parser(text, lang)
-                        else:
-                            raise ValueError("lang required in manifest when using aggregate tokenizers")
-                    else:
-                        text_tokens = parser(text)
-                else:
-                    text_tokens = []
-
-                if text_tokens is None:
-                    duration_filtered += duration
-                    num_filtered += 1
-                    continue
+            text_tokens = self.tokenize(parser, text, token_labels, lang)
+            if text_tokens is None:
+                duration_filtered += duration
+                num_filtered += 1
+                continue
 
             total_duration += duration
 
@@ -196,17 +249,47 @@ class AudioText(_Collection):
 
         super().__init__(data)
 
+    @staticmethod
+    def tokenize(
+        parser: parsers.CharParser, text: str, token_labels: Optional[List[int]], lang: Optional[str]
+    ) -> Optional[List[int]]:
+        """Converts a transcript to tokens, or returns None if the parser failed to parse it."""
+        if token_labels is not None:
+            return token_labels
+
+        if text == '':
+            return []
+
+        if hasattr(parser, "is_aggregate") and parser.is_aggregate:
+            if lang is not None:
+                return parser(text, lang)
+            else:
+                raise ValueError("lang required in manifest when using aggregate tokenizers")
+
+        return parser(text)
+
 
 class ASRAudioText(AudioText):
     """`AudioText` collector from asr structured json files."""
 
-    def __init__(self, manifests_files: Union[str, List[str]], *args, **kwargs):
+    def __init__(
+        self,
+        manifests_files: Union[str, List[str]],
+        *args,
+        num_workers: int = 0,
+        check_audio_exists: bool = True,
+        json_backend: str = 'json',
+        **kwargs,
+    ):
         """Parse lists of audio files, durations and transcripts texts.
 
         Args:
             manifests_files: Either single string file or list of such -
                 manifests to yield items from.
             *args: Args to pass to `AudioText` constructor.
+            num_workers: Number of processes used to parse the manifests, 0 to parse them in this process.
+            check_audio_exists: If False, skips probing the file system to resolve relative audio paths.
+            json_backend: Json decoder used to parse manifest lines, either 'json' or 'orjson'.
             **kwargs: Kwargs to pass to `AudioText` constructor.
         """
 
@@ -218,7 +301,9 @@ class ASRAudioText(AudioText):
             [],
         )
         speakers, orig_srs, token_labels, langs = [], [], [], []
-        for item in manifest.item_iter(manifests_files):
+        for item in manifest.item_iter(
+            manifests_files, num_workers=num_workers, check_audio_exists=check_audio_exists, json_backend=json_backend
+        ):
             ids.append(item['id'])
             audio_files.append(item['audio_file'])
             durations.append(item['duration'])
@@ -233,6 +318,179 @@ class ASRAudioText(AudioText):
         )
 
 
+class ColumnarASRAudioText(_ColumnarCollection):
+    """`AudioText` collector from asr structured json files, stored column-wise.
+
+    Durations and offsets are kept in numpy arrays, audio paths and transcripts in string pools and tokens in one
+    flat int array plus offsets. When ``cache_dir`` is set, the columns are additionally stored on disk on the first
+    use and loaded memory-mapped afterwards - including by other ranks and other nodes sharing the file system - so
+    startup does not depend on the manifest size. The cache is invalidated when the size or modification time of
+    any manifest, or the identity of the parser, changes.
+
+    Duration / number filters and sorting are applied on top of the columns, so the same cache can be shared by
+    datasets with different filtering settings.
+    """
+
+    OUTPUT_TYPE = AudioText.OUTPUT_TYPE
+
+    def __init__(
+        self,
+        manifests_files: Union[str, List[str]],
+        parser: parsers.CharParser,
+        min_duration: Optional[float] = None,
+        max_duration: Optional[float] = None,
+        max_number: Optional[int] = None,
+        do_sort_by_duration: bool = False,
+        index_by_file_id: bool = False,
+        cache_dir: Optional[str] = None,
+        num_workers: int = 0,
+        check_audio_exists: bool = True,
+        json_backend: str = 'json',
+    ):
+        """Parses the manifests into columns (or loads them from the cache) and applies the filters.
+
+        Args:
+            manifests_files: Either single string file or list of such -
+                manifests to yield items from.
+            parser: Instance of `CharParser` to convert string to tokens.
+            min_duration: Minimum duration to keep entry with (default: None).
+            max_duration: Maximum duration to keep entry with (default: None).
+            max_number: Maximum number of samples to collect.
+            do_sort_by_duration: True if sort samples list by duration. Not compatible with index_by_file_id.
+            index_by_file_id: If True, saves a mapping from filename base (ID) to index in data.
+            cache_dir: Directory in which the columns are cached. If None, the columns are only kept in memory.
+            num_workers: Number of processes used to parse the manifests.
+            check_audio_exists: If False, skips probing the file system to resolve relative audio paths.
+            json_backend: Json decoder used to parse manifest lines, either 'json' or 'orjson'.
+        """
+
+        def parse():
+            items = manifest.item_iter(
+                manifests_files,
+                num_workers=num_workers,
+                check_audio_exists=check_audio_exists,
+                json_backend=json_backend,
+            )
+            return self._build_columns(items, parser)
+
+        if cache_dir is None:
+            columns = parse()
+        else:
+            cache = manifest_cache.ManifestCache(
+                cache_dir=cache_dir,
+                manifests_files=manifests_files,
+                parser=parser,
+                key={'check_audio_exists': check_audio_exists},
+            )
+            if not cache.exists() and cache.acquire():
+                try:
+                    logging.info(f"Building manifest cache at {cache.path}")
+                    cache.save(parse())
+                finally:
+                    cache.release()
+            columns, _ = cache.load()
+
+        durations = columns['duration']
+        index, num_filtered, duration_filtered = self._filter_by_duration(
+            durations, columns['valid'], min_duration, max_duration, max_number
+        )
+        total_duration = float(durations[index].sum())
+
+        if do_sort_by_duration:
+            if index_by_file_id:
+                logging.warning("Tried to sort dataset by duration, but cannot since index_by_file_id is set.")
+            else:
+                index = index[np.argsort(durations[index], kind='stable')]
+
+        if index_by_file_id:
+            self.mapping = {}
+            audio_files = columns['audio_file']
+            for idx, row in enumerate(index):
+                file_id, _ = os.path.splitext(os.path.basename(audio_files[row]))
+                if file_id not in self.mapping:
+                    self.mapping[file_id] = []
+                self.mapping[file_id].append(idx)
+
+        logging.info("Dataset loaded with %d files totalling %.2f hours", len(index), total_duration / 3600)
+        logging.info("%d files were filtered totalling %.2f hours", num_filtered, duration_filtered / 3600)
+
+        super().__init__(columns, index)
+
+    @staticmethod
+    def _build_columns(items: Iterable[Dict[str, Any]], parser: parsers.CharParser) -> Dict[str, Any]:
+        """Tokenizes every parsed manifest item into columns, without applying any filter."""
+        durations, offsets, valid = array.array('d'), array.array('d'), array.array('b')
+        audio_files, texts, langs = (
+            manifest_cache.StringPoolBuilder(),
+            manifest_cache.StringPoolBuilder(),
+            manifest_cache.StringPoolBuilder(),
+        )
+        # Speakers and original sampling rates may be of any json type, so they are stored json-encoded.
+        speakers, orig_srs = manifest_cache.StringPoolBuilder(), manifest_cache.StringPoolBuilder()
+        tokens = manifest_cache.RaggedArrayBuilder()
+
+        for item in items:
+            text_tokens = AudioText.tokenize(parser, item['text'], item['token_labels'], item['lang'])
+
+            durations.append(item['duration'])
+            offsets.append(item['offset'] if item['offset'] is not None else np.nan)
+            valid.append(text_tokens is not None)
+            audio_files.append(item['audio_file'])
+            texts.append(item['text'])
+            langs.append(item['lang'])
+            speakers.append(json.dumps(item['speaker']))
+            orig_srs.append(json.dumps(item['orig_sr']))
+            tokens.append(text_tokens if text_tokens is not None else [])
+
+        return dict(
+            duration=np.frombuffer(durations, dtype=np.float64),
+            offset=np.frombuffer(offsets, dtype=np.float64),
+            valid=np.frombuffer(valid, dtype=np.int8).astype(bool),
+            audio_file=audio_files.build(),
+            text=texts.build(),
+            lang=langs.build(),
+            speaker=speakers.build(),
+            orig_sr=orig_srs.build(),
+            text_tokens=tokens.build(),
+        )
+
+    @property
+    def durations(self) -> np.ndarray:
+        """Durations of the entries of the collection, in collection order."""
+        return self._columns['duration'][self._index]
+
+    def _get_row(self, row: int):
+        columns = self._columns
+        offset = float(columns['offset'][row])
+        return self.OUTPUT_TYPE(
+            row,
+            columns['audio_file'][row],
+            float(columns['duration'][row]),
+            columns['text_tokens'][row],
+            None if np.isnan(offset) else offset,
+            columns['text'][row],
+            json.loads(columns['speaker'][row]),
+            json.loads(columns['orig_sr'][row]),
+            columns['lang'][row],
+        )
+
+
+class CachedASRAudioText(ColumnarASRAudioText):
+    """`ColumnarASRAudioText` whose columns are always backed by an on-disk memory-mapped cache."""
+
+    def __init__(self, manifests_files: Union[str, List[str]], parser: parsers.CharParser, cache_dir: str, **kwargs):
+        """Loads (or builds) the cached manifest columns and applies the filters.
+
+        Args:
+            manifests_files: Either single string file or list of such -
+                manifests to yield items from.
+            parser: Instance of `CharParser` to convert string to tokens.
+            cache_dir: Directory in which the columnar cache is stored.
+            **kwargs: Kwargs to pass to `ColumnarASRAudioText` constructor.
+        """
+        super().__init__(manifests_files, parser, cache_dir=cache_dir, **kwargs)
+
+
 class SpeechLabel(_Collection):
     """List of audio-label correspondence with preprocessing."""
 
@@ -318,7 +576,7 @@ class ASRSpeechLabel(SpeechLabel):
         """
         audio_files, durations, labels, offsets = [], [], [], []
 
-        for item in manifest.item_iter(manifests_files, parse_func=self.__parse_item):
+        for item in manifest.item_iter(manifests_files, parse_func=self._parse_item):
             audio_files.append(item['audio_file'])
             durations.append(item['duration'])
             if not is_regression_task:
@@ -330,7 +588,8 @@ class ASRSpeechLabel(SpeechLabel):
 
         super().__init__(audio_files, durations, labels, offsets, *args, **kwargs)
 
-    def __parse_item(self, line: str, manifest_file: str) -> Dict[str, Any]:
+    @staticmethod
+    def _parse_item(line: str, manifest_file: str) -> Dict[str, Any]:
         item = json.loads(line)
 
         # Audio file
@@ -368,6 +627,101 @@ class ASRSpeechLabel(SpeechLabel):
         return item
 
 
+class ColumnarASRSpeechLabel(_ColumnarCollection):
+    """`ASRSpeechLabel` equivalent storing the entries column-wise.
+
+    Audio paths are kept in a string pool, durations and offsets in numpy arrays and labels either as codes into the
+    list of distinct labels (classification) or as floats (regression).
+    """
+
+    OUTPUT_TYPE = SpeechLabel.OUTPUT_TYPE
+
+    def __init__(
+        self,
+        manifests_files: Union[str, List[str]],
+        is_regression_task: bool = False,
+        min_duration: Optional[float] = None,
+        max_duration: Optional[float] = None,
+        max_number: Optional[int] = None,
+        do_sort_by_duration: bool = False,
+        index_by_file_id: bool = False,
+        num_workers: int = 0,
+    ):
+        """Parse lists of audio files, durations and labels into columns and applies the filters.
+
+        Args:
+            manifests_files: Either single string file or list of such -
+                manifests to yield items from.
+            is_regression_task: It's a regression task
+            min_duration: Minimum duration to keep entry with (default: None).
+            max_duration: Maximum duration to keep entry with (default: None).
+            max_number: Maximum number of samples to collect.
+            do_sort_by_duration: True if sort samples list by duration.
+            index_by_file_id: If True, saves a mapping from filename base (ID) to index in data.
+            num_workers: Number of processes used to parse the manifests.
+        """
+        durations, offsets = array.array('d'), array.array('d')
+        labels = array.array('d' if is_regression_task else 'i')
+        audio_files = manifest_cache.StringPoolBuilder()
+        label_codes = {}
+
+        for item in manifest.item_iter(
+            manifests_files, parse_func=ASRSpeechLabel._parse_item, num_workers=num_workers
+        ):
+            audio_files.append(item['audio_file'])
+            durations.append(item['duration'])
+            offsets.append(item['offset'] if item['offset'] is not None else np.nan)
+            if is_regression_task:
+                labels.append(float(item['label']))
+            else:
+                labels.append(label_codes.setdefault(item['label'], len(label_codes)))
+
+        columns = dict(
+            audio_file=audio_files.build(),
+            duration=np.frombuffer(durations, dtype=np.float64),
+            offset=np.frombuffer(offsets, dtype=np.float64),
+            label=np.frombuffer(labels, dtype=np.float64 if is_regression_task else np.int32),
+        )
+        self._label_values = None if is_regression_task else list(label_codes)
+
+        index, _, duration_filtered = self._filter_by_duration(
+            columns['duration'], min_duration=min_duration, max_duration=max_duration, max_number=max_number
+        )
+
+        if index_by_file_id:
+            self.mapping = {}
+            for idx, row in enumerate(index):
+                file_id, _ = os.path.splitext(os.path.basename(columns['audio_file'][row]))
+                self.mapping[file_id] = idx
+
+        if do_sort_by_duration:
+            if index_by_file_id:
+                logging.warning("Tried to sort dataset by duration, but cannot since index_by_file_id is set.")
+            else:
+                index = index[np.argsort(columns['duration'][index], kind='stable')]
+
+        logging.info(
+            "Filtered duration for loading collection is %f.", duration_filtered,
+        )
+        kept_labels = np.unique(columns['label'][index])
+        if is_regression_task:
+            self.uniq_labels = kept_labels.tolist()
+        else:
+            self.uniq_labels = sorted(self._label_values[code] for code in kept_labels)
+        logging.info("# {} files loaded accounting to # {} labels".format(len(index), len(self.uniq_labels)))
+
+        super().__init__(columns, index)
+
+    def _get_row(self, row: int):
+        columns = self._columns
+        label = columns['label'][row]
+        label = float(label) if self._label_values is None else self._label_values[label]
+        offset = float(columns['offset'][row])
+        return self.OUTPUT_TYPE(
+            columns['audio_file'][row], float(columns['duration'][row]), label, None if np.isnan(offset) else offset,
+        )
+
+
 class FeatureSequenceLabel(_Collection):
     """List of feature sequence of label correspondence with preprocessing."""
 
@@ -421,7 +775,8 @@ class FeatureSequenceLabel(_Collection):
         logging.info("# {} files loaded including # {} unique labels".format(len(data), len(self.uniq_labels)))
         super().__init__(data)
 
-    def relative_speaker_parser(self, seq_label):
+    @staticmethod
+    def relative_speaker_parser(seq_label):
         """Convert sequence of speaker labels to relative labels.
         Convert sequence of absolute speaker to sequence of relative speaker [E A C A E E C] -> [0 1 2 1 0 0 2]
         In this seq of label , if label do not appear before, assign new relative labels len(pos); else reuse previous assigned relative labels.
@@ -472,7 +827,8 @@ class ASRFeatureSequenceLabel(FeatureSequenceLabel):
 
         super().__init__(feature_files, seq_labels, max_number, index_by_file_id)
 
-    def _parse_item(self, line: str, manifest_file: str) -> Dict[str, Any]:
+    @staticmethod
+    def _parse_item(line: str, manifest_file: str) -> Dict[str, Any]:
         item = json.loads(line)
 
         # Feature file
@@ -499,6 +855,64 @@ class ASRFeatureSequenceLabel(FeatureSequenceLabel):
         return item
 
 
+class ColumnarASRFeatureSequenceLabel(_ColumnarCollection):
+    """`ASRFeatureSequenceLabel` equivalent storing the entries column-wise.
+
+    Feature paths are kept in a string pool and the relative label sequences in one flat int array plus offsets.
+    """
+
+    OUTPUT_TYPE = FeatureSequenceLabel.OUTPUT_TYPE
+
+    def __init__(
+        self,
+        manifests_files: Union[str, List[str]],
+        max_number: Optional[int] = None,
+        index_by_file_id: bool = False,
+        num_workers: int = 0,
+    ):
+        """Parse lists of feature files and sequences of labels into columns.
+
+        Args:
+            manifests_files: Either single string file or list of such -
+                manifests to yield items from.
+            max_number: Maximum number of samples to collect.
+            index_by_file_id: If True, saves a mapping from feature file to index in data.
+            num_workers: Number of processes used to parse the manifests.
+        """
+        feature_files = manifest_cache.StringPoolBuilder()
+        seq_labels = manifest_cache.RaggedArrayBuilder()
+        self.uniq_labels = set()
+
+        if index_by_file_id:
+            self.mapping = {}
+
+        items = manifest.item_iter(
+            manifests_files, parse_func=ASRFeatureSequenceLabel._parse_item, num_workers=num_workers
+        )
+        for idx, item in enumerate(items):
+            label_tokens, uniq_labels_in_seq = FeatureSequenceLabel.relative_speaker_parser(item['seq_label'])
+
+            feature_files.append(item['feature_file'])
+            seq_labels.append(label_tokens)
+            self.uniq_labels |= uniq_labels_in_seq
+
+            if index_by_file_id:
+                self.mapping[item['feature_file']] = idx
+
+            # Max number of entities filter.
+            if idx + 1 == max_number:
+                break
+
+        columns = dict(feature_file=feature_files.build(), seq_label=seq_labels.build())
+        index = np.arange(len(columns['feature_file']))
+        logging.info("# {} files loaded including # {} unique labels".format(len(index), len(self.uniq_labels)))
+
+        super().__init__(columns, index)
+
+    def _get_row(self, row: int):
+        return self.OUTPUT_TYPE(self._columns['feature_file'][row], self._columns['seq_label'][row])
+
+
 class DiarizationLabel(_Collection):
     """List of diarization audio-label correspondence with preprocessing."""
 
@@ -13,9 +13,22 @@
 # limitations under the License.
 
 import json
+import multiprocessing
+import os
+from functools import partial
 from os.path import expanduser
 from pathlib import Path
-from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+try:
+    import orjson
+
+    HAVE_ORJSON = True
+except (ImportError, ModuleNotFoundError):
+    HAVE_ORJSON = False
+
+# Default size of the byte ranges which are parsed by a single worker in parallel mode.
+DEFAULT_CHUNK_SIZE = 16 * 1024 * 1024
 
 
 class ManifestBase:
@@ -33,7 +46,12 @@ class ManifestEN:
 
 
 def item_iter(
-    manifests_files: Union[str, List[str]], parse_func: Callable[[str, Optional[str]], Dict[str, Any]] = None
+    manifests_files: Union[str, List[str]],
+    parse_func: Callable[[str, Optional[str]], Dict[str, Any]] = None,
+    num_workers: int = 0,
+    check_audio_exists: bool = True,
+    json_backend: str = 'json',
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
 ) -> Iterator[Dict[str, Any]]:
     """Iterate through json lines of provided manifests.
 
@@ -44,6 +62,11 @@ def item_iter(
     string. Offset also could be additional field and is set to None by
     default.
 
+    With ``num_workers > 0``, every manifest is split into byte ranges of about
+    ``chunk_size`` bytes (aligned to line boundaries) which are parsed in a
+    process pool. Chunks are yielded in file order, so the ``id`` assigned to
+    every item is the same as in sequential mode.
+
     Args:
         manifests_files: Either single string file or list of such -
             manifests to yield items from.
@@ -51,6 +74,20 @@ def item_iter(
         parse_func: A callable function which accepts as input a single line
             of a manifest and optionally the manifest file itself,
             and parses it, returning a dictionary mapping from str -> Any.
+            Must be picklable if ``num_workers > 0``.
+
+        num_workers: Number of worker processes used to parse the manifests.
+            0 (default) parses in the calling process.
+
+        check_audio_exists: Only used by the default parser. If False, audio
+            paths are used as given and relative paths are not probed for
+            existence and resolved against the manifest directory. Skipping
+            the probe is much faster on network file systems. Defaults to True.
+
+        json_backend: Only used by the default parser. Either 'json' (default)
+            or 'orjson', which is considerably faster if installed.
+
+        chunk_size: Approximate number of bytes parsed by a worker at once.
 
     Yields:
         Parsed key to value item dicts.
@@ -63,21 +100,97 @@ def item_iter(
         manifests_files = [manifests_files]
 
     if parse_func is None:
-        parse_func = __parse_item
+        parse_func = partial(
+            __parse_item, check_audio_exists=check_audio_exists, json_loads=get_json_loads(json_backend)
+        )
+
+    if num_workers > 0:
+        items = _parallel_item_iter(manifests_files, parse_func, num_workers, chunk_size)
+    else:
+        items = _sequential_item_iter(manifests_files, parse_func)
 
     k = -1
+    for item in items:
+        k += 1
+        item['id'] = k
+
+        yield item
+
+
+def get_json_loads(json_backend: str) -> Callable[[Union[str, bytes]], Any]:
+    """Returns the json decoding function of the given backend."""
+    if json_backend == 'json':
+        return json.loads
+    elif json_backend == 'orjson':
+        if not HAVE_ORJSON:
+            raise ModuleNotFoundError("json_backend='orjson' requires the `orjson` package to be installed.")
+        return orjson.loads
+    else:
+        raise ValueError(f"Unsupported json backend: {json_backend}. Supported backends are 'json' and 'orjson'.")
+
+
+def _sequential_item_iter(manifests_files: List[str], parse_func: Callable) -> Iterator[Dict[str, Any]]:
     for manifest_file in manifests_files:
         with open(expanduser(manifest_file), 'r') as f:
             for line in f:
-                k += 1
-                item = parse_func(line, manifest_file)
-                item['id'] = k
+                yield parse_func(line, manifest_file)
+
+
+def _split_manifest(manifest_file: str, chunk_size: int) -> List[Tuple[str, int, int]]:
+    """Splits a manifest file into byte ranges of about `chunk_size` bytes."""
+    file_size = os.path.getsize(expanduser(manifest_file))
+    return [(manifest_file, start, min(start + chunk_size, file_size)) for start in range(0, file_size, chunk_size)]
+
+
+# Parse function of the worker processes, set once per worker by `_init_parse_worker`
+# instead of being pickled together with every chunk.
+_worker_parse_func = None
+
+
+def _init_parse_worker(parse_func: Callable):
+    global _worker_parse_func
+    _worker_parse_func = parse_func
+
+
+def _parse_chunk(chunk: Tuple[str, int, int]) -> List[Dict[str, Any]]:
+    """Parses all lines which start inside the byte range [start, end) of the manifest.
+
+    A line crossing the start of the range belongs to the previous range, so the
+    reading starts after the first newline preceding `start`.
+    """
+    manifest_file, start, end = chunk
+    items = []
+    with open(expanduser(manifest_file), 'rb') as f:
+        if start > 0:
+            f.seek(start - 1)
+            f.readline()
+        pos = f.tell()
+        while pos < end:
+            line = f.readline()
+            if not line:
+                break
+            pos += len(line)
+            items.append(_worker_parse_func(line.decode('utf-8'), manifest_file))
+    return items
+
+
+def _parallel_item_iter(
+    manifests_files: List[str], parse_func: Callable, num_workers: int, chunk_size: int
+) -> Iterator[Dict[str, Any]]:
+    chunks = []
+    for manifest_file in manifests_files:
+        chunks.extend(_split_manifest(manifest_file, chunk_size))
 
-                yield item
+    with multiprocessing.Pool(num_workers, initializer=_init_parse_worker, initargs=(parse_func,)) as pool:
+        # imap preserves the order of the chunks, and so the global order of the items.
+        for items in pool.imap(_parse_chunk, chunks):
+            yield from items
 
 
-def __parse_item(line: str, manifest_file: str) -> Dict[str, Any]:
-    item = json.loads(line)
+def __parse_item(
+    line: str, manifest_file: str, check_audio_exists: bool = True, json_loads: Callable = json.loads
+) -> Dict[str, Any]:
+    item = json_loads(line)
 
     # Audio file
     if 'audio_filename' in item:
@@ -93,9 +206,15 @@ def __parse_item(line: str, manifest_file: str) -> Dict[str, Any]:
     # try to attach the parent directory of manifest to the audio path.
     # Revert to the original path if the new path still doesn't exist.
     # Assume that the audio path is like "wavs/xxxxxx.wav".
+    # The file system probing is skipped if `check_audio_exists` is False.
     manifest_dir = Path(manifest_file).parent
     audio_file = Path(item['audio_file'])
-    if (len(str(audio_file)) < 255) and not audio_file.is_file() and not audio_file.is_absolute():
+    if (
+        check_audio_exists
+        and (len(str(audio_file)) < 255)
+        and not audio_file.is_file()
+        and not audio_file.is_absolute()
+    ):
         # assume the "wavs/" dir and manifest are under the same parent dir
         audio_file = manifest_dir / audio_file
         if audio_file.is_file():
@@ -0,0 +1,414 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Columnar, memory-mapped storage for parsed manifests.
+
+Parsing a large manifest (json decoding, path resolution and tokenization of every transcript) is expensive and is
+repeated by every rank of every job. The helpers in this file allow to store the result of that parsing once as a set
+of flat numpy arrays on disk, and to load them back with ``mmap_mode='r'`` so that all processes on a node share the
+same pages of the OS page cache instead of holding private copies of per-row python objects.
+"""
+
+import array
+import hashlib
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from os.path import expanduser
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+import numpy as np
+
+from nemo.utils import logging
+
+__all__ = [
+    'StringPool',
+    'StringPoolBuilder',
+    'RaggedArray',
+    'RaggedArrayBuilder',
+    'ManifestCache',
+    'get_manifest_fingerprint',
+    'get_parser_fingerprint',
+]
+
+# Bump whenever the on-disk layout or the content of the cached columns changes.
+MANIFEST_CACHE_VERSION = 1
+
+
+class StringPool:
+    """Immutable sequence of optional strings stored as one flat utf-8 buffer plus offsets.
+
+    Args:
+        data: uint8 array with the concatenated utf-8 encoded strings.
+        offsets: int64 array of size ``len + 1``; string ``i`` is ``data[offsets[i]:offsets[i + 1]]``.
+        nulls: Optional bool array marking entries which are None.
+    """
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray, nulls: Optional[np.ndarray] = None):
+        self.data = data
+        self.offsets = offsets
+        self.nulls = nulls
+
+    @classmethod
+    def from_list(cls, strings: Iterable[Optional[str]]) -> 'StringPool':
+        builder = StringPoolBuilder()
+        for string in strings:
+            builder.append(string)
+        return builder.build()
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx: int) -> Optional[str]:
+        if self.nulls is not None and self.nulls[idx]:
+            return None
+        return bytes(self.data[self.offsets[idx] : self.offsets[idx + 1]]).decode('utf-8')
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+
+class StringPoolBuilder:
+    """Incrementally collects strings for a `StringPool` without keeping python objects alive."""
+
+    def __init__(self):
+        self._data = bytearray()
+        self._offsets = array.array('q', [0])
+        self._nulls = array.array('b')
+        self._has_nulls = False
+
+    def append(self, string: Optional[str]):
+        if string is None:
+            self._has_nulls = True
+            self._nulls.append(1)
+        else:
+            self._data += string.encode('utf-8')
+            self._nulls.append(0)
+        self._offsets.append(len(self._data))
+
+    def __len__(self) -> int:
+        return len(self._nulls)
+
+    def build(self) -> StringPool:
+        data = np.frombuffer(bytes(self._data), dtype=np.uint8)
+        offsets = np.frombuffer(self._offsets, dtype=np.int64).copy()
+        nulls = np.frombuffer(self._nulls, dtype=np.int8).astype(bool) if self._has_nulls else None
+        return StringPool(data, offsets, nulls)
+
+
+class RaggedArray:
+    """Immutable sequence of variable length integer lists stored as one flat array plus offsets.
+
+    Args:
+        values: Flat array with the concatenated rows.
+        offsets: int64 array of size ``len + 1``; row ``i`` is ``values[offsets[i]:offsets[i + 1]]``.
+    """
+
+    def __init__(self, values: np.ndarray, offsets: np.ndarray):
+        self.values = values
+        self.offsets = offsets
+
+    @classmethod
+    def from_list(cls, rows: Iterable[List[int]], typecode: str = 'i') -> 'RaggedArray':
+        builder = RaggedArrayBuilder(typecode=typecode)
+        for row in rows:
+            builder.append(row)
+        return builder.build()
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx: int) -> List[int]:
+        return self.values[self.offsets[idx] : self.offsets[idx + 1]].tolist()
+
+    def lengths(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+
+class RaggedArrayBuilder:
+    """Incrementally collects integer rows for a `RaggedArray`.
+
+    Args:
+        typecode: `array` typecode of the stored values, int32 by default.
+    """
+
+    def __init__(self, typecode: str = 'i'):
+        self._values = array.array(typecode)
+        self._offsets = array.array('q', [0])
+
+    def append(self, row: Iterable[int]):
+        self._values.extend(row)
+        self._offsets.append(len(self._values))
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def build(self) -> RaggedArray:
+        values = np.frombuffer(self._values, dtype=np.dtype(self._values.typecode)).copy()
+        offsets = np.frombuffer(self._offsets, dtype=np.int64).copy()
+        return RaggedArray(values, offsets)
+
+
+Column = Union[np.ndarray, StringPool, RaggedArray]
+
+
+def get_manifest_fingerprint(manifests_files: Union[str, List[str]]) -> List[List[Any]]:
+    """Describes the manifest files by absolute path, size and modification time.
+
+    Any change to a manifest file changes its size or mtime, which invalidates caches built from it.
+    """
+    if isinstance(manifests_files, str):
+        manifests_files = [manifests_files]
+
+    fingerprint = []
+    for manifest_file in manifests_files:
+        manifest_file = os.path.abspath(expanduser(manifest_file))
+        stat = os.stat(manifest_file)
+        fingerprint.append([manifest_file, stat.st_size, stat.st_mtime_ns])
+    return fingerprint
+
+
+def get_parser_fingerprint(parser: Any) -> Dict[str, Any]:
+    """Describes the identity of a text parser or tokenizer wrapper.
+
+    For wrappers around a `TokenizerSpec` (which expose the tokenizer as ``_tokenizer``) the tokenizer class and
+    its vocabulary are used. For other parsers (e.g. `CharParser`) the class and all of its simple attributes
+    (labels, unk/blank ids, normalization flags) are used.
+    """
+    tokenizer = getattr(parser, '_tokenizer', None)
+    if tokenizer is not None:
+        fingerprint = {'tokenizer': type(tokenizer).__qualname__}
+        try:
+            fingerprint['vocab'] = list(tokenizer.vocab)
+        except (AttributeError, NotImplementedError, TypeError):
+            fingerprint['vocab_size'] = getattr(tokenizer, 'vocab_size', None)
+        return fingerprint
+
+    fingerprint = {'parser': type(parser).__qualname__}
+    for key, value in sorted(vars(parser).items()):
+        if value is None or isinstance(value, (str, int, float, bool)):
+            fingerprint[key] = value
+        elif isinstance(value, (list, tuple)) or type(value).__name__ == 'ListConfig':
+            fingerprint[key] = [str(v) for v in value]
+    return fingerprint
+
+
+class ManifestCache:
+    """On-disk cache of columns computed from a set of manifest files.
+
+    The cache lives in a sub-directory of ``cache_dir`` named after a hash of the manifest fingerprint (path, size,
+    mtime), the parser fingerprint and any extra ``key`` passed in by the caller. Every column is stored as one or
+    more ``.npy`` files and is loaded back memory-mapped.
+
+    Building is guarded by a lock file so that when many ranks start at the same time only one of them parses the
+    manifest while the others wait for the result. The lock file records the host and pid of its owner, whose
+    modification time is refreshed by a background thread while the cache is built. A lock whose owner died (on the
+    same host), or which was not refreshed for ``lock_stale_timeout`` seconds (e.g. its job was killed on another
+    node), is taken over by a waiting process. The cache directory is written to a temporary location first and
+    renamed into place, so a partially written cache is never visible to readers.
+
+    Args:
+        cache_dir: Directory in which caches are stored.
+        manifests_files: Either single string file or list of such - manifests the columns are computed from.
+        parser: Parser or tokenizer wrapper used to compute the cached tokens, or None.
+        key: Optional extra json-serializable data identifying the cached content.
+        wait_timeout: Number of seconds to wait for another process which builds the same cache before building
+            it in this process.
+        lock_stale_timeout: Number of seconds after which a lock file which is not refreshed by its owner is
+            considered stale.
+    """
+
+    META_FILE = 'meta.json'
+    LOCK_FILE = '.lock'
+
+    def __init__(
+        self,
+        cache_dir: str,
+        manifests_files: Union[str, List[str]],
+        parser: Any = None,
+        key: Any = None,
+        wait_timeout: float = 3600.0,
+        lock_stale_timeout: float = 60.0,
+    ):
+        self.cache_dir = expanduser(cache_dir)
+        self.wait_timeout = wait_timeout
+        self.lock_stale_timeout = lock_stale_timeout
+        self.fingerprint = {
+            'version': MANIFEST_CACHE_VERSION,
+            'manifests': get_manifest_fingerprint(manifests_files),
+            'parser': get_parser_fingerprint(parser) if parser is not None else None,
+            'key': key,
+        }
+        digest = hashlib.sha1(json.dumps(self.fingerprint, sort_keys=True, default=str).encode('utf-8'))
+        self.path = os.path.join(self.cache_dir, digest.hexdigest())
+        self.lock_file = self.path + self.LOCK_FILE
+        self._lock_owner = f'{socket.gethostname()} {os.getpid()}'
+        self._heartbeat = None
+        self._heartbeat_stop = threading.Event()
+
+    def exists(self) -> bool:
+        return os.path.isfile(os.path.join(self.path, self.META_FILE))
+
+    def acquire(self) -> bool:
+        """Tries to become the process which builds this cache.
+
+        Returns:
+            True if the lock was acquired and the caller should build and `save` the cache, then `release` the lock
+            (also when building fails), False if the cache was built by another process in the meantime and can be
+            loaded.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        start = time.time()
+        while not self.exists():
+            try:
+                fd = os.open(self.lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                if self._is_lock_stale():
+                    logging.warning(f"Taking over the stale lock of manifest cache {self.path}")
+                    self._remove_lock()
+                    continue
+                if time.time() - start > self.wait_timeout:
+                    logging.warning(f"Timed out waiting for manifest cache {self.path}, building it in this process.")
+                    return True
+                time.sleep(1.0)
+                continue
+
+            with os.fdopen(fd, 'w') as f:
+                f.write(self._lock_owner)
+            self._start_heartbeat()
+            return True
+        return False
+
+    def release(self):
+        """Releases the build lock taken by `acquire`. Does nothing if this process does not hold it."""
+        if self._heartbeat is not None:
+            self._heartbeat_stop.set()
+            self._heartbeat.join()
+            self._heartbeat = None
+        if self._read_lock_owner() == self._lock_owner:
+            self._remove_lock()
+
+    def _start_heartbeat(self):
+        """Refreshes the modification time of the lock file while this process holds it."""
+
+        def refresh():
+            while not self._heartbeat_stop.wait(self.lock_stale_timeout / 4):
+                try:
+                    os.utime(self.lock_file)
+                except OSError:
+                    return
+
+        self._heartbeat_stop.clear()
+        self._heartbeat = threading.Thread(target=refresh, name='manifest_cache_lock', daemon=True)
+        self._heartbeat.start()
+
+    def _read_lock_owner(self) -> Optional[str]:
+        try:
+            with open(self.lock_file, 'r') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _is_lock_stale(self) -> bool:
+        """Whether the owner of the lock file died, or has not refreshed it for ``lock_stale_timeout`` seconds."""
+        try:
+            age = time.time() - os.path.getmtime(self.lock_file)
+        except OSError:
+            return False
+        if age > self.lock_stale_timeout:
+            return True
+
+        # The owner may be checked directly when it runs on this host.
+        host, _, pid = (self._read_lock_owner() or '').rpartition(' ')
+        if host != socket.gethostname() or not pid.isdigit():
+            return False
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            pass
+        return False
+
+    def _remove_lock(self):
+        try:
+            os.remove(self.lock_file)
+        except FileNotFoundError:
+            pass
+
+    def save(self, columns: Dict[str, Column], meta: Optional[Dict[str, Any]] = None):
+        """Writes the columns atomically to the cache directory."""
+        tmp_dir = tempfile.mkdtemp(dir=self.cache_dir, prefix='.tmp_')
+        try:
+            kinds = {}
+            for name, column in columns.items():
+                if isinstance(column, StringPool):
+                    kinds[name] = 'string'
+                    np.save(os.path.join(tmp_dir, f'{name}.data.npy'), column.data)
+                    np.save(os.path.join(tmp_dir, f'{name}.offsets.npy'), column.offsets)
+                    if column.nulls is not None:
+                        np.save(os.path.join(tmp_dir, f'{name}.nulls.npy'), column.nulls)
+                elif isinstance(column, RaggedArray):
+                    kinds[name] = 'ragged'
+                    np.save(os.path.join(tmp_dir, f'{name}.values.npy'), column.values)
+                    np.save(os.path.join(tmp_dir, f'{name}.offsets.npy'), column.offsets)
+                else:
+                    kinds[name] = 'array'
+                    np.save(os.path.join(tmp_dir, f'{name}.npy'), np.asarray(column))
+
+            with open(os.path.join(tmp_dir, self.META_FILE), 'w') as f:
+                json.dump({'fingerprint': self.fingerprint, 'columns': kinds, 'meta': meta or {}}, f, default=str)
+
+            try:
+                os.rename(tmp_dir, self.path)
+            except OSError:
+                # Another process has published the same cache in the meantime.
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        logging.info(f"Saved manifest cache to {self.path}")
+
+    def load(self, mmap_mode: Optional[str] = 'r') -> (Dict[str, Column], Dict[str, Any]):
+        """Loads the cached columns.
+
+        Returns:
+            A tuple of the dict of columns and the user meta data passed to `save`.
+        """
+        with open(os.path.join(self.path, self.META_FILE), 'r') as f:
+            meta = json.load(f)
+
+        def _load(filename):
+            return np.load(os.path.join(self.path, filename), mmap_mode=mmap_mode)
+
+        columns = {}
+        for name, kind in meta['columns'].items():
+            if kind == 'string':
+                nulls_file = f'{name}.nulls.npy'
+                nulls = _load(nulls_file) if os.path.exists(os.path.join(self.path, nulls_file)) else None
+                columns[name] = StringPool(_load(f'{name}.data.npy'), _load(f'{name}.offsets.npy'), nulls)
+            elif kind == 'ragged':
+                columns[name] = RaggedArray(_load(f'{name}.values.npy'), _load(f'{name}.offsets.npy'))
+            else:
+                columns[name] = _load(f'{name}.npy')
+
+        logging.info(f"Loaded manifest cache from {self.path}")
+        return columns, meta['meta']
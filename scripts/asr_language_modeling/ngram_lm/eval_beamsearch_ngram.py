@@ -29,6 +29,11 @@
 #                                         --decoding_mode beamsearch_ngram
 #                                         ...
 #
+# The beam search decoder is the one of the ctc_decoders package (installed by install_beamsearch_decoders.sh) by
+# default. With '--beam_search_engine nemo', NeMo's built-in CTC prefix beam search is used instead, which needs no
+# external package. Its N-gram model is read from an ARPA file (e.g. written by KenLM's lmplz), given as
+# '--kenlm_model_file'. The time taken by each beam search decoding is logged, to compare the engines.
+#
 # You may find more info on how to use this script at:
 # https://docs.nvidia.com/deeplearning/nemo/user-guide/docs/en/main/asr/asr_language_modeling.html
 
@@ -41,6 +46,7 @@ import contextlib
 import json
 import os
 import pickle
+import time
 from pathlib import Path
 
 import editdistance
@@ -67,17 +73,28 @@ def beam_search_eval(
     beam_width=128,
     beam_batch_size=128,
     progress_bar=True,
+    beam_search_engine='ctc_decoders',
 ):
     # creating the beam search decoder
-    beam_search_lm = nemo_asr.modules.BeamSearchDecoderWithLM(
-        vocab=vocab,
-        beam_width=beam_width,
-        alpha=beam_alpha,
-        beta=beam_beta,
-        lm_path=lm_path,
-        num_cpus=max(os.cpu_count(), 1),
-        input_tensor=False,
-    )
+    if beam_search_engine == 'nemo':
+        beam_search_lm = nemo_asr.modules.CTCPrefixBeamSearchDecoderWithLM(
+            vocab=vocab,
+            beam_width=beam_width,
+            alpha=beam_alpha,
+            beta=beam_beta,
+            lm_path=lm_path,
+            num_cpus=max(os.cpu_count(), 1),
+        )
+    else:
+        beam_search_lm = nemo_asr.modules.BeamSearchDecoderWithLM(
+            vocab=vocab,
+            beam_width=beam_width,
+            alpha=beam_alpha,
+            beta=beam_beta,
+            lm_path=lm_path,
+            num_cpus=max(os.cpu_count(), 1),
+            input_tensor=False,
+        )
 
     wer_dist_first = cer_dist_first = 0
     wer_dist_best = cer_dist_best = 0
@@ -95,11 +112,20 @@ def beam_search_eval(
         )
     else:
         it = range(int(np.ceil(len(all_probs) / beam_batch_size)))
+    decoding_time = 0.0
     for batch_idx in it:
         # disabling type checking
         with nemo.core.typecheck.disable_checks():
             probs_batch = all_probs[batch_idx * beam_batch_size : (batch_idx + 1) * beam_batch_size]
-            beams_batch = beam_search_lm.forward(log_probs=probs_batch, log_probs_length=None,)
+            start_time = time.perf_counter()
+            if beam_search_engine == 'nemo':
+                # NeMo's beam search decodes log probabilities
+                beams_batch = beam_search_lm.forward(
+                    log_probs=[np.log(probs) for probs in probs_batch], log_probs_length=None
+                )
+            else:
+                beams_batch = beam_search_lm.forward(log_probs=probs_batch, log_probs_length=None,)
+            decoding_time += time.perf_counter() - start_time
 
         for beams_idx, beams in enumerate(beams_batch):
             target = target_transcripts[sample_idx + beams_idx]
@@ -155,6 +181,10 @@ def beam_search_eval(
             wer_dist_best / words_count, cer_dist_best / chars_count
         )
     )
+    logging.info(
+        f"Beam search decoding with the {beam_search_engine} engine took {decoding_time:.2f}s "
+        f"({len(all_probs) / decoding_time:.1f} samples/s)"
+    )
     logging.info(f"=================================================================================")
 
 
@@ -218,6 +248,14 @@ def main():
     parser.add_argument(
         "--beam_batch_size", default=128, type=int, help="The batch size to be used for beam search decoding"
     )
+    parser.add_argument(
+        "--beam_search_engine",
+        choices=["ctc_decoders", "nemo"],
+        default="ctc_decoders",
+        type=str,
+        help="The beam search decoder: the one of the ctc_decoders package, or NeMo's built-in CTC prefix beam search "
+        "which reads the N-gram model from an ARPA file",
+    )
     args = parser.parse_args()
 
     if args.nemo_model_file.endswith('.nemo'):
@@ -355,6 +393,7 @@ def main():
                 beam_beta=hp["beam_beta"],
                 beam_batch_size=args.beam_batch_size,
                 progress_bar=True,
+                beam_search_engine=args.beam_search_engine,
             )
 
 
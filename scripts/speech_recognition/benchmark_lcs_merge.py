@@ -0,0 +1,214 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Benchmarks the LCS merge of buffered RNNT inference (`--merge_algo=lcs`), comparing the previous pure Python
+implementation, the NumPy implementation merging one stream at a time, and the batched merge of all the streams.
+
+The buffers mimic the ones of `LongestCommonSubsequenceBatchedFrameASRRNNT`: the previous tokens are the last
+`lcs_delay * max_steps_per_timestep` tokens of the merged buffer, and the new tokens of a buffer start with a noisy copy
+of the tokens of the overlapping audio. The defaults correspond to 1.6 s chunks in 4 s buffers of a model with a stride
+of 40 ms, emitting 4 subword tokens per second.
+
+USAGE:
+    python benchmark_lcs_merge.py --num_streams 32 --total_buffer 4.0 --chunk_len 1.6 --tokens_per_sec 4
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from nemo.collections.asr.parts.utils.streaming_utils import (
+    MIN_MERGE_SUBSEQUENCE_LEN,
+    batched_longest_common_subsequence_merge,
+    longest_common_subsequence_merge,
+)
+
+
+def legacy_longest_common_subsequence_merge(X, Y):
+    """Previous pure Python implementation of `longest_common_subsequence_merge`, kept as the benchmark baseline."""
+    m = len(X)
+    n = len(Y)
+    LCSuff = [[0 for k in range(n + 1)] for l in range(m + 1)]
+
+    result = 0
+    result_idx = [0, 0, 0]
+
+    for i in range(m + 1):
+        for j in range(n + 1):
+            if i == 0 or j == 0:
+                LCSuff[i][j] = 0
+            elif X[i - 1] == Y[j - 1]:
+                LCSuff[i][j] = LCSuff[i - 1][j - 1] + 1
+
+                if result <= LCSuff[i][j]:
+                    result = LCSuff[i][j]
+                    result_idx = [i, j, result]
+
+            else:
+                LCSuff[i][j] = 0
+
+    i, j = result_idx[0:2]
+    is_complete_merge = i == m
+
+    if is_complete_merge:
+        length = result_idx[-1]
+
+        while length >= 0 and i > 0 and j > 0:
+            if LCSuff[i - 1][j - 1] > 0:
+                length -= 1
+                i, j = i - 1, j - 1
+
+            else:
+                i, j, length = i - 1, j - 1, length - 1
+                break
+
+    else:
+
+        max_j = 0
+        max_j_idx = n
+
+        i_partial = m
+        j_partial = -1
+        j_skip = 0
+        slice_count = 0
+
+        for i_idx in range(m, -1, -1):
+            for j_idx in range(0, n + 1):
+                if LCSuff[i_idx][j_idx] > max_j and j_idx <= max_j_idx:
+                    max_j = LCSuff[i_idx][j_idx]
+                    max_j_idx = j_idx
+
+                    i_partial = i_idx
+                    j_partial = j_idx
+
+        if max_j <= MIN_MERGE_SUBSEQUENCE_LEN:
+
+            i = i_partial
+            j = 0
+            result_idx[-1] = 0
+
+        else:
+
+            i_temp = i_partial + 1
+            j_temp = j_partial + 1
+
+            j_exp = 0
+            j_skip = 0
+
+            for i_idx in range(i_temp, m + 1):
+                j_any_skip = 0
+
+                for j_idx in range(j_temp, j_temp + j_skip + 1):
+                    if j_idx < n + 1:
+                        if LCSuff[i_idx][j_idx] == 0:
+                            j_any_skip = 1
+                        else:
+                            j_exp = 1 + j_skip + j_any_skip
+
+                j_skip += j_any_skip
+
+                j_temp += 1
+
+            j_skip = 0
+            j_partial += j_exp
+
+            while i_partial > 0 and j_partial > 0:
+                if LCSuff[i_partial][j_partial] == 0:
+                    j_partial -= 1
+                    j_skip += 1
+
+                if j_partial > 0:
+                    slice_count += 1
+                    i_partial -= 1
+                    j_partial -= 1
+
+            i = max(0, i_partial)
+            j = max(0, j_partial)
+            result_idx[-1] = slice_count + j_skip
+
+    result_idx[0] = i
+    result_idx[1] = j
+
+    return result_idx, LCSuff
+
+
+def make_buffers(args, rng):
+    """Previous and current token buffers of each stream."""
+    search_size = int(args.lcs_delay * args.max_steps_per_timestep)
+    overlap = int(round((args.total_buffer - args.chunk_len) * args.tokens_per_sec))
+    new_tokens = int(round(args.chunk_len * args.tokens_per_sec))
+    previous_len = min(search_size, int(round(args.history * args.tokens_per_sec)))
+
+    X, Y = [], []
+    for _ in range(args.num_streams):
+        previous = rng.randint(args.vocab_size, size=previous_len).tolist()
+        current = []
+        for token in previous[len(previous) - overlap :]:
+            draw = rng.rand()
+            if draw < args.noise:
+                current.append(int(rng.randint(args.vocab_size)))
+            elif draw >= 2 * args.noise:
+                current.append(token)
+        current += rng.randint(args.vocab_size, size=new_tokens).tolist()
+        X.append(previous)
+        Y.append(current)
+    return X, Y
+
+
+def time_fn(fn, num_iters):
+    fn()  # warmup
+    start = time.perf_counter()
+    for _ in range(num_iters):
+        fn()
+    return (time.perf_counter() - start) / num_iters
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the LCS merge of buffered RNNT inference")
+    parser.add_argument("--num_streams", type=int, default=32, help="Number of streams merged at each chunk")
+    parser.add_argument("--total_buffer", type=float, default=4.0, help="Buffer duration, in seconds")
+    parser.add_argument("--chunk_len", type=float, default=1.6, help="Chunk duration, in seconds")
+    parser.add_argument("--model_stride", type=float, default=0.04, help="Model stride, in seconds")
+    parser.add_argument("--tokens_per_sec", type=float, default=4.0, help="Tokens emitted per second of audio")
+    parser.add_argument("--history", type=float, default=60.0, help="Duration of the merged buffer, in seconds")
+    parser.add_argument("--max_steps_per_timestep", type=int, default=5)
+    parser.add_argument("--vocab_size", type=int, default=1024)
+    parser.add_argument("--noise", type=float, default=0.1, help="Probability of token substitutions and deletions")
+    parser.add_argument("--num_iters", type=int, default=20)
+    args = parser.parse_args()
+    args.lcs_delay = int((args.total_buffer - args.chunk_len) / args.model_stride)
+
+    X, Y = make_buffers(args, np.random.RandomState(0))
+    for x, y in zip(X, Y):
+        assert longest_common_subsequence_merge(x, y)[0] == legacy_longest_common_subsequence_merge(x, y)[0]
+
+    legacy_time = time_fn(
+        lambda: [legacy_longest_common_subsequence_merge(x, y) for x, y in zip(X, Y)], args.num_iters
+    )
+    numpy_time = time_fn(lambda: [longest_common_subsequence_merge(x, y) for x, y in zip(X, Y)], args.num_iters)
+    batched_time = time_fn(lambda: batched_longest_common_subsequence_merge(X, Y), args.num_iters)
+
+    print(
+        f"{args.num_streams} streams, {len(X[0])} previous tokens x {len(Y[0])} new tokens per stream "
+        f"(lcs_delay={args.lcs_delay})"
+    )
+    print(f"{'implementation':>14} {'ms/chunk':>9} {'speedup':>8}")
+    for name, merge_time in [('python', legacy_time), ('numpy', numpy_time), ('numpy batched', batched_time)]:
+        print(f"{name:>14} {merge_time * 1000:>9.2f} {legacy_time / merge_time:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
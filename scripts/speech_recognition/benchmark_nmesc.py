@@ -0,0 +1,105 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Benchmarks the NME analysis of speaker clustering (`NMESC.NMEanalysis`), comparing the evaluation of one p-value at a
+time with the batched evaluation of all the p-values (`batched_pvalue_search=True`).
+
+The affinity matrices are the multiscale cosine affinities of synthetic sessions with speaker turns of fixed length,
+at the scales of the diarization configs (1.5 s, 1.0 s and 0.5 s windows with a 50% shift). As in `COSclustering`,
+the matrices are subsampled to about `--NME_mat_size` segments before the analysis.
+
+USAGE:
+    python benchmark_nmesc.py --num_segments 200 500 1000 2000 5000 --sparse_search_volume 30
+"""
+
+import argparse
+import time
+
+import torch
+
+from nemo.collections.asr.parts.utils.nmesc_clustering import NMESC, getMultiScaleCosAffinityMatrix
+
+
+def make_session(num_segments, num_speakers, turn_len_in_sec, emb_dim=192, seed=0):
+    """Multiscale embeddings and time stamps of a session with `num_segments` base scale segments."""
+    generator = torch.Generator().manual_seed(seed)
+    centers = torch.randn(num_speakers, emb_dim, generator=generator)
+    session_len_in_sec = num_segments * 0.25 + 0.5
+    scale_dict = {}
+    for scale_idx, window in enumerate([1.5, 1.0, 0.5]):
+        starts = torch.arange(0, session_len_in_sec - window + 1e-3, window / 2)
+        speakers = ((starts + window / 2) // turn_len_in_sec).long() % num_speakers
+        scale_dict[scale_idx] = {
+            'embeddings': centers[speakers] + torch.randn(len(starts), emb_dim, generator=generator),
+            'time_stamps': [f'{start:.3f} {start + window:.3f} ' for start in starts.tolist()],
+        }
+    return {'scale_dict': scale_dict, 'multiscale_weights': torch.tensor([[1.0, 1.0, 1.0]])}
+
+
+def nme_analysis(mat, args, batched_pvalue_search):
+    nmesc = NMESC(
+        mat.clone(),
+        max_num_speaker=args.max_num_speakers,
+        max_rp_threshold=args.max_rp_threshold,
+        sparse_search_volume=args.sparse_search_volume,
+        NME_mat_size=args.NME_mat_size,
+        batched_pvalue_search=batched_pvalue_search,
+    )
+    return nmesc.NMEanalysis()
+
+
+def time_fn(fn, num_iters):
+    fn()  # warmup
+    start = time.perf_counter()
+    for _ in range(num_iters):
+        fn()
+    return (time.perf_counter() - start) / num_iters
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the NME analysis of speaker clustering")
+    parser.add_argument(
+        "--num_segments", type=int, nargs='+', default=[200, 500, 1000, 2000, 5000], help="Base scale segments"
+    )
+    parser.add_argument("--num_speakers", type=int, default=4)
+    parser.add_argument("--turn_len", type=float, default=15.0, help="Duration of the speaker turns, in seconds")
+    parser.add_argument("--max_num_speakers", type=int, default=8)
+    parser.add_argument("--max_rp_threshold", type=float, default=0.25)
+    parser.add_argument("--sparse_search_volume", type=int, default=30)
+    parser.add_argument("--NME_mat_size", type=int, default=300, help="Target size of the subsampled matrix")
+    parser.add_argument("--num_iters", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'segments':>8} {'NME size':>8} {'p-values':>8} {'loop ms':>9} {'batched ms':>10} {'speedup':>8}")
+    for num_segments in args.num_segments:
+        mat, _ = getMultiScaleCosAffinityMatrix(make_session(num_segments, args.num_speakers, args.turn_len))
+        subsample_ratio = max(1, int(mat.shape[0] / args.NME_mat_size))
+        nme_mat_size = len(range(0, mat.shape[0], subsample_ratio))
+        num_p_values = min(args.sparse_search_volume, int(nme_mat_size * args.max_rp_threshold))
+
+        est_num_of_spk, p_hat_value = nme_analysis(mat, args, batched_pvalue_search=False)
+        batched_est_num_of_spk, batched_p_hat_value = nme_analysis(mat, args, batched_pvalue_search=True)
+        assert est_num_of_spk == batched_est_num_of_spk and p_hat_value == batched_p_hat_value
+
+        loop_time = time_fn(lambda: nme_analysis(mat, args, batched_pvalue_search=False), args.num_iters)
+        batched_time = time_fn(lambda: nme_analysis(mat, args, batched_pvalue_search=True), args.num_iters)
+        print(
+            f"{mat.shape[0]:>8} {nme_mat_size:>8} {num_p_values:>8} {loop_time * 1000:>9.1f} "
+            f"{batched_time * 1000:>10.1f} {loop_time / batched_time:>7.1f}x"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Benchmarks the throughput of batched RNNT beam search (`search_type=batch`) against the beam searches which decode
+the samples of a batch one by one (`default`, `tsd`, `alsd`, `maes`), and against greedy batched decoding.
+
+The decoder and joint of an RNNT model are used if one is given, otherwise randomly initialized modules of a similar
+size. Encoder outputs are random, with ragged lengths.
+
+USAGE:
+    python benchmark_rnnt_beam_search.py \
+        --asr_model=<path to .nemo file or pretrained model name (optional)> \
+        --search_types default maes batch \
+        --beam_size 4 \
+        --batch_size 32 \
+        --max_frames 250
+"""
+
+import argparse
+import time
+
+import torch
+
+from nemo.collections.asr.models import ASRModel
+from nemo.collections.asr.modules import RNNTDecoder, RNNTJoint
+from nemo.collections.asr.parts.submodules.rnnt_beam_decoding import BeamRNNTInfer
+from nemo.collections.asr.parts.submodules.rnnt_greedy_decoding import GreedyBatchedRNNTInfer
+
+
+def get_decoder_joint(args):
+    if args.asr_model is not None:
+        if args.asr_model.endswith('.nemo'):
+            asr_model = ASRModel.restore_from(restore_path=args.asr_model, map_location='cpu')
+        else:
+            asr_model = ASRModel.from_pretrained(model_name=args.asr_model, map_location='cpu')
+        return asr_model.decoder, asr_model.joint, asr_model.cfg.joint.jointnet.encoder_hidden
+
+    vocabulary = [str(idx) for idx in range(args.vocab_size)]
+    decoder = RNNTDecoder({'pred_hidden': 640, 'pred_rnn_layers': 1}, args.vocab_size)
+    joint = RNNTJoint(
+        {'encoder_hidden': 512, 'pred_hidden': 640, 'joint_hidden': 640, 'activation': 'relu'},
+        args.vocab_size,
+        vocabulary=vocabulary,
+    )
+    return decoder, joint, 512
+
+
+def time_decoding(decoding, encoder_output, encoded_lengths, num_iters):
+    decoding(encoder_output=encoder_output, encoded_lengths=encoded_lengths)  # warmup
+    if encoder_output.is_cuda:
+        torch.cuda.synchronize()
+    start = time.perf_counter()
+    for _ in range(num_iters):
+        decoding(encoder_output=encoder_output, encoded_lengths=encoded_lengths)
+    if encoder_output.is_cuda:
+        torch.cuda.synchronize()
+    return (time.perf_counter() - start) / num_iters
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of batched RNNT beam search")
+    parser.add_argument("--asr_model", type=str, default=None, help="Path to a .nemo file or pretrained model name")
+    parser.add_argument("--search_types", type=str, nargs='+', default=['default', 'maes', 'batch'])
+    parser.add_argument("--beam_size", type=int, default=4)
+    parser.add_argument("--batch_size", type=int, default=32)
+    parser.add_argument("--min_frames", type=int, default=50)
+    parser.add_argument("--max_frames", type=int, default=250)
+    parser.add_argument("--vocab_size", type=int, default=128, help="Vocabulary size of the random model")
+    parser.add_argument("--num_iters", type=int, default=3)
+    parser.add_argument("--device", type=str, default='cuda' if torch.cuda.is_available() else 'cpu')
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    decoder, joint, encoder_hidden = get_decoder_joint(args)
+    decoder, joint = decoder.to(args.device).eval(), joint.to(args.device).eval()
+
+    encoded_lengths = torch.randint(args.min_frames, args.max_frames + 1, [args.batch_size], device=args.device)
+    encoder_output = torch.randn(args.batch_size, encoder_hidden, int(encoded_lengths.max()), device=args.device)
+    num_frames = int(encoded_lengths.sum())
+
+    greedy = GreedyBatchedRNNTInfer(decoder, joint, blank_index=decoder.blank_idx, max_symbols_per_step=10)
+    greedy_time = time_decoding(greedy, encoder_output, encoded_lengths, args.num_iters)
+
+    print(f"{'search_type':>12} {'time (s)':>9} {'frames/s':>10} {'vs greedy':>10}")
+    print(f"{'greedy_batch':>12} {greedy_time:>9.3f} {num_frames / greedy_time:>10.0f} {1.0:>9.1f}x")
+    for search_type in args.search_types:
+        decoding = BeamRNNTInfer(decoder, joint, beam_size=args.beam_size, search_type=search_type)
+        search_time = time_decoding(decoding, encoder_output, encoded_lengths, args.num_iters)
+        print(
+            f"{search_type:>12} {search_time:>9.3f} {num_frames / search_time:>10.0f} "
+            f"{search_time / greedy_time:>9.1f}x"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Benchmarks the CPU time per batch of `_speech_collate_fn` against the previous implementation, which padded every
+sample with `F.pad` and stacked the results.
+
+USAGE:
+    python benchmark_speech_collate.py --batch_sizes 32 64 128 256 512 --max_duration 20 --num_iters 20
+
+Add --pin_memory to collate directly into pinned memory (requires a CUDA-enabled build).
+"""
+
+import argparse
+import time
+
+import numpy as np
+import torch
+
+from nemo.collections.asr.data.audio_to_text import _speech_collate_fn
+
+
+def legacy_speech_collate_fn(batch, pad_id):
+    """Previous implementation of `_speech_collate_fn`, kept as the benchmark baseline."""
+    packed_batch = list(zip(*batch))
+    _, audio_lengths, _, tokens_lengths = packed_batch
+    max_audio_len = max(audio_lengths).item()
+    max_tokens_len = max(tokens_lengths).item()
+
+    audio_signal, tokens = [], []
+    for sig, sig_len, tokens_i, tokens_i_len in batch:
+        sig_len = sig_len.item()
+        if sig_len < max_audio_len:
+            sig = torch.nn.functional.pad(sig, (0, max_audio_len - sig_len))
+        audio_signal.append(sig)
+        tokens_i_len = tokens_i_len.item()
+        if tokens_i_len < max_tokens_len:
+            tokens_i = torch.nn.functional.pad(tokens_i, (0, max_tokens_len - tokens_i_len), value=pad_id)
+        tokens.append(tokens_i)
+
+    return torch.stack(audio_signal), torch.stack(audio_lengths), torch.stack(tokens), torch.stack(tokens_lengths)
+
+
+def make_batch(batch_size, sample_rate, min_duration, max_duration, rng):
+    batch = []
+    for duration in rng.uniform(min_duration, max_duration, size=batch_size):
+        audio_len = int(duration * sample_rate)
+        tokens_len = int(duration * 15)
+        batch.append(
+            (
+                torch.from_numpy(rng.standard_normal(audio_len).astype(np.float32)),
+                torch.tensor(audio_len).long(),
+                torch.from_numpy(rng.randint(0, 128, size=tokens_len)).long(),
+                torch.tensor(tokens_len).long(),
+            )
+        )
+    return batch
+
+
+def time_collate(collate_fn, batch, num_iters):
+    collate_fn(batch)  # warmup
+    start = time.perf_counter()
+    for _ in range(num_iters):
+        collate_fn(batch)
+    return (time.perf_counter() - start) / num_iters
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the speech collate function")
+    parser.add_argument("--batch_sizes", type=int, nargs='+', default=[32, 64, 128, 256, 512])
+    parser.add_argument("--sample_rate", type=int, default=16000)
+    parser.add_argument("--min_duration", type=float, default=1.0)
+    parser.add_argument("--max_duration", type=float, default=20.0)
+    parser.add_argument("--num_iters", type=int, default=20)
+    parser.add_argument("--num_threads", type=int, default=1, help="Torch intra-op threads, as in dataloader workers")
+    parser.add_argument("--pin_memory", action='store_true')
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.num_threads)
+    rng = np.random.RandomState(0)
+
+    print(f"{'batch_size':>10} {'legacy (ms)':>12} {'current (ms)':>13} {'speedup':>8}")
+    for batch_size in args.batch_sizes:
+        batch = make_batch(batch_size, args.sample_rate, args.min_duration, args.max_duration, rng)
+
+        expected = legacy_speech_collate_fn(batch, pad_id=0)
+        outputs = _speech_collate_fn(batch, pad_id=0, pin_memory=args.pin_memory)
+        for expected_tensor, tensor in zip(expected, outputs):
+            assert torch.equal(expected_tensor, tensor)
+
+        legacy_time = time_collate(lambda b: legacy_speech_collate_fn(b, pad_id=0), batch, args.num_iters)
+        current_time = time_collate(
+            lambda b: _speech_collate_fn(b, pad_id=0, pin_memory=args.pin_memory), batch, args.num_iters
+        )
+        print(
+            f"{batch_size:>10} {legacy_time * 1000:>12.2f} {current_time * 1000:>13.2f} "
+            f"{legacy_time / current_time:>7.2f}x"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+# This script computes the features of the audio of one or more manifests with the preprocessor of an ASR model
+# and writes them into a feature store: shards of features memory-mapped at training time, indexed by manifest entry.
+
+# Training on precomputed features avoids recomputing identical features every epoch. Set
+# `model.train_ds.feature_store_dir` (and/or `validation_ds`) to the store directory: the datasets then load features
+# instead of audio, the preprocessor is skipped and spectrogram augmentation is still applied on the GPU.
+# Waveform augmentations and dithering are not applied to precomputed features.
+
+# The preprocessor is taken from a model config, e.g. examples/asr/conf/citrinet/citrinet_1024.yaml, or from a
+# trained model (.nemo file or pretrained model name).
+
+# Usage:
+python extract_features.py \
+    --manifest=<comma separated paths to manifest files> \
+    --output_dir=<path to the feature store directory> \
+    --model_config=<path to the model config> (or --asr_model=<path to .nemo file or pretrained model name>) \
+    --batch_size=32 \
+    --num_workers=8 \
+    --dtype=float16
+
+# Add --output_manifest=<path> to also write a copy of the manifest whose `feature_filepath` fields are the keys of
+# the features in the store, for the feature_to_label datasets loading features through a FeatureStore.
+
+# Utterances are batched in the order of the manifest. As when computing features on the fly, the last frames of
+# an utterance may slightly depend on the padding of its batch; use --batch_size=1 for batch independent features.
+"""
+import argparse
+import json
+
+import torch
+from omegaconf import OmegaConf
+
+from nemo.collections.asr.models import ASRModel
+from nemo.collections.asr.parts.preprocessing.feature_store import FeatureStoreWriter, get_feature_store_key
+from nemo.collections.asr.parts.preprocessing.features import WaveformFeaturizer
+from nemo.collections.common.parts.preprocessing import manifest
+from nemo.core.classes import ModelPT
+from nemo.utils import logging
+
+
+class _ManifestAudioDataset(torch.utils.data.Dataset):
+    def __init__(self, items, sample_rate, resample_method):
+        self.items = items
+        self.featurizer = WaveformFeaturizer(sample_rate=sample_rate, resample_method=resample_method)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, index):
+        item = self.items[index]
+        audio = self.featurizer.process(item['audio_file'], offset=item['offset'] or 0, duration=item['duration'] or 0)
+        return audio, index
+
+
+def _collate_audio(batch):
+    audio, indices = zip(*batch)
+    lengths = torch.tensor([len(a) for a in audio], dtype=torch.long)
+    padded_audio = torch.zeros(len(audio), int(lengths.max()))
+    for padded_a, a in zip(padded_audio, audio):
+        padded_a[: len(a)] = a
+    return padded_audio, lengths, list(indices)
+
+
+def get_preprocessor(args):
+    if args.asr_model is not None:
+        if args.asr_model.endswith('.nemo'):
+            asr_model = ASRModel.restore_from(restore_path=args.asr_model, map_location='cpu')
+        else:
+            asr_model = ASRModel.from_pretrained(model_name=args.asr_model, map_location='cpu')
+        return asr_model.preprocessor, asr_model.cfg.preprocessor.sample_rate
+
+    cfg = OmegaConf.load(args.model_config)
+    if 'model' in cfg:
+        cfg = cfg.model
+    return ModelPT.from_config_dict(cfg.preprocessor), cfg.preprocessor.sample_rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract features of manifests into a feature store")
+    parser.add_argument("--manifest", required=True, type=str, help="Comma separated paths to manifest files")
+    parser.add_argument("--output_dir", required=True, type=str, help="Directory of the feature store")
+    parser.add_argument("--model_config", type=str, default=None, help="Model config with a preprocessor section")
+    parser.add_argument("--asr_model", type=str, default=None, help="Path to a .nemo file or pretrained model name")
+    parser.add_argument("--batch_size", type=int, default=32)
+    parser.add_argument("--num_workers", type=int, default=4, help="Number of dataloader workers loading audio")
+    parser.add_argument("--shard_size_mb", type=float, default=512, help="Approximate size of the shards")
+    parser.add_argument("--dtype", type=str, default='float32', choices=['float32', 'float16'])
+    parser.add_argument("--resample_method", type=str, default='librosa', choices=['librosa', 'polyphase'])
+    parser.add_argument("--device", type=str, default='cuda' if torch.cuda.is_available() else 'cpu')
+    parser.add_argument("--output_manifest", type=str, default=None, help="Manifest with feature store keys")
+    args = parser.parse_args()
+
+    if (args.model_config is None) == (args.asr_model is None):
+        raise ValueError("Exactly one of --model_config and --asr_model should be given")
+
+    preprocessor, sample_rate = get_preprocessor(args)
+    # Features are computed in evaluation mode, i.e. without dithering nor narrowband augmentation.
+    preprocessor = preprocessor.to(args.device).eval()
+
+    items = list(manifest.item_iter(args.manifest.split(',')))
+    dataloader = torch.utils.data.DataLoader(
+        _ManifestAudioDataset(items, sample_rate, args.resample_method),
+        batch_size=args.batch_size,
+        num_workers=args.num_workers,
+        collate_fn=_collate_audio,
+    )
+
+    keys = [get_feature_store_key(item['audio_file'], item['offset'], item['duration']) for item in items]
+    with FeatureStoreWriter(args.output_dir, shard_size_mb=args.shard_size_mb, dtype=args.dtype) as writer:
+        with torch.no_grad():
+            for audio, lengths, indices in dataloader:
+                features, features_lengths = preprocessor(
+                    input_signal=audio.to(args.device), length=lengths.to(args.device)
+                )
+                features, features_lengths = features.cpu().numpy(), features_lengths.cpu().numpy()
+                for features_i, length, index in zip(features, features_lengths, indices):
+                    if keys[index] not in writer.entries:
+                        writer.add(keys[index], features_i[:, :length])
+    logging.info(f"Wrote the features of {len(writer.entries)} utterances to {args.output_dir}")
+
+    if args.output_manifest is not None:
+        with open(args.output_manifest, 'w') as f:
+            for manifest_file in args.manifest.split(','):
+                with open(manifest_file, 'r') as manifest_f:
+                    lines = [line for line in manifest_f if line.strip()]
+                for line, key in zip(lines, keys):
+                    entry = json.loads(line)
+                    entry['feature_filepath'] = key
+                    f.write(json.dumps(entry) + '\n')
+                keys = keys[len(lines) :]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import pickle
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from nemo.collections.asr.parts.preprocessing.audio_reader import AudioReader
+from nemo.collections.asr.parts.preprocessing.segment import AudioSegment
+
+SAMPLE_RATE = 8000
+
+
+def _write_audio(path, duration=10.0, channels=1, seed=0):
+    samples = np.random.RandomState(seed).uniform(-0.5, 0.5, size=(int(duration * SAMPLE_RATE), channels))
+    sf.write(path, samples.squeeze(), SAMPLE_RATE)
+    return sf.read(path, dtype='float32')[0]
+
+
+class TestAudioReader:
+    @pytest.mark.unit
+    @pytest.mark.parametrize('cache_size_mb', [0, 16])
+    @pytest.mark.parametrize('channels', [1, 2])
+    def test_read_matches_soundfile(self, tmpdir, cache_size_mb, channels):
+        audio_file = os.path.join(tmpdir, 'audio.wav')
+        expected = _write_audio(audio_file, channels=channels)
+        reader = AudioReader(cache_size_mb=cache_size_mb, chunk_duration=1.5)
+
+        for offset, duration in [(0, 0), (0.5, 2.0), (2.9, 0), (9.5, 2.0), (3.0, 3.0)]:
+            samples, sample_rate = reader.read(audio_file, offset=offset, duration=duration)
+            start = int(offset * SAMPLE_RATE)
+            end = start + int(duration * SAMPLE_RATE) if duration > 0 else len(expected)
+            assert sample_rate == SAMPLE_RATE
+            np.testing.assert_array_equal(samples, expected[start:end])
+
+        samples, _ = reader.read_frames(audio_file, start=100, num_frames=50000)
+        np.testing.assert_array_equal(samples, expected[100:50100])
+        assert reader.info(audio_file) == (SAMPLE_RATE, len(expected))
+
+    @pytest.mark.unit
+    def test_handles_are_cached_and_refreshed(self, tmpdir):
+        audio_files = [os.path.join(tmpdir, f'audio_{idx}.wav') for idx in range(3)]
+        for idx, audio_file in enumerate(audio_files):
+            _write_audio(audio_file, duration=1.0, seed=idx)
+        reader = AudioReader(max_open_files=2)
+
+        for audio_file in audio_files:
+            reader.read(audio_file)
+        assert len(reader._handles) == 2
+
+        # A file rewritten on disk is reopened.
+        expected = _write_audio(audio_files[-1], duration=2.0, seed=10)
+        samples, _ = reader.read(audio_files[-1])
+        np.testing.assert_array_equal(samples, expected)
+
+        reader.clear()
+        assert len(reader._handles) == 0
+
+    @pytest.mark.unit
+    def test_decoded_chunks_are_reused(self, tmpdir, monkeypatch):
+        audio_file = os.path.join(tmpdir, 'audio.wav')
+        _write_audio(audio_file, duration=10.0)
+        reader = AudioReader(cache_size_mb=16, chunk_duration=5.0)
+
+        num_reads = 0
+        sf_read = sf.SoundFile.read
+
+        def counting_read(self, *args, **kwargs):
+            nonlocal num_reads
+            num_reads += 1
+            return sf_read(self, *args, **kwargs)
+
+        monkeypatch.setattr(sf.SoundFile, 'read', counting_read)
+        for offset in np.arange(0, 9, 0.5):
+            reader.read(audio_file, offset=offset, duration=1.0)
+        assert num_reads == 2
+
+    @pytest.mark.unit
+    def test_decoded_cache_is_bounded(self, tmpdir):
+        audio_file = os.path.join(tmpdir, 'audio.wav')
+        _write_audio(audio_file, duration=10.0)
+        chunk_bytes = SAMPLE_RATE * 4
+        reader = AudioReader(cache_size_mb=3 * chunk_bytes / (1024 * 1024), chunk_duration=1.0)
+
+        reader.read(audio_file)
+        assert len(reader._decoded) == 3
+        assert reader._decoded.size <= 3 * chunk_bytes
+
+    @pytest.mark.unit
+    def test_pickle(self, tmpdir):
+        audio_file = os.path.join(tmpdir, 'audio.wav')
+        expected = _write_audio(audio_file, duration=1.0)
+        reader = AudioReader(max_open_files=4, cache_size_mb=1)
+        reader.read(audio_file)
+
+        reader = pickle.loads(pickle.dumps(reader))
+        assert len(reader._handles) == 0 and reader.max_open_files == 4
+        np.testing.assert_array_equal(reader.read(audio_file)[0], expected)
+
+    @pytest.mark.unit
+    def test_audio_segment_from_file(self, tmpdir):
+        audio_file = os.path.join(tmpdir, 'audio.wav')
+        _write_audio(audio_file)
+
+        ref = AudioSegment.from_file(audio_file, offset=1.0, duration=2.0, audio_reader=AudioReader(max_open_files=0))
+        for reader in [None, AudioReader(cache_size_mb=16, chunk_duration=0.7)]:
+            segment = AudioSegment.from_file(audio_file, offset=1.0, duration=2.0, audio_reader=reader)
+            assert segment == ref
+            assert segment.num_samples == 2 * SAMPLE_RATE
+
+        segment = AudioSegment.segment_from_file(audio_file, n_segments=1000)
+        assert segment.num_samples == 1000
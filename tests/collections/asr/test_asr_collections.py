@@ -0,0 +1,244 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+from nemo.collections.asr.data.audio_to_text import ASRManifestProcessor
+from nemo.collections.common.parts.preprocessing import collections, manifest, manifest_cache, parsers
+
+
+def _write_manifest(path, num_samples=10):
+    with open(path, 'w', encoding='utf-8') as f:
+        for idx in range(num_samples):
+            item = {
+                'audio_filepath': f'/data/audio_{idx}.wav',
+                'duration': 1.0 + idx,
+                'text': 'hello world' if idx % 2 else 'abc',
+            }
+            if idx % 3 == 0:
+                item['offset'] = 0.5 * idx
+                item['speaker'] = idx
+            f.write(json.dumps(item) + '\n')
+    return path
+
+
+class TestManifestItemIter:
+    @pytest.mark.unit
+    @pytest.mark.parametrize('chunk_size', [1, 64, 1024 * 1024])
+    def test_parallel_matches_sequential(self, tmpdir, chunk_size):
+        manifests = [
+            _write_manifest(os.path.join(tmpdir, 'manifest_1.json'), num_samples=23),
+            _write_manifest(os.path.join(tmpdir, 'manifest_2.json'), num_samples=7),
+        ]
+
+        ref = list(manifest.item_iter(manifests))
+        items = list(manifest.item_iter(manifests, num_workers=2, chunk_size=chunk_size))
+
+        assert len(items) == 30
+        assert items == ref
+        assert [item['id'] for item in items] == list(range(30))
+
+    @pytest.mark.unit
+    def test_skip_audio_exists_check(self, tmpdir):
+        manifest_path = os.path.join(tmpdir, 'manifest.json')
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'audio_filepath': 'wavs/a.wav', 'duration': 1.0}) + '\n')
+        os.makedirs(os.path.join(tmpdir, 'wavs'))
+        open(os.path.join(tmpdir, 'wavs', 'a.wav'), 'w').close()
+
+        item = next(manifest.item_iter(manifest_path))
+        assert item['audio_file'] == os.path.join(tmpdir, 'wavs', 'a.wav')
+
+        item = next(manifest.item_iter(manifest_path, check_audio_exists=False))
+        assert item['audio_file'] == 'wavs/a.wav'
+
+
+class TestCachedASRAudioText:
+    labels = [" ", "a", "b", "c", "d", "e", "h", "l", "o", "r", "w"]
+
+    @pytest.mark.unit
+    def test_matches_uncached_collection(self, tmpdir):
+        manifest_path = _write_manifest(os.path.join(tmpdir, 'manifest.json'))
+        cache_dir = os.path.join(tmpdir, 'cache')
+        parser = parsers.make_parser(labels=self.labels)
+
+        ref = collections.ASRAudioText(manifest_path, parser=parser, min_duration=2.0, max_number=5)
+        # The first instance builds the cache, the second one loads it.
+        for _ in range(2):
+            cached = collections.CachedASRAudioText(
+                manifest_path, parser=parser, cache_dir=cache_dir, min_duration=2.0, max_number=5
+            )
+            assert len(cached) == len(ref)
+            for expected, actual in zip(ref, cached):
+                assert expected == actual
+
+        assert len(os.listdir(cache_dir)) == 1
+
+    @pytest.mark.unit
+    def test_cache_invalidated_by_parser(self, tmpdir):
+        manifest_path = _write_manifest(os.path.join(tmpdir, 'manifest.json'))
+        cache_dir = os.path.join(tmpdir, 'cache')
+
+        collections.CachedASRAudioText(
+            manifest_path, parser=parsers.make_parser(labels=self.labels), cache_dir=cache_dir
+        )
+        collections.CachedASRAudioText(manifest_path, parser=parsers.make_parser(labels=['a']), cache_dir=cache_dir)
+
+        assert len(os.listdir(cache_dir)) == 2
+
+    @pytest.mark.unit
+    def test_lock_released_on_error(self, tmpdir, monkeypatch):
+        manifest_path = _write_manifest(os.path.join(tmpdir, 'manifest.json'))
+        cache_dir = os.path.join(tmpdir, 'cache')
+        parser = parsers.make_parser(labels=self.labels)
+
+        def build_columns(items, parser):
+            raise ValueError("Parsing failed")
+
+        with monkeypatch.context() as patch:
+            patch.setattr(collections.CachedASRAudioText, '_build_columns', staticmethod(build_columns))
+            with pytest.raises(ValueError, match="Parsing failed"):
+                collections.CachedASRAudioText(manifest_path, parser=parser, cache_dir=cache_dir)
+        assert os.listdir(cache_dir) == []
+
+        start = time.time()
+        collections.CachedASRAudioText(manifest_path, parser=parser, cache_dir=cache_dir)
+        assert time.time() - start < 30.0
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('owner', ['dead_process', 'other_host'])
+    def test_stale_lock_taken_over(self, tmpdir, owner):
+        manifest_path = _write_manifest(os.path.join(tmpdir, 'manifest.json'))
+        cache = manifest_cache.ManifestCache(os.path.join(tmpdir, 'cache'), manifest_path, lock_stale_timeout=5.0)
+        os.makedirs(cache.cache_dir)
+        with open(cache.lock_file, 'w') as f:
+            if owner == 'dead_process':
+                process = subprocess.Popen([sys.executable, '-c', 'pass'])
+                process.wait()
+                f.write(f'{socket.gethostname()} {process.pid}')
+            else:
+                f.write('other_host 1')
+        if owner == 'other_host':
+            # A lock of another host is only stale once it is not refreshed anymore.
+            os.utime(cache.lock_file, (time.time() - 10.0, time.time() - 10.0))
+
+        start = time.time()
+        assert cache.acquire()
+        assert time.time() - start < cache.wait_timeout
+        with open(cache.lock_file, 'r') as f:
+            assert f.read() == f'{socket.gethostname()} {os.getpid()}'
+        cache.release()
+        assert not os.path.exists(cache.lock_file)
+
+    @pytest.mark.unit
+    def test_lock_refreshed_while_held(self, tmpdir):
+        manifest_path = _write_manifest(os.path.join(tmpdir, 'manifest.json'))
+        cache_dir = os.path.join(tmpdir, 'cache')
+        owner = manifest_cache.ManifestCache(cache_dir, manifest_path, lock_stale_timeout=0.4)
+        waiter = manifest_cache.ManifestCache(cache_dir, manifest_path, lock_stale_timeout=0.4)
+        assert owner.acquire()
+        try:
+            # An outdated modification time is refreshed by the owner before the lock becomes stale.
+            os.utime(owner.lock_file, (time.time() - 1.0, time.time() - 1.0))
+            time.sleep(0.3)
+            assert time.time() - os.path.getmtime(owner.lock_file) < 0.4
+            assert not waiter._is_lock_stale()
+        finally:
+            owner.release()
+        assert not os.path.exists(owner.lock_file)
+
+    @pytest.mark.unit
+    def test_index_by_file_id(self, tmpdir):
+        manifest_path = _write_manifest(os.path.join(tmpdir, 'manifest.json'))
+        parser = parsers.make_parser(labels=self.labels)
+
+        ref = collections.ASRAudioText(manifest_path, parser=parser, index_by_file_id=True)
+        cached = collections.CachedASRAudioText(
+            manifest_path, parser=parser, cache_dir=os.path.join(tmpdir, 'cache'), index_by_file_id=True
+        )
+        assert cached.mapping == ref.mapping
+
+    @pytest.mark.unit
+    def test_manifest_processor_with_cache(self, tmpdir):
+        manifest_path = _write_manifest(os.path.join(tmpdir, 'manifest.json'))
+        parser = parsers.make_parser(labels=self.labels)
+
+        processor = ASRManifestProcessor(
+            manifest_path, parser=parser, bos_id=20, manifest_cache_dir=os.path.join(tmpdir, 'cache')
+        )
+        assert isinstance(processor.collection, collections.ColumnarASRAudioText)
+
+        ref = ASRManifestProcessor(manifest_path, parser=parser, bos_id=20)
+        for idx in range(len(ref.collection)):
+            assert processor.process_text_by_id(idx) == ref.process_text_by_id(idx)
+
+
+class TestColumnarCollections:
+    labels = [" ", "a", "b", "c", "d", "e", "h", "l", "o", "r", "w"]
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('do_sort_by_duration', [False, True])
+    def test_audio_text_matches_list_collection(self, tmpdir, do_sort_by_duration):
+        manifest_path = _write_manifest(os.path.join(tmpdir, 'manifest.json'))
+        parser = parsers.make_parser(labels=self.labels)
+        kwargs = dict(min_duration=2.0, max_duration=9.0, do_sort_by_duration=do_sort_by_duration)
+
+        ref = collections.ASRAudioText(manifest_path, parser=parser, **kwargs)
+        columnar = collections.ColumnarASRAudioText(manifest_path, parser=parser, **kwargs)
+
+        assert len(columnar) == len(ref)
+        assert list(columnar) == list(ref)
+        assert columnar[-1] == ref[-1]
+        assert columnar[1:4] == list(ref)[1:4]
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('is_regression_task', [False, True])
+    def test_speech_label_matches_list_collection(self, tmpdir, is_regression_task):
+        manifest_path = os.path.join(tmpdir, 'manifest.json')
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            for idx in range(12):
+                item = {'audio_filepath': f'/data/audio_{idx}.wav', 'duration': 12.0 - idx, 'label': str(idx % 3)}
+                if idx % 2:
+                    item['offset'] = 0.25 * idx
+                f.write(json.dumps(item) + '\n')
+        kwargs = dict(is_regression_task=is_regression_task, min_duration=2.0, max_number=8, index_by_file_id=True)
+
+        ref = collections.ASRSpeechLabel(manifest_path, **kwargs)
+        columnar = collections.ColumnarASRSpeechLabel(manifest_path, **kwargs)
+
+        assert list(columnar) == list(ref)
+        assert columnar.uniq_labels == ref.uniq_labels
+        assert columnar.mapping == ref.mapping
+
+    @pytest.mark.unit
+    def test_feature_sequence_label_matches_list_collection(self, tmpdir):
+        manifest_path = os.path.join(tmpdir, 'manifest.json')
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            for idx in range(6):
+                item = {'feature_filepath': f'/data/feature_{idx}.p', 'seq_label': f'spk{idx} spk0 spk{idx} spk1'}
+                f.write(json.dumps(item) + '\n')
+
+        ref = collections.ASRFeatureSequenceLabel(manifest_path, max_number=4, index_by_file_id=True)
+        columnar = collections.ColumnarASRFeatureSequenceLabel(manifest_path, max_number=4, index_by_file_id=True)
+
+        assert list(columnar) == list(ref)
+        assert columnar.uniq_labels == ref.uniq_labels
+        assert columnar.mapping == ref.mapping
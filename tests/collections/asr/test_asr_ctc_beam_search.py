@@ -0,0 +1,269 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import itertools
+import os
+
+import numpy as np
+import pytest
+import torch
+
+from nemo.collections.asr.metrics.wer import CTCDecoding, CTCDecodingConfig
+from nemo.collections.asr.modules import CTCPrefixBeamSearchDecoderWithLM
+from nemo.collections.asr.parts.submodules.ctc_beam_decoding import BeamCTCInferConfig, CTCPrefixBeamSearch
+from nemo.collections.asr.parts.utils.ngram_lm_utils import NGramLM
+from nemo.core import typecheck
+
+ARPA = """
+\\data\\
+ngram 1=5
+ngram 2=4
+ngram 3=2
+
+\\1-grams:
+-1.0\t<unk>
+-99\t<s>\t-0.3
+-0.7\t</s>
+-0.5\ta\t-0.2
+-0.6\tb\t-0.1
+
+\\2-grams:
+-0.2\t<s> a\t-0.15
+-0.4\ta b\t-0.25
+-0.3\tb a
+-0.5\tb </s>
+
+\\3-grams:
+-0.1\t<s> a b
+-0.05\ta b a
+
+\\end\\
+"""
+
+
+@pytest.fixture
+def arpa_path(tmpdir):
+    path = os.path.join(tmpdir, 'lm.arpa')
+    with open(path, 'w') as f:
+        f.write(ARPA)
+    return path
+
+
+def _random_log_probs(rng, num_frames, num_tokens):
+    logits = rng.standard_normal((num_frames, num_tokens)) * 2
+    return (logits - np.logaddexp.reduce(logits, axis=-1, keepdims=True)).astype(np.float32)
+
+
+def _brute_force(log_probs, blank_id, lm_score_fn=None):
+    """Scores of all the label sequences, summing the probabilities of all their alignments."""
+    scores = {}
+    for path in itertools.product(range(log_probs.shape[1]), repeat=log_probs.shape[0]):
+        tokens = tuple(
+            token for idx, token in enumerate(path) if token != blank_id and (idx == 0 or token != path[idx - 1])
+        )
+        score = float(log_probs[np.arange(len(path)), path].sum())
+        scores[tokens] = np.logaddexp(scores.get(tokens, -np.inf), score)
+    if lm_score_fn is not None:
+        scores = {tokens: score + lm_score_fn(tokens) for tokens, score in scores.items()}
+    return scores
+
+
+class TestNGramLM:
+    @pytest.mark.unit
+    def test_score(self, arpa_path):
+        lm = NGramLM.from_arpa(arpa_path)
+        assert lm.order == 3
+        bos, a, b, unk = [lm.word_to_id(word) for word in ['<s>', 'a', 'b', '<unk>']]
+        assert lm.word_to_id('c') == unk
+
+        expected = {
+            ((bos, a), b): -0.1,
+            ((bos, a), a): -0.15 - 0.2 - 0.5,
+            ((a, b), a): -0.05,
+            ((a, b), b): -0.25 - 0.1 - 0.6,
+            ((b, a), a): -0.2 - 0.5,
+            ((b,), a): -0.3,
+            ((), b): -0.6,
+            ((a,), unk): -0.2 - 1.0,
+        }
+        for (state, word_id), log10_prob in expected.items():
+            assert lm.score(state, word_id) == pytest.approx(log10_prob * np.log(10), abs=1e-5)
+
+        for state in [(), (bos,), (bos, a), (a, b), (b, a), (a, unk)]:
+            expected_all = [lm.score(state, word_id) for word_id in range(lm.vocab_size)]
+            np.testing.assert_allclose(lm.score_all(state), expected_all, atol=1e-5)
+
+        assert lm.initial_state() == (bos,)
+        assert lm.next_state((bos, a), b) == (a, b)
+
+
+class TestCTCPrefixBeamSearch:
+    @pytest.mark.unit
+    @pytest.mark.parametrize('seed', [0, 1, 2])
+    def test_exact_search(self, seed):
+        rng = np.random.RandomState(seed)
+        log_probs = _random_log_probs(rng, num_frames=5, num_tokens=3)
+        expected = _brute_force(log_probs, blank_id=2)
+
+        beams = CTCPrefixBeamSearch(blank_id=2, beam_size=100).search(log_probs)
+        assert len(beams) == len(expected)
+        for score, tokens, frames in beams:
+            assert score == pytest.approx(expected[tuple(tokens)], abs=1e-4)
+            assert len(frames) == len(tokens) and frames == sorted(frames)
+        assert [score for score, _, _ in beams] == sorted([score for score, _, _ in beams], reverse=True)
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('vocabulary', [['a', 'b'], ['a', ' ', 'b']])
+    def test_exact_search_with_lm(self, arpa_path, vocabulary):
+        rng = np.random.RandomState(0)
+        lm = NGramLM.from_arpa(arpa_path)
+        alpha, beta = 0.5, 1.5
+        blank_id = len(vocabulary)
+        log_probs = _random_log_probs(rng, num_frames=5, num_tokens=blank_id + 1)
+
+        def lm_score_fn(tokens):
+            text = ''.join(vocabulary[token] for token in tokens)
+            words = [word for word in text.split(' ') if word] if ' ' in vocabulary else list(text)
+            state, score = lm.initial_state(), 0.0
+            for word in words:
+                score += alpha * lm.score(state, lm.word_to_id(word)) + beta
+                state = lm.next_state(state, lm.word_to_id(word))
+            return score
+
+        expected = _brute_force(log_probs, blank_id, lm_score_fn)
+        search = CTCPrefixBeamSearch(
+            blank_id, beam_size=500, ngram_lm=lm, alpha=alpha, beta=beta, vocabulary=vocabulary
+        )
+        beams = search.search(log_probs)
+        assert len(beams) == len(expected)
+        for score, tokens, _ in beams:
+            assert score == pytest.approx(expected[tuple(tokens)], abs=1e-4)
+
+    @pytest.mark.unit
+    def test_lm_fusion(self, arpa_path):
+        # The acoustics slightly prefer "b a" over "a b", the LM prefers "a b".
+        vocabulary = ['a', 'b', ' ']
+        probs = np.array([[0.45, 0.55, 0.0, 0.0], [0.0, 0.0, 1.0, 0.0], [0.55, 0.45, 0.0, 0.0]], dtype=np.float32)
+        log_probs = np.log(probs + 1e-10)
+
+        without_lm = CTCPrefixBeamSearch(blank_id=3, beam_size=8, vocabulary=vocabulary).search(log_probs)
+        assert without_lm[0][1] == [1, 2, 0]
+        with_lm = CTCPrefixBeamSearch(
+            blank_id=3, beam_size=8, ngram_lm=arpa_path, alpha=1.0, vocabulary=vocabulary
+        ).search(log_probs)
+        assert with_lm[0][1] == [0, 2, 1]
+
+    @pytest.mark.unit
+    def test_pruning(self):
+        rng = np.random.RandomState(0)
+        log_probs = _random_log_probs(rng, num_frames=30, num_tokens=10)
+
+        exact = CTCPrefixBeamSearch(blank_id=9, beam_size=16).search(log_probs)
+        pruned = CTCPrefixBeamSearch(blank_id=9, beam_size=16, cutoff_top_n=3, cutoff_prob=0.99).search(log_probs)
+        assert len(pruned) == 16
+        assert pruned[0][0] <= exact[0][0] + 1e-5
+
+        # Only the most probable token of each frame is a candidate.
+        greedy = CTCPrefixBeamSearch(blank_id=9, beam_size=1, cutoff_top_n=1).search(log_probs)
+        assert len(greedy) == 1
+
+    @pytest.mark.unit
+    def test_search_batch(self, arpa_path):
+        rng = np.random.RandomState(0)
+        log_probs = [_random_log_probs(rng, num_frames, 4) for num_frames in [10, 3, 25, 1]]
+        search = CTCPrefixBeamSearch(blank_id=3, beam_size=4, ngram_lm=arpa_path, vocabulary=['a', ' ', 'b'])
+
+        assert search.search_batch(log_probs, num_workers=2) == search.search_batch(log_probs, num_workers=1)
+
+
+class TestCTCBeamDecoding:
+    @pytest.mark.unit
+    def test_ctc_decoding_beam_strategy(self):
+        vocabulary = [' ', 'a', 'b']
+        # "a", blank, "a", "b" then blanks, greedy and beam search agree on the peaked distributions.
+        labels = torch.tensor([[1, 3, 1, 2, 3, 3], [2, 2, 0, 1, 3, 3]])
+        log_probs = torch.log_softmax(torch.nn.functional.one_hot(labels, 4).float() * 10, dim=-1)
+        lengths = torch.tensor([6, 5])
+
+        greedy = CTCDecoding(CTCDecodingConfig(), vocabulary=vocabulary)
+        expected, _ = greedy.ctc_decoder_predictions_tensor(log_probs, lengths)
+        assert expected == ['aab', 'b a']
+
+        cfg = CTCDecodingConfig(strategy='beam', beam=BeamCTCInferConfig(beam_size=4))
+        decoding = CTCDecoding(cfg, vocabulary=vocabulary)
+        texts, _ = decoding.ctc_decoder_predictions_tensor(log_probs, lengths)
+        assert texts == expected
+
+        # Timestamps are those of greedy decoding.
+        greedy = CTCDecoding(CTCDecodingConfig(compute_timestamps=True), vocabulary=vocabulary)
+        expected, _ = greedy.ctc_decoder_predictions_tensor(log_probs, lengths, return_hypotheses=True)
+        cfg.beam.return_best_hypothesis = False
+        cfg.beam.compute_timestamps = True
+        decoding = CTCDecoding(cfg, vocabulary=vocabulary)
+        assert decoding.compute_timestamps is True
+        hypotheses, all_hypotheses = decoding.ctc_decoder_predictions_tensor(
+            log_probs, lengths, return_hypotheses=True
+        )
+        assert len(all_hypotheses) == 2 and all(len(hyps) == 4 for hyps in all_hypotheses)
+        for hypothesis, expected_hypothesis in zip(hypotheses, expected):
+            assert hypothesis.text == expected_hypothesis.text
+            assert hypothesis.timestep['word'] == expected_hypothesis.timestep['word']
+
+    @pytest.mark.unit
+    def test_repeated_tokens(self):
+        # The most probable path of "a" emits it at frame 1, but "a a" extends its path emitting "a" at frame 0 then
+        # blank, so the frames of "a a" are 0 and 2 rather than the adjacent 1 and 2.
+        probs = np.array([[0.4, 0.6], [0.5, 0.5], [0.9, 0.1]], dtype=np.float32)
+        log_probs = torch.from_numpy(np.log(probs))[None]
+        beams = CTCPrefixBeamSearch(blank_id=1, beam_size=4).search(log_probs[0].numpy())
+        assert {tuple(tokens): frames for _, tokens, frames in beams}[(0, 0)] == [0, 2]
+
+        cfg = CTCDecodingConfig(strategy='beam', beam=BeamCTCInferConfig(beam_size=4, return_best_hypothesis=False))
+        decoding = CTCDecoding(cfg, vocabulary=['a'])
+        _, all_hypotheses = decoding.ctc_decoder_predictions_tensor(
+            log_probs, torch.tensor([3]), return_hypotheses=True
+        )
+        assert sorted(hypothesis.text for hypothesis in all_hypotheses[0]) == ['', 'a', 'aa']
+
+        # The frame-level labels of all the beams collapse to their tokens.
+        rng = np.random.RandomState(0)
+        log_probs = torch.from_numpy(np.stack([_random_log_probs(rng, 12, 3) for _ in range(50)]))
+        decoding = CTCDecoding(cfg, vocabulary=['a', 'b'])
+        all_beams = decoding.decoding.search.search_batch(list(log_probs.numpy()))
+        _, all_hypotheses = decoding.ctc_decoder_predictions_tensor(
+            log_probs, torch.full([50], 12), return_hypotheses=True
+        )
+        for beams, hypotheses in zip(all_beams, all_hypotheses):
+            assert [hypothesis.text for hypothesis in hypotheses] == [
+                ''.join('ab'[token] for token in tokens) for _, tokens, _ in beams
+            ]
+
+    @pytest.mark.unit
+    def test_decoder_module(self, arpa_path):
+        rng = np.random.RandomState(0)
+        log_probs = [_random_log_probs(rng, num_frames, 4) for num_frames in [10, 3]]
+        decoder = CTCPrefixBeamSearchDecoderWithLM(
+            vocab=['a', ' ', 'b'], beam_width=4, alpha=1.0, beta=0.5, lm_path=arpa_path, num_cpus=1
+        )
+
+        with typecheck.disable_checks():
+            beams = decoder.forward(log_probs=log_probs, log_probs_length=None)
+        assert len(beams) == 2 and all(len(beams_i) == 4 for beams_i in beams)
+        expected = decoder.search.search(log_probs[0])
+        assert beams[0][0] == (expected[0][0], ''.join(['a', ' ', 'b'][token] for token in expected[0][1]))
+
+        padded = torch.full([2, 10, 4], -np.inf)
+        padded[0], padded[1, :3] = torch.from_numpy(log_probs[0]), torch.from_numpy(log_probs[1])
+        with typecheck.disable_checks():
+            assert decoder.forward(log_probs=padded, log_probs_length=torch.tensor([10, 3])) == beams
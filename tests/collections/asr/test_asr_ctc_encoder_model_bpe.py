@@ -302,6 +302,10 @@ class TestEncDecCTCModel:
             'bucketing_batch_size',
             'bucketing_strategy',
             'bucketing_weights',
+            'max_batch_duration',
+            'num_duration_buckets',
+            'max_batch_size',
+            'feature_store_dir',
         ]
 
         REMAP_ARGS = {'trim_silence': 'trim', 'labels': 'tokenizer'}
@@ -337,6 +341,10 @@ class TestEncDecCTCModel:
             'bucketing_batch_size',
             'bucketing_strategy',
             'bucketing_weights',
+            'max_batch_duration',
+            'num_duration_buckets',
+            'max_batch_size',
+            'feature_store_dir',
         ]
 
         REMAP_ARGS = {
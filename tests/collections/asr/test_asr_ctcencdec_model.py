@@ -12,14 +12,18 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import copy
+import io
 
+import numpy as np
 import pytest
+import soundfile as sf
 import torch
 from omegaconf import DictConfig, OmegaConf, open_dict
 
 import nemo.collections.asr as nemo_asr
 from nemo.collections.asr.data import audio_to_text
 from nemo.collections.asr.metrics.wer import CTCDecoding, CTCDecodingConfig
+from nemo.collections.asr.parts.submodules.ctc_beam_decoding import BeamCTCInfer
 from nemo.collections.asr.models import EncDecCTCModel, configs
 from nemo.utils.config_utils import assert_dataclass_signature_match, update_model_config
 
@@ -131,6 +135,55 @@ class TestEncDecCTCModel:
         diff = torch.max(torch.abs(logprobs_instance - logprobs_batch))
         assert diff <= 1e-6
 
+    @pytest.mark.unit
+    def test_transcribe_audio(self, asr_model):
+        rng = np.random.RandomState(0)
+        # Inputs of equal lengths are batched together, and thus not padded
+        lengths = [3200, 800, 16000, 800, 3200, 16000, 1600, 1600]
+        waveforms = [rng.uniform(-0.5, 0.5, size=length).astype(np.float32) for length in lengths]
+        # Same inputs as encoded files, tensors and arrays
+        wav_bytes = io.BytesIO()
+        sf.write(wav_bytes, waveforms[1], 16000, format='WAV', subtype='FLOAT')
+        inputs = [waveforms[0], wav_bytes.getvalue(), torch.from_numpy(waveforms[2])] + waveforms[3:]
+
+        featurizer = asr_model.preprocessor.featurizer
+        dither_value, pad_to_value = featurizer.dither, featurizer.pad_to
+        with torch.no_grad():
+            asr_model.eval()
+            featurizer.dither, featurizer.pad_to = 0.0, 0
+            expected_log_probs = []
+            for waveform in waveforms:
+                log_probs, _, _ = asr_model.forward(
+                    input_signal=torch.from_numpy(waveform)[None], input_signal_length=torch.tensor([len(waveform)])
+                )
+                expected_log_probs.append(log_probs[0])
+            expected_texts, _ = asr_model.decoding.ctc_decoder_predictions_tensor(
+                torch.nn.utils.rnn.pad_sequence(expected_log_probs, batch_first=True),
+                decoder_lengths=torch.tensor([len(log_probs) for log_probs in expected_log_probs]),
+            )
+        asr_model.train()
+        featurizer.dither, featurizer.pad_to = dither_value, pad_to_value
+
+        for batch_size, num_workers, sort_window in [(1, 0, None), (2, 0, None), (2, 2, None), (4, 1, 1), (1, 2, 3)]:
+            hypotheses = asr_model.transcribe_audio(
+                inputs, batch_size=batch_size, return_hypotheses=True, num_workers=num_workers, sort_window=sort_window
+            )
+            hypotheses = list(hypotheses)
+            assert len(hypotheses) == len(waveforms)
+            for hypothesis, expected in zip(hypotheses, expected_log_probs):
+                assert torch.allclose(hypothesis.y_sequence, expected, atol=1e-5)
+
+            texts = asr_model.transcribe_audio(iter(inputs), batch_size=batch_size, sort_window=sort_window)
+            assert list(texts) == expected_texts
+
+        # The model is back in training mode, with its features settings
+        assert asr_model.training
+        assert featurizer.dither == dither_value and featurizer.pad_to == pad_to_value
+
+        # Resampled and averaged over channels
+        stereo_8k = (np.stack([waveforms[0][::2], waveforms[0][::2]], axis=1) * 2 ** 15).astype(np.int16)
+        assert len(list(asr_model.transcribe_audio([stereo_8k], sample_rate=8000))) == 1
+
     @pytest.mark.unit
     def test_vocab_change(self, asr_model):
         old_vocab = copy.deepcopy(asr_model.decoder.vocabulary)
@@ -160,6 +213,12 @@ class TestEncDecCTCModel:
         assert asr_model.decoding.preserve_alignments is True
         assert asr_model.decoding.compute_timestamps is True
 
+        cfg = CTCDecodingConfig(strategy='beam')
+        asr_model.change_decoding_strategy(cfg)
+
+        assert isinstance(asr_model.decoding.decoding, BeamCTCInfer)
+        assert asr_model.decoding.decoding.search.separator_id == asr_model.decoding.vocabulary.index(' ')
+
     @pytest.mark.unit
     def test_change_conv_asr_se_context_window(self, asr_model):
         old_cfg = copy.deepcopy(asr_model.cfg)
@@ -272,6 +331,10 @@ class TestEncDecCTCModel:
             'bucketing_batch_size',
             'bucketing_strategy',
             'bucketing_weights',
+            'max_batch_duration',
+            'num_duration_buckets',
+            'max_batch_size',
+            'feature_store_dir',
         ]
 
         REMAP_ARGS = {'trim_silence': 'trim'}
@@ -301,6 +364,10 @@ class TestEncDecCTCModel:
             'bucketing_batch_size',
             'bucketing_strategy',
             'bucketing_weights',
+            'max_batch_duration',
+            'num_duration_buckets',
+            'max_batch_size',
+            'feature_store_dir',
         ]
 
         REMAP_ARGS = {
@@ -0,0 +1,173 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import pytest
+import torch
+
+from nemo.collections.asr.data import audio_to_text
+from nemo.collections.asr.data.data_samplers import (
+    DurationBucketingBatchSampler,
+    get_duration_bucket_boundaries,
+    make_duration_batches,
+)
+
+SAMPLE_RATE = 100
+
+
+class _DummyIterableDataset(audio_to_text.IterableDataset):
+    def __init__(self, durations):
+        super().__init__()
+        self.durations = durations
+
+    def _collate_fn(self, batch):
+        return audio_to_text._speech_collate_fn(batch, pad_id=0)
+
+    def __iter__(self):
+        for duration in self.durations:
+            length = int(duration * SAMPLE_RATE)
+            yield torch.zeros(length), torch.tensor(length), torch.tensor([1, 2]), torch.tensor(2)
+
+
+class _DummyDataset(audio_to_text.Dataset):
+    def __init__(self, durations):
+        super().__init__()
+        self.samples = list(_DummyIterableDataset(durations))
+
+    def _collate_fn(self, batch):
+        return audio_to_text._speech_collate_fn(batch, pad_id=0)
+
+    def __getitem__(self, index):
+        return self.samples[index]
+
+    def __len__(self):
+        return len(self.samples)
+
+
+def _padded_duration(durations, batch):
+    return len(batch) * max(durations[i] for i in batch)
+
+
+class TestDurationBucketing:
+    @pytest.mark.unit
+    def test_bucket_boundaries(self):
+        durations = np.arange(1, 101, dtype=np.float64)
+        boundaries = get_duration_bucket_boundaries(durations, num_buckets=4)
+        assert len(boundaries) == 3
+        assert np.all(np.diff(boundaries) > 0)
+        assert len(get_duration_bucket_boundaries(durations, num_buckets=1)) == 0
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('shuffle', [False, True])
+    def test_make_duration_batches(self, shuffle):
+        rng = np.random.RandomState(0)
+        durations = rng.uniform(1.0, 30.0, size=500)
+        boundaries = get_duration_bucket_boundaries(durations, num_buckets=10)
+
+        batches = make_duration_batches(
+            durations, boundaries, max_batch_duration=120.0, max_batch_size=16, rng=rng if shuffle else None
+        )
+
+        indices = np.concatenate(batches)
+        assert sorted(indices.tolist()) == list(range(len(durations)))
+        for batch in batches:
+            assert len(batch) <= 16
+            assert _padded_duration(durations, batch) <= 120.0
+            # All the utterances of a batch come from the same bucket.
+            assert len(set(np.searchsorted(boundaries, durations[batch], side='right'))) == 1
+
+    @pytest.mark.unit
+    def test_long_utterance_forms_own_batch(self):
+        durations = np.array([1.0, 50.0, 1.0])
+        batches = make_duration_batches(durations, np.empty(0), max_batch_duration=10.0)
+        assert [batch.tolist() for batch in batches] == [[0, 2], [1]]
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('drop_last', [False, True])
+    def test_batch_sampler_distributed(self, drop_last):
+        durations = np.random.RandomState(0).uniform(1.0, 20.0, size=301)
+        samplers = [
+            DurationBucketingBatchSampler(
+                durations, max_batch_duration=60.0, num_buckets=5, drop_last=drop_last, global_rank=rank, world_size=3
+            )
+            for rank in range(3)
+        ]
+
+        rank_batches = [list(sampler) for sampler in samplers]
+        assert len(set(len(batches) for batches in rank_batches)) == 1
+        assert all(len(sampler) == len(batches) for sampler, batches in zip(samplers, rank_batches))
+
+        indices = [index for batches in rank_batches for batch in batches for index in batch]
+        if drop_last:
+            assert len(indices) == len(set(indices))
+        else:
+            assert set(indices) == set(range(len(durations)))
+
+    @pytest.mark.unit
+    def test_batch_sampler_set_epoch(self):
+        durations = np.random.RandomState(0).uniform(1.0, 20.0, size=200)
+        sampler = DurationBucketingBatchSampler(durations, max_batch_duration=60.0, num_buckets=5)
+
+        first_epoch = list(sampler)
+        assert list(sampler) == first_epoch
+        sampler.set_epoch(1)
+        assert list(sampler) != first_epoch
+
+        sampler = DurationBucketingBatchSampler(durations, max_batch_duration=60.0, num_buckets=5, shuffle=False)
+        for batch in sampler:
+            assert list(durations[batch]) == sorted(durations[batch])
+
+    @pytest.mark.unit
+    def test_duration_bucketing_dataset(self):
+        durations = np.random.RandomState(0).uniform(0.5, 5.0, size=50)
+        sampler = DurationBucketingBatchSampler(durations, max_batch_duration=10.0, num_buckets=4)
+        dataset = audio_to_text.DurationBucketingDataset(_DummyDataset(durations))
+        dataloader = torch.utils.data.DataLoader(
+            dataset=dataset, batch_size=None, sampler=sampler, collate_fn=dataset.collate_fn
+        )
+
+        num_samples = 0
+        for (audio, audio_len, _, _), batch in zip(dataloader, sampler):
+            assert audio.shape[0] == len(batch)
+            assert audio.shape[1] == audio_len.max()
+            assert audio.shape[0] * audio.shape[1] <= 10.0 * SAMPLE_RATE
+            num_samples += len(batch)
+        assert num_samples == len(durations)
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('drop_last', [False, True])
+    def test_tarred_duration_bucketing_dataset(self, drop_last):
+        durations = np.random.RandomState(0).uniform(0.5, 5.0, size=50)
+        boundaries = get_duration_bucket_boundaries(durations, num_buckets=4)
+        dataset = audio_to_text.TarredDurationBucketingDataset(
+            dataset=_DummyIterableDataset(durations),
+            sample_rate=SAMPLE_RATE,
+            max_batch_duration=10.0,
+            bucket_boundaries=boundaries,
+            max_batch_size=4,
+            drop_last=drop_last,
+            durations=durations,
+        )
+        dataloader = torch.utils.data.DataLoader(dataset=dataset, batch_size=None, collate_fn=dataset.collate_fn)
+
+        num_samples = 0
+        for audio, audio_len, _, _ in dataloader:
+            assert audio.shape[0] <= 4
+            assert audio.shape[0] * audio.shape[1] <= 10.0 * SAMPLE_RATE
+            num_samples += audio.shape[0]
+        if drop_last:
+            assert num_samples < len(durations)
+        else:
+            assert num_samples == len(durations)
+        assert len(dataset) > 0
@@ -24,7 +24,11 @@ from omegaconf import DictConfig, OmegaConf
 from torch.utils.data import DataLoader
 
 from nemo.collections.asr.data import audio_to_text_dataset
-from nemo.collections.asr.data.audio_to_text import TarredAudioToBPEDataset, TarredAudioToCharDataset
+from nemo.collections.asr.data.audio_to_text import (
+    TarredAudioToBPEDataset,
+    TarredAudioToCharDataset,
+    _speech_collate_fn,
+)
 from nemo.collections.asr.data.audio_to_text_dali import (
     __DALI_MINIMUM_VERSION__,
     AudioToBPEDALIDataset,
@@ -118,6 +122,44 @@ class TestASRDatasets:
             count += 1
         assert count == 32
 
+    @pytest.mark.unit
+    @pytest.mark.parametrize('with_sample_ids', [False, True])
+    def test_speech_collate_fn(self, with_sample_ids):
+        audio_lengths = [3, 5, 1]
+        tokens_lengths = [2, 0, 4]
+        batch = []
+        for idx, (audio_len, tokens_len) in enumerate(zip(audio_lengths, tokens_lengths)):
+            sample = (
+                torch.arange(1, audio_len + 1, dtype=torch.float32),
+                torch.tensor(audio_len).long(),
+                torch.arange(1, tokens_len + 1).long(),
+                torch.tensor(tokens_len).long(),
+            )
+            batch.append(sample + (idx,) if with_sample_ids else sample)
+
+        outputs = _speech_collate_fn(batch, pad_id=-1)
+
+        audio_signal, audio_len, tokens, tokens_len = outputs[:4]
+        assert audio_signal.shape == (3, 5) and audio_signal.dtype == torch.float32
+        assert tokens.shape == (3, 4) and tokens.dtype == torch.long
+        assert audio_len.tolist() == audio_lengths
+        assert tokens_len.tolist() == tokens_lengths
+        assert audio_signal.tolist() == [[1, 2, 3, 0, 0], [1, 2, 3, 4, 5], [1, 0, 0, 0, 0]]
+        assert tokens.tolist() == [[1, 2, -1, -1], [-1, -1, -1, -1], [1, 2, 3, 4]]
+        if with_sample_ids:
+            assert outputs[4].tolist() == [0, 1, 2]
+        else:
+            assert len(outputs) == 4
+
+    @pytest.mark.unit
+    def test_speech_collate_fn_without_audio(self):
+        batch = [(None, None, torch.tensor([1, 2]).long(), torch.tensor(2).long())]
+
+        audio_signal, audio_len, tokens, tokens_len = _speech_collate_fn(batch, pad_id=0)
+
+        assert audio_signal is None and audio_len is None
+        assert tokens.tolist() == [[1, 2]]
+
     @pytest.mark.unit
     def test_mismatch_in_model_dataloader_config(self, caplog):
         logging._logger.propagate = True
@@ -0,0 +1,181 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import pickle
+
+import numpy as np
+import pytest
+import soundfile as sf
+import torch
+
+from nemo.collections.asr.data import audio_to_text_dataset
+from nemo.collections.asr.data.audio_to_text_dali import DALIOutputs
+from nemo.collections.asr.data.feature_to_label import FeatureToSeqSpeakerLabelDataset
+from nemo.collections.asr.data.feature_to_text import FeatureTextOutputs, FeatureToCharDataset
+from nemo.collections.asr.modules import AudioToMelSpectrogramPreprocessor
+from nemo.collections.asr.parts.preprocessing.feature_store import (
+    FeatureStore,
+    FeatureStoreWriter,
+    get_feature_store_key,
+)
+from nemo.collections.asr.parts.preprocessing.features import WaveformFeaturizer
+
+LABELS = [' ', 'a', 'b', 'c']
+
+
+def _random_features(rng, num_frames, num_features=8):
+    return rng.standard_normal((num_features, num_frames)).astype(np.float32)
+
+
+class TestFeatureStore:
+    @pytest.mark.unit
+    @pytest.mark.parametrize('dtype', ['float32', 'float16'])
+    def test_write_read(self, tmpdir, dtype):
+        rng = np.random.RandomState(0)
+        features = {f'utt_{idx}': _random_features(rng, num_frames) for idx, num_frames in enumerate([5, 100, 1, 37])}
+
+        with FeatureStoreWriter(str(tmpdir), shard_size_mb=(50 * 8 * 2) / (1024 * 1024), dtype=dtype) as writer:
+            for key, features_i in features.items():
+                writer.add(key, features_i)
+        store = FeatureStore(str(tmpdir))
+
+        assert len(store) == len(features)
+        assert len(store.shards) > 1
+        for key, features_i in features.items():
+            loaded = store.get(key)
+            assert loaded.dtype == np.float32
+            assert store.num_frames(key) == features_i.shape[1]
+            np.testing.assert_allclose(loaded, features_i.astype(dtype), rtol=0)
+        assert 'utt_missing' not in store
+        with pytest.raises(KeyError):
+            store.get('utt_missing')
+
+        # Memory maps are not pickled, e.g. when sent to dataloader workers.
+        store = pickle.loads(pickle.dumps(store))
+        assert len(store._mmaps) == 0
+        assert torch.equal(
+            store.process('utt_1'), torch.from_numpy(features['utt_1'].astype(dtype).astype(np.float32))
+        )
+
+    @pytest.mark.unit
+    def test_writer_errors(self, tmpdir):
+        rng = np.random.RandomState(0)
+        writer = FeatureStoreWriter(str(tmpdir))
+        writer.add('utt_0', _random_features(rng, 10))
+        with pytest.raises(ValueError):
+            writer.add('utt_0', _random_features(rng, 10))
+        with pytest.raises(ValueError):
+            writer.add('utt_1', _random_features(rng, 10, num_features=4))
+
+    @pytest.mark.unit
+    def test_merge_indices(self, tmpdir):
+        rng = np.random.RandomState(0)
+        features, index_paths = {}, []
+        for rank in range(2):
+            writer = FeatureStoreWriter(str(tmpdir), shard_size_mb=1e-4, shard_prefix=f'rank_{rank}')
+            for idx in range(3):
+                key = f'rank_{rank}_utt_{idx}'
+                features[key] = _random_features(rng, 10)
+                writer.add(key, features[key])
+            index_paths.append(writer.close())
+        FeatureStoreWriter.merge_indices(str(tmpdir), index_paths)
+
+        store = FeatureStore(str(tmpdir))
+        assert len(store) == 6
+        for key, features_i in features.items():
+            np.testing.assert_array_equal(store.get(key), features_i)
+
+
+class TestFeatureDatasets:
+    @pytest.fixture
+    def feature_store_data(self, tmpdir):
+        rng = np.random.RandomState(0)
+        preprocessor = AudioToMelSpectrogramPreprocessor(features=16, dither=0.0).eval()
+        featurizer = WaveformFeaturizer(sample_rate=16000)
+        manifest_path = os.path.join(tmpdir, 'manifest.json')
+        store_dir = os.path.join(tmpdir, 'features')
+
+        expected = []
+        with open(manifest_path, 'w') as f, FeatureStoreWriter(store_dir) as writer:
+            for idx, (duration, text) in enumerate(zip([0.5, 1.0, 0.3], ['ab', 'abc', 'a b c'])):
+                audio_file = os.path.join(tmpdir, f'audio_{idx}.wav')
+                sf.write(audio_file, rng.uniform(-0.5, 0.5, size=int(duration * 16000)), 16000)
+                entry = {'audio_filepath': audio_file, 'duration': duration, 'text': text}
+                f.write(json.dumps(entry) + '\n')
+
+                audio = featurizer.process(audio_file, duration=duration)
+                with torch.no_grad():
+                    features, length = preprocessor(input_signal=audio[None], length=torch.tensor([len(audio)]))
+                features = features[0, :, : length[0]].numpy()
+                writer.add(get_feature_store_key(audio_file, None, duration), features)
+                expected.append(features)
+        return manifest_path, store_dir, expected, ['ab', 'abc', 'a b c']
+
+    @pytest.mark.unit
+    def test_feature_to_char_dataset(self, feature_store_data):
+        manifest_path, store_dir, expected, texts = feature_store_data
+        dataset = FeatureToCharDataset(manifest_filepath=manifest_path, labels=LABELS, feature_store_dir=store_dir)
+
+        assert len(dataset) == len(expected)
+        for idx, (features, text) in enumerate(zip(expected, texts)):
+            f, fl, t, tl = dataset[idx]
+            np.testing.assert_array_equal(f.numpy(), features)
+            assert fl.item() == features.shape[1]
+            assert t.tolist() == [LABELS.index(char) for char in text]
+
+        batch = dataset.collate_fn([dataset[idx] for idx in range(len(dataset))])
+        assert isinstance(batch, DALIOutputs) and batch.has_processed_signal
+        signal, signal_len, transcript, transcript_len = batch.to('cpu')
+        assert signal.shape == (3, 16, max(features.shape[1] for features in expected))
+        for signal_i, length, features in zip(signal, signal_len, expected):
+            np.testing.assert_array_equal(signal_i[:, :length].numpy(), features)
+            assert torch.all(signal_i[:, length:] == 0)
+        assert transcript.shape == (3, transcript_len.max())
+
+    @pytest.mark.unit
+    def test_get_char_dataset(self, feature_store_data):
+        manifest_path, store_dir, _, _ = feature_store_data
+        config = {'manifest_filepath': manifest_path, 'labels': LABELS, 'sample_rate': 16000}
+
+        dataset = audio_to_text_dataset.get_char_dataset(config=dict(config, feature_store_dir=store_dir))
+        assert isinstance(dataset, FeatureToCharDataset)
+        dataloader = torch.utils.data.DataLoader(dataset, batch_size=2, collate_fn=dataset.collate_fn)
+        assert all(isinstance(batch, FeatureTextOutputs) for batch in dataloader)
+
+        # Features of the entries of the manifest are required, e.g. here reading the first audio file at an offset.
+        with open(manifest_path, 'r') as f:
+            entry = json.loads(f.readline())
+        with open(manifest_path, 'a') as f:
+            f.write(json.dumps(dict(entry, offset=0.1, duration=0.2)) + '\n')
+        with pytest.raises(ValueError):
+            audio_to_text_dataset.get_char_dataset(config=dict(config, feature_store_dir=store_dir))
+
+    @pytest.mark.unit
+    def test_feature_to_label_dataset(self, tmpdir):
+        rng = np.random.RandomState(0)
+        manifest_path = os.path.join(tmpdir, 'manifest.json')
+        store_dir = os.path.join(tmpdir, 'features')
+        with open(manifest_path, 'w') as f, FeatureStoreWriter(store_dir) as writer:
+            for idx in range(3):
+                writer.add(f'utt_{idx}', _random_features(rng, 5))
+                f.write(json.dumps({'feature_filepath': f'utt_{idx}', 'seq_label': 'a b a b a'}) + '\n')
+
+        store = FeatureStore(store_dir)
+        dataset = FeatureToSeqSpeakerLabelDataset(
+            manifest_filepath=manifest_path, labels=['a', 'b'], feature_loader=store
+        )
+        features, _, _, _ = dataset[1]
+        assert torch.equal(features, store.process('utt_1'))
@@ -24,8 +24,16 @@ import torch
 
 from nemo.collections.asr.metrics.rnnt_wer import RNNTWER
 from nemo.collections.asr.metrics.rnnt_wer_bpe import RNNTBPEWER
-from nemo.collections.asr.metrics.wer import WER, CTCDecoding, CTCDecodingConfig, word_error_rate
+from nemo.collections.asr.metrics.wer import (
+    WER,
+    CTCDecoding,
+    CTCDecodingConfig,
+    word_error_rate,
+    word_error_rate_detail,
+)
 from nemo.collections.asr.metrics.wer_bpe import WERBPE, CTCBPEDecoding, CTCBPEDecodingConfig
+from nemo.collections.asr.parts.submodules.ctc_greedy_decoding import BatchedGreedyCTCHypotheses
+from nemo.collections.asr.parts.utils.edit_distance_utils import compute_error_rate_stats
 from nemo.collections.asr.parts.utils.rnnt_utils import Hypothesis
 from nemo.collections.common.tokenizers import CharTokenizer
 from nemo.utils.config_utils import assert_dataclass_signature_match
@@ -103,6 +111,66 @@ class TestWordErrorRate:
         assert word_error_rate(hypotheses=['ducati motorcycle'], references=['ducuti motorcycle']) == 0.5
         assert word_error_rate(hypotheses=['a B c'], references=['a b c']) == 1.0 / 3.0
 
+    @pytest.mark.unit
+    def test_wer_detail(self):
+        stats = word_error_rate_detail(
+            hypotheses=['a b d e', 'a c', ''], references=['a c d', 'a c', 'x y'], return_alignments=True
+        )
+        assert stats.substitutions.tolist() == [1, 0, 0]
+        assert stats.insertions.tolist() == [1, 0, 0]
+        assert stats.deletions.tolist() == [0, 0, 2]
+        assert stats.reference_lengths.tolist() == [3, 2, 2]
+        assert stats.error_rate == 4.0 / 7.0
+        assert stats.alignments[0] == [('C', 'a', 'a'), ('S', 'b', 'c'), ('C', 'd', 'd'), ('I', 'e', None)]
+        assert stats.alignments[2] == [('D', None, 'x'), ('D', None, 'y')]
+
+        stats = word_error_rate_detail(hypotheses=['GPUs'], references=['G PU'], use_cer=True)
+        assert (stats.substitutions[0], stats.insertions[0], stats.deletions[0]) == (0, 1, 1)
+        assert stats.error_rate == 0.5
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("use_cer", [False, True])
+    def test_wer_detail_randomized(self, use_cer):
+        editdistance = pytest.importorskip("editdistance")
+        rng = random.Random(0)
+        words = ['a', 'b', 'ab', 'ba', 'abc', 'é', 'ü b']
+
+        def __random_sentence():
+            return ' '.join(rng.choice(words) for _ in range(rng.randint(0, 30)))
+
+        hypotheses = [__random_sentence() for _ in range(200)]
+        references = [__random_sentence() for _ in range(200)]
+        stats = word_error_rate_detail(hypotheses, references, use_cer=use_cer, return_alignments=True)
+        for h, r, errors, alignment in zip(hypotheses, references, stats.errors, stats.alignments):
+            h_list, r_list = (list(h), list(r)) if use_cer else (h.split(), r.split())
+            assert errors == editdistance.eval(h_list, r_list)
+            assert [t for op, t, _ in alignment if op != 'D'] == h_list
+            assert [t for op, _, t in alignment if op != 'I'] == r_list
+            assert sum(op != 'C' for op, _, _ in alignment) == errors
+
+        # Chunks of pairs aligned by several threads.
+        parallel_stats = compute_error_rate_stats(
+            hypotheses, references, use_cer=use_cer, return_alignments=True, num_workers=3
+        )
+        assert (parallel_stats.errors == stats.errors).all()
+        assert parallel_stats.alignments == stats.alignments
+
+    @pytest.mark.unit
+    def test_wer_metric_edit_operations(self):
+        decoding = Mock(
+            blank_id=len(self.vocabulary),
+            labels_map=self.vocabulary.copy(),
+            ctc_decoder_predictions_tensor=Mock(return_value=(['a b d e', 'x'], None)),
+            decode_tokens_to_str=self.decode_token_to_str_with_vocabulary_mock,
+        )
+        wer = WER(decoding, use_cer=False)
+        targets = torch.nn.utils.rnn.pad_sequence(
+            [self.__reference_string_to_tensor(r, False)[0] for r in ['a c d', 'x y']], batch_first=True
+        )
+        wer(predictions=None, predictions_lengths=None, targets=targets, target_lengths=torch.tensor([5, 3]))
+        assert (wer.substitutions.item(), wer.insertions.item(), wer.deletions.item()) == (1, 1, 1)
+        assert wer.compute()[0].item() == pytest.approx(3.0 / 5.0)
+
     @pytest.mark.unit
     @pytest.mark.parametrize("batch_dim_index", [0, 1])
     @pytest.mark.parametrize("test_wer_bpe", [False, True])
@@ -422,6 +490,48 @@ class TestWordErrorRate:
         assert len(hyp.timestep) == 3
         assert hyp.alignments is None
 
+    @pytest.mark.unit
+    @pytest.mark.parametrize("as_labels", [False, True])
+    @pytest.mark.parametrize("compute_timestamps", [False, True])
+    @pytest.mark.parametrize("with_lengths", [False, True])
+    def test_char_decoding_batched_inference(self, as_labels, compute_timestamps, with_lengths):
+        B, T, V = 4, 20, len(self.vocabulary)
+        torch.manual_seed(0)
+        decoder_outputs = torch.log_softmax(torch.randn(B, T, V + 1) * 3, dim=-1)
+        if as_labels:
+            decoder_outputs = decoder_outputs.argmax(dim=-1)
+        decoder_lens = torch.tensor([T, 7, 1, 12], dtype=torch.int32) if with_lengths else None
+
+        decodings = []
+        for batched_inference in [True, False]:
+            decoding_cfg = CTCDecodingConfig(compute_timestamps=compute_timestamps)
+            decoding_cfg.greedy.batched_inference = batched_inference
+            decodings.append(CTCDecoding(decoding_cfg, vocabulary=self.vocabulary))
+
+        texts, _ = decodings[0].ctc_decoder_predictions_tensor(decoder_outputs, decoder_lens)
+        expected_texts, _ = decodings[1].ctc_decoder_predictions_tensor(decoder_outputs, decoder_lens)
+        assert texts == expected_texts
+
+        hyps, _ = decodings[0].ctc_decoder_predictions_tensor(decoder_outputs, decoder_lens, return_hypotheses=True)
+        expected_hyps, _ = decodings[1].ctc_decoder_predictions_tensor(
+            decoder_outputs, decoder_lens, return_hypotheses=True
+        )
+        assert len(hyps) == B
+        if not compute_timestamps:
+            # Hypotheses are only created when accessed
+            assert isinstance(hyps, BatchedGreedyCTCHypotheses)
+        for hyp, expected_hyp in zip(hyps, expected_hyps):
+            assert isinstance(hyp, Hypothesis)
+            assert hyp.text == expected_hyp.text
+            assert torch.equal(hyp.y_sequence, expected_hyp.y_sequence)
+            assert float(hyp.score) == pytest.approx(float(expected_hyp.score), abs=1e-4)
+            assert hyp.length == expected_hyp.length
+            assert hyp.timestep == expected_hyp.timestep
+
+        # Changes to the hypotheses persist
+        hyps[1].y_sequence = None
+        assert hyps[1].y_sequence is None and hyps[-3] is hyps[1]
+
     @pytest.mark.unit
     def test_subword_decoding_logprobs(self):
         B, T, V = 1, 8, self.char_tokenizer.vocab_size
@@ -0,0 +1,195 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import pickle
+import random
+
+import numpy as np
+import pytest
+import soundfile as sf
+import torch
+from scipy import signal
+
+from nemo.collections.asr.data.audio_to_text import AudioToCharDataset
+from nemo.collections.asr.parts.preprocessing.perturb import (
+    AudioAugmentor,
+    AudioBank,
+    GainPerturbation,
+    ImpulsePerturbation,
+    NoisePerturbation,
+    RandomSegmentPerturbation,
+    ShiftPerturbation,
+    WhiteNoisePerturbation,
+)
+from nemo.collections.asr.parts.preprocessing.segment import AudioSegment
+
+SAMPLE_RATE = 8000
+
+
+def _write_manifest(tmpdir, name, durations, seed=0):
+    rng = np.random.RandomState(seed)
+    manifest_path = os.path.join(tmpdir, f'{name}.json')
+    with open(manifest_path, 'w') as f:
+        for idx, duration in enumerate(durations):
+            audio_file = os.path.join(tmpdir, f'{name}_{idx}.wav')
+            sf.write(audio_file, rng.uniform(-0.5, 0.5, size=int(duration * SAMPLE_RATE)), SAMPLE_RATE)
+            f.write(json.dumps({'audio_filepath': audio_file, 'duration': duration, 'text': 'a'}) + '\n')
+    return manifest_path
+
+
+def _padded_batch(lengths, seed=0):
+    rng = np.random.RandomState(seed)
+    lengths = torch.tensor(lengths)
+    signals = torch.zeros(len(lengths), int(lengths.max()))
+    for signal_i, length in zip(signals, lengths):
+        signal_i[:length] = torch.from_numpy(rng.uniform(-0.5, 0.5, size=int(length)).astype(np.float32))
+    return signals, lengths
+
+
+def _perturb_each(perturbation, signals, lengths, mask):
+    expected = signals.clone()
+    for idx in mask.nonzero().flatten().tolist():
+        segment = AudioSegment(signals[idx, : lengths[idx]].numpy().copy(), SAMPLE_RATE)
+        perturbation.perturb(segment)
+        expected[idx, : lengths[idx]] = torch.from_numpy(segment.samples)
+    return expected
+
+
+class TestBatchedPerturbations:
+    @pytest.mark.unit
+    @pytest.mark.parametrize(
+        'perturbation_cls, kwargs',
+        [(GainPerturbation, {}), (ShiftPerturbation, {'min_shift_ms': -50.0, 'max_shift_ms': 50.0})],
+    )
+    def test_matches_per_sample(self, perturbation_cls, kwargs):
+        signals, lengths = _padded_batch([800, 1000, 300, 1000])
+        mask = torch.tensor([True, True, False, True])
+
+        expected = _perturb_each(perturbation_cls(rng=random.Random(1), **kwargs), signals, lengths, mask)
+        perturbed = perturbation_cls(rng=random.Random(1), **kwargs).perturb_batch(
+            signals.clone(), lengths, SAMPLE_RATE, mask
+        )
+        torch.testing.assert_close(perturbed, expected)
+
+    @pytest.mark.unit
+    def test_white_noise(self):
+        signals, lengths = _padded_batch([800, 1000, 300])
+        mask = torch.tensor([True, False, True])
+        perturbation = WhiteNoisePerturbation(min_level=-40, max_level=-30)
+
+        perturbed = perturbation.perturb_batch(signals.clone(), lengths, SAMPLE_RATE, mask)
+        assert torch.equal(perturbed[1], signals[1])
+        for idx in [0, 2]:
+            assert not torch.equal(perturbed[idx, : lengths[idx]], signals[idx, : lengths[idx]])
+            assert torch.all(perturbed[idx, lengths[idx] :] == 0)
+
+    @pytest.mark.unit
+    def test_noise(self, tmpdir):
+        noise_manifest = _write_manifest(tmpdir, 'noise', [0.05, 0.5], seed=1)
+        signals, lengths = _padded_batch([2000, 4000, 1000])
+        mask = torch.tensor([True, True, True])
+        perturbation = NoisePerturbation(
+            manifest_path=noise_manifest, min_snr_db=10, max_snr_db=10, rng=random.Random(1)
+        )
+
+        perturbed = perturbation.perturb_batch(signals.clone(), lengths, SAMPLE_RATE, mask)
+        # Replays the draws of the perturbation to get the span of the noise added to each signal.
+        rng = random.Random(1)
+        bank_lengths = AudioBank(noise_manifest, SAMPLE_RATE).lengths
+        for idx, length in enumerate(lengths.tolist()):
+            noise_length = int(bank_lengths[rng.randrange(len(bank_lengths))])
+            rng.uniform(10, 10)
+            if noise_length > length:
+                rng.uniform(0, noise_length - length)
+            position = rng.randint(0, length - noise_length) if noise_length < length else 0
+            valid = np.zeros(signals.shape[1], dtype=bool)
+            valid[position : position + min(noise_length, length)] = True
+
+            noise = (perturbed[idx] - signals[idx]).numpy()
+            assert np.all(noise[~valid] == 0)
+            # Noise is added at the requested SNR over its span.
+            data_rms = 10 * np.log10(np.mean(signals[idx, :length].numpy() ** 2))
+            noise_rms = 10 * np.log10(np.mean(noise[valid] ** 2))
+            assert data_rms - noise_rms == pytest.approx(10.0, abs=1e-3)
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('shift_impulse', [False, True])
+    def test_impulse(self, tmpdir, shift_impulse):
+        rir_manifest = _write_manifest(tmpdir, 'rir', [0.01], seed=1)
+        signals, lengths = _padded_batch([800, 1000, 300])
+        mask = torch.tensor([True, False, True])
+        perturbation = ImpulsePerturbation(manifest_path=rir_manifest, shift_impulse=shift_impulse)
+
+        perturbed = perturbation.perturb_batch(signals.clone(), lengths, SAMPLE_RATE, mask)
+        impulse = AudioSegment.from_file(os.path.join(tmpdir, 'rir_0.wav')).samples
+        impulse = (impulse - impulse.min()) / (impulse.max() - impulse.min())
+        for idx in [0, 2]:
+            data = signals[idx, : lengths[idx]].numpy()
+            if shift_impulse:
+                expected = signal.fftconvolve(data, impulse[np.argmax(np.abs(impulse)) :], 'full')[: len(data)]
+            else:
+                expected = signal.fftconvolve(data, impulse, 'same')
+            np.testing.assert_allclose(perturbed[idx, : lengths[idx]].numpy(), expected, atol=1e-4)
+            assert torch.all(perturbed[idx, lengths[idx] :] == 0)
+        assert torch.equal(perturbed[1], signals[1])
+
+    @pytest.mark.unit
+    def test_audio_bank_cache(self, tmpdir):
+        manifest_path = _write_manifest(tmpdir, 'noise', [0.1, 0.2, 0.05])
+        cache_dir = os.path.join(tmpdir, 'cache')
+
+        bank = AudioBank(manifest_path, SAMPLE_RATE, cache_dir=cache_dir)
+        assert len(bank) == 3
+        assert bank.lengths.tolist() == [800, 1600, 400]
+        np.testing.assert_array_equal(bank[1], AudioSegment.from_file(os.path.join(tmpdir, 'noise_1.wav')).samples)
+
+        cached_bank = pickle.loads(pickle.dumps(bank))
+        assert cached_bank._samples is None
+        assert isinstance(cached_bank.samples, np.memmap)
+        np.testing.assert_array_equal(cached_bank.samples, bank.samples)
+
+    @pytest.mark.unit
+    def test_augmentor_perturb_batch(self):
+        signals, lengths = _padded_batch([800, 1000, 300])
+        augmentor = AudioAugmentor(
+            perturbations=[
+                (1.0, GainPerturbation(min_gain_dbfs=6.0, max_gain_dbfs=6.0)),
+                (1.0, RandomSegmentPerturbation(duration_sec=0.025)),
+            ]
+        )
+
+        perturbed, perturbed_lengths = augmentor.perturb_batch(signals.clone(), lengths, SAMPLE_RATE)
+        assert perturbed_lengths.tolist() == [200, 200, 200]
+        assert perturbed.shape == (3, 200)
+
+    @pytest.mark.unit
+    def test_dataset_batch_augmentation(self, tmpdir):
+        manifest_path = _write_manifest(tmpdir, 'data', [0.1, 0.2, 0.05])
+        augmentor = AudioAugmentor(perturbations=[(1.0, GainPerturbation(min_gain_dbfs=6.0, max_gain_dbfs=6.0))])
+        datasets = [
+            AudioToCharDataset(
+                manifest_filepath=manifest_path,
+                labels=['a'],
+                sample_rate=SAMPLE_RATE,
+                augmentor=augmentor,
+                batch_augmentation=batch_augmentation,
+            )
+            for batch_augmentation in [False, True]
+        ]
+
+        batches = [dataset.collate_fn([dataset[idx] for idx in range(len(dataset))]) for dataset in datasets]
+        for tensor, batched_tensor in zip(*batches):
+            torch.testing.assert_close(tensor, batched_tensor)
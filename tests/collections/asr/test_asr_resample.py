@@ -0,0 +1,56 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+
+import numpy as np
+import pytest
+import soundfile as sf
+from scipy.signal import resample_poly
+
+from nemo.collections.asr.parts.preprocessing.features import WaveformFeaturizer
+from nemo.collections.asr.parts.preprocessing.resample import Resampler
+from nemo.collections.asr.parts.preprocessing.segment import AudioSegment
+
+
+class TestResampler:
+    @pytest.mark.unit
+    @pytest.mark.parametrize('orig_sr, target_sr', [(8000, 16000), (48000, 16000), (44100, 16000), (22050, 16000)])
+    def test_polyphase_matches_scipy(self, orig_sr, target_sr):
+        samples = np.random.RandomState(0).uniform(-1.0, 1.0, size=orig_sr // 2 + 17).astype(np.float32)
+        resampler = Resampler(method='polyphase')
+
+        resampled = resampler.resample(samples, orig_sr, target_sr)
+        expected = resample_poly(samples, target_sr, orig_sr)
+        assert resampled.dtype == np.float32
+        assert len(resampled) == len(expected)
+        np.testing.assert_allclose(resampled, expected, atol=1e-5)
+
+    @pytest.mark.unit
+    def test_invalid_method(self):
+        with pytest.raises(ValueError):
+            Resampler(method='sinc')
+
+    @pytest.mark.unit
+    def test_waveform_featurizer(self, tmpdir):
+        audio_file = os.path.join(tmpdir, 'audio.wav')
+        sf.write(audio_file, np.random.RandomState(0).uniform(-0.5, 0.5, size=8000), 8000)
+
+        featurizer = WaveformFeaturizer.from_config({'sample_rate': 16000, 'resample_method': 'polyphase'})
+        features = featurizer.process(audio_file)
+        assert features.shape == (16000,)
+
+        segment = AudioSegment.from_file(audio_file, target_sr=16000, resampler=Resampler(method='polyphase'))
+        expected = resample_poly(sf.read(audio_file, dtype='float32')[0], 2, 1)
+        np.testing.assert_allclose(segment.samples, expected, atol=1e-5)
@@ -146,6 +146,22 @@ class TestEncDecRNNTModel:
         diff = torch.max(torch.abs(logprobs_instance - logprobs_batch))
         assert diff <= 1e-6
 
+    @pytest.mark.skipif(
+        not NUMBA_RNNT_LOSS_AVAILABLE, reason='RNNTLoss has not been compiled with appropriate numba version.',
+    )
+    @pytest.mark.unit
+    def test_transcribe_audio(self, asr_model):
+        asr_model.compute_eval_loss = False
+        # Inputs of equal lengths are batched together, and thus not padded
+        torch.manual_seed(0)
+        inputs = [torch.randn(1600), torch.randn(800), torch.randn(1600)]
+
+        texts = list(asr_model.transcribe_audio(inputs, batch_size=2))
+        assert texts == [list(asr_model.transcribe_audio([signal], batch_size=1))[0] for signal in inputs]
+
+        hypotheses = list(asr_model.transcribe_audio(inputs, batch_size=2, return_hypotheses=True))
+        assert [hypothesis.text for hypothesis in hypotheses] == texts
+
     @pytest.mark.skipif(
         not NUMBA_RNNT_LOSS_AVAILABLE, reason='RNNTLoss has not been compiled with appropriate numba version.',
     )
@@ -240,6 +256,13 @@ class TestEncDecRNNTModel:
         assert isinstance(asr_model.decoding.decoding, beam_decode.BeamRNNTInfer)
         assert asr_model.decoding.decoding.search_type == "alsd"
 
+        new_strategy = DictConfig({})
+        new_strategy.strategy = 'beam_batch'
+        new_strategy.beam = DictConfig({'beam_size': 2})
+        asr_model.change_decoding_strategy(decoding_cfg=new_strategy)
+        assert isinstance(asr_model.decoding.decoding, beam_decode.BeamRNNTInfer)
+        assert asr_model.decoding.decoding.search_type == "batch"
+
     @pytest.mark.unit
     def test_GreedyRNNTInferConfig(self):
         IGNORE_ARGS = ['decoder_model', 'joint_model', 'blank_index']
@@ -374,6 +397,7 @@ class TestEncDecRNNTModel:
             {"search_type": "tsd", "tsd_max_sym_exp_per_step": 3, "return_best_hypothesis": False},
             {"search_type": "maes", "maes_num_steps": 2, "maes_expansion_beta": 2, "return_best_hypothesis": False},
             {"search_type": "maes", "maes_num_steps": 3, "maes_expansion_beta": 1, "return_best_hypothesis": False},
+            {"search_type": "batch", "batch_max_symbols_per_step": 3, "return_best_hypothesis": False},
         ],
     )
     def test_beam_decoding(self, beam_config):
@@ -405,6 +429,123 @@ class TestEncDecRNNTModel:
         with torch.no_grad():
             _ = beam(encoder_output=enc_out, encoded_lengths=enc_len)
 
+    @pytest.mark.unit
+    def test_prediction_cache(self):
+        cache = rnnt_utils.PredictionCache(max_size=3)
+        cache[(0,)] = 'a'
+        cache[(0, 1)] = 'b'
+        cache[(0, 1, 2)] = 'c'
+        assert cache.get((0,)) == 'a'
+        assert cache.get((0, 2)) is None
+        assert (cache.hits, cache.misses) == (1, 1)
+
+        # The least recently used entry is evicted
+        cache[(0, 2)] = 'd'
+        assert len(cache) == 3
+        assert (0, 1) not in cache
+        assert cache[(0, 1, 2)] == 'c'
+        assert cache.get((0, 2)) == 'd'
+        with pytest.raises(KeyError):
+            cache[(0, 1)]
+
+        cache.clear()
+        assert len(cache) == 0 and (0,) not in cache
+        assert cache.hit_rate == pytest.approx(2 / 3)
+
+    @pytest.mark.skipif(
+        not NUMBA_RNNT_LOSS_AVAILABLE, reason='RNNTLoss has not been compiled with appropriate numba version.',
+    )
+    @pytest.mark.unit
+    @pytest.mark.parametrize("search_type", ["default", "tsd", "alsd", "maes"])
+    def test_beam_decoding_prediction_cache(self, search_type):
+        token_list = [" ", "a", "b", "c"]
+        vocab_size = len(token_list)
+
+        prednet_cfg = {'pred_hidden': 4, 'pred_rnn_layers': 1}
+        jointnet_cfg = {'encoder_hidden': 4, 'pred_hidden': 4, 'joint_hidden': 4, 'activation': 'relu'}
+
+        torch.manual_seed(0)
+        decoder = RNNTDecoder(prednet_cfg, vocab_size)
+        joint_net = RNNTJoint(jointnet_cfg, vocab_size, vocabulary=token_list)
+
+        # (B, D, T)
+        enc_out = torch.randn(3, 4, 20)
+        enc_len = torch.tensor([20, 12, 20], dtype=torch.int32)
+
+        hyps = []
+        for prediction_cache_size in [None, 1]:
+            beam = beam_decode.BeamRNNTInfer(
+                decoder,
+                joint_net,
+                beam_size=2,
+                search_type=search_type,
+                return_best_hypothesis=False,
+                prediction_cache_size=prediction_cache_size,
+            )
+            with torch.no_grad():
+                hyps.append(beam(encoder_output=enc_out, encoded_lengths=enc_len)[0])
+            assert beam.prediction_cache.hits > 0
+            assert len(beam.prediction_cache) == 0
+
+        # Evictions only cause recomputations
+        for nbest, nbest_evicted in zip(*hyps):
+            for hyp, hyp_evicted in zip(nbest.n_best_hypotheses, nbest_evicted.n_best_hypotheses):
+                assert hyp.y_sequence.tolist() == hyp_evicted.y_sequence.tolist()
+                assert hyp.score == pytest.approx(hyp_evicted.score)
+
+    @pytest.mark.skipif(
+        not NUMBA_RNNT_LOSS_AVAILABLE, reason='RNNTLoss has not been compiled with appropriate numba version.',
+    )
+    @pytest.mark.unit
+    def test_batched_beam_decoding(self):
+        token_list = [" ", "a", "b", "c", "d"]
+        vocab_size = len(token_list)
+
+        encoder_output_size = 4
+        decoder_output_size = 4
+        joint_output_shape = 4
+
+        prednet_cfg = {'pred_hidden': decoder_output_size, 'pred_rnn_layers': 1}
+        jointnet_cfg = {
+            'encoder_hidden': encoder_output_size,
+            'pred_hidden': decoder_output_size,
+            'joint_hidden': joint_output_shape,
+            'activation': 'relu',
+        }
+
+        torch.manual_seed(0)
+        decoder = RNNTDecoder(prednet_cfg, vocab_size)
+        joint_net = RNNTJoint(jointnet_cfg, vocab_size, vocabulary=token_list)
+
+        beam = beam_decode.BeamRNNTInfer(
+            decoder, joint_net, beam_size=3, search_type='batch', return_best_hypothesis=False
+        )
+
+        # (B, D, T)
+        enc_out = 3 * torch.randn(4, encoder_output_size, 20)
+        enc_len = torch.tensor([20, 7, 1, 15], dtype=torch.int32)
+
+        with torch.no_grad():
+            hyps = beam(encoder_output=enc_out, encoded_lengths=enc_len)[0]
+
+            # Decoding a padded batch gives the same hypotheses as decoding its samples one by one
+            for idx in range(len(enc_len)):
+                sample_hyps = beam(
+                    encoder_output=enc_out[idx : idx + 1, :, : enc_len[idx]], encoded_lengths=enc_len[idx : idx + 1]
+                )[0][0]
+                assert len(hyps[idx].n_best_hypotheses) == len(sample_hyps.n_best_hypotheses)
+                for hyp, sample_hyp in zip(hyps[idx].n_best_hypotheses, sample_hyps.n_best_hypotheses):
+                    assert hyp.y_sequence.tolist() == sample_hyp.y_sequence.tolist()
+                    assert hyp.score == pytest.approx(sample_hyp.score, abs=1e-4)
+
+                # Hypotheses are unique, and their tokens are emitted within the sample
+                sequences = [tuple(hyp.y_sequence.tolist()) for hyp in hyps[idx].n_best_hypotheses]
+                assert len(set(sequences)) == len(sequences)
+                for hyp in hyps[idx].n_best_hypotheses:
+                    assert hyp.y_sequence[0] == decoder.blank_idx
+                    assert len(hyp.timestep) == len(hyp.y_sequence)
+                    assert all(-1 <= t < enc_len[idx] for t in hyp.timestep)
+
     @pytest.mark.skipif(
         not NUMBA_RNNT_LOSS_AVAILABLE, reason='RNNTLoss has not been compiled with appropriate numba version.',
     )
@@ -0,0 +1,492 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+
+import numpy as np
+import pytest
+import soundfile as sf
+import torch
+from omegaconf import DictConfig, ListConfig, OmegaConf
+
+from nemo.collections.asr.models import EncDecCTCModel, EncDecRNNTModel
+from nemo.collections.asr.parts.utils.streaming_utils import (
+    MIN_MERGE_SUBSEQUENCE_LEN,
+    AudioFeatureIterator,
+    FrameBatchASR,
+    FramewiseStreamingAudioBuffer,
+    MultiFileFrameBatchASR,
+    StreamingSession,
+    batched_lcs_alignment_merge_buffer,
+    batched_longest_common_subsequence_merge,
+    lcs_alignment_merge_buffer,
+    longest_common_subsequence_merge,
+)
+
+LABELS = [' ', 'a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'i', 'j', 'k']
+
+
+def _streaming_model(transducer, normalize):
+    preprocessor = {
+        '_target_': 'nemo.collections.asr.modules.AudioToMelSpectrogramPreprocessor',
+        'features': 32,
+        'normalize': normalize,
+    }
+    encoder = {
+        '_target_': 'nemo.collections.asr.modules.ConformerEncoder',
+        'feat_in': 32,
+        'n_layers': 2,
+        'd_model': 32,
+        'n_heads': 2,
+        'subsampling': 'striding',
+        'subsampling_factor': 4,
+        'causal_downsampling': True,
+        'att_context_size': [4, 1],
+        'att_context_style': 'chunked_limited',
+        'conv_kernel_size': 5,
+        'conv_context_size': 'causal',
+        'conv_norm_type': 'layer_norm',
+        'dropout': 0.0,
+        'dropout_emb': 0.0,
+        'dropout_att': 0.0,
+    }
+    if transducer:
+        cfg = {
+            'labels': ListConfig(LABELS),
+            'preprocessor': preprocessor,
+            'encoder': encoder,
+            'model_defaults': {'enc_hidden': 32, 'pred_hidden': 16},
+            'decoder': {
+                '_target_': 'nemo.collections.asr.modules.RNNTDecoder',
+                'prednet': {'pred_hidden': 16, 'pred_rnn_layers': 1},
+            },
+            'joint': {
+                '_target_': 'nemo.collections.asr.modules.RNNTJoint',
+                'jointnet': {'joint_hidden': 16, 'activation': 'relu'},
+            },
+            'decoding': {'strategy': 'greedy', 'greedy': {'max_symbols': 5}},
+            'loss': {'loss_name': 'default'},
+        }
+        model_cls = EncDecRNNTModel
+    else:
+        cfg = {
+            'preprocessor': preprocessor,
+            'encoder': encoder,
+            'decoder': {
+                '_target_': 'nemo.collections.asr.modules.ConvASRDecoder',
+                'feat_in': 32,
+                'num_classes': len(LABELS),
+                'vocabulary': LABELS,
+            },
+        }
+        model_cls = EncDecCTCModel
+
+    torch.manual_seed(0)
+    return model_cls(cfg=DictConfig(cfg)).eval()
+
+
+def _stream_step_reference(model, audio, online_normalization):
+    """Transcribes an audio with conformer_stream_step, as the streaming inference example does."""
+    streaming_buffer = FramewiseStreamingAudioBuffer(model, online_normalization=online_normalization)
+    streaming_buffer.append_audio(audio)
+    cache_last_channel, cache_last_time = model.encoder.get_initial_cache_state(batch_size=1)
+    previous_hypotheses = pred_out_stream = None
+    with torch.inference_mode():
+        for step_num, (chunk_audio, chunk_lengths) in enumerate(streaming_buffer):
+            (
+                pred_out_stream,
+                transcribed_texts,
+                cache_last_channel,
+                cache_last_time,
+                previous_hypotheses,
+            ) = model.conformer_stream_step(
+                processed_signal=chunk_audio,
+                processed_signal_length=chunk_lengths,
+                cache_last_channel=cache_last_channel,
+                cache_last_time=cache_last_time,
+                keep_all_outputs=streaming_buffer.is_buffer_empty(),
+                previous_hypotheses=previous_hypotheses,
+                previous_pred_out=pred_out_stream,
+                drop_extra_pre_encoded=0 if step_num == 0 else None,
+                return_transcription=True,
+            )
+    return transcribed_texts[0].text if previous_hypotheses is not None else transcribed_texts[0]
+
+
+class _LabelsTokenizer:
+    """Decodes the predictions of the character models of these tests, which have no tokenizer."""
+
+    def ids_to_text(self, ids):
+        return ''.join(LABELS[idx] for idx in ids)
+
+
+def _frame_batch_model():
+    model = _streaming_model(transducer=False, normalize='per_feature')
+    OmegaConf.set_struct(model._cfg, False)
+    model._cfg.sample_rate = 16000
+    model._cfg.preprocessor.window_stride = 0.01
+    model.tokenizer = _LabelsTokenizer()
+    return model
+
+
+def _frame_batch_reference(model, features, frame_len, total_len):
+    """Predictions of each buffer, built and normalized as FeatureFrameBufferer does without reusing buffers."""
+    features = np.pad(features, [(0, 0), (0, -features.shape[1] % frame_len)])
+    buffer = np.full([features.shape[0], total_len], -16.635, dtype=np.float32)
+    preds = []
+    for start in range(0, features.shape[1], frame_len):
+        buffer = np.concatenate([buffer[:, frame_len:], features[:, start : start + frame_len]], axis=1)
+        mean, std = buffer.mean(axis=1, keepdims=True), buffer.std(axis=1, keepdims=True)
+        with torch.no_grad():
+            _, _, predictions = model(
+                processed_signal=torch.from_numpy((buffer - mean) / (std + 1e-5)).unsqueeze(0),
+                processed_signal_length=torch.tensor([total_len]),
+            )
+        preds.append(predictions[0].numpy())
+    return preds
+
+
+def _reference_lcs_merge(X, Y):
+    """Original pure Python implementation of longest_common_subsequence_merge."""
+    m = len(X)
+    n = len(Y)
+    LCSuff = [[0 for k in range(n + 1)] for l in range(m + 1)]
+
+    result = 0
+    result_idx = [0, 0, 0]
+
+    for i in range(m + 1):
+        for j in range(n + 1):
+            if i == 0 or j == 0:
+                LCSuff[i][j] = 0
+            elif X[i - 1] == Y[j - 1]:
+                LCSuff[i][j] = LCSuff[i - 1][j - 1] + 1
+
+                if result <= LCSuff[i][j]:
+                    result = LCSuff[i][j]
+                    result_idx = [i, j, result]
+
+            else:
+                LCSuff[i][j] = 0
+
+    i, j = result_idx[0:2]
+    is_complete_merge = i == m
+
+    if is_complete_merge:
+        length = result_idx[-1]
+
+        while length >= 0 and i > 0 and j > 0:
+            if LCSuff[i - 1][j - 1] > 0:
+                length -= 1
+                i, j = i - 1, j - 1
+
+            else:
+                i, j, length = i - 1, j - 1, length - 1
+                break
+
+    else:
+
+        max_j = 0
+        max_j_idx = n
+
+        i_partial = m
+        j_partial = -1
+        j_skip = 0
+        slice_count = 0
+
+        for i_idx in range(m, -1, -1):
+            for j_idx in range(0, n + 1):
+                if LCSuff[i_idx][j_idx] > max_j and j_idx <= max_j_idx:
+                    max_j = LCSuff[i_idx][j_idx]
+                    max_j_idx = j_idx
+
+                    i_partial = i_idx
+                    j_partial = j_idx
+
+        if max_j <= MIN_MERGE_SUBSEQUENCE_LEN:
+
+            i = i_partial
+            j = 0
+            result_idx[-1] = 0
+
+        else:
+
+            i_temp = i_partial + 1
+            j_temp = j_partial + 1
+
+            j_exp = 0
+            j_skip = 0
+
+            for i_idx in range(i_temp, m + 1):
+                j_any_skip = 0
+
+                for j_idx in range(j_temp, j_temp + j_skip + 1):
+                    if j_idx < n + 1:
+                        if LCSuff[i_idx][j_idx] == 0:
+                            j_any_skip = 1
+                        else:
+                            j_exp = 1 + j_skip + j_any_skip
+
+                j_skip += j_any_skip
+
+                j_temp += 1
+
+            j_skip = 0
+            j_partial += j_exp
+
+            while i_partial > 0 and j_partial > 0:
+                if LCSuff[i_partial][j_partial] == 0:
+                    j_partial -= 1
+                    j_skip += 1
+
+                if j_partial > 0:
+                    slice_count += 1
+                    i_partial -= 1
+                    j_partial -= 1
+
+            i = max(0, i_partial)
+            j = max(0, j_partial)
+            result_idx[-1] = slice_count + j_skip
+
+    result_idx[0] = i
+    result_idx[1] = j
+
+    return result_idx, LCSuff
+
+
+def _overlapping_buffers(rng, vocab_size, overlap, new_tokens, noise):
+    """Token ids of the end of a previous chunk and of a current chunk starting with a noisy copy of its end."""
+    previous = rng.randint(vocab_size, size=overlap + rng.randint(0, 10)).tolist()
+    current = []
+    for token in previous[len(previous) - overlap :]:
+        draw = rng.rand()
+        if draw < noise:
+            current.append(int(rng.randint(vocab_size)))  # substitution
+        elif draw < 2 * noise:
+            current.extend([token, int(rng.randint(vocab_size))])  # insertion
+        elif draw >= 3 * noise:
+            current.append(token)  # otherwise deletion
+    current += rng.randint(vocab_size, size=new_tokens).tolist()
+    return previous, current
+
+
+class TestLongestCommonSubsequenceMerge:
+    @pytest.mark.unit
+    @pytest.mark.parametrize('vocab_size', [2, 5, 1024])
+    @pytest.mark.parametrize('noise', [0.0, 0.1, 0.3])
+    def test_lcs_merge(self, vocab_size, noise):
+        rng = np.random.RandomState(0)
+        cases = [([], [1, 2]), ([1, 2], []), ([1, 2, 3], [4, 5]), ([1, 2, 3], [2, 3, 4]), ([3, 1, 2], [1, 2, 1, 2])]
+        for _ in range(50):
+            overlap, new_tokens = rng.randint(0, 40), rng.randint(0, 30)
+            cases.append(_overlapping_buffers(rng, vocab_size, overlap, new_tokens, noise))
+
+        for X, Y in cases:
+            expected_idx, expected_alignment = _reference_lcs_merge(X, Y)
+            lcs_idx, alignment = longest_common_subsequence_merge(X, Y)
+            assert lcs_idx == expected_idx
+            assert alignment.tolist() == expected_alignment
+
+        results = batched_longest_common_subsequence_merge([X for X, _ in cases], [Y for _, Y in cases])
+        for (X, Y), (lcs_idx, alignment) in zip(cases, results):
+            expected_idx, expected_alignment = _reference_lcs_merge(X, Y)
+            assert lcs_idx == expected_idx
+            assert alignment.tolist() == expected_alignment
+
+    @pytest.mark.unit
+    def test_batched_merge_buffer(self, tmpdir):
+        rng = np.random.RandomState(0)
+        cases = [_overlapping_buffers(rng, 128, 20, 10, noise=0.1) for _ in range(8)] + [([], [1, 2, 3])]
+        buffers = [list(range(200, 220)) + X for X, _ in cases]
+
+        expected = [
+            lcs_alignment_merge_buffer(list(buffer), Y, delay=4, model=None, max_steps_per_timestep=5)
+            for buffer, (_, Y) in zip(buffers, cases)
+        ]
+        filepaths = [str(tmpdir.join(f'alignment_{idx}.pt')) for idx in range(len(cases))]
+        merged = batched_lcs_alignment_merge_buffer(
+            buffers, [Y for _, Y in cases], delay=4, model=None, max_steps_per_timestep=5, filepaths=filepaths
+        )
+        assert merged == expected
+        assert all(tmpdir.join(f'alignment_{idx}.pt').exists() for idx in range(len(cases) - 1))
+
+        merged = batched_lcs_alignment_merge_buffer([[1, 2]], [[2, 3]], delay=0, model=None)
+        assert merged == [[1, 2, 2, 3]]
+
+
+class TestStreamingSession:
+    @pytest.mark.unit
+    def test_featurization(self):
+        model = _streaming_model(transducer=False, normalize='NA')
+        session = StreamingSession(model)
+        rng = np.random.RandomState(0)
+        audio = rng.randn(12345).astype(np.float32) * 0.1
+
+        stream_id = session.add_stream()
+        state = session._streams[stream_id]
+        start = 0
+        while start < len(audio):
+            end = start + rng.randint(1, 2000)
+            session.push(stream_id, audio[start:end])
+            start = end
+            # no frame depending on audio not pushed yet is computed
+            assert (state.num_frames - 1) * 160 + 256 <= min(start, len(audio))
+        session.end_stream(stream_id)
+
+        with torch.inference_mode():
+            expected, expected_len = session.preprocessor(
+                input_signal=torch.from_numpy(audio).unsqueeze(0), length=torch.tensor([len(audio)])
+            )
+        assert state.num_frames == expected_len[0]
+        assert torch.allclose(state.features, expected[0], atol=1e-4)
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('transducer', [False, True])
+    @pytest.mark.parametrize('normalize', ['NA', 'per_feature'])
+    @pytest.mark.parametrize('max_batch_size', [1, 3])
+    def test_streaming_session(self, transducer, normalize, max_batch_size):
+        model = _streaming_model(transducer=transducer, normalize=normalize)
+        rng = np.random.RandomState(0)
+        audios = [rng.randn(num_samples).astype(np.float32) * 0.1 for num_samples in [16000, 9000, 12345, 3000, 9000]]
+
+        session = StreamingSession(model, max_batch_size=max_batch_size)
+        stream_ids = [session.add_stream() for _ in audios]
+        positions = [0] * len(audios)
+        texts = {}
+        while not all(session.is_finished(stream_id) for stream_id in stream_ids):
+            for idx, (stream_id, audio) in enumerate(zip(stream_ids, audios)):
+                start = positions[idx]
+                if start < len(audio):
+                    positions[idx] = start + rng.randint(1, 3000)
+                    session.push(stream_id, audio[start : positions[idx]])
+                    if positions[idx] >= len(audio):
+                        session.end_stream(stream_id)
+            for stream_id, hypothesis in session.step().items():
+                # hypotheses grow incrementally
+                assert hypothesis.text.startswith(texts.get(stream_id, ''))
+                texts[stream_id] = hypothesis.text
+        assert session.step() == {}
+
+        for stream_id, audio in zip(stream_ids, audios):
+            expected = _stream_step_reference(model, audio, online_normalization=normalize != 'NA')
+            assert session.get_hypothesis(stream_id).text == expected
+            assert session.remove_stream(stream_id).text == expected
+        assert len(session) == 0
+
+    @pytest.mark.unit
+    def test_stream_slots(self):
+        model = _streaming_model(transducer=False, normalize='NA')
+        rng = np.random.RandomState(0)
+        audio = rng.randn(8000).astype(np.float32) * 0.1
+        expected = _stream_step_reference(model, audio, online_normalization=False)
+
+        session = StreamingSession(model)
+        first, second = session.add_stream(), session.add_stream()
+        session.push(first, audio)
+        session.end_stream(first)
+        session.push(second, torch.from_numpy(audio[:4000]))
+        session.flush()
+        assert session.is_finished(first) and not session.is_finished(second)
+        slot = session._streams[first].slot
+        assert session.remove_stream(first).text == expected
+
+        # the slot of the removed stream is reused with fresh caches
+        third = session.add_stream()
+        assert session._streams[third].slot == slot
+        session.push(third, audio)
+        session.push(second, audio[4000:])
+        session.end_stream(second)
+        session.end_stream(third)
+        hypotheses = session.flush()
+        assert hypotheses[second].text == expected
+        assert hypotheses[third].text == expected
+
+        with pytest.raises(ValueError):
+            session.push(second, audio)
+        with pytest.raises(ValueError):
+            session.get_hypothesis(first)
+
+
+class TestFrameBatchASR:
+    @pytest.mark.unit
+    @pytest.mark.parametrize('prefetch_batches', [0, 1, 3])
+    def test_infer_logits(self, prefetch_batches):
+        model = _frame_batch_model()
+        rng = np.random.RandomState(0)
+        samples = rng.randn(16000 * 9 + 1234).astype(np.float32) * 0.1
+
+        frame_asr = FrameBatchASR(
+            model, frame_len=1.6, total_buffer=4.0, batch_size=2, prefetch_batches=prefetch_batches
+        )
+        for _ in range(2):
+            frame_asr.reset()
+            frame_reader = AudioFeatureIterator(samples, 1.6, frame_asr.raw_preprocessor, model.device)
+            frame_asr.set_frame_reader(frame_reader)
+            frame_asr.infer_logits()
+
+            features = frame_reader._features[:, : frame_reader._features_len[0]].numpy()
+            expected = _frame_batch_reference(model, features, frame_len=160, total_len=400)
+            assert len(frame_asr.all_preds) == len(expected)
+            for pred, expected_pred in zip(frame_asr.all_preds, expected):
+                assert np.array_equal(pred, expected_pred)
+
+        # buffers are built in preallocated slots
+        frame_bufferer = frame_asr.frame_bufferer
+        assert len(frame_bufferer.frame_buffer_slots) == (prefetch_batches + 2 if prefetch_batches > 0 else 1)
+        assert all(
+            np.shares_memory(buffer, frame_bufferer.frame_buffer_slots) for buffer in frame_bufferer.frame_buffers
+        )
+
+    @pytest.mark.unit
+    def test_prefetch_error(self):
+        model = _frame_batch_model()
+        frame_asr = FrameBatchASR(model, frame_len=1.6, total_buffer=4.0, batch_size=2, prefetch_batches=2)
+
+        def frame_reader():
+            for _ in range(5):
+                yield np.zeros([32, 160], dtype=np.float32)
+            raise RuntimeError("Failed to read the audio")
+
+        frame_asr.set_frame_reader(frame_reader())
+        with pytest.raises(RuntimeError, match="Failed to read the audio"):
+            frame_asr.infer_logits()
+        # the batches produced before the error are transcribed
+        assert len(frame_asr.all_preds) == 4
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('batch_size', [1, 4])
+    @pytest.mark.parametrize('prefetch_batches', [0, 2])
+    def test_multi_file(self, tmpdir, batch_size, prefetch_batches):
+        model = _frame_batch_model()
+        rng = np.random.RandomState(0)
+        audio_filepaths = []
+        for idx, duration in enumerate([0.5, 7.0, 3.3, 12.1, 1.0]):
+            audio_filepaths.append(os.path.join(tmpdir, f'{idx}.wav'))
+            sf.write(audio_filepaths[-1], (rng.randn(int(duration * 16000)) * 3000).astype(np.int16), 16000)
+        tokens_per_chunk, delay, model_stride_in_secs = 40, 70, 0.04
+
+        frame_asr = FrameBatchASR(model, frame_len=1.6, total_buffer=4.0, batch_size=batch_size)
+        expected = []
+        for audio_filepath in audio_filepaths:
+            frame_asr.reset()
+            frame_asr.read_audio_file(audio_filepath, delay, model_stride_in_secs)
+            expected.append(frame_asr.transcribe(tokens_per_chunk, delay))
+        assert any(expected)
+
+        multi_file_asr = MultiFileFrameBatchASR(
+            model, frame_len=1.6, total_buffer=4.0, batch_size=batch_size, prefetch_batches=prefetch_batches
+        )
+        hyps = multi_file_asr.transcribe_files(iter(audio_filepaths), tokens_per_chunk, delay, model_stride_in_secs)
+        assert list(hyps) == expected
+        assert list(multi_file_asr.transcribe_files([], tokens_per_chunk, delay, model_stride_in_secs)) == []
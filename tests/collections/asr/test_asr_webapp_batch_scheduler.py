@@ -0,0 +1,141 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import importlib.util
+import os
+import threading
+
+import numpy as np
+import pytest
+
+# The web app is not a package, its modules are imported from their directory
+_BATCH_SCHEDULER_PATH = os.path.join(
+    os.path.dirname(__file__), '..', '..', '..', 'tools', 'asr_webapp', 'batch_scheduler.py'
+)
+_spec = importlib.util.spec_from_file_location('batch_scheduler', _BATCH_SCHEDULER_PATH)
+batch_scheduler = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(batch_scheduler)
+
+SAMPLE_RATE = 100
+TIMEOUT = 10.0
+
+
+def _waveform(duration):
+    return np.zeros(int(duration * SAMPLE_RATE), dtype=np.float32)
+
+
+class _RecordingTranscriber:
+    """Transcribes waveforms as their durations, and records the durations of the waveforms of each batch."""
+
+    def __init__(self, fail_duration=None):
+        self.fail_duration = fail_duration
+        self.batches = []
+        self._lock = threading.Lock()
+
+    def __call__(self, waveforms):
+        durations = [len(waveform) / SAMPLE_RATE for waveform in waveforms]
+        with self._lock:
+            self.batches.append(durations)
+        if self.fail_duration in durations:
+            raise ValueError("Transcription failed")
+        return [str(duration) for duration in durations]
+
+
+class TestBatchScheduler:
+    @pytest.mark.unit
+    def test_deadline_flush(self):
+        transcriber = _RecordingTranscriber()
+        scheduler = batch_scheduler.BatchScheduler(
+            transcriber, sample_rate=SAMPLE_RATE, max_batch_size=8, max_latency=0.05
+        )
+        try:
+            # The batch is not full, so it only runs once its deadline is reached
+            assert scheduler.transcribe([_waveform(1.0), _waveform(1.5)], timeout=TIMEOUT) == ['1.0', '1.5']
+            assert transcriber.batches == [[1.0, 1.5]]
+
+            summary = scheduler.metrics.summary()
+            assert summary['num_batches'] == 1 and summary['num_requests'] == 1
+            assert summary['queue_time_ms']['mean'] >= 50.0
+            assert summary['batch_fill']['mean'] == pytest.approx(2 / 8)
+        finally:
+            scheduler.close()
+
+    @pytest.mark.unit
+    def test_full_batches_of_one_bucket(self):
+        transcriber = _RecordingTranscriber()
+        # Batches can only run once they are full
+        scheduler = batch_scheduler.BatchScheduler(
+            transcriber, sample_rate=SAMPLE_RATE, max_batch_size=2, max_latency=TIMEOUT * 10
+        )
+        try:
+            futures = [
+                scheduler.submit([_waveform(1.0), _waveform(10.0)]),
+                scheduler.submit([_waveform(12.0), _waveform(1.5)]),
+            ]
+            assert futures[0].result(timeout=TIMEOUT) == ['1.0', '10.0']
+            assert futures[1].result(timeout=TIMEOUT) == ['12.0', '1.5']
+            assert sorted(transcriber.batches) == [[1.0, 1.5], [10.0, 12.0]]
+            assert scheduler.queue_size == 0
+        finally:
+            scheduler.close()
+
+    @pytest.mark.unit
+    def test_deadline_batch_filled_from_adjacent_buckets(self):
+        transcriber = _RecordingTranscriber()
+        scheduler = batch_scheduler.BatchScheduler(
+            transcriber, sample_rate=SAMPLE_RATE, max_batch_size=4, max_latency=0.01
+        )
+        try:
+            # 1 s and 3 s are in adjacent buckets, 30 s is in the last bucket
+            texts = scheduler.transcribe([_waveform(1.0), _waveform(30.0), _waveform(3.0)], timeout=TIMEOUT)
+            assert texts == ['1.0', '30.0', '3.0']
+            assert transcriber.batches == [[1.0, 3.0], [30.0]]
+        finally:
+            scheduler.close()
+
+    @pytest.mark.unit
+    def test_failure_propagation(self):
+        transcriber = _RecordingTranscriber(fail_duration=10.0)
+        scheduler = batch_scheduler.BatchScheduler(
+            transcriber, sample_rate=SAMPLE_RATE, max_batch_size=2, max_latency=TIMEOUT * 10
+        )
+        try:
+            failed = scheduler.submit([_waveform(10.0), _waveform(1.0)])
+            succeeded = scheduler.submit([_waveform(1.5)])
+            other_failed = scheduler.submit([_waveform(12.0)])
+
+            # The batch of the long waveforms failed, the request whose waveforms all succeeded is unaffected
+            assert succeeded.result(timeout=TIMEOUT) == ['1.5']
+            for future in [failed, other_failed]:
+                with pytest.raises(ValueError, match="Transcription failed"):
+                    future.result(timeout=TIMEOUT)
+
+            # The scheduler keeps running after a failed batch
+            assert scheduler.transcribe([_waveform(2.0), _waveform(2.0)], timeout=TIMEOUT) == ['2.0', '2.0']
+            summary = scheduler.metrics.summary()
+            assert summary['num_requests'] == 4 and summary['num_failed_requests'] == 2
+        finally:
+            scheduler.close()
+
+    @pytest.mark.unit
+    def test_close(self):
+        scheduler = batch_scheduler.BatchScheduler(
+            _RecordingTranscriber(), sample_rate=SAMPLE_RATE, max_batch_size=2, max_latency=TIMEOUT * 10
+        )
+        queued = scheduler.submit([_waveform(1.0)])
+        scheduler.close()
+        with pytest.raises(RuntimeError, match="closed"):
+            queued.result(timeout=TIMEOUT)
+        with pytest.raises(RuntimeError, match="closed"):
+            scheduler.submit([_waveform(1.0)])
@@ -0,0 +1,188 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import threading
+
+import numpy as np
+import pytest
+import torch
+from omegaconf import OmegaConf
+
+from nemo.collections.asr.models.clustering_diarizer import ClusteringDiarizer
+from nemo.collections.asr.parts.utils.embedding_cache import SpeakerEmbeddingCache, get_model_checksum
+
+
+def _write_audio_files(tmpdir, contents):
+    audio_filepaths = []
+    for name, content in contents.items():
+        audio_filepath = os.path.join(tmpdir, name + '.wav')
+        with open(audio_filepath, 'wb') as f:
+            f.write(content)
+        audio_filepaths.append(audio_filepath)
+    return audio_filepaths
+
+
+def _segments(audio_filepath, window, shift, duration):
+    return [
+        {'audio_filepath': audio_filepath, 'offset': offset, 'duration': window, 'label': 'UNK'}
+        for offset in np.arange(0, duration - window + 1e-6, shift).tolist()
+    ]
+
+
+def _fake_embeddings(segments):
+    """Embeddings which only depend on the segment."""
+    return np.array([[len(s['audio_filepath']), s['offset'], s['duration']] for s in segments], dtype=np.float32)
+
+
+class TestSpeakerEmbeddingCache:
+    @pytest.mark.unit
+    def test_lookup_and_store(self, tmpdir):
+        audio_a, audio_b = _write_audio_files(tmpdir, {'a': b'audio a', 'bb': b'audio b'})
+        cache = SpeakerEmbeddingCache(os.path.join(tmpdir, 'cache'), namespace='model')
+        segments = _segments(audio_a, 1.5, 0.75, 6.0) + _segments(audio_b, 1.5, 0.75, 3.0)
+        assert all(emb is None for emb in cache.lookup(segments))
+
+        cache.store(segments[::2], _fake_embeddings(segments[::2]))
+        embs = cache.lookup(segments)
+        for idx, emb in enumerate(embs):
+            if idx % 2 == 0:
+                assert np.array_equal(emb, _fake_embeddings([segments[idx]])[0])
+            else:
+                assert emb is None
+
+        # Appends to the entries of the audio files, and is visible to other instances.
+        cache.store(segments, _fake_embeddings(segments))
+        embs = SpeakerEmbeddingCache(os.path.join(tmpdir, 'cache'), namespace='model').lookup(segments)
+        assert np.array_equal(np.stack(embs), _fake_embeddings(segments))
+        assert all(emb is None for emb in SpeakerEmbeddingCache(str(tmpdir), namespace='other').lookup(segments))
+
+    @pytest.mark.unit
+    def test_concurrent_store(self, tmpdir):
+        (audio_filepath,) = _write_audio_files(tmpdir, {'a': b'audio a'})
+        segments = _segments(audio_filepath, 0.5, 0.1, 20.0)
+        errors = []
+
+        def store_and_lookup(worker_idx):
+            try:
+                cache = SpeakerEmbeddingCache(os.path.join(tmpdir, 'cache'), namespace='model')
+                for chunk_start in range(worker_idx * 5, len(segments), 20):
+                    chunk = segments[chunk_start : chunk_start + 5]
+                    cache.store(chunk, _fake_embeddings(chunk))
+                    # Entries are always consistent, rows of the other writers may be missing.
+                    for segment, emb in zip(segments, cache.lookup(segments)):
+                        assert emb is None or np.array_equal(emb, _fake_embeddings([segment])[0])
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=store_and_lookup, args=(worker_idx,)) for worker_idx in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert not errors
+
+    @pytest.mark.unit
+    def test_versioned_arrays(self, tmpdir):
+        (audio_filepath,) = _write_audio_files(tmpdir, {'a': b'audio a'})
+        cache = SpeakerEmbeddingCache(os.path.join(tmpdir, 'cache'), namespace='model')
+        segments = _segments(audio_filepath, 1.0, 0.5, 4.0)
+        cache.store(segments[:3], _fake_embeddings(segments[:3]))
+        audio_hash = cache.get_audio_hash(audio_filepath)
+        cached_embs, _, first_version = cache._load(audio_hash)
+        assert isinstance(cached_embs, np.memmap)
+
+        # Adding rows publishes a new array and removes the previous one, whose mapping stays readable.
+        cache.store(segments, _fake_embeddings(segments))
+        assert np.array_equal(cached_embs, _fake_embeddings(segments[:3]))
+        assert sorted(os.listdir(cache.cache_dir)) == sorted(
+            [f'{audio_hash}.json', f'{audio_hash}.{cache._load(audio_hash)[2]}.npy']
+        )
+        assert first_version not in ''.join(os.listdir(cache.cache_dir))
+
+    @pytest.mark.unit
+    def test_missing_entry_file(self, tmpdir):
+        (audio_filepath,) = _write_audio_files(tmpdir, {'a': b'audio a'})
+        cache = SpeakerEmbeddingCache(os.path.join(tmpdir, 'cache'), namespace='model')
+        segments = _segments(audio_filepath, 1.0, 0.5, 4.0)
+        cache.store(segments, _fake_embeddings(segments))
+
+        # An index whose array is missing is a cache miss, and is replaced by the next store.
+        for filename in os.listdir(cache.cache_dir):
+            if filename.endswith('.npy'):
+                os.remove(os.path.join(cache.cache_dir, filename))
+        assert all(emb is None for emb in cache.lookup(segments))
+        cache.store(segments[:2], _fake_embeddings(segments[:2]))
+        assert np.array_equal(np.stack(cache.lookup(segments[:2])), _fake_embeddings(segments[:2]))
+
+    @pytest.mark.unit
+    def test_content_addressing(self, tmpdir):
+        audio_a, audio_copy = _write_audio_files(tmpdir, {'a': b'audio a', 'copy_of_a': b'audio a'})
+        cache = SpeakerEmbeddingCache(os.path.join(tmpdir, 'cache'), namespace='model')
+        segments = _segments(audio_a, 1.0, 0.5, 4.0)
+        cache.store(segments, _fake_embeddings(segments))
+
+        # Same content at another path, with offsets and durations within the rounding to the millisecond.
+        copy_segments = [
+            dict(segment, audio_filepath=audio_copy, offset=segment['offset'] + 1e-5)
+            for segment in _segments(audio_a, 1.0, 0.5, 4.0)
+        ]
+        assert np.array_equal(np.stack(cache.lookup(copy_segments)), _fake_embeddings(segments))
+
+        with open(audio_copy, 'ab') as f:
+            f.write(b' modified')
+        assert all(emb is None for emb in cache.lookup(copy_segments))
+
+    @pytest.mark.unit
+    def test_model_checksum(self):
+        model = torch.nn.Sequential(torch.nn.Linear(4, 4), torch.nn.BatchNorm1d(4))
+        checksum = get_model_checksum(model)
+        assert get_model_checksum(model) == checksum
+        with torch.no_grad():
+            model[0].weight[0, 0] += 1
+        assert get_model_checksum(model) != checksum
+
+    @pytest.mark.unit
+    def test_diarizer_extract_embeddings(self, tmpdir):
+        (audio_filepath,) = _write_audio_files(tmpdir, {'session': b'session audio'})
+        speaker_dir = os.path.join(tmpdir, 'speaker_outputs')
+        os.makedirs(speaker_dir)
+
+        diarizer = ClusteringDiarizer.__new__(ClusteringDiarizer)
+        diarizer._speaker_dir = speaker_dir
+        diarizer._speaker_params = OmegaConf.create({'save_embeddings': False})
+        diarizer._embedding_cache = SpeakerEmbeddingCache(os.path.join(tmpdir, 'cache'), namespace='model')
+        inferred_segments = []
+
+        def infer_embeddings(manifest_file):
+            with open(manifest_file, 'r') as f:
+                segments = [json.loads(line) for line in f]
+            inferred_segments.append(segments)
+            return torch.from_numpy(_fake_embeddings(segments))
+
+        diarizer._infer_embeddings = infer_embeddings
+
+        # The windows of the second scale contain the ones of the first scale, and those of a rerun.
+        for window, shift in [(1.5, 0.75), (1.5, 0.25), (1.5, 0.75)]:
+            segments = _segments(audio_filepath, window, shift, 6.0)
+            manifest_file = os.path.join(tmpdir, 'subsegments.json')
+            with open(manifest_file, 'w') as f:
+                f.write(''.join(json.dumps(segment) + '\n' for segment in segments))
+
+            diarizer._extract_embeddings(manifest_file)
+            assert torch.equal(diarizer.embeddings['session'], torch.from_numpy(_fake_embeddings(segments)))
+            assert len(diarizer.time_stamps['session']) == len(segments)
+
+        assert [len(segments) for segments in inferred_segments] == [7, 12]
@@ -0,0 +1,152 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+
+import numpy as np
+import pytest
+import torch
+from omegaconf import OmegaConf
+from sklearn.metrics import adjusted_rand_score
+
+from nemo.collections.asr.parts.utils.nmesc_clustering import (
+    NMESC,
+    COSclustering,
+    TiledMultiScaleCosAffinity,
+    getAffinityGraphMat,
+    getAffinityGraphMatBatch,
+    getMultiScaleCosAffinityMatrix,
+)
+from nemo.collections.asr.parts.utils.speaker_utils import perform_clustering
+
+
+def _multiscale_session(session_len_in_sec, num_speakers=3, turn_len_in_sec=20.0, seed=0):
+    """Embeddings of a session with speaker turns of fixed length, at three scales."""
+    generator = torch.Generator().manual_seed(seed)
+    centers = torch.randn(num_speakers, 32, generator=generator)
+    scale_dict = {}
+    for scale_idx, window in enumerate([1.5, 1.0, 0.5]):
+        shift = window / 2
+        starts = torch.arange(0, session_len_in_sec - window, shift)
+        speakers = ((starts + window / 2) // turn_len_in_sec).long() % num_speakers
+        scale_dict[scale_idx] = {
+            'embeddings': centers[speakers] + 0.8 * torch.randn(len(starts), 32, generator=generator),
+            'time_stamps': [f'{start:.3f} {start + window:.3f} ' for start in starts.tolist()],
+        }
+    return {'scale_dict': scale_dict, 'multiscale_weights': torch.tensor([[1.0, 0.5, 1.0]])}
+
+
+class TestLongFormClustering:
+    @pytest.mark.unit
+    def test_tiled_affinity(self):
+        session = _multiscale_session(60.0)
+        mat, _ = getMultiScaleCosAffinityMatrix(session)
+        affinity = TiledMultiScaleCosAffinity(session, tile_size=37)
+        idx = torch.arange(affinity.num_segments)
+        assert torch.allclose(affinity.getAffinityBlock(idx, idx), mat, atol=1e-5)
+        assert torch.allclose(affinity.getAffinityBlock(idx[::5], idx[1::3]), mat[::5, 1::3], atol=1e-5)
+
+        for p_value in [1, 7, 30]:
+            graph = affinity.getAffinityGraph(p_value).toarray()
+            assert np.array_equal(graph, getAffinityGraphMat(mat, p_value).numpy())
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('max_num_neighbors', [None, 20])
+    def test_long_form_clustering(self, max_num_neighbors):
+        session = _multiscale_session(400.0)
+        labels = COSclustering(session, max_num_speaker=8)
+        long_form_labels = COSclustering(
+            session, max_num_speaker=8, long_form=True, tile_size=256, max_num_neighbors=max_num_neighbors
+        )
+        assert len(set(long_form_labels)) == len(set(labels)) == 3
+        assert adjusted_rand_score(labels, long_form_labels) == 1.0
+
+    @pytest.mark.unit
+    def test_long_form_oracle_num_speakers(self):
+        session = _multiscale_session(100.0, num_speakers=2)
+        labels = COSclustering(session, oracle_num_speakers=4, long_form=True, tile_size=64)
+        assert len(labels) == len(session['scale_dict'][2]['time_stamps'])
+        assert len(set(labels)) == 4
+
+
+class TestParallelClustering:
+    @pytest.mark.unit
+    @pytest.mark.parametrize('use_subsampling_for_NME', [True, False])
+    @pytest.mark.parametrize('pvalue_search', ['parallel_pvalue_search', 'batched_pvalue_search'])
+    def test_pvalue_search(self, use_subsampling_for_NME, pvalue_search):
+        mat, _ = getMultiScaleCosAffinityMatrix(_multiscale_session(200.0))
+        outputs = []
+        for search_kwargs in [{}, {pvalue_search: True}]:
+            nmesc = NMESC(
+                mat.clone(),
+                max_num_speaker=8,
+                NME_mat_size=256,
+                use_subsampling_for_NME=use_subsampling_for_NME,
+                **search_kwargs,
+            )
+            outputs.append(nmesc.NMEanalysis())
+        assert outputs[0] == outputs[1]
+
+    @pytest.mark.unit
+    def test_eig_ratio_batch(self):
+        mat, _ = getMultiScaleCosAffinityMatrix(_multiscale_session(60.0))
+        p_value_list = torch.tensor([1, 2, 9, 30])
+        affinity_mats = getAffinityGraphMatBatch(mat, p_value_list)
+        for idx, p_value in enumerate(p_value_list.tolist()):
+            assert torch.equal(affinity_mats[idx], getAffinityGraphMat(mat, p_value).float())
+
+        # The eigengaps of disconnected graphs are at the precision of the eigenvalues, so are their eigen ratios.
+        p_value_list = torch.tensor([9, 15, 30])
+        nmesc = NMESC(mat, max_num_speaker=8)
+        est_num_of_spk, g_p = nmesc.getEigRatioBatch(p_value_list)
+        for idx, p_value in enumerate(p_value_list.tolist()):
+            expected_est_num_of_spk, expected_g_p = nmesc.getEigRatio(p_value)
+            assert est_num_of_spk[idx] == expected_est_num_of_spk
+            assert torch.allclose(g_p[idx], expected_g_p, rtol=1e-3)
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('num_workers', [1, 2])
+    def test_perform_clustering(self, tmpdir, num_workers):
+        session_lengths = {'session_a': 90.0, 'session_b': 30.0, 'session_c': 60.0}
+        audio_rttm_map = {uniq_id: {'num_speakers': None, 'rttm_filepath': None} for uniq_id in session_lengths}
+        clustering_params = OmegaConf.create(
+            {
+                'oracle_num_speakers': False,
+                'max_num_speakers': 8,
+                'enhanced_count_thres': 80,
+                'max_rp_threshold': 0.25,
+                'sparse_search_volume': 30,
+                'num_workers': num_workers,
+                'parallel_pvalue_search': True,
+            }
+        )
+        out_rttm_dir = os.path.join(tmpdir, 'pred_rttms')
+        os.makedirs(out_rttm_dir)
+        os.makedirs(os.path.join(tmpdir, 'speaker_outputs'))
+
+        embs_and_timestamps = {
+            uniq_id: _multiscale_session(session_len, num_speakers=2, seed=seed)
+            for seed, (uniq_id, session_len) in enumerate(session_lengths.items())
+        }
+        _, all_hypothesis = perform_clustering(embs_and_timestamps, audio_rttm_map, out_rttm_dir, clustering_params)
+
+        assert [uniq_id for uniq_id, _ in all_hypothesis] == list(session_lengths)
+        for uniq_id, hypothesis in all_hypothesis:
+            assert len(hypothesis.labels()) == 2
+            assert os.path.exists(os.path.join(out_rttm_dir, uniq_id + '.rttm'))
+        with open(os.path.join(tmpdir, 'speaker_outputs', 'clustering_times.json')) as f:
+            clustering_times = json.load(f)
+        assert list(clustering_times) == list(session_lengths)
+        assert all(clustering_time > 0 for clustering_time in clustering_times.values())
@@ -0,0 +1,121 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+
+import pytest
+import torch
+
+from nemo.collections.asr.parts.utils.vad_utils import (
+    generate_overlap_vad_seq,
+    generate_overlap_vad_seq_from_tensors,
+    generate_overlap_vad_seq_per_tensor,
+    generate_vad_segment_table,
+    generate_vad_segment_table_from_tensors,
+    load_tensor_from_file,
+    write_tensor_to_file,
+)
+
+POSTPROCESSING_PARAMS = {
+    'onset': 0.5,
+    'offset': 0.5,
+    'pad_onset': 0.05,
+    'pad_offset': -0.1,
+    'min_duration_on': 0.2,
+    'min_duration_off': 0.2,
+    'filter_speech_first': True,
+}
+
+
+def _reference_overlap_vad_seq(frame, overlap, window_length_in_sec, shift_length_in_sec, smoothing_method):
+    """Smooths the frame predictions one window at a time, as generate_overlap_vad_seq_per_tensor did."""
+    shift = int(shift_length_in_sec / 0.01)
+    seg = int(window_length_in_sec / 0.01 + 1)
+    jump_on_frame = int(int(seg * (1 - overlap)) / shift)
+    target_len = len(frame) * shift
+
+    window_preds = [[] for _ in range(target_len)]
+    for i in range(0, len(frame), jump_on_frame):
+        for j in range(i * shift, min(i * shift + seg, target_len)):
+            window_preds[j].append(frame[i])
+
+    preds = torch.full([target_len], float('nan'))
+    for j, values in enumerate(window_preds):
+        if values:
+            values = torch.stack(values)
+            preds[j] = values.mean() if smoothing_method == 'mean' else torch.quantile(values, q=0.5)
+    preds[torch.isnan(preds)] = preds[~torch.isnan(preds)][-1]
+    return preds
+
+
+class TestVADUtils:
+    @pytest.mark.unit
+    @pytest.mark.parametrize('smoothing_method', ['mean', 'median'])
+    @pytest.mark.parametrize(
+        'overlap, window_length_in_sec, shift_length_in_sec',
+        [(0.875, 0.15, 0.01), (0.5, 0.63, 0.08), (0.75, 0.15, 0.02)],
+    )
+    @pytest.mark.parametrize('num_frames', [1, 7, 1000])
+    def test_overlap_vad_seq(self, smoothing_method, overlap, window_length_in_sec, shift_length_in_sec, num_frames):
+        torch.manual_seed(0)
+        frame = torch.rand(num_frames)
+        per_args = {
+            'overlap': overlap,
+            'window_length_in_sec': window_length_in_sec,
+            'shift_length_in_sec': shift_length_in_sec,
+        }
+        preds = generate_overlap_vad_seq_per_tensor(frame, per_args, smoothing_method)
+        expected = _reference_overlap_vad_seq(
+            frame, overlap, window_length_in_sec, shift_length_in_sec, smoothing_method
+        )
+        assert torch.allclose(preds, expected, atol=1e-6)
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('smoothing_method', ['mean', 'median'])
+    def test_vad_pipeline_from_tensors(self, tmpdir, smoothing_method):
+        torch.manual_seed(0)
+        frame_dir = os.path.join(tmpdir, 'frames')
+        os.makedirs(frame_dir)
+        frame_preds = {}
+        for name, num_frames in [('short', 50), ('long', 3000)]:
+            # speech with noisy probabilities, in the precision of the frame files
+            frame = torch.rand(num_frames) * 0.4 + (torch.arange(num_frames) // 200 % 2) * 0.6
+            write_tensor_to_file(frame, os.path.join(frame_dir, name + '.frame'))
+            frame_preds[name], _ = load_tensor_from_file(os.path.join(frame_dir, name + '.frame'))
+
+        overlap_dir = generate_overlap_vad_seq(
+            frame_dir, smoothing_method, 0.875, 0.15, 0.01, num_workers=0, out_dir=os.path.join(tmpdir, 'overlap')
+        )
+        table_dir = generate_vad_segment_table(
+            overlap_dir, POSTPROCESSING_PARAMS, 0.01, num_workers=0, out_dir=os.path.join(tmpdir, 'tables')
+        )
+
+        overlap_preds = generate_overlap_vad_seq_from_tensors(
+            frame_preds, smoothing_method, 0.875, 0.15, 0.01, out_dir=os.path.join(tmpdir, 'overlap_from_tensors')
+        )
+        tensors_table_dir = generate_vad_segment_table_from_tensors(
+            overlap_preds, POSTPROCESSING_PARAMS, 0.01, out_dir=os.path.join(tmpdir, 'tables_from_tensors')
+        )
+
+        for name in frame_preds:
+            saved_preds, _ = load_tensor_from_file(
+                os.path.join(tmpdir, 'overlap_from_tensors', f'{name}.{smoothing_method}')
+            )
+            assert torch.allclose(saved_preds, overlap_preds[name], atol=1e-4)
+            with open(os.path.join(table_dir, name + '.txt')) as f:
+                expected_table = f.read()
+            with open(os.path.join(tensors_table_dir, name + '.txt')) as f:
+                table = f.read()
+            assert table == expected_table
+        assert table.count('speech') > 1
@@ -23,7 +23,7 @@ from uuid import uuid4
 import model_api
 import torch
 import werkzeug
-from flask import Flask, make_response, render_template, request, url_for
+from flask import Flask, jsonify, make_response, render_template, request, url_for
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 
@@ -315,6 +315,17 @@ def transcribe():
     return result
 
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    API Endpoint for the metrics of the batch schedulers of this worker.
+
+    Files of concurrent transcription requests are batched together, the metrics report the queue time of the files,
+    the fill of the batches and the latency of the requests.
+    """
+    return jsonify(model_api.get_scheduler_metrics())
+
+
 def remove_tmp_dir_at_exit():
     """
     Helper method to attempt a deletion of audio file cache on flask api exit.
@@ -368,6 +379,7 @@ def main():
 
 # Register hook to delete file cache (for flask server only)
 atexit.register(remove_tmp_dir_at_exit)
+atexit.register(model_api.close_batch_schedulers)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,366 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Dynamic micro-batching of transcription requests.
+
+Concurrent requests (each made of one or more waveforms) are queued by `BatchScheduler`, which groups waveforms of
+similar lengths from all the requests into batches, and runs them through the model from a single thread. A batch is
+run as soon as it is full, or when its oldest waveform has waited for ``max_latency`` seconds. The results are then
+dispatched back to the requests, each resolving a `concurrent.futures.Future` once all its waveforms are transcribed.
+
+The scheduler can be tried locally (on CPU) with simulated concurrent clients:
+
+    python batch_scheduler.py \
+        --model_name=<pretrained model name or path to .nemo file> \
+        --num_clients=8 \
+        --requests_per_client=4 \
+        --max_batch_size=16 \
+        --max_latency=0.05
+"""
+
+import bisect
+import contextlib
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import torch
+
+from nemo.utils import logging
+
+__all__ = ['BatchScheduler', 'SchedulerMetrics', 'model_transcribe_fn']
+
+# Upper bounds of the duration buckets, in seconds. Longer waveforms share the last bucket.
+DEFAULT_BUCKET_DURATIONS = (2.0, 4.0, 8.0, 16.0, 32.0)
+
+
+class SchedulerMetrics:
+    """
+    Thread-safe statistics of a `BatchScheduler`, over the last ``window`` waveforms, batches and requests.
+
+    - queue time: time between the submission of a waveform and the start of its batch.
+    - batch fill: number of waveforms of a batch divided by the maximum batch size.
+    - request latency: time between the submission of a request and the transcription of all its waveforms.
+    """
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._queue_times = deque(maxlen=window)
+        self._batch_fills = deque(maxlen=window)
+        self._batch_run_times = deque(maxlen=window)
+        self._latencies = deque(maxlen=window)
+        self.num_requests = 0
+        self.num_failed_requests = 0
+        self.num_batches = 0
+        self.num_waveforms = 0
+
+    def record_batch(self, queue_times: List[float], batch_fill: float, run_time: float):
+        with self._lock:
+            self._queue_times.extend(queue_times)
+            self._batch_fills.append(batch_fill)
+            self._batch_run_times.append(run_time)
+            self.num_batches += 1
+            self.num_waveforms += len(queue_times)
+
+    def record_request(self, latency: float, failed: bool = False):
+        with self._lock:
+            self._latencies.append(latency)
+            self.num_requests += 1
+            self.num_failed_requests += int(failed)
+
+    @staticmethod
+    def _stats(values: Sequence[float], scale: float = 1.0) -> Dict[str, float]:
+        if len(values) == 0:
+            return {}
+        values = np.asarray(values) * scale
+        return {
+            'mean': float(values.mean()),
+            'p50': float(np.percentile(values, 50)),
+            'p95': float(np.percentile(values, 95)),
+            'max': float(values.max()),
+        }
+
+    def summary(self) -> Dict:
+        """Returns the counters, and the statistics of the times (in milliseconds) and batch fill."""
+        with self._lock:
+            return {
+                'num_requests': self.num_requests,
+                'num_failed_requests': self.num_failed_requests,
+                'num_batches': self.num_batches,
+                'num_waveforms': self.num_waveforms,
+                'queue_time_ms': self._stats(self._queue_times, scale=1000.0),
+                'batch_run_time_ms': self._stats(self._batch_run_times, scale=1000.0),
+                'request_latency_ms': self._stats(self._latencies, scale=1000.0),
+                'batch_fill': self._stats(self._batch_fills),
+            }
+
+
+class _Request:
+    def __init__(self, num_waveforms: int):
+        self.future = Future()
+        self.results: List[Optional[str]] = [None] * num_waveforms
+        self.remaining = num_waveforms
+        self.submit_time = time.monotonic()
+
+
+class _Item:
+    __slots__ = ['request', 'index', 'waveform', 'enqueue_time']
+
+    def __init__(self, request: _Request, index: int, waveform: np.ndarray, enqueue_time: float):
+        self.request = request
+        self.index = index
+        self.waveform = waveform
+        self.enqueue_time = enqueue_time
+
+
+class BatchScheduler:
+    """
+    Coalesces the waveforms of concurrent requests into length-bucketed batches, run by a background thread.
+
+    Args:
+        transcribe_fn: Function transcribing a list of waveforms into a list of texts, e.g. `model_transcribe_fn`.
+        sample_rate: Sample rate of the waveforms, used to bucket them by duration.
+        max_batch_size: Maximum number of waveforms per batch.
+        max_latency: Maximum time in seconds a waveform waits for its batch to fill up before the batch is run.
+        bucket_durations: Upper bounds of the duration buckets in seconds. Waveforms of a batch come from one
+            bucket, or from the adjacent buckets to fill a batch whose deadline is reached.
+        metrics_window: Number of recent waveforms, batches and requests whose statistics are reported.
+    """
+
+    def __init__(
+        self,
+        transcribe_fn: Callable[[List[np.ndarray]], List[str]],
+        sample_rate: int = 16000,
+        max_batch_size: int = 32,
+        max_latency: float = 0.05,
+        bucket_durations: Sequence[float] = DEFAULT_BUCKET_DURATIONS,
+        metrics_window: int = 1000,
+    ):
+        if max_batch_size < 1:
+            raise ValueError(f"`max_batch_size` must be positive, got {max_batch_size}")
+        self.transcribe_fn = transcribe_fn
+        self.sample_rate = sample_rate
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.bucket_bounds = [int(duration * sample_rate) for duration in sorted(bucket_durations)]
+        self.metrics = SchedulerMetrics(window=metrics_window)
+
+        self._buckets: List[deque] = [deque() for _ in range(len(self.bucket_bounds) + 1)]
+        self._num_queued = 0
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='asr_batch_scheduler', daemon=True)
+        self._thread.start()
+
+    @property
+    def queue_size(self) -> int:
+        """Number of queued waveforms, not yet in a batch."""
+        return self._num_queued
+
+    def submit(self, waveforms: List[np.ndarray]) -> Future:
+        """
+        Queues the waveforms of a request.
+
+        Returns:
+            A future resolved with the texts of the waveforms, in order, or with the exception raised by the model.
+        """
+        request = _Request(len(waveforms))
+        if len(waveforms) == 0:
+            request.future.set_result([])
+            return request.future
+
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("BatchScheduler is closed")
+            for index, waveform in enumerate(waveforms):
+                bucket = bisect.bisect_left(self.bucket_bounds, len(waveform))
+                self._buckets[bucket].append(_Item(request, index, waveform, request.submit_time))
+            self._num_queued += len(waveforms)
+            self._condition.notify()
+        return request.future
+
+    def transcribe(self, waveforms: List[np.ndarray], timeout: Optional[float] = None) -> List[str]:
+        """Queues the waveforms of a request and waits for their texts."""
+        return self.submit(waveforms).result(timeout=timeout)
+
+    def close(self):
+        """Stops the scheduler. Requests still queued fail with a RuntimeError."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+
+        error = RuntimeError("BatchScheduler was closed before the request was processed")
+        for bucket in self._buckets:
+            for item in bucket:
+                self._fail(item.request, error)
+            bucket.clear()
+
+    def _pop_batch(self, now: float) -> Optional[List[_Item]]:
+        """Returns the next batch to run if one is full or past its deadline, otherwise None. Called with the lock."""
+        # The bucket whose oldest waveform reached its deadline, then full buckets
+        oldest = None
+        for bucket_idx, bucket in enumerate(self._buckets):
+            if bucket and (oldest is None or bucket[0].enqueue_time < self._buckets[oldest][0].enqueue_time):
+                oldest = bucket_idx
+
+        if oldest is not None and now - self._buckets[oldest][0].enqueue_time >= self.max_latency:
+            batch = self._pop_items(self._buckets[oldest], self.max_batch_size)
+            # Fills the batch with the waveforms of the closest lengths
+            for neighbour in [oldest - 1, oldest + 1]:
+                if 0 <= neighbour < len(self._buckets) and len(batch) < self.max_batch_size:
+                    batch.extend(self._pop_items(self._buckets[neighbour], self.max_batch_size - len(batch)))
+            return batch
+
+        for bucket in self._buckets:
+            if len(bucket) >= self.max_batch_size:
+                return self._pop_items(bucket, self.max_batch_size)
+        return None
+
+    def _pop_items(self, bucket: deque, count: int) -> List[_Item]:
+        items = [bucket.popleft() for _ in range(min(count, len(bucket)))]
+        self._num_queued -= len(items)
+        return items
+
+    def _next_deadline(self) -> Optional[float]:
+        oldest = min((bucket[0].enqueue_time for bucket in self._buckets if bucket), default=None)
+        return None if oldest is None else oldest + self.max_latency
+
+    def _run(self):
+        while True:
+            with self._condition:
+                batch = None
+                while not self._closed:
+                    now = time.monotonic()
+                    batch = self._pop_batch(now)
+                    if batch is not None:
+                        break
+                    deadline = self._next_deadline()
+                    self._condition.wait(timeout=None if deadline is None else max(deadline - now, 0.0))
+                if batch is None:
+                    return
+
+            self._run_batch(batch)
+
+    def _run_batch(self, batch: List[_Item]):
+        start_time = time.monotonic()
+        try:
+            texts = self.transcribe_fn([item.waveform for item in batch])
+            if len(texts) != len(batch):
+                raise RuntimeError(f"Expected {len(batch)} transcriptions, got {len(texts)}")
+        except Exception as e:
+            logging.warning(f"Transcription of a batch of {len(batch)} waveforms failed : {e}")
+            for item in batch:
+                self._fail(item.request, e)
+            return
+
+        end_time = time.monotonic()
+        self.metrics.record_batch(
+            queue_times=[start_time - item.enqueue_time for item in batch],
+            batch_fill=len(batch) / self.max_batch_size,
+            run_time=end_time - start_time,
+        )
+        for item, text in zip(batch, texts):
+            request = item.request
+            if request.future.done():
+                continue
+            request.results[item.index] = text
+            request.remaining -= 1
+            if request.remaining == 0:
+                self.metrics.record_request(end_time - request.submit_time)
+                request.future.set_result(request.results)
+
+    def _fail(self, request: _Request, error: Exception):
+        if not request.future.done():
+            self.metrics.record_request(time.monotonic() - request.submit_time, failed=True)
+            request.future.set_exception(error)
+
+
+def model_transcribe_fn(model, autocast=contextlib.nullcontext) -> Callable[[List[np.ndarray]], List[str]]:
+    """Returns a function transcribing a batch of waveforms with the `transcribe_audio` method of an ASR model."""
+
+    def transcribe(waveforms: List[np.ndarray]) -> List[str]:
+        with autocast():
+            with torch.no_grad():
+                return list(model.transcribe_audio(waveforms, batch_size=len(waveforms)))
+
+    return transcribe
+
+
+def main():
+    import argparse
+    import random
+
+    import nemo.collections.asr as nemo_asr
+    from nemo.collections.asr.parts.preprocessing.segment import AudioSegment
+
+    parser = argparse.ArgumentParser(description="Simulates concurrent clients of a BatchScheduler")
+    parser.add_argument("--model_name", type=str, required=True, help="Pretrained model name or path to .nemo file")
+    parser.add_argument("--audio_files", type=str, nargs='*', default=[], help="Audio files sent by the clients")
+    parser.add_argument("--num_clients", type=int, default=8)
+    parser.add_argument("--requests_per_client", type=int, default=4)
+    parser.add_argument("--files_per_request", type=int, default=2)
+    parser.add_argument("--max_batch_size", type=int, default=16)
+    parser.add_argument("--max_latency", type=float, default=0.05)
+    parser.add_argument("--device", type=str, default='cuda' if torch.cuda.is_available() else 'cpu')
+    args = parser.parse_args()
+
+    if args.model_name.endswith('.nemo'):
+        model = nemo_asr.models.ASRModel.restore_from(restore_path=args.model_name, map_location=args.device)
+    else:
+        model = nemo_asr.models.ASRModel.from_pretrained(args.model_name, map_location=args.device)
+    model.freeze()
+    sample_rate = model.preprocessor._sample_rate
+
+    if args.audio_files:
+        waveforms = [AudioSegment.from_file(path, target_sr=sample_rate).samples for path in args.audio_files]
+    else:
+        # Random noise of 1 to 10 seconds
+        rng = np.random.RandomState(0)
+        waveforms = [rng.uniform(-0.1, 0.1, size=rng.randint(sample_rate, 10 * sample_rate)) for _ in range(32)]
+        waveforms = [waveform.astype(np.float32) for waveform in waveforms]
+
+    scheduler = BatchScheduler(
+        model_transcribe_fn(model),
+        sample_rate=sample_rate,
+        max_batch_size=args.max_batch_size,
+        max_latency=args.max_latency,
+    )
+
+    def client(seed):
+        client_rng = random.Random(seed)
+        for _ in range(args.requests_per_client):
+            scheduler.transcribe(client_rng.sample(waveforms, min(args.files_per_request, len(waveforms))))
+
+    start = time.monotonic()
+    clients = [threading.Thread(target=client, args=(seed,)) for seed in range(args.num_clients)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    elapsed = time.monotonic() - start
+    scheduler.close()
+
+    summary = scheduler.metrics.summary()
+    print(f"{summary['num_requests']} requests, {summary['num_waveforms']} waveforms in {elapsed:.2f} s")
+    for key, value in summary.items():
+        print(f"{key:>22}: {value}")
+
+
+if __name__ == '__main__':
+    main()
@@ -24,6 +24,9 @@ bind = "0.0.0.0:8000"
 workers = 2
 
 # Worker specific config
+# Threaded workers let concurrent requests be batched together by the batch scheduler of the worker
+worker_class = "gthread"
+threads = 8
 worker_connections = 1000
 timeout = 180  # 3 minutes of timeout
 
@@ -13,12 +13,16 @@
 # limitations under the License.
 
 import contextlib
+import copy
 import glob
 import os
+import threading
 
 import torch
+from batch_scheduler import BatchScheduler, model_transcribe_fn
 
 import nemo.collections.asr as nemo_asr
+from nemo.collections.asr.parts.preprocessing.segment import AudioSegment
 from nemo.utils import logging, model_utils
 
 # setup AMP (optional)
@@ -34,6 +38,14 @@ else:
 
 MODEL_CACHE = {}
 
+# Batch schedulers of the models, keyed by model name and device
+SCHEDULER_CACHE = {}
+SCHEDULER_LOCK = threading.Lock()
+
+# Dynamic batching settings, waveforms of concurrent requests are batched together
+MAX_BATCH_SIZE = int(os.environ.get('ASR_MAX_BATCH_SIZE', 32))
+MAX_BATCH_LATENCY = float(os.environ.get('ASR_MAX_BATCH_LATENCY', 0.05))  # seconds
+
 # Special tags for fallbacks / user notifications
 TAG_ERROR_DURING_TRANSCRIPTION = "<ERROR_DURING_TRANSCRIPTION>"
 
@@ -86,48 +98,85 @@ def initialize_model(model_name):
     return model
 
 
-def transcribe_all(filepaths, model_name, use_gpu_if_available=True):
-    # instantiate model
-    if model_name in MODEL_CACHE:
-        model = MODEL_CACHE[model_name]
-    else:
-        model = initialize_model(model_name)
+def get_batch_scheduler(model_name, use_gpu_if_available=True):
+    """
+    Returns the batch scheduler of a model on a device, which coalesces the files of concurrent requests into batches.
+    The cached model stays on CPU, the scheduler on GPU runs its own copy of the model, so that requests on both
+    devices can be served at the same time.
+    """
+    device = 'cuda' if torch.cuda.is_available() and use_gpu_if_available else 'cpu'
+    with SCHEDULER_LOCK:
+        key = (model_name, device)
+        if key not in SCHEDULER_CACHE:
+            model = initialize_model(model_name)
+            if device != 'cpu':
+                model = copy.deepcopy(model).to(device)
+            SCHEDULER_CACHE[key] = BatchScheduler(
+                model_transcribe_fn(model, autocast=autocast if device == 'cuda' else contextlib.nullcontext),
+                sample_rate=model.preprocessor._sample_rate,
+                max_batch_size=MAX_BATCH_SIZE,
+                max_latency=MAX_BATCH_LATENCY,
+            )
+        return SCHEDULER_CACHE[key]
+
+
+def close_batch_schedulers():
+    """Stops all the batch schedulers, at shutdown. Their requests still queued fail."""
+    with SCHEDULER_LOCK:
+        schedulers = list(SCHEDULER_CACHE.values())
+        SCHEDULER_CACHE.clear()
+
+    # Joins the scheduler threads outside of the lock, their batches may take a while to finish
+    for scheduler in schedulers:
+        scheduler.close()
+
+
+def is_cuda_out_of_memory(error):
+    """Whether an exception is a CUDA out of memory error."""
+    return isinstance(error, RuntimeError) and 'CUDA out of memory' in str(error)
+
+
+def get_scheduler_metrics():
+    """Returns the metrics of each batch scheduler, keyed by model name and device."""
+    with SCHEDULER_LOCK:
+        return {
+            f"{model_name} ({device})": dict(queue_size=scheduler.queue_size, **scheduler.metrics.summary())
+            for (model_name, device), scheduler in SCHEDULER_CACHE.items()
+        }
 
-    if torch.cuda.is_available() and use_gpu_if_available:
-        model = model.cuda()
+
+def transcribe_all(filepaths, model_name, use_gpu_if_available=True):
+    # instantiate model and its batch scheduler
+    scheduler = get_batch_scheduler(model_name, use_gpu_if_available=use_gpu_if_available)
 
     # transcribe audio
     logging.info("Begin transcribing audio...")
     try:
-        with autocast():
-            with torch.no_grad():
-                transcriptions = model.transcribe(filepaths, batch_size=32)
-
-    except RuntimeError:
-        # Purge the cache to clear some memory
-        MODEL_CACHE.clear()
-
-        logging.info("Ran out of memory on device - performing inference on CPU for now")
+        waveforms = [
+            AudioSegment.from_file(filepath, target_sr=scheduler.sample_rate).samples for filepath in filepaths
+        ]
+    except Exception as e:
+        logging.info(f"Exception {e} occured while attemting to load audio. Returning error message")
+        return TAG_ERROR_DURING_TRANSCRIPTION
 
+    try:
         try:
-            model = model.cpu()
+            transcriptions = scheduler.transcribe(waveforms)
 
-            with torch.no_grad():
-                transcriptions = model.transcribe(filepaths, batch_size=32)
+        except RuntimeError as e:
+            if not is_cuda_out_of_memory(e):
+                raise
 
-        except Exception as e:
-            logging.info(f"Exception {e} occured while attemting to transcribe audio. Returning error message")
-            return TAG_ERROR_DURING_TRANSCRIPTION
+            # Only this request falls back to CPU, the GPU scheduler keeps serving the other requests
+            logging.info("Ran out of memory on device - performing inference on CPU for now")
+            torch.cuda.empty_cache()
+            scheduler = get_batch_scheduler(model_name, use_gpu_if_available=False)
+            transcriptions = scheduler.transcribe(waveforms)
 
-    logging.info(f"Finished transcribing {len(filepaths)} files !")
+    except Exception as e:
+        logging.info(f"Exception {e} occured while attemting to transcribe audio. Returning error message")
+        return TAG_ERROR_DURING_TRANSCRIPTION
 
-    # If RNNT models transcribe, they return a tuple (greedy, beam_scores)
-    if type(transcriptions[0]) == list and len(transcriptions) == 2:
-        # get greedy transcriptions only
-        transcriptions = transcriptions[0]
-
-    # Force onto CPU
-    model = model.cpu()
-    MODEL_CACHE[model_name] = model
+    logging.info(f"Finished transcribing {len(filepaths)} files !")
 
     return transcriptions